@@ -10,15 +10,30 @@ Orchestration complète de la chaîne de données DVF :
                     → dbt Gold  (agrégations métier)
                         → dbt Star Schema (Power BI)
                             → dbt test (qualité)
+                                → S3 Parquet (extraits de service → API locale)
 
-Fréquence : 5e jour du mois à 02h00 UTC
-            (les fichiers DVF sont mis à jour le 1er du mois)
+Déclenchement : événement d'asset `dvf_data_gouv`, émis par un trigger
+            différable (include/dvf/triggers.py, triggerer) qui interroge
+            l'API dataset toutes les DVF_POLL_INTERVAL secondes et compare
+            les empreintes amont au manifest d'ingestion S3 : le run part
+            dès la publication, jamais pour rien.
+            DVF_SCHEDULE="0 2 5 * *" rétablit la planification cron.
 
 Architecture Airflow :
-    - TaskGroup `ingestion`       : API → S3 (idempotent, skip si déjà présent)
-    - TaskGroup `loading`         : S3 → Snowflake Bronze (idempotent COPY INTO)
-    - TaskGroup `transformation`  : dbt seed → staging → silver → gold → star_schema
+    - TaskGroup `ingestion`       : API → S3 (1 tâche mappée par année, idempotent,
+                                    skip si déjà présent)
+    - TaskGroup `conversion`      : (optionnel, DVF_PARQUET_ENABLED) TXT → Parquet
+                                    zstd partitionné annee / Code departement
+    - TaskGroup `loading`         : S3 → Snowflake Bronze (idempotent COPY INTO ;
+                                    DVF_TYPED_BRONZE : dates / décimaux typés au COPY ;
+                                    1 session, DDL / stages rejoués si modifiés)
+    - TaskGroup `transformation`  : dbt seed puis 1 tâche par modèle dbt, dépendances
+                                    ref() lues dans manifest.json (sous-groupes
+                                    staging / silver / gold / star_schema)
     - TaskGroup `quality`         : dbt test sur tous les modèles
+    - TaskGroup `serving`         : (DVF_SERVING_ENABLED, désactivé par défaut) déchargement Parquet des
+                                    dimensions / agrégats Star, publication d'une
+                                    version (CURRENT.json) lue par include/serving/api.py
 
 Connexions Airflow requises :
     - aws_conn      : AWS (S3) — type Amazon Web Services
@@ -27,21 +42,27 @@ Connexions Airflow requises :
 Variables d'environnement requises (pour dbt via profiles.yml) :
     SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, SNOWFLAKE_PASSWORD
     (configurable via Astronomer UI → Environment Variables)
+
+Télémétrie (callbacks de tâche, include/dvf/telemetry.py) :
+    temps mur, pic RSS, octets téléchargés / uploadés, lignes COPY, temps
+    dbt par modèle → StatsD / OpenTelemetry via la section [metrics]
+    d'Airflow (AIRFLOW__METRICS__STATSD_ON ou AIRFLOW__METRICS__OTEL_ON) ;
+    DVF_TELEMETRY_FILE=/tmp/dvf_metrics.jsonl pour un export fichier local.
 """
 
 from __future__ import annotations
 
 import logging
-import zipfile
+import os
 from datetime import datetime, timedelta
-from io import BytesIO
 from pathlib import Path
 
-import requests
-from airflow.sdk import DAG, task, task_group
+from airflow.sdk import DAG, Asset, AssetWatcher, TaskGroup, chain, task, task_group
 from airflow.providers.standard.operators.empty import EmptyOperator
 from airflow.providers.standard.operators.bash import BashOperator
 
+from include.dvf.triggers import DvfDatasetUpdateTrigger
+
 logger = logging.getLogger(__name__)
 
 # ─── Configuration ────────────────────────────────────────────────────────────
@@ -55,12 +76,112 @@ DBT_PROJECT_DIR  = "/usr/local/airflow/include/dbt/real_estate_analytics"
 DBT_PROFILES_DIR = "/usr/local/airflow/include/dbt"
 DBT_LOG_PATH     = "/tmp/dbt_logs"   # Volume monté en lecture seule → logs dans /tmp
 
+# Graphe par modèle : manifest généré au build de l'image (Dockerfile, dbt parse).
+# Absent (dev local sans rebuild) → repli sur 1 tâche par couche.
+DBT_MANIFEST_PATH = os.getenv("DVF_DBT_MANIFEST", "/usr/local/airflow/dbt_manifest/manifest.json")
+DBT_TARGET_ROOT   = "/tmp/dbt_target"   # 1 target-path par tâche : runs dbt concurrents isolés
+# Concurrence des modèles = slots du pool (ex. pool `dbt` de 8 slots, DVF_DBT_POOL=dbt)
+DBT_POOL          = os.getenv("DVF_DBT_POOL", "default_pool")
+# Exécution dbt : "inprocess" (défaut) = dbtRunner via include/dvf/dbt_runner.py,
+# état de partial parse partagé entre tâches dans DBT_STATE_DIR (clé = empreinte
+# du projet) et `dbt deps` ignoré si package-lock.yml est inchangé ; "cli" = dbt
+DBT_RUNNER        = os.getenv("DVF_DBT_RUNNER", "inprocess")
+DBT_STATE_DIR     = os.getenv("DVF_DBT_STATE_DIR", "/tmp/dbt_state")
+DBT_EXECUTABLE    = (
+    f"{DBT_VENV}/dbt" if DBT_RUNNER == "cli" else
+    f"DVF_DBT_STATE_DIR={DBT_STATE_DIR} PYTHONPATH=/usr/local/airflow {DBT_VENV}/python -m include.dvf.dbt_runner"
+)
+DBT_LAYER_TIMEOUTS = {
+    "silver":      timedelta(hours=2),   # Silver peut être long (17M rows)
+    "star_schema": timedelta(hours=1),
+}
+
 DVF_API_URL      = "https://www.data.gouv.fr/api/1/datasets/demandes-de-valeurs-foncieres/"
+S3_PART_SIZE     = 16 * 1024 * 1024   # Multipart upload : mémoire max ≈ 1 part
+
+# Téléchargement par plages HTTP reprenable (include/dvf/download.py) : la
+# progression est persistée dans DOWNLOAD_DIR, une nouvelle tentative sur le
+# même worker reprend le ZIP là où la précédente s'est arrêtée
+DOWNLOAD_DIR         = os.getenv("DVF_DOWNLOAD_DIR", "/tmp/dvf_downloads")
+DOWNLOAD_CONCURRENCY = int(os.getenv("DVF_DOWNLOAD_CONCURRENCY", "4"))
+
+# Cache disque des ZIP vérifiés (include/dvf/cache.py), clé = URL + empreinte
+# amont : retries et backfills n'appellent plus data.gouv.fr. Vide = désactivé
+# (le ZIP est alors supprimé de DOWNLOAD_DIR après l'upload)
+CACHE_DIR       = os.getenv("DVF_CACHE_DIR", "/tmp/dvf_cache")
+CACHE_MAX_BYTES = int(float(os.getenv("DVF_CACHE_MAX_GB", "10")) * 1024 ** 3)
+
+# Chunks compressés (entête répété) pour paralléliser COPY INTO — 0 = fichier entier
+S3_CHUNK_TARGET_SIZE = int(os.getenv("DVF_CHUNK_TARGET_MB", "128")) * 1024 * 1024
+S3_CHUNK_CODEC       = os.getenv("DVF_CHUNK_CODEC", "gzip")   # gzip | zstd
+
+# Conversion optionnelle TXT → Parquet (zstd, partitionné annee / département)
+PARQUET_ENABLED  = os.getenv("DVF_PARQUET_ENABLED", "false").lower() == "true"
+PARQUET_PREFIX   = "real-parquet/"
+
+# Bronze typé : dates / décimaux convertis au COPY (DEV_BRONZE.mutations_foncieres_typed).
+# Lu aussi par dbt (macro bronze_typed) : Silver lit alors la table typée.
+TYPED_BRONZE     = os.getenv("DVF_TYPED_BRONZE", "false").lower() == "true"
+
+# Chargement Bronze sur une session Snowflake (include/dvf/loading.py) : DDL et
+# stages rejoués seulement si leur SQL a changé ; DVF_FORCE_DDL=true force
+SQL_DIR          = Path("/usr/local/airflow/include/sql")
+FORCE_DDL        = os.getenv("DVF_FORCE_DDL", "false").lower() == "true"
+# Storage integration Snowflake des stages S3 (recommandé) ; vide = credentials
+# de aws_conn dans le DDL des stages (secret masqué dans empreintes et erreurs)
+STORAGE_INTEGRATION = os.getenv("DVF_STORAGE_INTEGRATION", "")
+# Taux de lignes rejetées par COPY (ON_ERROR = CONTINUE) au-delà duquel la tâche
+# échoue ; rejets audités (copy_file_audit) et mis en quarantaine (copy_rejects)
+COPY_MAX_ERROR_RATE = float(os.getenv("DVF_COPY_MAX_ERROR_RATE", "0.01"))
+
+# Extraits de service (star schema → Parquet versionné, include/dvf/serving.py)
+SERVING_ENABLED       = os.getenv("DVF_SERVING_ENABLED", "false").lower() == "true"
+SERVING_PREFIX        = "real-serving/"
+SERVING_KEEP_VERSIONS = int(os.getenv("DVF_SERVING_KEEP_VERSIONS", "3"))
+
+# Planification : "asset" (défaut) = run déclenché par le trigger de
+# publication data.gouv.fr (include/dvf/triggers.py, exécuté par le
+# triggerer) ; sinon expression cron (ex. "0 2 5 * *", 5e du mois 2h UTC)
+DVF_SCHEDULE      = os.getenv("DVF_SCHEDULE", "asset")
+DVF_POLL_INTERVAL = int(os.getenv("DVF_POLL_INTERVAL", "3600"))
+
+# Ingestion parallèle : 1 instance mappée par année DVF
+INGESTION_POOL        = os.getenv("DVF_INGESTION_POOL", "default_pool")
+INGESTION_CONCURRENCY = int(os.getenv("DVF_INGESTION_CONCURRENCY", "6"))
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 
+def _dbt_run_results(context: dict) -> str | None:
+    """run_results.json des tâches dbt (temps par modèle), None sinon."""
+    task_id = context["ti"].task_id
+    if task_id.rsplit(".", 1)[-1].startswith("dbt_") or task_id.startswith("transformation."):
+        return f"{_dbt_target_path(task_id)}/run_results.json"
+    return None
+
+
+def _dbt_target_path(task_id: str) -> str:
+    """target-path propre à une tâche dbt (task_id complet) : ni course ni lecture croisée."""
+    return f"{DBT_TARGET_ROOT}/{task_id}"
+
+
+def _on_execute_callback(context: dict) -> None:
+    """Télémétrie : départ du chronomètre de la tâche."""
+    from include.dvf.telemetry import on_execute_callback
+
+    on_execute_callback(context)
+
+
+def _on_success_callback(context: dict) -> None:
+    """Télémétrie : temps mur, pic RSS, compteurs de la tâche, temps dbt par modèle."""
+    from include.dvf.telemetry import emit_task_metrics
+
+    emit_task_metrics(context, "success", dbt_run_results=_dbt_run_results(context))
+
+
 def _on_failure_callback(context: dict) -> None:
     """Log détaillé en cas d'échec — étendre avec Slack/email si nécessaire."""
+    from include.dvf.telemetry import emit_task_metrics
+
     logger.error(
         "PIPELINE FAILED | dag=%s | task=%s | run_id=%s | log_url=%s",
         context["dag"].dag_id,
@@ -68,21 +189,62 @@ def _on_failure_callback(context: dict) -> None:
         context["run_id"],
         context["task_instance"].log_url,
     )
+    emit_task_metrics(context, "failed", dbt_run_results=_dbt_run_results(context))
 
 
-def _dbt_cmd(select: str, cmd: str = "run") -> str:
+def _dbt_cmd(select: str, cmd: str = "run", target_path: str | None = None) -> str:
     """Génère une commande dbt avec les chemins de production."""
+    target_path_arg = f" --target-path {target_path}" if target_path else ""
     return (
-        f"{DBT_VENV}/dbt {cmd}"
+        f"{DBT_EXECUTABLE} {cmd}"
         f" --project-dir {DBT_PROJECT_DIR}"
         f" --profiles-dir {DBT_PROFILES_DIR}"
-        f" --log-path {DBT_LOG_PATH}"
+        f" --log-path {DBT_LOG_PATH}{target_path_arg}"
         f" --target prod"
         f" --select {select}"
         f" --no-use-colors"
     )
 
 
+def _dbt_model_graph() -> dict[str, dict] | None:
+    """Graphe des modèles dbt (include/dvf/dbt_graph.py), None sans manifest."""
+    from include.dvf.dbt_graph import load_manifest, model_graph
+
+    manifest = load_manifest(DBT_MANIFEST_PATH)
+    return model_graph(manifest) if manifest else None
+
+
+# ─── Assets ───────────────────────────────────────────────────────────────────
+
+# Dataset amont : un événement par publication nouvelle ou republiée par
+# rapport au manifest d'ingestion (payload : ressources en attente)
+dvf_source_asset = Asset(
+    name     = "dvf_data_gouv",
+    uri      = "https://www.data.gouv.fr/datasets/demandes-de-valeurs-foncieres",
+    group    = "dvf",
+    extra    = {"source": "data.gouv.fr", "layer": "source"},
+    watchers = [
+        AssetWatcher(
+            name    = "dvf_data_gouv_publication",
+            trigger = DvfDatasetUpdateTrigger(
+                DVF_API_URL,
+                bucket        = BUCKET_NAME,
+                aws_conn_id   = AWS_CONN_ID,
+                poll_interval = DVF_POLL_INTERVAL,
+            ),
+        ),
+    ],
+)
+
+# Fichiers bruts sur S3 : mis à jour par ingestion.validate_s3_upload
+dvf_raw_asset = Asset(
+    name  = "dvf_raw",
+    uri   = f"s3://{BUCKET_NAME}/{S3_PREFIX.rstrip('/')}",
+    group = "dvf",
+    extra = {"source": "data.gouv.fr", "layer": "raw", "format": "txt"},
+)
+
+
 # ─── DAG ──────────────────────────────────────────────────────────────────────
 
 default_args = {
@@ -90,13 +252,16 @@ default_args = {
     "depends_on_past":   False,
     "retries":           2,
     "retry_delay":       timedelta(minutes=5),
+    # Télémétrie par tâche (include/dvf/telemetry.py) : tous les TaskGroups
+    "on_execute_callback": _on_execute_callback,
+    "on_success_callback": _on_success_callback,
     "on_failure_callback": _on_failure_callback,
 }
 
 with DAG(
     dag_id      = "dvf_production_pipeline",
     description = "Pipeline DVF complet : data.gouv.fr → S3 → Snowflake → dbt → Star Schema",
-    schedule    = "0 2 5 * *",       # 5e du mois, 2h UTC
+    schedule    = [dvf_source_asset] if DVF_SCHEDULE == "asset" else DVF_SCHEDULE,
     start_date  = datetime(2025, 1, 1),
     catchup     = False,
     max_active_runs = 1,             # Pas d'exécutions concurrentes
@@ -115,179 +280,546 @@ with DAG(
     @task_group(group_id="ingestion")
     def ingestion_group() -> None:
 
-        @task(task_id="fetch_dvf_to_s3", retries=3, retry_delay=timedelta(minutes=10))
-        def fetch_dvf_to_s3() -> dict:
+        @task(task_id="list_dvf_resources")
+        def list_dvf_resources() -> list[dict]:
             """
-            Télécharge les fichiers DVF depuis l'API data.gouv.fr et les uploade sur S3.
-            Idempotent : vérifie S3 AVANT de télécharger chaque ZIP (évite ~25 min
-            de download inutile quand les fichiers sont déjà présents).
-            Pattern DVF : valeursfoncieres-YYYY.zip → valeursfoncieres-YYYY.txt
+            Liste les ZIP DVF publiés sur data.gouv.fr (un seul appel API) et
+            compare leur empreinte amont (checksum / last_modified) au manifest
+            d'ingestion. Chaque ressource devient une instance mappée de
+            fetch_dvf_to_s3, annotée de l'action à mener (unchanged / changed / new).
             """
             from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+            from include.dvf.ingestion import list_dvf_resources as _list_resources
+            from include.dvf.manifest import load_manifest, plan_resources
+
+            resources = _list_resources(DVF_API_URL)
+            logger.info("%d fichiers ZIP DVF détectés sur data.gouv.fr", len(resources))
+
+            manifest = load_manifest(S3Hook(aws_conn_id=AWS_CONN_ID).get_conn(), BUCKET_NAME)
+            planned = plan_resources(resources, manifest)
+            for action in ("unchanged", "changed", "new"):
+                logger.info(
+                    "  %-9s : %s", action,
+                    [r["year"] for r in planned if r["action"] == action],
+                )
+            return planned
+
+        @task(
+            task_id      = "fetch_dvf_to_s3",
+            retries      = 3,
+            retry_delay  = timedelta(minutes=10),
+            pool         = INGESTION_POOL,
+            max_active_tis_per_dagrun = INGESTION_CONCURRENCY,
+            map_index_template = "{{ dvf_year }}",
+        )
+        def fetch_dvf_to_s3(resource: dict) -> dict:
+            """
+            Télécharge UN fichier DVF (une année) et l'uploade sur S3.
+            Instance mappée par ressource : chaque année skip, retry et
+            rapporte indépendamment des autres.
+            Pattern DVF : valeursfoncieres-YYYY.zip → valeursfoncieres-YYYY.txt
 
-            s3 = S3Hook(aws_conn_id=AWS_CONN_ID)
-
-            response = requests.get(DVF_API_URL, timeout=30)
-            response.raise_for_status()
-            dataset = response.json()
+            Selon l'action décidée par list_dvf_resources :
+              - unchanged : empreinte amont identique → aucun appel S3 ni HTTP
+              - changed   : republication data.gouv.fr → download de la nouvelle
+                            version sous son propre préfixe (version_prefix),
+                            l'ancienne reste intacte ; la bascule et le retrait
+                            de l'ancienne sont faits par update_ingestion_manifest
+              - new       : absente du manifest → skip si déjà sur S3 (adoption
+                            de l'ETag existant), download sinon
+
+            Téléchargement : plages HTTP de 16 Mio (DOWNLOAD_CONCURRENCY en
+            parallèle) écrites dans DOWNLOAD_DIR ; une coupure ne fait rejouer
+            que la plage en cours, un retry de la tâche reprend le fichier
+            partiel. Taille et sha1 sont vérifiés contre l'API avant l'upload.
+            Le ZIP vérifié est conservé dans CACHE_DIR (LRU, CACHE_MAX_BYTES) :
+            un retry ou un backfill de la même version ne touche pas le réseau.
+            Le .txt interne est décompressé à la volée et envoyé en multipart
+            upload. La mémoire du worker est bornée par S3_PART_SIZE, pas par
+            la taille du fichier.
+            Si S3_CHUNK_TARGET_SIZE > 0, le .txt est réécrit en chunks compressés
+            numérotés (entête répété) pour paralléliser le COPY INTO.
+            """
+            from airflow.sdk import get_current_context
 
-            zip_urls = [
-                r["url"]
-                for r in dataset["resources"]
-                if r["url"].endswith(".zip") and "valeursfoncieres" in r["url"]
-            ]
-            logger.info("%d fichiers ZIP DVF détectés sur data.gouv.fr", len(zip_urls))
-
-            # Liste les clés S3 existantes UNE SEULE FOIS — évite N*check_for_key
-            existing_keys = set(s3.list_keys(bucket_name=BUCKET_NAME, prefix=S3_PREFIX) or [])
-            # Index lowercase pour comparaison insensible à la casse
-            # (ZIPs DVF : nom lowercase, mais .txt internes en PascalCase sur S3)
-            existing_keys_lower = {k.lower() for k in existing_keys}
-            logger.info("%d fichiers déjà présents sur S3 (préfixe %s)", len(existing_keys), S3_PREFIX)
-
-            uploaded, skipped = [], []
-
-            for url in zip_urls:
-                zip_name = url.split("/")[-1]
-
-                # Vérifie S3 AVANT de télécharger le ZIP
-                # Les ZIP DVF ont une double extension : valeursfoncieres-YYYY.txt.zip
-                # → retirer seulement '.zip' donne valeursfoncieres-YYYY.txt
-                # → comparaison lowercase car les .txt internes sont en PascalCase (ValeursFoncieres-...)
-                expected_txt = zip_name[:-4]  # retire uniquement '.zip'
-                expected_key = f"{S3_PREFIX}{expected_txt}"
-
-                if expected_key.lower() in existing_keys_lower:
-                    logger.info("SKIP ZIP (déjà sur S3) : %s", zip_name)
-                    skipped.append(expected_txt)
-                    continue
-
-                logger.info("Téléchargement ZIP : %s", zip_name)
-                r = requests.get(url, timeout=300)
-                r.raise_for_status()
-
-                with zipfile.ZipFile(BytesIO(r.content)) as z:
-                    for file_name in z.namelist():
-                        if not file_name.endswith(".txt"):
-                            continue
-
-                        s3_key = f"{S3_PREFIX}{file_name}"
-
-                        if s3_key in existing_keys:
-                            logger.info("SKIP (déjà présent sur S3) : %s", file_name)
-                            skipped.append(file_name)
-                            continue
-
-                        logger.info("Upload S3 → %s", s3_key)
-                        with z.open(file_name) as f:
-                            s3.load_file_obj(
-                                file_obj    = f,
-                                key         = s3_key,
-                                bucket_name = BUCKET_NAME,
-                                replace     = False,
-                            )
-                        uploaded.append(file_name)
-                        logger.info("Upload terminé : %s", file_name)
+            get_current_context()["dvf_year"] = resource["year"]
 
             summary = {
-                "uploaded": uploaded,
-                "skipped":  skipped,
-                "total":    len(uploaded) + len(skipped),
+                "year":             resource["year"],
+                "zip_name":         resource["zip_name"],
+                "action":           resource["action"],
+                "uploaded":         [],
+                "skipped":          [],
+                "bytes_downloaded": 0,
+                "bytes_resumed":    0,
+                "download_retries": 0,
+                "cache_hits":       0,
+                "cache_misses":     0,
+                "bytes_saved":      0,
+                "bytes_uploaded":   0,
+                "manifest_entry":   None,
             }
-            logger.info("Ingestion terminée : %s", summary)
+
+            if resource["action"] == "unchanged":
+                logger.info("SKIP ZIP (empreinte amont inchangée) : %s", resource["zip_name"])
+                summary["skipped"].append(resource["expected_txt"])
+                return summary
+
+            from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+            from include.dvf.cache import DownloadCache
+            from include.dvf.chunking import is_dvf_text_key
+            from include.dvf.ingestion import stream_zip_to_s3
+            from include.dvf.manifest import manifest_entry, version_prefix
+            from include.dvf.telemetry import record
+
+            s3_client = S3Hook(aws_conn_id=AWS_CONN_ID).get_conn()
+
+            if resource["action"] == "new":
+                # Comparaison lowercase car les .txt internes sont en PascalCase (ValeursFoncieres-...)
+                # Fichier entier (….txt) ou chunks compressés (….txt.NNNN.gz)
+                expected_key = f"{S3_PREFIX}{resource['expected_txt']}".lower()
+                paginator = s3_client.get_paginator("list_objects_v2")
+                present = [
+                    o
+                    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=S3_PREFIX)
+                    for o in page.get("Contents", [])
+                    if o["Key"].lower().startswith(expected_key) and is_dvf_text_key(o["Key"])
+                ]
+                if present:
+                    logger.info("SKIP ZIP (déjà sur S3, adopté dans le manifest) : %s", resource["zip_name"])
+                    summary["skipped"].append(resource["expected_txt"])
+                    summary["manifest_entry"] = manifest_entry(resource, [
+                        {"key": o["Key"], "etag": o["ETag"].strip('"'), "bytes": o["Size"]}
+                        for o in present
+                    ])
+                    return summary
+            else:
+                logger.info("Republication détectée → nouvelle version : %s", resource["zip_name"])
+
+            # Cache hit, sinon download par plages reprenable ; décompression +
+            # multipart : mémoire bornée par S3_PART_SIZE
+            cache = DownloadCache(CACHE_DIR, CACHE_MAX_BYTES) if CACHE_DIR else None
+            result = stream_zip_to_s3(
+                resource["url"],
+                s3_client,
+                BUCKET_NAME,
+                version_prefix(S3_PREFIX, resource),
+                part_size            = S3_PART_SIZE,
+                chunk_target_size    = S3_CHUNK_TARGET_SIZE or None,
+                chunk_codec          = S3_CHUNK_CODEC,
+                download_dir         = DOWNLOAD_DIR,
+                expected_size        = resource.get("filesize"),
+                checksum             = resource.get("checksum"),
+                checksum_type        = resource.get("checksum_type") or "sha1",
+                download_concurrency = DOWNLOAD_CONCURRENCY,
+                cache                = cache,
+                cache_version        = resource["fingerprint"],
+            )
+            download = result["download"] or {}
+            summary["bytes_downloaded"] = result["bytes_downloaded"]
+            summary["bytes_resumed"]    = download.get("bytes_resumed", 0)
+            summary["download_retries"] = download.get("retries", 0)
+            if cache:
+                summary["cache_hits"]   = cache.stats["hits"]
+                summary["cache_misses"] = cache.stats["misses"]
+                summary["bytes_saved"]  = cache.stats["bytes_saved"]
+            summary["bytes_uploaded"]   = sum(u["bytes"] for u in result["uploaded"])
+            summary["uploaded"]         = sorted({u["file_name"] for u in result["uploaded"]})
+            summary["manifest_entry"]   = manifest_entry(resource, [
+                {"key": u["key"], "etag": u["etag"], "bytes": u["bytes"]}
+                for u in result["uploaded"]
+            ])
+            record(
+                bytes_downloaded = summary["bytes_downloaded"],
+                bytes_resumed    = summary["bytes_resumed"],
+                download_retries = summary["download_retries"],
+                cache_hits       = summary["cache_hits"],
+                cache_misses     = summary["cache_misses"],
+                bytes_saved      = summary["bytes_saved"],
+                bytes_uploaded   = summary["bytes_uploaded"],
+                files_uploaded   = len(result["uploaded"]),
+            )
+
+            logger.info("Ingestion %s terminée : %s", resource["year"], summary)
             return summary
 
-        @task(task_id="validate_s3_upload")
-        def validate_s3_upload(summary: dict) -> None:
-            """Vérifie qu'au moins un fichier DVF est disponible sur S3."""
+        @task(task_id="update_ingestion_manifest", trigger_rule="all_done")
+        def update_ingestion_manifest(summaries: list[dict]) -> None:
+            """
+            Consolide les entrées de manifest des instances mappées réussies et
+            réécrit le manifest S3 (écrivain unique → pas de course entre années).
+            trigger_rule=all_done : une année en échec n'empêche pas d'enregistrer
+            celles qui ont réussi (elles ne seront pas re-téléchargées au retry).
+
+            Bascule des versions republiées (include/dvf/manifest.py) :
+              1. lignes Bronze des objets remplacés supprimées (_source_file ;
+                 objets historiques : lignes sans lignage de leur année),
+                 avant tout rechargement
+              2. manifest réécrit → la nouvelle version devient la version courante
+              3. objets remplacés et versions orphelines (uploads interrompus)
+                 supprimés du stage, Parquet dérivés compris
+            Un échec avant 2 laisse l'ancienne version pointée : le run suivant
+            rejoue la republication.
+            """
             from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+            from include.dvf.chunking import is_dvf_text_key
+            from include.dvf.manifest import (
+                load_manifest,
+                merge_entries,
+                orphan_keys,
+                replaced_objects,
+                save_manifest,
+            )
+
+            entries = {
+                s["zip_name"]: s["manifest_entry"]
+                for s in summaries
+                if s and s.get("manifest_entry")
+            }
+            s3_client = S3Hook(aws_conn_id=AWS_CONN_ID).get_conn()
+            manifest = load_manifest(s3_client, BUCKET_NAME)
+            replaced = [obj["key"] for obj in replaced_objects(manifest, entries)]
+
+            if replaced:
+                _retire_bronze_rows(replaced)
+            if entries:
+                manifest = merge_entries(manifest, entries)
+                save_manifest(s3_client, BUCKET_NAME, manifest)
+                logger.info("Manifest d'ingestion mis à jour : %s", sorted(entries))
+            else:
+                logger.info("Manifest d'ingestion inchangé")
+
+            paginator = s3_client.get_paginator("list_objects_v2")
+            keys = [
+                o["Key"]
+                for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=S3_PREFIX)
+                for o in page.get("Contents", [])
+                if is_dvf_text_key(o["Key"])
+            ]
+            retired = sorted(set(replaced) | set(orphan_keys(manifest, keys)))
+            for key in retired:
+                s3_client.delete_object(Bucket=BUCKET_NAME, Key=key)
+                logger.info("Objet retiré du stage : %s", key)
+            if retired and PARQUET_ENABLED:
+                from include.dvf.parquet import delete_converted, source_basename
+
+                for basename in sorted({source_basename(key) for key in retired}):
+                    delete_converted(s3_client, BUCKET_NAME, PARQUET_PREFIX, basename)
+
+        def _retire_bronze_rows(keys: list[str]) -> None:
+            """Supprime de Bronze les lignes chargées depuis les objets `keys` (versions remplacées)."""
+            import json
+            from contextlib import closing
+
+            from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+            from include.dvf.loading import (
+                SESSION_CONTEXT_SQL,
+                LoadingSession,
+                legacy_source_years,
+                retire_rows_sql,
+                retired_source_files,
+            )
+
+            table = "mutations_foncieres_typed" if TYPED_BRONZE else "mutations_foncieres"
+            prefix = PARQUET_PREFIX if PARQUET_ENABLED else S3_PREFIX
+            source_files = retired_source_files(keys, prefix, parquet=PARQUET_ENABLED)
+            # Objets historiques adoptés : lignes d'avant le lignage (_source_file NULL)
+            legacy_years = legacy_source_years(keys)
+            with closing(SnowflakeHook(snowflake_conn_id=SNOWFLAKE_CONN).get_conn()) as conn:
+                session = LoadingSession(conn)
+                session.execute_script(SESSION_CONTEXT_SQL)
+                rows = session.execute(
+                    retire_rows_sql(table, parquet=PARQUET_ENABLED, typed=TYPED_BRONZE),
+                    {"source_files": json.dumps(source_files), "legacy_years": json.dumps(legacy_years)},
+                )
+            deleted = rows[0].get("number of rows deleted", 0) if rows else 0
+            logger.warning(
+                "Version remplacée : %d lignes retirées de DEV_BRONZE.%s (%d fichiers source, "
+                "lignes sans lignage des années %s). Silver conserve les lignes corrigées / "
+                "supprimées jusqu'à `dbt run --full-refresh -s silver_mutation_f+`",
+                deleted, table, len(source_files), legacy_years or "-",
+            )
+
+        @task(task_id="validate_s3_upload", outlets=[dvf_raw_asset])
+        def validate_s3_upload(summaries: list[dict]) -> dict:
+            """
+            Vérifie qu'au moins un fichier DVF est disponible sur S3 et
+            consolide les résumés par année des instances mappées.
+            """
+            from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+            from include.dvf.chunking import is_dvf_text_key
 
             s3 = S3Hook(aws_conn_id=AWS_CONN_ID)
             keys = s3.list_keys(bucket_name=BUCKET_NAME, prefix=S3_PREFIX) or []
-            dvf_files = [k for k in keys if k.endswith(".txt")]
+            dvf_files = [k for k in keys if is_dvf_text_key(k)]
 
             if not dvf_files:
                 raise ValueError(
                     f"Aucun fichier DVF .txt trouvé sur S3 : s3://{BUCKET_NAME}/{S3_PREFIX}"
                 )
 
+            summaries = list(summaries)
+            for s in sorted(summaries, key=lambda s: s["year"]):
+                logger.info(
+                    "  %s | +%d uploadés, %d skippés | %d octets téléchargés, %d servis par le cache",
+                    s["year"], len(s["uploaded"]), len(s["skipped"]), s["bytes_downloaded"], s["bytes_saved"],
+                )
+
+            total = {
+                "years":            len(summaries),
+                "uploaded":         [f for s in summaries for f in s["uploaded"]],
+                "skipped":          [f for s in summaries for f in s["skipped"]],
+                "bytes_downloaded": sum(s["bytes_downloaded"] for s in summaries),
+                "bytes_uploaded":   sum(s["bytes_uploaded"] for s in summaries),
+                "cache_hits":       sum(s["cache_hits"] for s in summaries),
+                "cache_misses":     sum(s["cache_misses"] for s in summaries),
+                "bytes_saved":      sum(s["bytes_saved"] for s in summaries),
+            }
             logger.info(
-                "%d fichiers DVF disponibles sur S3 | ce run : +%d uploadés, %d skippés",
+                "%d fichiers DVF disponibles sur S3 | ce run : +%d uploadés, %d skippés"
+                " | cache : %d hits, %d misses, %d octets économisés",
                 len(dvf_files),
-                len(summary.get("uploaded", [])),
-                len(summary.get("skipped", [])),
+                len(total["uploaded"]),
+                len(total["skipped"]),
+                total["cache_hits"],
+                total["cache_misses"],
+                total["bytes_saved"],
             )
+            return total
 
-        summary = fetch_dvf_to_s3()
-        validate_s3_upload(summary)
+        resources = list_dvf_resources()
+        summaries = fetch_dvf_to_s3.expand(resource=resources)
+        update_ingestion_manifest(summaries)
+        validate_s3_upload(summaries)
 
     # ═══════════════════════════════════════════════════════════════════════════
-    # TaskGroup : LOADING — S3 → Snowflake DEV_BRONZE
+    # TaskGroup : CONVERSION (optionnel) — S3 TXT → S3 Parquet partitionné
     # ═══════════════════════════════════════════════════════════════════════════
 
-    @task_group(group_id="loading")
-    def loading_group() -> None:
+    @task_group(group_id="conversion")
+    def conversion_group() -> None:
 
-        @task(task_id="create_snowflake_objects")
-        def create_snowflake_objects() -> None:
+        @task(task_id="list_raw_files")
+        def list_raw_files() -> list[dict]:
             """
-            Crée les objets Snowflake nécessaires au pipeline (idempotent).
-            Exécute : 01_create_snowflake_objects.sql
+            Liste les fichiers DVF bruts présents sur S3 (1 appel de listing) :
+            fichiers .txt entiers ou chunks compressés .txt.NNNN.gz.
             """
-            from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+            import re
 
-            sql = Path("/usr/local/airflow/include/sql/01_create_snowflake_objects.sql").read_text()
-            hook = SnowflakeHook(snowflake_conn_id=SNOWFLAKE_CONN)
-            hook.run(sql)
-            logger.info("Objets Snowflake créés / vérifiés avec succès")
-
-        @task(task_id="create_or_replace_stage")
-        def create_or_replace_stage() -> None:
+            from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+            from include.dvf.chunking import is_dvf_text_key
+
+            s3_client = S3Hook(aws_conn_id=AWS_CONN_ID).get_conn()
+            paginator = s3_client.get_paginator("list_objects_v2")
+            sources = []
+            for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=S3_PREFIX):
+                for obj in page.get("Contents", []):
+                    if not is_dvf_text_key(obj["Key"]):
+                        continue
+                    year = re.search(r"(\d{4})", obj["Key"].rsplit("/", 1)[-1])
+                    sources.append({
+                        "key":  obj["Key"],
+                        "etag": obj["ETag"].strip('"'),
+                        "year": year.group(1) if year else "0000",
+                    })
+            logger.info("%d fichiers .txt à examiner pour conversion Parquet", len(sources))
+            return sources
+
+        @task(
+            task_id      = "convert_to_parquet",
+            pool         = INGESTION_POOL,
+            max_active_tis_per_dagrun = INGESTION_CONCURRENCY,
+            map_index_template = "{{ dvf_year }}",
+            execution_timeout  = timedelta(hours=1),
+        )
+        def convert_to_parquet(source: dict) -> dict:
             """
-            Crée ou remplace le Snowflake External Stage pointant vers S3.
-            Les credentials AWS sont lus depuis la connexion Airflow (aws_conn)
-            et jamais stockés en dur dans le code.
+            Convertit UN fichier .txt en Parquet zstd partitionné par année et
+            Code departement (s3://BUCKET/PARQUET_PREFIX/annee=YYYY/code_departement=XX/).
+            Idempotent : un marqueur par source mémorise l'ETag converti, une
+            source inchangée n'est ni relue ni réécrite.
+            Mémoire bornée : lecture CSV par blocs, écriture par row groups.
             """
+            import tempfile
+
             from airflow.providers.amazon.aws.hooks.s3 import S3Hook
-            from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+            from airflow.sdk import get_current_context
+            from include.dvf.parquet import convert_s3_object, is_converted, source_basename
+            from include.dvf.telemetry import record
+
+            get_current_context()["dvf_year"] = source["year"]
+
+            s3_client = S3Hook(aws_conn_id=AWS_CONN_ID).get_conn()
+            basename = source_basename(source["key"])
+            if is_converted(s3_client, BUCKET_NAME, PARQUET_PREFIX, basename, source["etag"]):
+                logger.info("SKIP (déjà converti) : %s", source["key"])
+                return {"source_key": source["key"], "skipped": True}
+
+            with tempfile.TemporaryDirectory(prefix="dvf_parquet_") as work_dir:
+                summary = convert_s3_object(
+                    s3_client,
+                    BUCKET_NAME,
+                    source["key"],
+                    PARQUET_PREFIX,
+                    default_year = source["year"],
+                    work_dir     = work_dir,
+                )
+            record(rows_converted=summary["rows"], rows_rejected=summary["rejected"], files_written=summary["files"])
+            logger.info("Conversion Parquet terminée : %s", summary)
+            return {**summary, "skipped": False}
 
-            # Récupération des credentials depuis la connexion Airflow aws_conn
-            s3_hook = S3Hook(aws_conn_id=AWS_CONN_ID)
-            creds = s3_hook.get_credentials()
-
-            snow_hook = SnowflakeHook(snowflake_conn_id=SNOWFLAKE_CONN)
-            snow_hook.run(
-                f"""
-                CREATE OR REPLACE STAGE DVF_DB.DEV_BRONZE.dvf_s3_stage
-                    URL = 's3://{BUCKET_NAME}/{S3_PREFIX}'
-                    CREDENTIALS = (
-                        AWS_KEY_ID     = '{creds.access_key}'
-                        AWS_SECRET_KEY = '{creds.secret_key}'
-                    )
-                    FILE_FORMAT = DVF_DB.DEV_BRONZE.dvf_csv_format
-                    COMMENT = 'Stage DVF — credentials gérés par Airflow aws_conn';
-                """
-            )
-            logger.info(
-                "Stage DVF créé : @DVF_DB.DEV_BRONZE.dvf_s3_stage → s3://%s/%s",
-                BUCKET_NAME, S3_PREFIX,
-            )
+        convert_to_parquet.expand(source=list_raw_files())
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # TaskGroup : LOADING — S3 → Snowflake DEV_BRONZE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    @task_group(group_id="loading")
+    def loading_group() -> None:
 
         @task(task_id="copy_into_bronze")
         def copy_into_bronze() -> None:
             """
-            Charge les fichiers DVF depuis le stage S3 vers Snowflake DEV_BRONZE.
+            Charge les fichiers DVF depuis le stage S3 vers Snowflake DEV_BRONZE,
+            sur UNE session Snowflake (include/dvf/loading.py) :
+              1. DDL 01_create_snowflake_objects.sql (idempotent)
+              2. Stages externes S3 (credentials lus depuis aws_conn, jamais
+                 stockés en dur dans le code)
+              3. COPY INTO encadré par un lot DEV_BRONZE.load_batches
+                 (ouverture, puis clôture LOADED / EMPTY / FAILED) : les
+                 consommateurs (Silver) ne traitent que les lots non absorbés.
+            Les étapes 1 et 2 ne sont rejouées que si leur SQL a changé depuis
+            la dernière application (empreintes DEV_BRONZE.ddl_fingerprints,
+            DVF_FORCE_DDL=true pour forcer).
             Idempotent : FORCE=FALSE (Snowflake skip les fichiers déjà chargés
             grâce à son registre interne COPY_HISTORY).
+            Source : stage Parquet si DVF_PARQUET_ENABLED, sinon fichiers .txt bruts.
+            Cible : table typée (dates / décimaux convertis au COPY, valeurs
+            non convertibles dans _raw_rejects) si DVF_TYPED_BRONZE.
+            Audit (include/dvf/copy_audit.py) : résultat par fichier et durée
+            du COPY dans DEV_BRONZE.copy_file_audit, lignes rejetées extraites
+            par VALIDATE() dans DEV_BRONZE.copy_rejects. Échec (sans retry :
+            un nouveau COPY ne verrait plus ces fichiers) si le taux de rejet
+            du lot dépasse COPY_MAX_ERROR_RATE.
             """
+            import time
+            from contextlib import closing
+
+            from airflow.exceptions import AirflowFailException
+            from airflow.providers.amazon.aws.hooks.s3 import S3Hook
             from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+            from airflow.sdk import get_current_context
+
+            from include.dvf.batches import (
+                CLOSE_BATCH_SQL,
+                OPEN_BATCH_SQL,
+                close_batch_parameters,
+                new_batch_id,
+                summarize_copy_results,
+            )
+            from include.dvf.copy_audit import (
+                INSERT_AUDIT_SQL,
+                VALIDATE_TABLES,
+                CopyErrorRateExceeded,
+                audit_parameters,
+                check_error_rate,
+                error_rate,
+                quarantine_sql,
+            )
+            from include.dvf.loading import SESSION_CONTEXT_SQL, LoadingSession, stage_sql
+            from include.dvf.telemetry import record
+
+            # (stage, préfixe S3, file format) — le stage Parquet n'existe que si activé
+            stages = [("dvf_s3_stage", S3_PREFIX, "dvf_csv_format")]
+            if PARQUET_ENABLED:
+                stages.append(("dvf_s3_parquet_stage", PARQUET_PREFIX, "dvf_parquet_format"))
+            if SERVING_ENABLED:
+                stages.append(("dvf_s3_serving_stage", SERVING_PREFIX, "dvf_parquet_format"))
+
+            ddl_script = "01_create_snowflake_objects.sql"
+            script = "02_copy_into_bronze_parquet" if PARQUET_ENABLED else "02_copy_into_bronze"
+            script += "_typed.sql" if TYPED_BRONZE else ".sql"
+            table  = "mutations_foncieres_typed" if TYPED_BRONZE else "mutations_foncieres"
+            stage  = "dvf_s3_parquet_stage" if PARQUET_ENABLED else "dvf_s3_stage"
+            # Bronze typé TXT : COPY par nom de colonne dans la table d'atterrissage,
+            # conversion vers la table typée ensuite (03_insert_bronze_typed.sql)
+            copy_table = "mutations_foncieres_typed_landing" if TYPED_BRONZE and not PARQUET_ENABLED else table
+            if STORAGE_INTEGRATION:
+                access_key = secret_key = None
+            else:
+                creds = S3Hook(aws_conn_id=AWS_CONN_ID).get_credentials()
+                access_key, secret_key = creds.access_key, creds.secret_key
 
-            sql = Path("/usr/local/airflow/include/sql/02_copy_into_bronze.sql").read_text()
             hook = SnowflakeHook(snowflake_conn_id=SNOWFLAKE_CONN)
-            hook.run(sql)
-            logger.info("COPY INTO DEV_BRONZE.mutations_foncieres terminé")
+            with closing(hook.get_conn()) as conn:
+                session = LoadingSession(conn, force=FORCE_DDL)
+                session.execute_script(SESSION_CONTEXT_SQL)
+
+                session.ensure(f"script:{ddl_script}", (SQL_DIR / ddl_script).read_text())
+                for name, prefix, file_format in stages:
+                    session.ensure(
+                        f"stage:{name}",
+                        stage_sql(
+                            name, f"s3://{BUCKET_NAME}/{prefix}", file_format, access_key, secret_key,
+                            storage_integration = STORAGE_INTEGRATION,
+                        ),
+                        depends_on = (f"script:{ddl_script}",),
+                        secrets    = (secret_key,) if secret_key else (),
+                    )
 
-        create_snowflake_objects() >> create_or_replace_stage() >> copy_into_bronze()
+                batch_id = new_batch_id()
+                session.execute(OPEN_BATCH_SQL, {
+                    "batch_id":     batch_id,
+                    "dag_run_id":   get_current_context()["run_id"],
+                    "source_stage": stage,
+                })
+                started = time.monotonic()
+                try:
+                    rows = session.execute_script((SQL_DIR / script).read_text())
+                    copy_seconds, copy_query_id = time.monotonic() - started, session.last_query_id
+                    if copy_table != table:
+                        session.execute_script((SQL_DIR / "03_insert_bronze_typed.sql").read_text())
+                except Exception as exc:
+                    session.execute(CLOSE_BATCH_SQL, close_batch_parameters(
+                        batch_id, summarize_copy_results([]), error_message=str(exc),
+                    ))
+                    raise
+
+                summary = summarize_copy_results(rows)
+                session.execute(CLOSE_BATCH_SQL, close_batch_parameters(batch_id, summary))
+                if summary["files_loaded"] or summary["errors_seen"]:
+                    session.execute(INSERT_AUDIT_SQL, audit_parameters(batch_id, copy_table, rows, copy_seconds))
+                if summary["errors_seen"] and copy_table in VALIDATE_TABLES:
+                    try:
+                        session.execute(quarantine_sql(copy_table), {"batch_id": batch_id, "job_id": copy_query_id})
+                    except Exception as exc:   # l'audit par fichier reste disponible
+                        logger.warning("Quarantaine VALIDATE() impossible pour le COPY %s : %s", copy_query_id, exc)
+
+            record(
+                files_loaded = summary["files_loaded"],
+                rows_parsed  = summary["rows_parsed"],
+                rows_loaded  = summary["rows_loaded"],
+                errors_seen  = summary["errors_seen"],
+                error_rate   = error_rate(summary),
+                copy_seconds = copy_seconds,
+                statements   = session.statements,
+                ddl_applied  = len(session.applied),
+                ddl_skipped  = len(session.skipped),
+            )
+            logger.info(
+                "COPY INTO DEV_BRONZE.%s terminé | lot=%s | statut=%s"
+                " | fichiers=%d | lignes=%d | rejets=%d (%.3f %%) | %.1f s | DDL rejoué=%s | instructions=%d",
+                table, batch_id, summary["status"], summary["files_loaded"],
+                summary["rows_loaded"], summary["errors_seen"], 100 * error_rate(summary), copy_seconds,
+                session.applied or "aucun", session.statements,
+            )
+            try:
+                check_error_rate(summary, COPY_MAX_ERROR_RATE)
+            except CopyErrorRateExceeded as exc:
+                raise AirflowFailException(str(exc)) from exc
+
+        copy_into_bronze()
 
     # ═══════════════════════════════════════════════════════════════════════════
     # TaskGroup : TRANSFORMATION — dbt (couches Silver → Gold → Star Schema)
@@ -296,12 +828,13 @@ with DAG(
     @task_group(group_id="transformation")
     def transformation_group() -> None:
 
-        # dbt deps : télécharge les packages dbt (dbt_utils, etc.)
+        # dbt deps : télécharge les packages dbt (dbt_utils, etc.) ; en mode
+        # inprocess, ignoré tant que package-lock.yml n'a pas changé
         dbt_deps = BashOperator(
             task_id      = "dbt_deps",
             bash_command = (
                 f"mkdir -p {DBT_LOG_PATH} && "
-                f"{DBT_VENV}/dbt deps"
+                f"{DBT_EXECUTABLE} deps"
                 f" --project-dir {DBT_PROJECT_DIR}"
                 f" --profiles-dir {DBT_PROFILES_DIR}"
                 f" --log-path {DBT_LOG_PATH}"
@@ -313,43 +846,55 @@ with DAG(
         dbt_seed = BashOperator(
             task_id      = "dbt_seed",
             bash_command = (
-                f"{DBT_VENV}/dbt seed"
+                f"{DBT_EXECUTABLE} seed"
                 f" --project-dir {DBT_PROJECT_DIR}"
                 f" --profiles-dir {DBT_PROFILES_DIR}"
                 f" --log-path {DBT_LOG_PATH}"
+                f" --target-path {_dbt_target_path('transformation.dbt_seed')}"
                 f" --target prod"
                 f" --no-use-colors"
             ),
         )
 
-        # dbt run staging : vue src_dvf (renommage colonnes)
-        dbt_staging = BashOperator(
-            task_id      = "dbt_staging",
-            bash_command = _dbt_cmd("staging"),
-        )
-
-        # dbt run silver : déduplication + validation + enrichissement (~17M rows)
-        # Incrémental : seules les nouvelles mutations sont traitées
-        dbt_silver = BashOperator(
-            task_id      = "dbt_silver",
-            bash_command = _dbt_cmd("silver"),
-            execution_timeout = timedelta(hours=2),  # Silver peut être long (17M rows)
-        )
-
-        # dbt run gold : 9 tables d'agrégations métier
-        dbt_gold = BashOperator(
-            task_id      = "dbt_gold",
-            bash_command = _dbt_cmd("gold"),
-        )
-
-        # dbt run star_schema : 4 dims + 1 fact + 4 AGG tables (Power BI)
-        dbt_star_schema = BashOperator(
-            task_id      = "dbt_star_schema",
-            bash_command = _dbt_cmd("star_schema"),
-            execution_timeout = timedelta(hours=1),
-        )
-
-        dbt_deps >> dbt_seed >> dbt_staging >> dbt_silver >> dbt_gold >> dbt_star_schema
+        dbt_deps >> dbt_seed
+
+        graph = _dbt_model_graph()
+        if graph is None:
+            logger.warning("manifest dbt introuvable (%s) : 1 tâche par couche", DBT_MANIFEST_PATH)
+            # staging (vue src_dvf) → silver (incrémental, ~17M rows) → gold → star_schema
+            layers = [
+                BashOperator(
+                    task_id      = f"dbt_{layer}",
+                    bash_command = _dbt_cmd(layer, target_path=_dbt_target_path(f"transformation.dbt_{layer}")),
+                    execution_timeout = DBT_LAYER_TIMEOUTS.get(layer),
+                )
+                for layer in ("staging", "silver", "gold", "star_schema")
+            ]
+            dbt_seed >> layers[0]
+            chain(*layers)
+            return
+
+        # 1 tâche par modèle, dépendances ref() réelles : les Gold et les dims
+        # du star schema démarrent dès que Silver est prêt, en parallèle.
+        # Retry au niveau du modèle ; concurrence bornée par les slots de
+        # DBT_POOL. target-path par tâche : pas de course sur target/.
+        groups = {layer: TaskGroup(group_id=layer) for layer in sorted({m["layer"] for m in graph.values()})}
+        models = {}
+        for name, model in sorted(graph.items()):
+            target_path = _dbt_target_path(groups[model["layer"]].child_id(name))
+            models[name] = BashOperator(
+                task_id      = name,
+                task_group   = groups[model["layer"]],
+                bash_command = _dbt_cmd(name, target_path=target_path),
+                pool         = DBT_POOL,
+                execution_timeout = DBT_LAYER_TIMEOUTS.get(model["layer"]),
+                doc_md       = f"dbt run `{model['unique_id']}` ({model['materialized']})",
+            )
+        for name, model in graph.items():
+            for upstream in model["upstream"]:
+                models[upstream] >> models[name]
+            if not model["upstream"]:
+                dbt_seed >> models[name]
 
     # ═══════════════════════════════════════════════════════════════════════════
     # TaskGroup : QUALITY — dbt test
@@ -358,14 +903,17 @@ with DAG(
     @task_group(group_id="quality")
     def quality_group() -> None:
 
-        # dbt test : tous les tests (unique, not_null, relationships, custom)
+        # dbt test : tous les tests (unique, not_null, relationships, custom) ;
+        # run_results.json dans son propre target-path, lu par log_quality_summary
+        target_path = _dbt_target_path("quality.dbt_test")
         dbt_test = BashOperator(
             task_id      = "dbt_test",
             bash_command = (
-                f"{DBT_VENV}/dbt test"
+                f"{DBT_EXECUTABLE} test"
                 f" --project-dir {DBT_PROJECT_DIR}"
                 f" --profiles-dir {DBT_PROFILES_DIR}"
                 f" --log-path {DBT_LOG_PATH}"
+                f" --target-path {target_path}"
                 f" --target prod"
                 f" --no-use-colors"
             ),
@@ -376,7 +924,7 @@ with DAG(
         def log_quality_summary() -> None:
             """Log le résumé des tests dbt depuis le fichier run_results.json."""
             import json
-            results_path = Path(f"{DBT_PROJECT_DIR}/target/run_results.json")
+            results_path = Path(f"{target_path}/run_results.json")
             if not results_path.exists():
                 logger.warning("run_results.json introuvable, skip résumé qualité")
                 return
@@ -393,10 +941,90 @@ with DAG(
 
         dbt_test >> log_quality_summary()
 
+    # ═══════════════════════════════════════════════════════════════════════════
+    # TaskGroup : SERVING — Star Schema → S3 Parquet (API de lecture locale)
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    @task_group(group_id="serving")
+    def serving_group() -> None:
+
+        @task(task_id="export_star_extracts")
+        def export_star_extracts() -> dict:
+            """
+            Décharge les dimensions et agrégats du star schema en Parquet sous
+            une version immuable (date logique du run, ou run_after pour un run
+            déclenché par asset : un retry réécrit la même version,
+            OVERWRITE = TRUE). Rien n'est encore publié.
+            """
+            from airflow.providers.common.sql.hooks.handlers import fetch_all_handler
+            from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+            from airflow.sdk import get_current_context
+
+            from include.dvf.serving import SERVING_TABLES, serving_version, summarize_unload, unload_sql
+            from include.dvf.telemetry import record
+
+            # Run déclenché par asset : pas de date logique → run_after
+            context = get_current_context()
+            version = serving_version(context.get("logical_date") or context["dag_run"].run_after)
+            hook = SnowflakeHook(snowflake_conn_id=SNOWFLAKE_CONN)
+            tables = {}
+            for table in SERVING_TABLES:
+                rows = hook.run(unload_sql(table, version), handler=fetch_all_handler, return_dictionaries=True)
+                tables[table] = summarize_unload(rows)
+                logger.info("Extrait %s/%s : %s", version, table, tables[table])
+
+            record(
+                rows_unloaded = sum(t["rows"] for t in tables.values()),
+                bytes_written = sum(t["bytes"] for t in tables.values()),
+            )
+            return {"version": version, "tables": tables}
+
+        @task(task_id="publish_serving_version")
+        def publish_serving_version(extract: dict) -> None:
+            """
+            Publie la version en réécrivant CURRENT.json, après le déchargement
+            complet : l'API ne voit jamais une version partielle et vide son
+            cache au changement de version. Purge ensuite les anciennes
+            versions (DVF_SERVING_KEEP_VERSIONS).
+            """
+            import json
+
+            from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+            from airflow.sdk import get_current_context
+
+            from include.dvf.serving import CURRENT_KEY, publication, stale_versions
+
+            current = publication(extract["version"], extract["tables"], dag_run_id=get_current_context()["run_id"])
+            s3_hook = S3Hook(aws_conn_id=AWS_CONN_ID)
+            s3_hook.load_string(
+                json.dumps(current, indent=2),
+                key         = f"{SERVING_PREFIX}{CURRENT_KEY}",
+                bucket_name = BUCKET_NAME,
+                replace     = True,
+            )
+            logger.info("Version de service publiée : %s", current["version"])
+
+            prefixes = s3_hook.list_prefixes(bucket_name=BUCKET_NAME, prefix=SERVING_PREFIX, delimiter="/") or []
+            versions = [p[len(SERVING_PREFIX):].rstrip("/") for p in prefixes]
+            for version in stale_versions(versions, current["version"], SERVING_KEEP_VERSIONS):
+                keys = s3_hook.list_keys(bucket_name=BUCKET_NAME, prefix=f"{SERVING_PREFIX}{version}/")
+                if keys:
+                    s3_hook.delete_objects(bucket=BUCKET_NAME, keys=keys)
+                logger.info("Version de service purgée : %s (%d fichiers)", version, len(keys or []))
+
+        publish_serving_version(export_star_extracts())
+
     # ─── Dépendances globales ─────────────────────────────────────────────────
     ing      = ingestion_group()
     loading  = loading_group()
     transform = transformation_group()
     quality  = quality_group()
 
-    start >> ing >> loading >> transform >> quality >> end
+    if PARQUET_ENABLED:
+        start >> ing >> conversion_group() >> loading
+    else:
+        start >> ing >> loading
+    if SERVING_ENABLED:
+        loading >> transform >> quality >> serving_group() >> end
+    else:
+        loading >> transform >> quality >> end
@@ -0,0 +1 @@
+"""Benchmarks manuels du pipeline DVF (exécutés dans le conteneur Airflow)."""
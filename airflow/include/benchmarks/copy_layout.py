@@ -0,0 +1,146 @@
+"""
+Benchmark COPY INTO : fichier DVF entier vs chunks compressés.
+
+Uploade un même fichier DVF sous deux layouts S3 (objet .txt unique non
+compressé / chunks .txt.NNNN.gz de taille cible), puis chronomètre un
+COPY INTO vers une table temporaire clonée de DEV_BRONZE.mutations_foncieres
+pour chacun. Les objets S3 de benchmark sont supprimés à la fin.
+
+Usage (dans le conteneur : `astro dev bash`) :
+    python -m include.benchmarks.copy_layout --source /tmp/ValeursFoncieres-2024.txt
+    python -m include.benchmarks.copy_layout --source ... --target-mb 64 128 256 --codec zstd
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from pathlib import Path
+
+BUCKET_NAME    = "data-platform-project-kubctl-1"
+BENCH_PREFIX   = "benchmarks/copy_layout/"
+AWS_CONN_ID    = "aws_conn"
+SNOWFLAKE_CONN = "snowflake_conn"
+
+COPY_SQL = """
+COPY INTO {table}
+FROM @{stage}
+PATTERN     = '.*[.]txt([.][0-9]{{4}}[.](gz|zst))?'
+FILE_FORMAT = (
+    TYPE                           = 'CSV'
+    COMPRESSION                    = 'AUTO'
+    FIELD_DELIMITER                = '|'
+    PARSE_HEADER                   = TRUE
+    FIELD_OPTIONALLY_ENCLOSED_BY   = '"'
+    ENCODING                       = 'UTF8'
+    TRIM_SPACE                     = TRUE
+    EMPTY_FIELD_AS_NULL            = TRUE
+    NULL_IF                        = ('', 'NULL', 'null')
+    ERROR_ON_COLUMN_COUNT_MISMATCH = FALSE
+)
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+ON_ERROR             = CONTINUE
+FORCE                = TRUE
+"""
+
+
+def _upload_layouts(client, source: Path, run_prefix: str, target_sizes: list[int], codec: str) -> dict:
+    from include.dvf.chunking import upload_chunked
+    from include.dvf.ingestion import multipart_upload
+
+    layouts = {}
+    with source.open("rb") as f:
+        result = multipart_upload(client, f, BUCKET_NAME, f"{run_prefix}single/{source.name}")
+    layouts["single"] = {"prefix": f"{run_prefix}single/", "files": 1, "bytes": result["bytes"]}
+
+    for target in target_sizes:
+        name = f"chunked_{target // (1024 * 1024)}mb_{codec}"
+        with source.open("rb") as f:
+            results = upload_chunked(
+                f, client, BUCKET_NAME, f"{run_prefix}{name}/{source.name}",
+                target_size=target, codec=codec,
+            )
+        layouts[name] = {
+            "prefix": f"{run_prefix}{name}/",
+            "files":  len(results),
+            "bytes":  sum(r["bytes"] for r in results),
+        }
+    return layouts
+
+
+def _time_copy(cursor, creds, prefix: str) -> tuple[float, int]:
+    stage = f"bench_stage_{uuid.uuid4().hex[:8]}"
+    cursor.execute(
+        f"""
+        CREATE TEMPORARY STAGE {stage}
+            URL = 's3://{BUCKET_NAME}/{prefix}'
+            CREDENTIALS = (AWS_KEY_ID = '{creds.access_key}' AWS_SECRET_KEY = '{creds.secret_key}')
+        """
+    )
+    cursor.execute("TRUNCATE TABLE bench_mutations_foncieres")
+    started = time.perf_counter()
+    cursor.execute(COPY_SQL.format(table="bench_mutations_foncieres", stage=stage))
+    elapsed = time.perf_counter() - started
+    columns = [c[0].lower() for c in cursor.description]
+    rows_loaded = sum(dict(zip(columns, r)).get("rows_loaded") or 0 for r in cursor.fetchall())
+    return elapsed, rows_loaded
+
+
+def main() -> None:
+    from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+    from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", type=Path, required=True, help="Fichier DVF .txt local")
+    parser.add_argument("--target-mb", type=int, nargs="+", default=[128], help="Tailles cibles des chunks (Mo compressés)")
+    parser.add_argument("--codec", choices=["gzip", "zstd"], default="gzip")
+    parser.add_argument("--repeat", type=int, default=1, help="Nombre de COPY par layout (médiane retenue)")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args()
+
+    s3_hook = S3Hook(aws_conn_id=AWS_CONN_ID)
+    client = s3_hook.get_conn()
+    run_prefix = f"{BENCH_PREFIX}{uuid.uuid4().hex[:8]}/"
+
+    layouts = _upload_layouts(
+        client, args.source, run_prefix, [mb * 1024 * 1024 for mb in args.target_mb], args.codec,
+    )
+    try:
+        conn = SnowflakeHook(snowflake_conn_id=SNOWFLAKE_CONN).get_conn()
+        cursor = conn.cursor()
+        cursor.execute("USE DATABASE DVF_DB")
+        cursor.execute("USE SCHEMA DEV_BRONZE")
+        cursor.execute("CREATE TEMPORARY TABLE bench_mutations_foncieres LIKE DEV_BRONZE.mutations_foncieres")
+        creds = s3_hook.get_credentials()
+
+        for layout in layouts.values():
+            timings = []
+            for _ in range(args.repeat):
+                elapsed, rows = _time_copy(cursor, creds, layout["prefix"])
+                timings.append(elapsed)
+            layout["copy_seconds"] = sorted(timings)[len(timings) // 2]
+            layout["rows_loaded"] = rows
+        conn.close()
+    finally:
+        paginator = client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=run_prefix):
+            for obj in page.get("Contents", []):
+                client.delete_object(Bucket=BUCKET_NAME, Key=obj["Key"])
+
+    if args.json:
+        print(json.dumps(layouts, indent=2))
+        return
+
+    baseline = layouts["single"]["copy_seconds"]
+    print(f"{'layout':<28} {'fichiers':>8} {'octets S3':>14} {'lignes':>12} {'COPY (s)':>10} {'speedup':>8}")
+    for name, layout in layouts.items():
+        print(
+            f"{name:<28} {layout['files']:>8} {layout['bytes']:>14,} {layout['rows_loaded']:>12,}"
+            f" {layout['copy_seconds']:>10.2f} {baseline / layout['copy_seconds']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
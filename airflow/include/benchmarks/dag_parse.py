@@ -0,0 +1,150 @@
+"""
+Benchmark du parsing des DAGs : temps d'import et mémoire par fichier.
+
+Chaque fichier est chargé par DagBag, comme le fait le DAG processor à
+chaque boucle de parsing, dans un sous-processus neuf où Airflow est déjà
+importé. Le coût mesuré est donc celui qu'ajoute le fichier lui-même :
+imports de modules tiers, lecture du manifest dbt, code exécuté au niveau
+module (hooks, appels réseau, écritures disque).
+
+Le socle comprend la découverte des normaliseurs d'URI d'assets des
+providers : Airflow la déclenche au premier Asset dont l'URI a un schéma
+(s3://, https://…) et elle importe les modules d'assets de chaque provider
+(amazon → S3Hook, boto3, requests). Ce coût (~0,4 s, une fois par
+processus) ne dépend pas du code du DAG ; il est rapporté à part.
+
+Par fichier : secondes de chargement DagBag (médiane sur --repeat
+processus), croissance du pic RSS, modules de premier niveau importés, et
+parmi eux les clients lourds (HEAVY_MODULES) qui ne doivent être importés
+que dans les tâches.
+
+Usage (racine du projet Astro, AIRFLOW_HOME positionné) :
+    python -m include.benchmarks.dag_parse                         # dags/
+    python -m include.benchmarks.dag_parse dags/dvf_pipeline_prod.py --repeat 5
+    python -m include.benchmarks.dag_parse --budget-seconds 1 --budget-mb 32 --json
+
+Code retour 1 si un fichier dépasse le budget, importe un module lourd ou
+échoue à l'import.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DAGS_FOLDER  = PROJECT_ROOT / "dags"
+
+# Budget par fichier (au-delà du socle Airflow déjà importé)
+BUDGET_SECONDS = 2.0
+BUDGET_MB      = 64
+
+# Clients réseau / données : à importer dans le corps des tâches uniquement
+HEAVY_MODULES = frozenset({
+    "aiohttp", "boto3", "botocore", "dbt", "duckdb", "pandas", "pyarrow", "requests", "snowflake",
+})
+
+
+def measure_file(path: str | Path) -> dict:
+    """Charge `path` via DagBag dans le processus courant (appelé dans un sous-processus neuf)."""
+    from airflow.models.dagbag import DagBag
+    from airflow.providers_manager import ProvidersManager
+
+    from include.dvf.telemetry import peak_rss_bytes
+
+    started = time.perf_counter()
+    ProvidersManager().initialize_providers_asset_uri_resources()
+    baseline = time.perf_counter() - started
+
+    before_modules, before_rss = set(sys.modules), peak_rss_bytes()
+    started = time.perf_counter()
+    dag_bag = DagBag(dag_folder=str(path), include_examples=False, safe_mode=False)
+    seconds = time.perf_counter() - started
+
+    modules = sorted({name.split(".")[0] for name in set(sys.modules) - before_modules})
+    return {
+        "file":             str(path),
+        "seconds":          round(seconds, 4),
+        "baseline_seconds": round(baseline, 4),
+        "rss_mb":           round((peak_rss_bytes() - before_rss) / 1024 ** 2, 1),
+        "dags":             sorted(dag_bag.dag_ids),
+        "import_errors":    {Path(k).name: v.strip().splitlines()[-1] for k, v in dag_bag.import_errors.items()},
+        "modules":          modules,
+        "heavy_modules":    sorted(HEAVY_MODULES.intersection(modules)),
+    }
+
+
+def measure(path: str | Path, *, repeat: int = 1) -> dict:
+    """Mesure `path` dans `repeat` sous-processus ; temps médian, pic RSS maximal."""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-m", "include.benchmarks.dag_parse", "--worker", str(Path(path).resolve())],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    result = runs[0]
+    result["seconds"] = sorted(r["seconds"] for r in runs)[len(runs) // 2]
+    result["baseline_seconds"] = sorted(r["baseline_seconds"] for r in runs)[len(runs) // 2]
+    result["rss_mb"] = max(r["rss_mb"] for r in runs)
+    return result
+
+
+def violations(result: dict, *, budget_seconds: float = BUDGET_SECONDS, budget_mb: float = BUDGET_MB) -> list[str]:
+    """Écarts d'un fichier au budget de parsing (liste vide si conforme)."""
+    problems = [f"erreur d'import : {error}" for error in result["import_errors"].values()]
+    if result["seconds"] > budget_seconds:
+        problems.append(f"{result['seconds']:.2f} s > budget {budget_seconds:.2f} s")
+    if result["rss_mb"] > budget_mb:
+        problems.append(f"{result['rss_mb']:.0f} Mo > budget {budget_mb:.0f} Mo")
+    if result["heavy_modules"]:
+        problems.append(f"modules lourds au parsing : {', '.join(result['heavy_modules'])}")
+    return problems
+
+
+def dag_files(folder: str | Path = DAGS_FOLDER) -> list[Path]:
+    """Fichiers Python du dossier retenus par le DAG processor (.airflowignore appliqué)."""
+    from airflow.utils.file import list_py_file_paths
+
+    return sorted(Path(p) for p in list_py_file_paths(folder, safe_mode=False) if not p.endswith("__init__.py"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, help="Fichiers DAG (défaut : dags/)")
+    parser.add_argument("--repeat", type=int, default=3, help="Processus par fichier (médiane retenue)")
+    parser.add_argument("--budget-seconds", type=float, default=BUDGET_SECONDS)
+    parser.add_argument("--budget-mb", type=float, default=BUDGET_MB)
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure_file(args.worker)))
+        return
+
+    results = [measure(path, repeat=args.repeat) for path in (args.paths or dag_files())]
+    failed = False
+    for result in results:
+        result["violations"] = violations(result, budget_seconds=args.budget_seconds, budget_mb=args.budget_mb)
+        failed |= bool(result["violations"])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'fichier':<40} {'parse (s)':>9} {'RSS (Mo)':>9} {'DAGs':>5} {'modules':>8}  budget")
+        for r in results:
+            status = "; ".join(r["violations"]) or "OK"
+            print(f"{Path(r['file']).name:<40} {r['seconds']:>9.3f} {r['rss_mb']:>9.1f} {len(r['dags']):>5}"
+                  f" {len(r['modules']):>8}  {status}")
+        if results:
+            print(f"socle Airflow (normaliseurs d'URI d'assets) : {results[0]['baseline_seconds']:.3f} s / processus")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Générateur de données DVF synthétiques, reproductible, pour les benchmarks.
+
+Écrit des fichiers `ValeursFoncieres-YYYY.txt` pipe-séparés au layout de
+DEV_BRONZE.mutations_foncieres (42 colonnes + "Date mutation" lue par
+src_dvf), avec les conventions DVF : virgule décimale, dates JJ/MM/AAAA,
+champs vides pour NULL, plusieurs lignes par acte (lots, dépendances) et
+doublons exacts. Départements tirés de seeds/ref_departements.csv.
+
+Facteur d'échelle : SF1 = ROWS_PER_SCALE_FACTOR lignes (SF10 ≈ production,
+~17M lignes), réparties sur les années demandées. Une graine fixe donne des
+fichiers identiques octet pour octet ; chaque année a son propre générateur
+(les fichiers ne dépendent pas les uns des autres). Écriture en streaming :
+la mémoire ne dépend pas du facteur d'échelle.
+
+Usage :
+    python -m include.benchmarks.synthetic_dvf --scale 0.01 --out /tmp/dvf_sf001
+    python -m include.benchmarks.synthetic_dvf --scale 10 --seed 7 --years 2020-2024 --zip --out /tmp/dvf_sf10
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+import zipfile
+from datetime import date
+from pathlib import Path
+from typing import IO
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+ROWS_PER_SCALE_FACTOR = 1_700_000
+DEFAULT_SEED          = 42
+DEFAULT_YEARS         = (2020, 2021, 2022, 2023, 2024)
+COMMUNES_PER_DEPT     = 40
+DUPLICATE_RATE        = 0.02      # Lignes répétées à l'identique (doublons DVF)
+WRITE_BUFFER_SIZE     = 1024 * 1024
+
+SEED_DEPARTEMENTS = (
+    Path(__file__).resolve().parents[1]
+    / "dbt" / "real_estate_analytics" / "seeds" / "ref_departements.csv"
+)
+
+# Ordre des colonnes de DEV_BRONZE.mutations_foncieres (01_create_snowflake_objects.sql),
+# "Date mutation" insérée à sa place DVF (avant "Nature mutation")
+COLUMNS = [
+    "No disposition", "Identifiant de document", "Reference document",
+    "1 Articles CGI", "2 Articles CGI", "3 Articles CGI", "4 Articles CGI", "5 Articles CGI",
+    "Motif de la non-price", "Date mutation", "Nature mutation", "Valeur fonciere",
+    "No voie", "B/T/Q", "Type de voie", "Code voie", "Voie",
+    "Code postal", "Commune", "Code departement", "Code commune",
+    "Section", "No plan", "No Volume",
+    "1er lot", "Surface Carrez du 1er lot", "2eme lot", "Surface Carrez du 2eme lot",
+    "3eme lot", "Surface Carrez du 3eme lot", "4eme lot", "Surface Carrez du 4eme lot",
+    "5eme lot", "Surface Carrez du 5eme lot", "Nombre de lots",
+    "Code type local", "Type local", "Identifiant local",
+    "Surface reelle bati", "Nombre pieces principales",
+    "Nature culture", "Nature culture speciale", "Surface terrain",
+]
+
+# Distributions (ordre de grandeur DVF)
+NATURES = [
+    ("Vente", 0.86), ("Vente en l'état futur d'achèvement", 0.07),
+    ("Echange", 0.02), ("Vente terrain à bâtir", 0.03),
+    ("Adjudication", 0.015), ("Expropriation", 0.005),
+]
+LINES_PER_DEED = [(1, 0.62), (2, 0.20), (3, 0.10), (4, 0.05), (5, 0.03)]
+MAIN_TYPES = [
+    # (code, libellé, poids, (surface min, max), prix médian)
+    ("1", "Maison",                                   0.34, (50, 200), 220_000),
+    ("2", "Appartement",                              0.30, (15, 140), 190_000),
+    ("4", "Local industriel. commercial ou assimilé", 0.05, (20, 900), 260_000),
+    ("",  "",                                         0.31, (0, 0),    60_000),   # terrain nu
+]
+DEPENDANCE = ("3", "Dépendance")
+TYPES_VOIE = ["RUE", "AV", "BD", "CHE", "ALL", "IMP", "RTE", "PL", "LOT", "SQ"]
+NOMS_VOIE = ["DES LILAS", "DE LA GARE", "VICTOR HUGO", "DU MOULIN", "JEAN JAURES",
+             "DE LA REPUBLIQUE", "DES ECOLES", "PASTEUR", "DU STADE", "DES CHENES"]
+NATURES_CULTURE = ["S", "T", "AG", "J", "L", "P", "BT", "VI"]
+COMMUNE_PREFIXES = ["SAINT", "VILLE", "MONT", "BOURG", "PORT", "CHATEAU", "FONT", "VAL"]
+COMMUNE_SUFFIXES = ["SUR-MER", "LES-BAINS", "LE-HAUT", "LA-FORET", "EN-VAL", "DU-LAC",
+                    "LES-PINS", "SUR-LOIRE", "LE-VIEUX", "EN-BRIE"]
+BIG_DEPARTEMENTS = {"75": 6, "13": 4, "69": 4, "59": 4, "33": 3, "92": 3, "06": 3, "31": 3, "44": 3}
+
+
+def load_departements(path: str | Path = SEED_DEPARTEMENTS) -> list[str]:
+    with open(path, encoding="utf-8", newline="") as f:
+        return [row["code_departement"] for row in csv.DictReader(f)]
+
+
+def _communes(departement: str) -> list[tuple[str, str, str]]:
+    """(code commune, nom, code postal) déterministes pour un département."""
+    rng = random.Random(f"communes-{departement}")
+    if departement.startswith("2") and not departement.isdigit():   # 2A / 2B
+        postal_prefix = "20"
+    else:
+        postal_prefix = departement[:3] if len(departement) == 3 else departement
+    communes = []
+    for i in range(1, COMMUNES_PER_DEPT + 1):
+        nom = f"{rng.choice(COMMUNE_PREFIXES)}-{rng.choice(COMMUNE_SUFFIXES)}-{departement}{i:02d}"
+        postal = f"{postal_prefix}{rng.randrange(0, 10 ** (5 - len(postal_prefix))):0{5 - len(postal_prefix)}d}"
+        communes.append((f"{i:03d}", nom, postal))
+    return communes
+
+
+def _decimal(value: float, digits: int = 2) -> str:
+    return f"{value:.{digits}f}".replace(".", ",")
+
+
+class _YearGenerator:
+    """Actes d'une année : 1 à 5 lignes par acte, prix partagé par l'acte."""
+
+    def __init__(self, year: int, seed: int, departements: list[str]) -> None:
+        self.year = year
+        self.rng = random.Random(f"{seed}-{year}")
+        self.departements = departements
+        self.dept_weights = [BIG_DEPARTEMENTS.get(d, 1) for d in departements]
+        self.communes = {d: _communes(d) for d in departements}
+        self.first_day = date(year, 1, 1).toordinal()
+        self.days = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+        self.natures = [n for n, _ in NATURES]
+        self.nature_weights = [w for _, w in NATURES]
+        self.line_counts = [n for n, _ in LINES_PER_DEED]
+        self.line_weights = [w for _, w in LINES_PER_DEED]
+        self.type_weights = [t[2] for t in MAIN_TYPES]
+
+    def deed(self) -> list[list[str]]:
+        rng = self.rng
+        departement = rng.choices(self.departements, weights=self.dept_weights)[0]
+        code_commune, commune, code_postal = rng.choice(self.communes[departement])
+        mutation_date = date.fromordinal(self.first_day + rng.randrange(self.days)).strftime("%d/%m/%Y")
+        nature = rng.choices(self.natures, weights=self.nature_weights)[0]
+        code_type, type_local, _, (s_min, s_max), median = rng.choices(MAIN_TYPES, weights=self.type_weights)[0]
+        n_lines = rng.choices(self.line_counts, weights=self.line_weights)[0]
+
+        price = "" if nature == "Echange" and rng.random() < 0.5 else _decimal(
+            round(median * rng.lognormvariate(0, 0.55), -2 if rng.random() < 0.8 else 0)
+        )
+        address = [
+            str(rng.randint(1, 250)) if type_local else "",
+            "B" if rng.random() < 0.03 else "",
+            rng.choice(TYPES_VOIE),
+            f"{rng.randrange(10000):04d}" if rng.random() < 0.9 else f"B{rng.randrange(1000):03d}",
+            rng.choice(NOMS_VOIE),
+        ]
+        section = f"{chr(65 + rng.randrange(26))}{chr(65 + rng.randrange(26))}"
+        no_disposition = "000001" if rng.random() < 0.97 else "000002"
+
+        lines = []
+        for i in range(n_lines):
+            if i == 0 or not type_local:
+                line_code, line_type = code_type, type_local
+                surface = rng.randint(s_min, s_max) if type_local else 0
+            else:
+                # Lignes suivantes : dépendances (cave, parking) ou 2e local
+                line_code, line_type = DEPENDANCE if rng.random() < 0.8 else (code_type, type_local)
+                surface = rng.randint(s_min, s_max) if line_type == type_local else 0
+            lots = []
+            if line_type == "Appartement" or (line_type == "Dépendance" and code_type == "2"):
+                lots = [(str(rng.randint(1, 400)),
+                         _decimal(surface * rng.uniform(0.9, 1.0)) if line_type == "Appartement" else "")
+                        for _ in range(1 if rng.random() < 0.85 else 2)]
+            lot_fields = []
+            for k in range(5):
+                lot_fields += list(lots[k]) if k < len(lots) else ["", ""]
+            land = not line_type or (line_type == "Maison" and rng.random() < 0.7)
+            lines.append([
+                no_disposition, "", "", "", "", "", "", "", "",
+                mutation_date, nature, price,
+                *address,
+                code_postal, commune, departement, code_commune,
+                section, str(rng.randint(1, 3000)), "",
+                *lot_fields, str(len(lots)),
+                line_code, line_type, "",
+                str(surface) if line_type and line_type != "Dépendance" else "",
+                str(max(1, surface // 22)) if line_type in ("Maison", "Appartement") else ("0" if line_type else ""),
+                rng.choice(NATURES_CULTURE) if land else "", "",
+                str(rng.randint(100, 5000)) if land else "",
+            ])
+        return lines
+
+    def write(self, out: IO[str], n_rows: int) -> int:
+        """Écrit l'entête puis des actes jusqu'à `n_rows` lignes (acte final tronqué)."""
+        out.write("|".join(COLUMNS) + "\n")
+        written = 0
+        while written < n_rows:
+            for line in self.deed():
+                text = "|".join(line) + "\n"
+                out.write(text)
+                written += 1
+                if written < n_rows and self.rng.random() < DUPLICATE_RATE:
+                    out.write(text)
+                    written += 1
+                if written >= n_rows:
+                    break
+        return written
+
+
+def rows_for_scale(scale_factor: float) -> int:
+    return max(1, round(scale_factor * ROWS_PER_SCALE_FACTOR))
+
+
+def generate_dataset(
+    out_dir: str | Path,
+    *,
+    scale_factor: float,
+    seed: int = DEFAULT_SEED,
+    years: tuple[int, ...] | list[int] = DEFAULT_YEARS,
+    zip_output: bool = False,
+) -> dict:
+    """
+    Génère un fichier par année sous `out_dir` (ou un ZIP data.gouv.fr
+    `valeursfoncieres-YYYY.txt.zip` si `zip_output`).
+    Retourne {"scale_factor", "seed", "rows", "files": [{"path", "year", "rows", "bytes"}]}.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    departements = load_departements()
+    total = rows_for_scale(scale_factor)
+    per_year = [total // len(years) + (1 if i < total % len(years) else 0) for i in range(len(years))]
+
+    files = []
+    for year, n_rows in zip(years, per_year):
+        generator = _YearGenerator(year, seed, departements)
+        txt_name = f"ValeursFoncieres-{year}.txt"
+        if zip_output:
+            path = out_dir / f"valeursfoncieres-{year}.txt.zip"
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z, z.open(txt_name, "w") as raw:
+                with io.TextIOWrapper(raw, encoding="utf-8", newline="", write_through=False) as out:
+                    rows = generator.write(out, n_rows)
+        else:
+            path = out_dir / txt_name
+            with open(path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER_SIZE) as out:
+                rows = generator.write(out, n_rows)
+        files.append({"path": str(path), "year": year, "rows": rows, "bytes": path.stat().st_size})
+
+    return {
+        "scale_factor": scale_factor,
+        "seed":         seed,
+        "rows":         sum(f["rows"] for f in files),
+        "files":        files,
+    }
+
+
+def _parse_years(value: str) -> tuple[int, ...]:
+    if "-" in value:
+        start, end = (int(v) for v in value.split("-", 1))
+        return tuple(range(start, end + 1))
+    return tuple(int(v) for v in value.split(","))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, required=True, help="Facteur d'échelle (0.01 … 10)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--years", type=_parse_years, default=DEFAULT_YEARS, help="ex. 2020-2024 ou 2022,2024")
+    parser.add_argument("--zip", action="store_true", help="ZIP par année, comme data.gouv.fr")
+    parser.add_argument("--out", type=Path, required=True, help="Dossier de sortie")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = generate_dataset(
+        args.out, scale_factor=args.scale, seed=args.seed, years=args.years, zip_output=args.zip,
+    )
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    for f in summary["files"]:
+        print(f"{f['path']:<60} {f['rows']:>12,} lignes {f['bytes']:>14,} octets")
+    print(f"SF{args.scale} seed={args.seed} : {summary['rows']:,} lignes en {summary['seconds']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -79,53 +79,78 @@
 
 # print("✅ Extraction DVF terminée")
 
-import requests
-import zipfile
-from io import BytesIO
 import os
 import re
+import sys
+import zipfile
+from pathlib import Path
 
+# Script local (python produce_data.py) : import sans effet de bord — aucun
+# appel réseau, répertoire ni cache créé tant que main() n'est pas appelé
 RAW_DIR = "raw"
-os.makedirs(RAW_DIR, exist_ok=True)
+
+# Cache partagé : DVF_CACHE_DIR pointé sur le même répertoire que le worker
+# Airflow → un ZIP déjà téléchargé (par l'un ou l'autre) n'est plus retéléchargé
+CACHE_DIR = os.getenv("DVF_CACHE_DIR", str(Path.home() / ".cache" / "dvf"))
+CACHE_MAX_BYTES = int(float(os.getenv("DVF_CACHE_MAX_GB", "10")) * 1024 ** 3)
 
 DATASET_API = "https://www.data.gouv.fr/api/1/datasets/demandes-de-valeurs-foncieres/"
 
-response = requests.get(DATASET_API)
-response.raise_for_status()
 
-dataset = response.json()
-resources = dataset["resources"]
+def main():
+    import requests
+
+    # Modules partagés avec le DAG (airflow/include/dvf) : même cache de ZIP
+    sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+    from include.dvf.cache import DownloadCache
+    from include.dvf.ingestion import parse_dvf_resources
+    from include.dvf.manifest import resource_fingerprint
+
+    os.makedirs(RAW_DIR, exist_ok=True)
+
+    response = requests.get(DATASET_API)
+    response.raise_for_status()
+
+    zip_files = parse_dvf_resources(response.json())
+    cache = DownloadCache(CACHE_DIR, CACHE_MAX_BYTES)
 
-zip_files = [
-    r for r in resources
-    if r["url"].endswith(".zip") and "valeursfoncieres" in r["url"]
-]
+    print(f"{len(zip_files)} fichiers DVF détectés")
 
-print(f"{len(zip_files)} fichiers DVF détectés")
+    for r in zip_files:
+        url = r["url"]
+        zip_name = r["zip_name"]
+        year_match = re.search(r"20\d{2}", zip_name)
 
-for r in zip_files:
-    url = r["url"]
-    zip_name = url.split("/")[-1]
-    year_match = re.search(r"20\d{2}", zip_name)
+        # nom du fichier txt attendu après extraction
+        extracted_files = [
+            f for f in os.listdir(RAW_DIR)
+            if year_match and year_match.group() in f
+        ]
 
-    # nom du fichier txt attendu après extraction
-    extracted_files = [
-        f for f in os.listdir(RAW_DIR)
-        if year_match and year_match.group() in f
-    ]
+        if extracted_files:
+            print(f"⏭️  {zip_name} déjà présent → SKIP")
+            continue
 
-    if extracted_files:
-        print(f"⏭️  {zip_name} déjà présent → SKIP")
-        continue
+        # Cache hit : aucun appel réseau ; sinon download par plages vérifié puis mis en cache
+        archive, download = cache.fetch(
+            url, resource_fingerprint(r),
+            expected_size=r["filesize"],
+            checksum=r["checksum"],
+            checksum_type=r["checksum_type"] or "sha1",
+            concurrency=4,
+        )
+        print(f"⬇️  {zip_name} téléchargé" if download else f"📦 {zip_name} servi par le cache")
 
-    print(f"⬇️  Téléchargement : {zip_name}")
-    resp = requests.get(url)
-    resp.raise_for_status()
+        with archive, zipfile.ZipFile(archive) as z:
+            z.extractall(RAW_DIR)
 
-    with zipfile.ZipFile(BytesIO(resp.content)) as z:
-        z.extractall(RAW_DIR)
+        print(f"✅ {zip_name} extrait")
 
-    print(f"✅ {zip_name} extrait")
+    stats = cache.stats
+    print(f"🗄️  Cache {CACHE_DIR} : {stats['hits']} hits, {stats['misses']} misses, {stats['bytes_saved']} octets économisés")
+    print("🎯 Ingestion DVF terminée")
 
-print("🎯 Ingestion DVF terminée")
 
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,11 @@
-from airflow.sdk import Asset, asset
-from airflow.providers.amazon.aws.hooks.s3 import S3Hook
-import requests
-import zipfile
-from io import BytesIO
+from airflow.sdk import asset
 import logging
 
 # -------------------
 # LOGGING
 # -------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-)
+# Pas de logging.basicConfig : au parsing, il reconfigurerait le logging du
+# DAG processor ; les logs de la tâche passent par le handler Airflow
 logger = logging.getLogger(__name__)
 
 # -------------------
@@ -21,31 +15,32 @@ BUCKET_NAME = "data-platform-project-kubctl-1"
 S3_PREFIX = "real-raw/"
 AWS_CONN_ID = "aws_default"
 
-s3_hook = S3Hook(aws_conn_id=AWS_CONN_ID)
+DATASET_API = "https://www.data.gouv.fr/api/1/datasets/demandes-de-valeurs-foncieres/"
 
 # -------------------
-# ASSET
+# ASSET INGESTION
 # -------------------
-dvf_raw_asset = Asset(
+# Le décorateur @asset déclare l'asset produit (s3://…/real-raw) ; hook S3,
+# requests et zipfile ne sont créés / importés qu'à l'exécution
+@asset(
+    name="dvf_raw_ingestion",
     uri="s3://data-platform-project-kubctl-1/real-raw",
     extra={
         "source": "data.gouv.fr",
         "layer": "raw",
         "format": "txt"
-    }
-)
-
-DATASET_API = "https://www.data.gouv.fr/api/1/datasets/demandes-de-valeurs-foncieres/"
-
-# -------------------
-# ASSET INGESTION
-# -------------------
-@asset(
-    name="dvf_raw_ingestion",
+    },
+    schedule=None,
     description="Ingestion DVF RAW vers S3",
-    outlets=[dvf_raw_asset],
 )
 def extract_dvf_to_s3():
+    import zipfile
+    from io import BytesIO
+
+    import requests
+    from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+
+    s3_hook = S3Hook(aws_conn_id=AWS_CONN_ID)
 
     logger.info("🚀 Démarrage ingestion DVF → S3")
 
@@ -0,0 +1,39 @@
+{#
+    Bronze typé (variable `bronze_typed`, défaut : env DVF_TYPED_BRONZE).
+
+    - false (défaut) : DEV_BRONZE.mutations_foncieres, tout en VARCHAR ;
+      Silver parse dates et décimaux à virgule à chaque exécution.
+    - true : DEV_BRONZE.mutations_foncieres_typed, dates / décimaux
+      convertis une fois au COPY (02_copy_into_bronze*_typed.sql,
+      load_local_bronze typed=true) ; valeurs non convertibles → NULL,
+      valeur brute dans _raw_rejects.
+
+    bronze_date / bronze_number rendent le même type et la même valeur dans
+    les deux modes (DATE au format JJ/MM/AAAA, NUMBER(38, 0)) : colonnes
+    Silver et mutation_id inchangés (tests/include/test_bronze_typed.py).
+#}
+{% macro bronze_typed() -%}
+    {{ return((var('bronze_typed', env_var('DVF_TYPED_BRONZE', 'false')) | string | lower) == 'true') }}
+{%- endmacro %}
+
+{% macro bronze_table() -%}
+    {{ return('mutations_foncieres_typed' if bronze_typed() else 'mutations_foncieres') }}
+{%- endmacro %}
+
+{# Date DVF (JJ/MM/AAAA) → DATE #}
+{% macro bronze_date(expr) -%}
+    {%- if bronze_typed() -%}
+        {{ expr }}
+    {%- else -%}
+        {{ try_to_date(expr) }}
+    {%- endif -%}
+{%- endmacro %}
+
+{# Décimal DVF (virgule) → NUMBER(38, 0), arrondi comme TRY_TO_NUMBER #}
+{% macro bronze_number(expr) -%}
+    {%- if bronze_typed() -%}
+        CAST({{ expr }} AS DECIMAL(38, 0))
+    {%- else -%}
+        {{ try_to_number("REPLACE(" ~ expr ~ ", ',', '.')") }}
+    {%- endif -%}
+{%- endmacro %}
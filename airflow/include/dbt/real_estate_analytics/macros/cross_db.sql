@@ -0,0 +1,163 @@
+{#
+    Macros cross-database : Snowflake (prod / dev) et DuckDB (target `duckdb`,
+    exécution locale hors-ligne). Le SQL Snowflake généré est inchangé ;
+    seules les fonctions absentes de DuckDB passent par ces macros.
+    Dispatch dbt : `<adapter>__<macro>` puis `default__<macro>` (= Snowflake).
+#}
+
+
+{#
+    TRY_TO_NUMBER(expr) : NUMBER(38, 0), NULL si non convertible.
+    DuckDB : lecture en DECIMAL(18, 0) (entier 64 bits, ~100x plus rapide
+    que le parsing direct en DECIMAL(38, 0) 128 bits) puis élargissement.
+#}
+{% macro try_to_number(expr) -%}
+    {{ return(adapter.dispatch('try_to_number')(expr)) }}
+{%- endmacro %}
+
+{% macro default__try_to_number(expr) -%}
+    TRY_TO_NUMBER({{ expr }})
+{%- endmacro %}
+
+{% macro duckdb__try_to_number(expr) -%}
+    CAST(TRY_CAST({{ expr }} AS DECIMAL(18, 0)) AS DECIMAL(38, 0))
+{%- endmacro %}
+
+
+{#
+    TRY_TO_DATE(expr) au format DVF (JJ/MM/AAAA), celui du Bronze typé
+    (03_insert_bronze_typed.sql) : sans format, Snowflake applique AUTO
+    (MM/JJ/AAAA) → jours > 12 à NULL, jour et mois inversés sinon.
+    DuckDB lit aussi l'ISO.
+#}
+{% macro try_to_date(expr) -%}
+    {{ return(adapter.dispatch('try_to_date')(expr)) }}
+{%- endmacro %}
+
+{% macro default__try_to_date(expr) -%}
+    TRY_TO_DATE({{ expr }}, 'DD/MM/YYYY')
+{%- endmacro %}
+
+{% macro duckdb__try_to_date(expr) -%}
+    CAST(COALESCE(TRY_STRPTIME({{ expr }}, '%d/%m/%Y'), TRY_CAST({{ expr }} AS DATE)) AS DATE)
+{%- endmacro %}
+
+
+{# IFF(condition, si_vrai, si_faux) #}
+{% macro iff(condition, if_true, if_false) -%}
+    {{ return(adapter.dispatch('iff')(condition, if_true, if_false)) }}
+{%- endmacro %}
+
+{% macro default__iff(condition, if_true, if_false) -%}
+    IFF({{ condition }}, {{ if_true }}, {{ if_false }})
+{%- endmacro %}
+
+{% macro duckdb__iff(condition, if_true, if_false) -%}
+    CASE WHEN {{ condition }} THEN {{ if_true }} ELSE {{ if_false }} END
+{%- endmacro %}
+
+
+{# INITCAP(expr) : DuckDB → majuscule en tête de chaque mot (séparateur espace) #}
+{% macro initcap(expr) -%}
+    {{ return(adapter.dispatch('initcap')(expr)) }}
+{%- endmacro %}
+
+{% macro default__initcap(expr) -%}
+    INITCAP({{ expr }})
+{%- endmacro %}
+
+{% macro duckdb__initcap(expr) -%}
+    ARRAY_TO_STRING(
+        LIST_TRANSFORM(STRING_SPLIT(LOWER({{ expr }}), ' '), w -> UPPER(LEFT(w, 1)) || SUBSTR(w, 2)),
+        ' '
+    )
+{%- endmacro %}
+
+
+{# DATE_FROM_PARTS(annee, mois, jour) #}
+{% macro date_from_parts(year, month, day) -%}
+    {{ return(adapter.dispatch('date_from_parts')(year, month, day)) }}
+{%- endmacro %}
+
+{% macro default__date_from_parts(year, month, day) -%}
+    DATE_FROM_PARTS({{ year }}, {{ month }}, {{ day }})
+{%- endmacro %}
+
+{% macro duckdb__date_from_parts(year, month, day) -%}
+    MAKE_DATE(CAST({{ year }} AS INTEGER), CAST({{ month }} AS INTEGER), CAST({{ day }} AS INTEGER))
+{%- endmacro %}
+
+
+{#
+    Hash 64 bits signé (BIGINT) d'une liste de colonnes typées, sans
+    conversion en chaîne ; NULL et position des colonnes pris en compte.
+    DuckDB : HASH() UBIGINT décalé de -2^63 dans l'intervalle BIGINT.
+#}
+{% macro row_hash(columns) -%}
+    {{ return(adapter.dispatch('row_hash')(columns)) }}
+{%- endmacro %}
+
+{% macro default__row_hash(columns) -%}
+    HASH({{ columns | join(', ') }})
+{%- endmacro %}
+
+{% macro duckdb__row_hash(columns) -%}
+    CAST(CAST(HASH({{ columns | join(', ') }}) AS HUGEINT) - 9223372036854775808 AS BIGINT)
+{%- endmacro %}
+
+
+{# `day_count` jours consécutifs depuis `start_date` → colonne `date_complete` #}
+{% macro date_spine_days(start_date, day_count) -%}
+    {{ return(adapter.dispatch('date_spine_days')(start_date, day_count)) }}
+{%- endmacro %}
+
+{% macro default__date_spine_days(start_date, day_count) -%}
+    SELECT DATEADD(DAY, SEQ4(), '{{ start_date }}')::DATE AS date_complete
+    FROM TABLE(GENERATOR(ROWCOUNT => {{ day_count }}))
+{%- endmacro %}
+
+{% macro duckdb__date_spine_days(start_date, day_count) -%}
+    SELECT CAST(DATE '{{ start_date }}' + CAST(i AS INTEGER) AS DATE) AS date_complete
+    FROM range({{ day_count }}) AS t(i)
+{%- endmacro %}
+
+
+{#
+    TO_CHAR(date, format) pour les formats Snowflake utilisés par le projet.
+    Un format absent de la table de correspondance DuckDB lève une erreur
+    de compilation plutôt qu'un résultat silencieusement différent.
+#}
+{% macro format_date(expr, format) -%}
+    {{ return(adapter.dispatch('format_date')(expr, format)) }}
+{%- endmacro %}
+
+{% macro default__format_date(expr, format) -%}
+    TO_CHAR({{ expr }}, '{{ format }}')
+{%- endmacro %}
+
+{% macro duckdb__format_date(expr, format) -%}
+    {%- set strftime_formats = {
+        'YYYYMMDD': '%Y%m%d',
+        'MMMM':     '%B',
+        'MON YYYY': '%b %Y',
+        'DY':       '%a',
+    } -%}
+    {%- if format not in strftime_formats -%}
+        {{ exceptions.raise_compiler_error("format_date : format non supporté sous DuckDB : " ~ format) }}
+    {%- endif -%}
+    STRFTIME({{ expr }}, '{{ strftime_formats[format] }}')
+{%- endmacro %}
+
+
+{# Clé de date entière AAAAMMJJ (dim_date.date_key) #}
+{% macro date_key(expr) -%}
+    {{ return(adapter.dispatch('date_key')(expr)) }}
+{%- endmacro %}
+
+{% macro default__date_key(expr) -%}
+    TO_NUMBER({{ format_date(expr, 'YYYYMMDD') }})
+{%- endmacro %}
+
+{% macro duckdb__date_key(expr) -%}
+    CAST({{ format_date(expr, 'YYYYMMDD') }} AS INTEGER)
+{%- endmacro %}
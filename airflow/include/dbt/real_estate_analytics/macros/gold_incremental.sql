@@ -0,0 +1,33 @@
+{#
+    Périodes Gold à recalculer (mois, année…) pour un modèle incrémental
+    `delete+insert` dont `unique_key` est la période.
+
+    `period_expr` : expression de période sur `relation`
+    (ex. "DATE_TRUNC('month', date_mutation)", "YEAR(mois)").
+    `relation` / `date_column` : silver_mutation_f / date_mutation par défaut ;
+    les agrégats construits sur le cube passent cube_mutations_mensuel / mois.
+
+    - Mode lots (silver_batch_driven) : périodes touchées par les lignes de
+      `relation` d'un lot plus récent que la marque haute du modèle (MAX(_batch_id)).
+    - Mode date : périodes des `gold_lookback_months` derniers mois de `relation`.
+
+    `include_undated` : les lignes sans date comptent aussi (période de
+    `period_expr` sur une date NULL, ex. clé 0 du cube) ; en mode date, elles
+    sont toujours retenues (pas de fenêtre applicable).
+#}
+{% macro gold_changed_periods(
+    period_expr, batch_column='_batch_id', relation=none, date_column='date_mutation', include_undated=false
+) -%}
+    {%- set relation = relation if relation is not none else ref('silver_mutation_f') -%}
+    SELECT DISTINCT {{ period_expr }} AS period
+    FROM {{ relation }}
+    WHERE {% if not include_undated %}{{ date_column }} IS NOT NULL{% else %}1 = 1{% endif %}
+    {%- if var('silver_batch_driven', true) %}
+      AND _batch_id > {{ batch_high_watermark(batch_column) }}
+    {%- else %}
+      AND ({{ date_column }} >= (
+          SELECT {{ dbt.dateadd('month', -var('gold_lookback_months', 3), 'MAX(' ~ date_column ~ ')') }}
+          FROM {{ relation }}
+      ){% if include_undated %} OR {{ date_column }} IS NULL{% endif %})
+    {%- endif %}
+{%- endmacro %}
@@ -0,0 +1,49 @@
+{#
+    Lots Bronze (DEV_BRONZE.load_batches) pas encore absorbés par le modèle
+    consommateur courant.
+
+    Chaque consommateur garde son propre état : la colonne `batch_column`
+    (ex. `_batch_id` de silver_mutation_f) porte le lot d'origine de chaque
+    ligne, et son MAX sert de marque haute. Les batch_id sont horodatés
+    (YYYYMMDDTHHMMSS-xxxxxxxx) et les COPY sont séquentiels (max_active_runs = 1) :
+    tout lot LOADED au-delà de la marque est à traiter. Un MERGE qui réécrit
+    une ligne avec un lot plus récent ne fait qu'avancer la marque.
+    Hors incrémental (premier run, --full-refresh) : tous les lots LOADED.
+    Table créée avant la migration lignage (colonne absente) : marque vide,
+    tous les lots LOADED sont à traiter, sans --full-refresh.
+
+    Usage :
+        WITH pending_batches AS ({{ unconsumed_load_batches() }})
+        … ON _loaded_at BETWEEN pending_batches.started_at AND pending_batches.finished_at
+#}
+{% macro unconsumed_load_batches(batch_column='_batch_id') -%}
+    SELECT batch_id, started_at, finished_at
+    FROM {{ source('dvf', 'load_batches') }}
+    WHERE status = 'LOADED'
+    {%- if is_incremental() %}
+      AND batch_id > {{ batch_high_watermark(batch_column) }}
+    {%- endif %}
+{%- endmacro %}
+
+
+{#
+    Marque haute de consommation de lots du modèle courant : MAX(batch_column)
+    de {{ this }}, ou '' si la colonne n'existe pas encore (table antérieure à
+    la migration, ajoutée ensuite par on_schema_change='append_new_columns').
+#}
+{% macro batch_high_watermark(batch_column='_batch_id') -%}
+    {%- if relation_has_column(this, batch_column) -%}
+        (SELECT COALESCE(MAX({{ batch_column }}), '') FROM {{ this }})
+    {%- else -%}
+        ''
+    {%- endif -%}
+{%- endmacro %}
+
+
+{% macro relation_has_column(relation, column_name) %}
+    {% if not execute %}
+        {{ return(false) }}
+    {% endif %}
+    {% set names = adapter.get_columns_in_relation(relation) | map(attribute='name') | map('lower') | list %}
+    {{ return(column_name | lower in names) }}
+{% endmacro %}
@@ -0,0 +1,168 @@
+{#
+    Chargement Bronze local (target duckdb) — équivalent hors-ligne de
+    02_copy_into_bronze*.sql + lot DEV_BRONZE.load_batches.
+
+    `path` : fichier(s) ou glob, Parquet (sortie de la conversion Airflow,
+    ex. real-parquet/**/*.parquet) ou TXT DVF pipe-séparé, éventuellement
+    en chunks .gz / .zst (ex. real-raw/*.txt*). Toutes les colonnes sont
+    chargées en VARCHAR, comme la table Snowflake.
+
+    `typed=true` : équivalent de 02_copy_into_bronze*_typed.sql → table
+    mutations_foncieres_typed (Date mutation en DATE, montant et surfaces
+    en DECIMAL, valeurs brutes non convertibles dans _raw_rejects en JSON).
+    À combiner avec `--vars "{bronze_typed: true}"` côté dbt run.
+
+    Comme COPY INTO (FORCE = FALSE), un fichier déjà chargé est ignoré.
+    Les lignes reçoivent _source_file / _source_row_number / _loaded_at et
+    le lot est enregistré LOADED (ou EMPTY) : les modèles incrémentaux
+    (silver_mutation_f, Gold) se comportent comme en production.
+
+    Usage :
+        dbt run-operation load_local_bronze --target duckdb \
+            --args "{path: 'data/dvf/*.txt'}"
+#}
+
+{# Colonnes converties au chargement typé (cf. 01_create_snowflake_objects.sql) #}
+{% macro bronze_typed_columns() -%}
+    {{ return({
+        'Date mutation':              'DATE',
+        'Valeur fonciere':            'DECIMAL(15, 2)',
+        'Surface Carrez du 1er lot':  'DECIMAL(12, 2)',
+        'Surface Carrez du 2eme lot': 'DECIMAL(12, 2)',
+        'Surface Carrez du 3eme lot': 'DECIMAL(12, 2)',
+        'Surface Carrez du 4eme lot': 'DECIMAL(12, 2)',
+        'Surface Carrez du 5eme lot': 'DECIMAL(12, 2)',
+        'Surface reelle bati':        'DECIMAL(12, 2)',
+        'Surface terrain':            'DECIMAL(12, 2)',
+    }) }}
+{%- endmacro %}
+
+{% macro load_local_bronze(path, typed=false) %}
+    {% if target.type != 'duckdb' %}
+        {{ exceptions.raise_compiler_error("load_local_bronze : réservé au target duckdb (target courant : " ~ target.type ~ ")") }}
+    {% endif %}
+
+    {% set bronze = source('dvf', 'mutations_foncieres_typed' if typed else 'mutations_foncieres') %}
+    {% set batches = source('dvf', 'load_batches') %}
+    {% set now = modules.datetime.datetime.utcnow() %}
+    {# Microsecondes : deux chargements dans la même seconde ne doivent pas
+       entrer en collision sur la clé primaire de load_batches #}
+    {% set batch_id = now.strftime('%Y%m%dT%H%M%S%f') ~ '-local' %}
+    {# Horodatage unique du lot : started_at = _loaded_at (fenêtre du lot) #}
+    {% set loaded_at = "TIMESTAMPTZ '" ~ now.isoformat() ~ "+00:00'" %}
+
+    {% if path.endswith('.parquet') %}
+        {% set files %}
+            SELECT COLUMNS(* EXCLUDE (filename, file_row_number))::VARCHAR,
+                   filename,
+                   file_row_number + 1 AS file_row_number
+            FROM read_parquet('{{ path }}', filename = true, file_row_number = true,
+                              union_by_name = true, hive_partitioning = false)
+        {% endset %}
+    {% else %}
+        {% set files %}
+            SELECT * EXCLUDE (filename),
+                   filename,
+                   ROW_NUMBER() OVER (PARTITION BY filename) AS file_row_number
+            FROM read_csv('{{ path }}', delim = '|', header = true, quote = '"',
+                          all_varchar = true, filename = true, union_by_name = true,
+                          nullstr = ['', 'NULL', 'null'])
+        {% endset %}
+    {% endif %}
+
+    {# Colonnes Bronze : VARCHAR, ou conversions + _raw_rejects (typé) #}
+    {% set columns %}
+        * EXCLUDE (filename, file_row_number)
+        {%- if typed %}
+        REPLACE (
+            {%- for column, type in bronze_typed_columns().items() %}
+            {{ _bronze_convert(column, type) }} AS "{{ column }}"{{ ',' if not loop.last }}
+            {%- endfor %}
+        ),
+        NULLIF(to_json(map_from_entries(list_filter([
+            {%- for column, type in bronze_typed_columns().items() %}
+            ('{{ column }}', CASE WHEN {{ _bronze_convert(column, type) }} IS NULL THEN "{{ column }}" END){{ ',' if not loop.last }}
+            {%- endfor %}
+        ], e -> e[2] IS NOT NULL))), '{}')::JSON AS _raw_rejects
+        {%- endif %}
+    {% endset %}
+
+    {% set sql %}
+        CREATE SCHEMA IF NOT EXISTS {{ bronze.database }}.{{ bronze.schema }};
+
+        CREATE TABLE IF NOT EXISTS {{ batches }} (
+            batch_id       VARCHAR PRIMARY KEY,
+            dag_run_id     VARCHAR,
+            source_stage   VARCHAR,
+            status         VARCHAR NOT NULL,
+            started_at     TIMESTAMPTZ NOT NULL,
+            finished_at    TIMESTAMPTZ,
+            files          VARCHAR[],
+            files_loaded   BIGINT,
+            rows_parsed    BIGINT,
+            rows_loaded    BIGINT,
+            errors_seen    BIGINT,
+            error_message  VARCHAR
+        );
+
+        CREATE TEMP TABLE _local_bronze_files AS
+        SELECT * FROM ({{ files }});
+
+        CREATE TABLE IF NOT EXISTS {{ bronze }} AS
+        SELECT {{ columns }},
+               CAST(NULL AS VARCHAR)     AS _source_file,
+               CAST(NULL AS BIGINT)      AS _source_row_number,
+               CAST(NULL AS TIMESTAMPTZ) AS _loaded_at
+        FROM _local_bronze_files
+        LIMIT 0;
+
+        INSERT INTO {{ batches }} (batch_id, dag_run_id, source_stage, status, started_at)
+        VALUES ('{{ batch_id }}', 'local', '{{ path }}', 'RUNNING', {{ loaded_at }});
+
+        -- FORCE = FALSE : fichiers déjà présents en Bronze ignorés
+        INSERT INTO {{ bronze }} BY NAME
+        SELECT {{ columns }},
+               filename                AS _source_file,
+               file_row_number         AS _source_row_number,
+               {{ loaded_at }}         AS _loaded_at
+        FROM _local_bronze_files
+        WHERE filename NOT IN (
+            SELECT DISTINCT _source_file FROM {{ bronze }} WHERE _source_file IS NOT NULL
+        );
+
+        UPDATE {{ batches }}
+        SET status       = CASE WHEN s.rows_loaded > 0 THEN 'LOADED' ELSE 'EMPTY' END,
+            finished_at  = GREATEST(CURRENT_TIMESTAMP, {{ loaded_at }}),
+            files        = s.files,
+            files_loaded = s.files_loaded,
+            rows_parsed  = s.rows_loaded,
+            rows_loaded  = s.rows_loaded,
+            errors_seen  = 0
+        FROM (
+            SELECT COUNT(*)                             AS rows_loaded,
+                   COUNT(DISTINCT _source_file)         AS files_loaded,
+                   COALESCE(LIST(DISTINCT _source_file ORDER BY _source_file), [])  AS files
+            FROM {{ bronze }}
+            WHERE _loaded_at = {{ loaded_at }}
+        ) AS s
+        WHERE batch_id = '{{ batch_id }}';
+
+        DROP TABLE _local_bronze_files;
+    {% endset %}
+
+    {% do run_query(sql) %}
+
+    {% set summary = run_query("SELECT status, files_loaded, rows_loaded FROM " ~ batches ~ " WHERE batch_id = '" ~ batch_id ~ "'") %}
+    {% do log("Bronze local : lot " ~ batch_id ~ " → " ~ summary.columns[0].values()[0]
+              ~ " (" ~ summary.columns[1].values()[0] ~ " fichier(s), "
+              ~ summary.columns[2].values()[0] ~ " lignes)", info=true) %}
+{% endmacro %}
+
+
+{% macro _bronze_convert(column, type) -%}
+    {%- if type == 'DATE' -%}
+        {{ try_to_date('"' ~ column ~ '"') }}
+    {%- else -%}
+        TRY_CAST(REPLACE("{{ column }}", ',', '.') AS {{ type }})
+    {%- endif -%}
+{%- endmacro %}
@@ -0,0 +1,93 @@
+{#
+    Identifiant des mutations Silver.
+
+    `mutation_id` = hash 64 bits (BIGINT, macro row_hash) de la ligne
+    normalisée : toutes les colonnes métier stockées dans
+    silver_mutation_f, après casts et LOWER. Le même hash sert à la
+    déduplication (une ligne par mutation_id, lot Bronze le plus récent)
+    et de clé au MERGE incrémental. Recalculable depuis la table Silver
+    elle-même : c'est ce qui permet la migration des anciennes clés.
+
+    Collisions : ~n² / 2^65, soit ~1e-5 pour 17M lignes.
+#}
+
+
+{# Colonnes normalisées hachées, dans l'ordre #}
+{% macro mutation_identity_columns() -%}
+    {{ return([
+        'no_disposition',
+        'identifiant_document',
+        'date_mutation',
+        'nature_mutation',
+        'valeur_fonciere',
+        'code_postal',
+        'commune',
+        'code_departement',
+        'type_local',
+        'surface_reelle_bati',
+        'nombre_pieces_principales',
+        'surface_terrain',
+    ]) }}
+{%- endmacro %}
+
+{% macro mutation_id() -%}
+    {{ row_hash(mutation_identity_columns()) }}
+{%- endmacro %}
+
+
+{#
+    Migration des clés MD5 VARCHAR(32) (pre_hook de silver_mutation_f).
+    Si `relation` existe avec un mutation_id texte :
+      1. `<relation>_legacy_ids` conserve la correspondance
+         legacy_mutation_id (MD5) → mutation_id (BIGINT), pour les
+         consommateurs qui ont stocké d'anciens identifiants ;
+      2. la table est réécrite en place avec les nouvelles clés, dédupliquée
+         sur le hash (les copies distinguées par l'ancien lot_rank ne
+         différaient sur aucune colonne Silver).
+    Sans objet ensuite (mutation_id numérique) : aucune requête.
+#}
+{% macro migrate_legacy_mutation_id(relation) -%}
+    {%- if not execute -%}
+        {{ return('') }}
+    {%- endif -%}
+    {%- set existing = adapter.get_relation(
+        database=relation.database, schema=relation.schema, identifier=relation.identifier
+    ) -%}
+    {%- if existing is none -%}
+        {{ return('') }}
+    {%- endif -%}
+
+    {%- set columns = adapter.get_columns_in_relation(existing) -%}
+    {%- set ns = namespace(legacy=false, batch=false) -%}
+    {%- for column in columns -%}
+        {%- if column.name | lower == 'mutation_id' and column.is_string() -%}
+            {%- set ns.legacy = true -%}
+        {%- elif column.name | lower == '_batch_id' -%}
+            {%- set ns.batch = true -%}
+        {%- endif -%}
+    {%- endfor -%}
+    {%- if not ns.legacy -%}
+        {{ return('') }}
+    {%- endif -%}
+
+    {%- set legacy_ids = existing.incorporate(path={'identifier': existing.identifier ~ '_legacy_ids'}) -%}
+    {{ log("Migration mutation_id MD5 → BIGINT : " ~ existing ~ " (correspondance : " ~ legacy_ids ~ ")", info=true) }}
+
+    {% call statement('legacy_mutation_ids') -%}
+        CREATE TABLE IF NOT EXISTS {{ legacy_ids }} AS
+        SELECT mutation_id AS legacy_mutation_id, {{ mutation_id() }} AS mutation_id
+        FROM {{ existing }}
+    {%- endcall %}
+
+    {% call statement('rekey_mutations') -%}
+        CREATE OR REPLACE TABLE {{ existing }} AS
+        SELECT * EXCLUDE (mutation_id), {{ mutation_id() }} AS mutation_id
+        FROM {{ existing }}
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY {{ mutation_id() }}
+            ORDER BY {{ '_batch_id DESC NULLS LAST' if ns.batch else 'mutation_id' }}
+        ) = 1
+    {%- endcall %}
+
+    {{ return('') }}
+{%- endmacro %}
@@ -0,0 +1,185 @@
+{#
+    État de quantiles fusionnable (sketch) : agrégé au grain fin (cube
+    mensuel), combiné à n'importe quel grain plus grossier (commune →
+    département → France, mois → année) sans relire les lignes Silver.
+
+    - Snowflake : t-digest natif (APPROX_PERCENTILE_ACCUMULATE / _COMBINE /
+      _ESTIMATE), état OBJECT stocké en colonne. Erreur en rang, non bornée
+      en valeur par Snowflake.
+    - DuckDB (target local / CI) : histogramme à buckets logarithmiques
+      (type DDSketch), liste de paires {key: bucket, value: effectif}.
+      Une valeur x > 0 tombe dans le bucket k = CEIL(LN(x) / LN(γ)),
+      γ = (1 + α) / (1 - α), estimé par 2·γ^k / (γ + 1) : tout quantile
+      estimé est à ±α (erreur relative) du quantile exact « bas »
+      (QUANTILE_DISC), quel que soit le nombre de fusions. Fusion = simple
+      concaténation des listes. α = var('quantile_sketch_alpha') ; vérifié
+      par tests/assert_median_sketch_error_bound.sql.
+
+    Usage :
+        {{ quantile_state('valeur_fonciere') }}              AS prix_etat     -- cube
+        {{ median_from_states('prix_etat') }}                AS prix_median   -- agrégat
+        {{ prix_median('prix_etat') }}                       AS prix_median   -- selon median_mode
+#}
+
+
+{# γ du sketch DuckDB, rendu en littéral #}
+{% macro quantile_sketch_gamma() -%}
+    {%- set alpha = var('quantile_sketch_alpha') | float -%}
+    {%- if not (0.0001 <= alpha < 1) -%}
+        {{ exceptions.raise_compiler_error("quantile_sketch_alpha doit être dans [0.0001, 1[ : " ~ alpha) }}
+    {%- endif -%}
+    {{ (1 + alpha) / (1 - alpha) }}
+{%- endmacro %}
+
+{# Bucket des valeurs <= 0 (pas de logarithme) #}
+{% macro _quantile_sketch_zero_bucket() -%}
+    -1000000
+{%- endmacro %}
+
+
+{# État d'un agrégat (fonction d'agrégation sur les valeurs) #}
+{% macro quantile_state(expr) -%}
+    {{ return(adapter.dispatch('quantile_state')(expr)) }}
+{%- endmacro %}
+
+{% macro default__quantile_state(expr) -%}
+    APPROX_PERCENTILE_ACCUMULATE({{ expr }})
+{%- endmacro %}
+
+{% macro duckdb__quantile_state(expr) -%}
+    MAP_ENTRIES(HISTOGRAM(CASE
+        WHEN {{ expr }} > 0 THEN CAST(CEIL(LN({{ expr }}) / LN({{ quantile_sketch_gamma() }})) AS INTEGER)
+        WHEN {{ expr }} IS NOT NULL THEN {{ _quantile_sketch_zero_bucket() }}
+    END))
+{%- endmacro %}
+
+
+{# Fusion d'états (fonction d'agrégation sur une colonne d'états) #}
+{% macro quantile_state_merge(state) -%}
+    {{ return(adapter.dispatch('quantile_state_merge')(state)) }}
+{%- endmacro %}
+
+{% macro default__quantile_state_merge(state) -%}
+    APPROX_PERCENTILE_COMBINE({{ state }})
+{%- endmacro %}
+
+{% macro duckdb__quantile_state_merge(state) -%}
+    FLATTEN(LIST({{ state }}))
+{%- endmacro %}
+
+
+{# Quantile `q` (0–1) d'un état (scalaire) #}
+{% macro quantile_from_state(state, q) -%}
+    {{ return(adapter.dispatch('quantile_from_state')(state, q)) }}
+{%- endmacro %}
+
+{% macro default__quantile_from_state(state, q) -%}
+    APPROX_PERCENTILE_ESTIMATE({{ state }}, {{ q }})
+{%- endmacro %}
+
+{#
+    Bucket de rang CEIL(q · n) - 1 (0 = premier, rang de QUANTILE_DISC) :
+    plus petite clé dont l'effectif cumulé (paires de clé <= k) dépasse ce
+    rang. Recherche dichotomique sur l'intervalle ]min, max] des clés, une
+    passe vectorisée LIST_FILTER / LIST_SUM par étape : coût O(paires ·
+    log(étendue)), sans déplier les effectifs en une liste de n lignes.
+
+    21 étapes : étendue des clés < 2^21 (bucket des valeurs <= 0 à -1000000,
+    estimé nul car γ^-1000000 = 0 en double ; |k| <= 150 000 pour
+    valeur_fonciere DECIMAL(15, 2) et α >= 0,0001).
+#}
+{% macro duckdb__quantile_from_state(state, q) -%}
+    {%- set gamma = quantile_sketch_gamma() -%}
+    {%- set ns = namespace(intervalle=
+        "{'lo': CAST(LIST_MIN(LIST_TRANSFORM(etat, lambda e: e.key)) AS BIGINT) - 1,"
+        ~ " 'hi': CAST(LIST_MAX(LIST_TRANSFORM(etat, lambda e: e.key)) AS BIGINT),"
+        ~ " 'rang': GREATEST(CAST(CEIL(" ~ q ~ " * LIST_SUM(LIST_TRANSFORM(etat, lambda e: e.value))) AS BIGINT) - 1, 0)}"
+    ) -%}
+    {%- for _ in range(21) -%}
+        {%- set ns.intervalle = _quantile_sketch_bisect(ns.intervalle) -%}
+    {%- endfor -%}
+    2 * POW({{ gamma }}, LIST_TRANSFORM([{{ state }}], lambda etat: ({{ ns.intervalle }}).hi)[1]) / ({{ gamma }} + 1)
+{%- endmacro %}
+
+{#
+    Une étape : moitié de ]lo, hi] contenant le rang. L'intervalle est lié
+    par LIST_TRANSFORM([...])[1] : la lambda de LIST_FILTER ne capture que
+    cette valeur, pas l'état par élément d'une liste longue.
+#}
+{% macro _quantile_sketch_bisect(intervalle) -%}
+    LIST_TRANSFORM([{{ intervalle }}], lambda b: CASE
+        WHEN b.hi - b.lo <= 1 THEN b
+        WHEN LIST_SUM(LIST_TRANSFORM(
+            LIST_FILTER(etat, lambda e: e.key <= (b.lo + b.hi) // 2), lambda e: e.value
+        )) > b.rang THEN {'lo': b.lo, 'hi': (b.lo + b.hi) // 2, 'rang': b.rang}
+        ELSE {'lo': (b.lo + b.hi) // 2, 'hi': b.hi, 'rang': b.rang}
+    END)[1]
+{%- endmacro %}
+
+
+{# Médiane d'un groupe d'états (fonction d'agrégation) #}
+{% macro median_from_states(state) -%}
+    {{ quantile_from_state(quantile_state_merge(state), 0.5) }}
+{%- endmacro %}
+
+
+{#
+    Médiane exacte ou approchée, au choix du modèle :
+
+        {{ config(meta={'median_mode': 'approx'}) }}
+
+    - exact (défaut, var('median_mode')) : MEDIAN(valeur_fonciere) relue
+      depuis silver_mutation_f au grain du modèle (rescan Silver, coût
+      d'avant le cube) par exact_median_join(), appelé après le FROM ;
+    - approx : fusion des états du cube, sans rescan ; erreur mesurée par
+      tests/assert_median_sketch_error_bound.sql.
+#}
+{% macro median_mode() -%}
+    {%- if not execute -%}
+        {{ return('approx') }}
+    {%- endif -%}
+    {%- set mode = (config.get('meta') or {}).get('median_mode', var('median_mode', 'exact')) -%}
+    {%- if mode not in ('approx', 'exact') -%}
+        {{ exceptions.raise_compiler_error("median_mode invalide : '" ~ mode ~ "' (approx | exact)") }}
+    {%- endif -%}
+    {{ return(mode) }}
+{%- endmacro %}
+
+{% macro prix_median(state) -%}
+    {%- if median_mode() == 'exact' -%}
+        MAX(prix_median_exact.prix_median)
+    {%- else -%}
+        {{ median_from_states(state) }}
+    {%- endif -%}
+{%- endmacro %}
+
+{#
+    grain : liste de paires [expression du modèle, expression Silver]
+    (vide = niveau national) ; where : filtre Silver additionnel.
+#}
+{% macro exact_median_join(grain=[], where=none) -%}
+    {#- ref() résolu à chaque parse : dépendance déclarée quel que soit le mode -#}
+    {%- set silver = ref('silver_mutation_f') -%}
+    {%- if median_mode() == 'exact' %}
+    LEFT JOIN (
+        SELECT
+            {%- for _, silver_expr in grain %}
+            {{ silver_expr }} AS grain_{{ loop.index }},
+            {%- endfor %}
+            MEDIAN(valeur_fonciere) AS prix_median
+        FROM {{ silver }}
+        {%- if where %}
+        WHERE {{ where }}
+        {%- endif %}
+        {%- if grain %}
+        GROUP BY {% for _ in grain %}grain_{{ loop.index }}{{ ", " if not loop.last }}{% endfor %}
+        {%- endif %}
+    ) prix_median_exact
+      ON {% for model_expr, _ in grain -%}
+          {{ model_expr }} IS NOT DISTINCT FROM prix_median_exact.grain_{{ loop.index }}
+          {{- "\n     AND " if not loop.last }}
+        {%- else -%}
+          1 = 1
+        {%- endfor %}
+    {%- endif %}
+{%- endmacro %}
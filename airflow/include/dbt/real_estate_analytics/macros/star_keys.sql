@@ -0,0 +1,82 @@
+{#
+    Clés de substitution entières du modèle en étoile.
+
+    Chaque dimension a une table de correspondance persistante
+    `key_map_<dimension>` (clé naturelle → clé INTEGER) : incrémentale en
+    append, `full_refresh=false`. Une clé naturelle nouvelle reçoit
+    MAX(clé) + n ; une clé attribuée ne change jamais, même après un
+    `--full-refresh` des dimensions ou des faits (rafraîchissements
+    Power BI incrémentaux, signets, relations conservés).
+
+    Clés naturelles normalisées (COALESCE) à l'identique dans les maps,
+    les dimensions, les faits et les agrégats : une valeur NULL reçoit
+    la clé de son libellé par défaut (ex. commune 'Inconnu').
+#}
+
+
+{# Colonnes de la clé naturelle et valeur de remplacement des NULL #}
+{% macro star_natural_key(dimension) -%}
+    {%- set natural_keys = {
+        'geography':       [('commune', 'Inconnu'), ('code_postal', 'XXXXX'), ('code_departement', 'XX')],
+        'type_bien':       [('type_local', 'non renseigné')],
+        'nature_mutation': [('nature_mutation', 'inconnue')],
+    } -%}
+    {%- if dimension not in natural_keys -%}
+        {{ exceptions.raise_compiler_error("Dimension sans clé naturelle : '" ~ dimension ~ "'") }}
+    {%- endif -%}
+    {{ return(natural_keys[dimension]) }}
+{%- endmacro %}
+
+
+{#
+    Corps d'un modèle key_map_<dimension> : clés naturelles distinctes de
+    `source` ; en incrémental, seules les nouvelles sont ajoutées, numérotées
+    à la suite (ordre de la clé naturelle : attribution déterministe).
+#}
+{% macro integer_key_map(dimension, key_column, source) -%}
+    {%- set columns = star_natural_key(dimension) %}
+WITH naturelles AS (
+    SELECT DISTINCT
+        {%- for column, default in columns %}
+        COALESCE({{ column }}, '{{ default }}') AS {{ column }}{{ "," if not loop.last }}
+        {%- endfor %}
+    FROM {{ source }}
+)
+
+SELECT
+    CAST(
+        {%- if is_incremental() %}
+        (SELECT COALESCE(MAX({{ key_column }}), 0) FROM {{ this }}) +
+        {%- endif %}
+        ROW_NUMBER() OVER (ORDER BY {% for column, _ in columns %}{{ column }}{{ ", " if not loop.last }}{% endfor %})
+        AS INTEGER
+    )                                                               AS {{ key_column }},
+    {%- for column, _ in columns %}
+    {{ column }},
+    {%- endfor %}
+    CURRENT_TIMESTAMP                                               AS _assigned_at
+FROM naturelles n
+{%- if is_incremental() %}
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM {{ this }} m
+    WHERE {% for column, _ in columns %}m.{{ column }} = n.{{ column }}{{ "\n      AND " if not loop.last }}{% endfor %}
+)
+{%- endif %}
+{%- endmacro %}
+
+
+{#
+    Jointure d'une relation (alias `source_alias`, clé naturelle brute) à la
+    map de `dimension`, sous l'alias `alias` :
+
+        FROM {{ ref('silver_mutation_f') }} f
+        {{ star_key_join('geography', 'kg', 'f') }}
+#}
+{% macro star_key_join(dimension, alias, source_alias) -%}
+    JOIN {{ ref('key_map_' ~ dimension) }} {{ alias }}
+        ON {% for column, default in star_natural_key(dimension) -%}
+        {{ alias }}.{{ column }} = COALESCE({{ source_alias }}.{{ column }}, '{{ default }}')
+        {{- "\n       AND " if not loop.last }}
+        {%- endfor %}
+{%- endmacro %}
@@ -0,0 +1,79 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='cle_mois',
+    on_schema_change='append_new_columns'
+  )
+}}
+
+/*
+  Cube mensuel partagé : mois × commune × type de bien.
+  Les agrégats Gold et Star se recombinent depuis ce cube au lieu de
+  rescanner ~17M lignes, sauf pour la médiane : en median_mode exact
+  (défaut), gold_kpis, prix_moyen_commune, prix_par_departement et
+  evolution_annuelle relisent chacun silver_mutation_f (exact_median_join).
+  config(meta={'median_mode': 'approx'}) ou --vars '{median_mode: approx}'
+  : médiane fusionnée depuis `prix_etat`, sans rescan.
+
+  Mesures additives (SUM / COUNT / MIN / MAX) : une moyenne se recombine
+  en SUM(somme) / SUM(nb). `prix_etat` est un état de quantiles fusionnable
+  (macros/quantile_state.sql) : médianes à tout grain plus grossier.
+
+  Mutations sans date_mutation : conservées dans un compartiment `mois`
+  NULL (cle_mois = 0), pour que les agrégats sans grain temporel (KPIs,
+  départements, communes, types) comptent toutes les lignes Silver. Les
+  agrégats temporels l'écartent (filtre mois IS NOT NULL, jointure dim_date).
+
+  Incrémental par mois (delete+insert sur `cle_mois`, AAAAMM ; `mois` NULL
+  ne serait jamais supprimé) : seuls les mois touchés par de nouveaux lots
+  Silver sont recalculés, compartiment sans date compris.
+*/
+
+{% set cle_mois = "COALESCE(YEAR(date_mutation) * 100 + MONTH(date_mutation), 0)" %}
+
+{% if is_incremental() %}
+WITH mois_modifies AS (
+    {{ gold_changed_periods(cle_mois, include_undated=true) }}
+)
+{% endif %}
+
+SELECT
+    {{ cle_mois }}                                                  AS cle_mois,
+    DATE_TRUNC('month', date_mutation)                              AS mois,
+    commune,
+    code_postal,
+    code_departement,
+    type_local,
+
+    COUNT(*)                                                        AS nb_transactions,
+    COUNT(valeur_fonciere)                                          AS nb_ventes,
+    SUM(valeur_fonciere)                                            AS volume_financier,
+    MIN(valeur_fonciere)                                            AS prix_min,
+    MAX(valeur_fonciere)                                            AS prix_max,
+    {{ quantile_state('valeur_fonciere') }}                         AS prix_etat,
+
+    -- Prix au m² bâti (valeur / surface réelle bâtie) : agrégats Gold
+    COUNT(CASE WHEN surface_reelle_bati > 0 THEN 1 END)             AS nb_biens_batis,
+    SUM(CASE WHEN surface_reelle_bati > 0
+             THEN valeur_fonciere / surface_reelle_bati END)        AS somme_prix_m2_bati,
+    -- prix_metre_carre Silver (règles par type de bien) : agrégats Star
+    COUNT(prix_metre_carre)                                         AS nb_prix_metre_carre,
+    SUM(prix_metre_carre)                                           AS somme_prix_metre_carre,
+    COUNT(surface_reelle_bati)                                      AS nb_surfaces,
+    SUM(surface_reelle_bati)                                        AS somme_surface_bati,
+
+    MIN(date_mutation)                                              AS date_premiere_transaction,
+    MAX(date_mutation)                                              AS date_derniere_transaction,
+    MAX(_batch_id)                                                  AS _batch_id
+FROM {{ ref('silver_mutation_f') }}
+{% if is_incremental() %}
+WHERE {{ cle_mois }} IN (SELECT period FROM mois_modifies)
+  -- Élagage sur date_mutation : premier jour du plus ancien mois modifié
+  AND (date_mutation IS NULL OR date_mutation >= (
+      SELECT {{ date_from_parts('FLOOR(MIN(period) / 100)', 'MIN(period) - FLOOR(MIN(period) / 100) * 100', 1) }}
+      FROM mois_modifies
+      WHERE period > 0
+  ))
+{% endif %}
+GROUP BY cle_mois, mois, commune, code_postal, code_departement, type_local
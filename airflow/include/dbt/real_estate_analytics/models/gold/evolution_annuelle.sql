@@ -1,18 +1,65 @@
-{{ config(materialized='table') }}
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='annee',
+    on_schema_change='append_new_columns'
+  )
+}}
 
-WITH annuel AS (
+-- Incrémental par année (delete+insert sur `annee`) :
+--   - agrégats recombinés depuis le cube mensuel pour les seules années
+--     modifiées (médiane : fusion des états de quantiles des 12 mois) ;
+--   - les autres années sont relues depuis la table elle-même (quelques
+--     centaines de lignes) pour que LAG() voie l'historique complet ;
+--   - sont réécrites les années modifiées ET l'année suivante de chaque
+--     type_local, dont variation_prix_pct / variation_volume_pct dépendent.
+
+WITH
+{% if is_incremental() %}
+annees_modifiees AS (
+    {{ gold_changed_periods('YEAR(mois)', relation=ref('cube_mutations_mensuel'), date_column='mois') }}
+),
+{% endif %}
+
+annuel AS (
     SELECT
-        YEAR(date_mutation)                                         AS annee,
+        YEAR(mois)                                                  AS annee,
         type_local,
-        COUNT(*)                                                    AS nb_transactions,
-        AVG(valeur_fonciere)                                        AS prix_moyen,
-        MEDIAN(valeur_fonciere)                                     AS prix_median,
-        AVG(valeur_fonciere / NULLIF(surface_reelle_bati, 0))       AS prix_m2_moyen,
-        SUM(valeur_fonciere)                                        AS volume_financier
-    FROM {{ ref('silver_mutation_f') }}
-    WHERE valeur_fonciere IS NOT NULL
-      AND date_mutation IS NOT NULL
+        SUM(nb_ventes)                                              AS nb_transactions,
+        SUM(volume_financier) / NULLIF(SUM(nb_ventes), 0)           AS prix_moyen,
+        {{ prix_median('prix_etat') }}                              AS prix_median,
+        SUM(somme_prix_m2_bati) / NULLIF(SUM(nb_biens_batis), 0)    AS prix_m2_moyen,
+        SUM(volume_financier)                                       AS volume_financier,
+        MAX(_batch_id)                                              AS _batch_id
+    FROM {{ ref('cube_mutations_mensuel') }}
+    {{ exact_median_join(
+        [['YEAR(mois)', 'YEAR(date_mutation)'], ['type_local', 'type_local']],
+        where=('YEAR(date_mutation) IN (SELECT period FROM annees_modifiees)' if is_incremental() else none)
+    ) }}
+    WHERE nb_ventes > 0
+      AND mois IS NOT NULL
+    {% if is_incremental() %}
+      AND YEAR(mois) IN (SELECT period FROM annees_modifiees)
+      AND mois >= (SELECT {{ date_from_parts('MIN(period)', 1, 1) }} FROM annees_modifiees)
+    {% endif %}
     GROUP BY annee, type_local
+
+    {% if is_incremental() %}
+    UNION ALL
+
+    SELECT
+        annee,
+        type_local,
+        nb_transactions,
+        prix_moyen,
+        prix_median,
+        prix_m2_moyen,
+        volume_financier,
+        {% if relation_has_column(this, '_batch_id') %}_batch_id{% else %}CAST(NULL AS VARCHAR){% endif %}
+    FROM {{ this }}
+    WHERE annee NOT IN (SELECT period FROM annees_modifiees)
+    {% endif %}
 ),
 
 avec_variation AS (
@@ -24,11 +71,22 @@ avec_variation AS (
         prix_median,
         prix_m2_moyen,
         volume_financier,
+        _batch_id,
+        LAG(annee)            OVER (PARTITION BY type_local ORDER BY annee) AS annee_precedente,
         LAG(prix_moyen)       OVER (PARTITION BY type_local ORDER BY annee) AS prix_moyen_an_precedent,
         LAG(nb_transactions)  OVER (PARTITION BY type_local ORDER BY annee) AS nb_transactions_an_precedent
     FROM annuel
 )
 
+{% if is_incremental() %}
+, annees_a_reecrire AS (
+    SELECT period AS annee FROM annees_modifiees
+    UNION
+    SELECT annee FROM avec_variation
+    WHERE annee_precedente IN (SELECT period FROM annees_modifiees)
+)
+{% endif %}
+
 SELECT
     annee,
     type_local,
@@ -44,6 +102,10 @@ SELECT
     ROUND(
         (nb_transactions - nb_transactions_an_precedent) / NULLIF(nb_transactions_an_precedent, 0) * 100,
         2
-    )                                                               AS variation_volume_pct
+    )                                                               AS variation_volume_pct,
+    _batch_id
 FROM avec_variation
+{% if is_incremental() %}
+WHERE annee IN (SELECT annee FROM annees_a_reecrire)
+{% endif %}
 ORDER BY annee, type_local
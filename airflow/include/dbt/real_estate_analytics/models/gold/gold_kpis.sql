@@ -1,15 +1,16 @@
 {{ config(materialized='table') }}
 
 -- KPIs globaux pour les cartes de synthèse du dashboard
+-- Recombinés depuis le cube mensuel (moyennes = SUM / COUNT, médiane = états fusionnés)
 SELECT
-    COUNT(*)                                                        AS total_transactions,
+    SUM(nb_transactions)                                            AS total_transactions,
     COUNT(DISTINCT commune)                                         AS nb_communes,
     COUNT(DISTINCT code_departement)                                AS nb_departements,
-    MIN(date_mutation)                                              AS date_premiere_transaction,
-    MAX(date_mutation)                                              AS date_derniere_transaction,
-    SUM(valeur_fonciere)                                            AS volume_financier_total,
-    AVG(valeur_fonciere)                                            AS prix_moyen_france,
-    MEDIAN(valeur_fonciere)                                         AS prix_median_france,
-    AVG(valeur_fonciere / NULLIF(surface_reelle_bati, 0))           AS prix_m2_moyen_france
-FROM {{ ref('silver_mutation_f') }}
-WHERE valeur_fonciere IS NOT NULL
+    MIN(date_premiere_transaction)                                  AS date_premiere_transaction,
+    MAX(date_derniere_transaction)                                  AS date_derniere_transaction,
+    SUM(volume_financier)                                           AS volume_financier_total,
+    SUM(volume_financier) / NULLIF(SUM(nb_ventes), 0)               AS prix_moyen_france,
+    {{ prix_median('prix_etat') }}                                  AS prix_median_france,
+    SUM(somme_prix_m2_bati) / NULLIF(SUM(nb_biens_batis), 0)        AS prix_m2_moyen_france
+FROM {{ ref('cube_mutations_mensuel') }}
+{{ exact_median_join() }}
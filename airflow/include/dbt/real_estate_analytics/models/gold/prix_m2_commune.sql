@@ -1,12 +1,13 @@
 {{ config(materialized='table') }}
 
+-- Toutes années confondues, recombiné depuis le cube mensuel
+-- (SUM / COUNT = AVG d'origine), mutations sans date comprises.
 SELECT
     commune,
     code_postal,
     type_local,
-    COUNT(*) AS nb_transactions,
-    AVG(valeur_fonciere / NULLIF(surface_reelle_bati, 0)) AS prix_m2_moyen
-FROM {{ ref('silver_mutation_f') }}
-WHERE surface_reelle_bati > 0
-  AND valeur_fonciere IS NOT NULL
+    SUM(nb_biens_batis)                                       AS nb_transactions,
+    SUM(somme_prix_m2_bati) / NULLIF(SUM(nb_biens_batis), 0)  AS prix_m2_moyen
+FROM {{ ref('cube_mutations_mensuel') }}
+WHERE nb_biens_batis > 0
 GROUP BY commune, code_postal, type_local
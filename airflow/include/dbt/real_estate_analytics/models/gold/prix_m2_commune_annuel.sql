@@ -0,0 +1,37 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='annee',
+    on_schema_change='append_new_columns'
+  )
+}}
+
+-- Prix au m² par année × commune × type de bien, incrémental par année.
+-- `somme_prix_m2` rend la moyenne fusionnable entre années.
+-- Recombiné depuis le cube mensuel (biens bâtis : surface_reelle_bati > 0) ;
+-- les mutations sans date n'ont pas d'année et sont écartées.
+
+{% if is_incremental() %}
+WITH annees_modifiees AS (
+    {{ gold_changed_periods('YEAR(mois)', relation=ref('cube_mutations_mensuel'), date_column='mois') }}
+)
+{% endif %}
+
+SELECT
+    YEAR(mois)                                                AS annee,
+    commune,
+    code_postal,
+    type_local,
+    SUM(nb_biens_batis)                                       AS nb_transactions,
+    SUM(somme_prix_m2_bati)                                   AS somme_prix_m2,
+    SUM(somme_prix_m2_bati) / NULLIF(SUM(nb_biens_batis), 0)  AS prix_m2_moyen,
+    MAX(_batch_id)                                            AS _batch_id
+FROM {{ ref('cube_mutations_mensuel') }}
+WHERE nb_biens_batis > 0
+  AND mois IS NOT NULL
+{% if is_incremental() %}
+  AND YEAR(mois) IN (SELECT period FROM annees_modifiees)
+  AND mois >= (SELECT {{ date_from_parts('MIN(period)', 1, 1) }} FROM annees_modifiees)
+{% endif %}
+GROUP BY annee, commune, code_postal, type_local
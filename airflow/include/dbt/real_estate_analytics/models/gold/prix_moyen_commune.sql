@@ -4,9 +4,9 @@ SELECT
     commune,
     code_postal,
     type_local,
-    COUNT(*)                       AS nb_transactions,
-    AVG(valeur_fonciere)           AS prix_moyen,
-    MEDIAN(valeur_fonciere)        AS prix_median
-FROM {{ ref('silver_mutation_f') }}
-WHERE valeur_fonciere IS NOT NULL
+    SUM(nb_transactions)                                  AS nb_transactions,
+    SUM(volume_financier) / NULLIF(SUM(nb_ventes), 0)     AS prix_moyen,
+    {{ prix_median('prix_etat') }}                        AS prix_median
+FROM {{ ref('cube_mutations_mensuel') }}
+{{ exact_median_join([['commune', 'commune'], ['code_postal', 'code_postal'], ['type_local', 'type_local']]) }}
 GROUP BY commune, code_postal, type_local
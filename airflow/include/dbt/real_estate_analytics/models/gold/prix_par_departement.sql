@@ -3,12 +3,12 @@
 SELECT
     code_departement,
     type_local,
-    COUNT(*)                                                        AS nb_transactions,
-    AVG(valeur_fonciere)                                            AS prix_moyen,
-    MEDIAN(valeur_fonciere)                                         AS prix_median,
-    AVG(valeur_fonciere / NULLIF(surface_reelle_bati, 0))           AS prix_m2_moyen,
-    SUM(valeur_fonciere)                                            AS volume_financier
-FROM {{ ref('silver_mutation_f') }}
-WHERE valeur_fonciere IS NOT NULL
-  AND code_departement IS NOT NULL
+    SUM(nb_transactions)                                            AS nb_transactions,
+    SUM(volume_financier) / NULLIF(SUM(nb_ventes), 0)               AS prix_moyen,
+    {{ prix_median('prix_etat') }}                                  AS prix_median,
+    SUM(somme_prix_m2_bati) / NULLIF(SUM(nb_biens_batis), 0)        AS prix_m2_moyen,
+    SUM(volume_financier)                                           AS volume_financier
+FROM {{ ref('cube_mutations_mensuel') }}
+{{ exact_median_join([['code_departement', 'code_departement'], ['type_local', 'type_local']]) }}
+WHERE code_departement IS NOT NULL
 GROUP BY code_departement, type_local
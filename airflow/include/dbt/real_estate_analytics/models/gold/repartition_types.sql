@@ -2,7 +2,7 @@
 
 SELECT
     type_local,
-    COUNT(*) AS nb_transactions
-FROM {{ ref('silver_mutation_f') }}
+    SUM(nb_transactions) AS nb_transactions
+FROM {{ ref('cube_mutations_mensuel') }}
 GROUP BY type_local
 ORDER BY nb_transactions DESC
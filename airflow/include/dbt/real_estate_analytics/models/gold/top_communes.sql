@@ -3,9 +3,9 @@
 SELECT
     commune,
     code_postal,
-    AVG(valeur_fonciere) AS prix_moyen
-FROM {{ ref('silver_mutation_f') }}
+    SUM(volume_financier) / NULLIF(SUM(nb_ventes), 0) AS prix_moyen
+FROM {{ ref('cube_mutations_mensuel') }}
 GROUP BY commune, code_postal
-HAVING COUNT(*) > 50
+HAVING SUM(nb_transactions) > 50
 ORDER BY prix_moyen DESC
 LIMIT 50
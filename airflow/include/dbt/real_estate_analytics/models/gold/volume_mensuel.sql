@@ -1,9 +1,32 @@
-{{ config(materialized='table') }}
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='mois',
+    on_schema_change='append_new_columns'
+  )
+}}
+
+-- Incrémental : seuls les mois touchés par de nouveaux lots Silver sont
+-- recalculés (delete+insert sur `mois`), pas d'effet de fenêtre.
+-- Recombiné depuis le cube mensuel (1 mois = quelques milliers de lignes),
+-- compartiment des mutations sans date écarté.
+
+{% if is_incremental() %}
+WITH mois_modifies AS (
+    {{ gold_changed_periods('mois', relation=ref('cube_mutations_mensuel'), date_column='mois') }}
+)
+{% endif %}
 
 SELECT
-    DATE_TRUNC('month', date_mutation) AS mois,
-    COUNT(*)                           AS nb_transactions,
-    SUM(valeur_fonciere)               AS volume_financier
-FROM {{ ref('silver_mutation_f') }}
+    mois,
+    SUM(nb_transactions)               AS nb_transactions,
+    SUM(volume_financier)              AS volume_financier,
+    MAX(_batch_id)                     AS _batch_id
+FROM {{ ref('cube_mutations_mensuel') }}
+WHERE mois IS NOT NULL
+{% if is_incremental() %}
+  AND mois IN (SELECT period FROM mois_modifies)
+{% endif %}
 GROUP BY mois
 ORDER BY mois
@@ -1,49 +1,98 @@
 {{
   config(
     materialized='incremental',
-    unique_key='mutation_id'
+    unique_key='mutation_id',
+    on_schema_change='append_new_columns',
+    pre_hook="{{ migrate_legacy_mutation_id(this) }}"
   )
 }}
 
-WITH source AS (
-    SELECT DISTINCT *
-    FROM {{ ref('src_dvf') }}
+{#
+    Deux modes incrémentaux (variable `silver_batch_driven`) :
+    - true  (défaut) : seuls les lots Bronze non consommés (load_batches)
+      sont lus ; une republication d'années anciennes est donc retraitée.
+    - false : marque haute sur date_mutation (tables Bronze sans lignage).
+
+    Déduplication et identifiant en une passe (macros/mutation_id.sql) :
+    mutation_id = hash 64 bits de la ligne normalisée, calculé une fois ;
+    une ligne par mutation_id (GROUP BY sur la clé), lot Bronze le plus récent.
+
+    Bronze typé (macros/bronze_typed.sql) : dates et montants déjà convertis
+    au COPY ; bronze_date / bronze_number ne font alors qu'élargir le type.
+#}
+{% set batch_driven = var('silver_batch_driven', true) %}
+
+WITH
+{% if batch_driven %}
+pending_batches AS (
+    {{ unconsumed_load_batches() }}
+),
+{% endif %}
+
+source AS (
+    SELECT
+        s.no_disposition,
+        s.identifiant_document,
+        s.date_mutation,
+        s.nature_mutation,
+        s.valeur_fonciere,
+        s.code_postal,
+        s.commune,
+        s.code_departement,
+        s.type_local,
+        s.surface_reelle_bati,
+        s.nombre_pieces_principales,
+        s.surface_terrain,
+        {% if batch_driven %}b.batch_id{% else %}CAST(NULL AS VARCHAR){% endif %} AS _batch_id
+    FROM {{ ref('src_dvf') }} AS s
+
+    {% if batch_driven %}
+    -- Rattachement ligne → lot par fenêtre de chargement ; en incrémental
+    -- la borne basse élague les micro-partitions Bronze déjà consommées
+    -- (chargées dans l'ordre de _loaded_at).
+    {% if is_incremental() %}INNER{% else %}LEFT{% endif %} JOIN pending_batches AS b
+        ON s._loaded_at BETWEEN b.started_at AND b.finished_at
+    {% if is_incremental() %}
+    WHERE s._loaded_at >= (SELECT MIN(started_at) FROM pending_batches)
+    {% endif %}
+
+    {% elif is_incremental() %}
+    -- Filtre incrémental poussé dans le scan Bronze : casts, hash et
+    -- déduplication ne portent que sur les nouvelles mutations.
+    -- `>=` retraite le dernier jour déjà chargé (lignes arrivées en retard) :
+    -- mêmes mutation_id → MERGE idempotent sur unique_key.
+    WHERE {{ bronze_date('s.date_mutation') }} >= (
+        SELECT {{ dbt.dateadd(
+            'day',
+            -var('silver_lookback_days', 0),
+            "COALESCE(MAX(date_mutation), '1900-01-01'::DATE)"
+        ) }}
+        FROM {{ this }}
+    )
+    {% endif %}
 ),
 
 transformed AS (
     SELECT
         no_disposition,
         identifiant_document,
-        TRY_TO_DATE(date_mutation)                                    AS date_mutation,
+        {{ bronze_date('date_mutation') }}                            AS date_mutation,
         LOWER(nature_mutation)                                        AS nature_mutation,
-        TRY_TO_NUMBER(REPLACE(valeur_fonciere, ',', '.'))             AS valeur_fonciere,
+        {{ bronze_number('valeur_fonciere') }}                        AS valeur_fonciere,
         code_postal,
         LOWER(commune)                                                AS commune,
         code_departement,
         LOWER(type_local)                                             AS type_local,
-        TRY_TO_NUMBER(REPLACE(surface_reelle_bati, ',', '.'))         AS surface_reelle_bati,
+        {{ bronze_number('surface_reelle_bati') }}                    AS surface_reelle_bati,
         nombre_pieces_principales,
-        CAST(TRY_TO_NUMBER(REPLACE(surface_terrain, ',', '.')) AS INT) AS surface_terrain
+        CAST({{ bronze_number('surface_terrain') }} AS INT)           AS surface_terrain,
+        _batch_id
     FROM source
 ),
 
-ranked AS (
-    SELECT
-        *,
-        ROW_NUMBER() OVER (
-            PARTITION BY 
-                no_disposition, 
-                identifiant_document, 
-                COALESCE(type_local, ''), 
-                COALESCE(surface_reelle_bati::STRING, '')
-            ORDER BY no_disposition
-        ) AS lot_rank
-    FROM transformed
-),
-
 filtered AS (
     SELECT *
-    FROM ranked
+    FROM transformed
     WHERE
         -- Suppression des prix nuls ou négatifs
         valeur_fonciere IS NOT NULL
@@ -63,6 +112,25 @@ filtered AS (
         END
 ),
 
+hashed AS (
+    -- Hash calculé une fois : clé de déduplication, de MERGE et mutation_id
+    SELECT *, {{ mutation_id() }} AS mutation_id
+    FROM filtered
+),
+
+deduplicated AS (
+    -- Agrégation sur la seule clé 64 bits : les colonnes hachées sont
+    -- identiques dans un groupe ; une ligne rechargée garde le lot le plus récent.
+    SELECT
+        mutation_id,
+        {%- for column in mutation_identity_columns() %}
+        ANY_VALUE({{ column }}) AS {{ column }},
+        {%- endfor %}
+        MAX(_batch_id)          AS _batch_id
+    FROM hashed
+    GROUP BY mutation_id
+),
+
 silver_with_id AS (
     SELECT
         no_disposition,
@@ -78,22 +146,7 @@ silver_with_id AS (
         nombre_pieces_principales,
         surface_terrain,
 
-        -- Génération de l'identifiant unique
-        MD5(
-            CONCAT(
-                COALESCE(no_disposition::STRING, ''),
-                COALESCE(identifiant_document::STRING, ''),
-                COALESCE(date_mutation::STRING, ''),
-                COALESCE(valeur_fonciere::STRING, ''),
-                COALESCE(code_postal::STRING, ''),
-                COALESCE(commune, ''),
-                COALESCE(type_local, ''),
-                COALESCE(surface_reelle_bati::STRING, ''),
-                COALESCE(surface_terrain::STRING, ''),
-                COALESCE(nombre_pieces_principales::STRING, ''),
-                lot_rank::STRING
-            )
-        ) AS mutation_id,
+        mutation_id,
 
         -- Calcul du prix au m² selon le type de bien
         CASE
@@ -103,13 +156,12 @@ silver_with_id AS (
             WHEN type_local = 'dépendance'
                 THEN valeur_fonciere / NULLIF(COALESCE(surface_reelle_bati, surface_terrain), 0)
             ELSE NULL
-        END AS prix_metre_carre
+        END AS prix_metre_carre,
 
-    FROM filtered
-)
+        -- Lot Bronze d'origine : marque haute de consommation (unconsumed_load_batches)
+        _batch_id
 
-SELECT * FROM silver_with_id
+    FROM deduplicated
+)
 
-{% if is_incremental() %}
-WHERE date_mutation > (SELECT MAX(date_mutation) FROM {{ this }})
-{% endif %}
\ No newline at end of file
+SELECT * FROM silver_with_id
\ No newline at end of file
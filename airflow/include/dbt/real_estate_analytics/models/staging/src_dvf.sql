@@ -14,7 +14,13 @@ SELECT
     "Type local"                     AS type_local,
     "Surface reelle bati"            AS surface_reelle_bati,
     "Nombre pieces principales"      AS nombre_pieces_principales,
-    "Surface terrain"                AS surface_terrain
-FROM {{ source('dvf', 'mutations_foncieres') }}
+    "Surface terrain"                AS surface_terrain,
+
+    -- Lignage (COPY INTO … INCLUDE_METADATA, ou colonnes METADATA$ en typé)
+    _source_file,
+    _source_row_number,
+    _loaded_at
+-- Table VARCHAR ou typée selon la variable bronze_typed (macros/bronze_typed.sql)
+FROM {{ source('dvf', bronze_table()) }}
 
 
@@ -1,4 +1,4 @@
-{{ config(materialized='table', schema='STAR') }}
+{{ config(materialized='table', schema='STAR', meta={'median_mode': 'approx'}) }}
 
 /*
   Agrégation annuelle × type de bien — France entière.
@@ -7,25 +7,30 @@
 
   Table ultra-légère pour les KPI cards et comparaisons YoY
   sans aucun calcul DAX complexe côté Power BI.
+  Recombinée depuis le cube mensuel (pas de scan de fact_mutations).
+  La jointure dim_date écarte le compartiment des mutations sans date.
 */
 
 WITH base AS (
     SELECT
-        f.type_bien_key,
+        kt.type_bien_key,
         d.annee,
-        COUNT(*)                                                    AS nb_transactions,
-        COUNT(CASE WHEN f.est_vente_avec_prix = 1 THEN 1 END)      AS nb_ventes,
-        SUM(f.valeur_fonciere)                                      AS volume_financier,
-        AVG(f.valeur_fonciere)                                      AS prix_moyen,
-        MEDIAN(f.valeur_fonciere)                                   AS prix_median,
-        MIN(f.valeur_fonciere)                                      AS prix_min,
-        MAX(f.valeur_fonciere)                                      AS prix_max,
-        AVG(f.prix_metre_carre)                                     AS prix_m2_moyen,
-        AVG(f.surface_reelle_bati)                                  AS surface_moyenne,
-        COUNT(DISTINCT f.geo_key)                                   AS nb_communes_actives
-    FROM {{ ref('fact_mutations') }} f
-    JOIN {{ ref('dim_date') }} d ON f.date_key = d.date_key
-    GROUP BY f.type_bien_key, d.annee
+        SUM(c.nb_transactions)                                      AS nb_transactions,
+        SUM(c.nb_ventes)                                            AS nb_ventes,
+        SUM(c.volume_financier)                                     AS volume_financier,
+        SUM(c.volume_financier) / NULLIF(SUM(c.nb_ventes), 0)       AS prix_moyen,
+        {{ prix_median('c.prix_etat') }}                            AS prix_median,
+        MIN(c.prix_min)                                             AS prix_min,
+        MAX(c.prix_max)                                             AS prix_max,
+        SUM(c.somme_prix_metre_carre) / NULLIF(SUM(c.nb_prix_metre_carre), 0) AS prix_m2_moyen,
+        SUM(c.somme_surface_bati) / NULLIF(SUM(c.nb_surfaces), 0)   AS surface_moyenne,
+        COUNT(DISTINCT kg.geo_key)                                  AS nb_communes_actives
+    FROM {{ ref('cube_mutations_mensuel') }} c
+    {{ star_key_join('geography', 'kg', 'c') }}
+    {{ star_key_join('type_bien', 'kt', 'c') }}
+    JOIN {{ ref('dim_date') }} d ON d.date_complete = c.mois
+    {{ exact_median_join([['c.type_local', 'type_local'], ['d.annee', 'YEAR(date_mutation)']]) }}
+    GROUP BY kt.type_bien_key, d.annee
 ),
 
 avec_yoy AS (
@@ -1,4 +1,4 @@
-{{ config(materialized='table', schema='STAR') }}
+{{ config(materialized='table', schema='STAR', meta={'median_mode': 'approx'}) }}
 
 /*
   Agrégation commune × type de bien × année.
@@ -9,9 +9,21 @@
   → Supprime le bruit des micro-marchés et réduit la cardinalité de ~80%.
 
   Alimente le benchmark communes et la table de détail page 4.
+  Recombinée depuis le cube mensuel (pas de scan de fact_mutations).
+  La jointure dim_date écarte le compartiment des mutations sans date.
 */
 
-WITH base AS (
+WITH cube AS (
+    SELECT
+        kg.geo_key,
+        kt.type_bien_key,
+        c.*
+    FROM {{ ref('cube_mutations_mensuel') }} c
+    {{ star_key_join('geography', 'kg', 'c') }}
+    {{ star_key_join('type_bien', 'kt', 'c') }}
+),
+
+base AS (
     SELECT
         g.geo_key,
         g.commune,
@@ -19,25 +31,29 @@ WITH base AS (
         g.code_departement,
         g.nom_departement,
         g.region,
-        f.type_bien_key,
+        c.type_bien_key,
         d.annee,
-        COUNT(*)                                                    AS nb_transactions,
-        COUNT(CASE WHEN f.est_vente_avec_prix = 1 THEN 1 END)      AS nb_ventes,
-        SUM(f.valeur_fonciere)                                      AS volume_financier,
-        AVG(f.valeur_fonciere)                                      AS prix_moyen,
-        MEDIAN(f.valeur_fonciere)                                   AS prix_median,
-        MIN(f.valeur_fonciere)                                      AS prix_min,
-        MAX(f.valeur_fonciere)                                      AS prix_max,
-        AVG(f.prix_metre_carre)                                     AS prix_m2_moyen,
-        AVG(f.surface_reelle_bati)                                  AS surface_moyenne
-    FROM {{ ref('fact_mutations') }} f
-    JOIN {{ ref('dim_geography') }} g  ON f.geo_key  = g.geo_key
-    JOIN {{ ref('dim_date') }}      d  ON f.date_key = d.date_key
+        SUM(c.nb_transactions)                                      AS nb_transactions,
+        SUM(c.nb_ventes)                                            AS nb_ventes,
+        SUM(c.volume_financier)                                     AS volume_financier,
+        SUM(c.volume_financier) / NULLIF(SUM(c.nb_ventes), 0)       AS prix_moyen,
+        {{ prix_median('c.prix_etat') }}                            AS prix_median,
+        MIN(c.prix_min)                                             AS prix_min,
+        MAX(c.prix_max)                                             AS prix_max,
+        SUM(c.somme_prix_metre_carre) / NULLIF(SUM(c.nb_prix_metre_carre), 0) AS prix_m2_moyen,
+        SUM(c.somme_surface_bati) / NULLIF(SUM(c.nb_surfaces), 0)   AS surface_moyenne
+    FROM cube c
+    JOIN {{ ref('dim_geography') }} g  ON c.geo_key  = g.geo_key
+    JOIN {{ ref('dim_date') }}      d  ON d.date_complete = c.mois
+    {{ exact_median_join([
+        ['c.commune', 'commune'], ['c.code_postal', 'code_postal'], ['c.code_departement', 'code_departement'],
+        ['c.type_local', 'type_local'], ['d.annee', 'YEAR(date_mutation)'],
+    ]) }}
     GROUP BY
         g.geo_key, g.commune, g.code_postal,
         g.code_departement, g.nom_departement, g.region,
-        f.type_bien_key, d.annee
-    HAVING COUNT(*) >= 5
+        c.type_bien_key, d.annee
+    HAVING SUM(c.nb_transactions) >= 5
 )
 
 SELECT * FROM base
@@ -1,4 +1,4 @@
-{{ config(materialized='table', schema='STAR') }}
+{{ config(materialized='table', schema='STAR', meta={'median_mode': 'approx'}) }}
 
 /*
   Agrégation département × type de bien × année.
@@ -7,25 +7,42 @@
 
   Alimente la carte choroplèthe et le benchmark départemental.
   Inclut variation YoY calculée en SQL (pas besoin de DAX DATEADD).
+  Recombinée depuis le cube mensuel : médiane départementale = fusion des
+  états de quantiles des communes.
+  La jointure dim_date écarte le compartiment des mutations sans date.
 */
 
-WITH base AS (
+WITH cube AS (
+    SELECT
+        kg.geo_key,
+        kt.type_bien_key,
+        c.*
+    FROM {{ ref('cube_mutations_mensuel') }} c
+    {{ star_key_join('geography', 'kg', 'c') }}
+    {{ star_key_join('type_bien', 'kt', 'c') }}
+),
+
+base AS (
     SELECT
         g.code_departement,
         g.nom_departement,
         g.region,
-        f.type_bien_key,
+        c.type_bien_key,
         d.annee,
-        COUNT(*)                                                    AS nb_transactions,
-        COUNT(CASE WHEN f.est_vente_avec_prix = 1 THEN 1 END)      AS nb_ventes,
-        SUM(f.valeur_fonciere)                                      AS volume_financier,
-        AVG(f.valeur_fonciere)                                      AS prix_moyen,
-        MEDIAN(f.valeur_fonciere)                                   AS prix_median,
-        AVG(f.prix_metre_carre)                                     AS prix_m2_moyen
-    FROM {{ ref('fact_mutations') }} f
-    JOIN {{ ref('dim_geography') }} g  ON f.geo_key      = g.geo_key
-    JOIN {{ ref('dim_date') }}      d  ON f.date_key     = d.date_key
-    GROUP BY g.code_departement, g.nom_departement, g.region, f.type_bien_key, d.annee
+        SUM(c.nb_transactions)                                      AS nb_transactions,
+        SUM(c.nb_ventes)                                            AS nb_ventes,
+        SUM(c.volume_financier)                                     AS volume_financier,
+        SUM(c.volume_financier) / NULLIF(SUM(c.nb_ventes), 0)       AS prix_moyen,
+        {{ prix_median('c.prix_etat') }}                            AS prix_median,
+        SUM(c.somme_prix_metre_carre) / NULLIF(SUM(c.nb_prix_metre_carre), 0) AS prix_m2_moyen
+    FROM cube c
+    JOIN {{ ref('dim_geography') }} g  ON c.geo_key      = g.geo_key
+    JOIN {{ ref('dim_date') }}      d  ON d.date_complete = c.mois
+    {{ exact_median_join([
+        ['c.code_departement', 'code_departement'], ['c.type_local', 'type_local'],
+        ['d.annee', 'YEAR(date_mutation)'],
+    ]) }}
+    GROUP BY g.code_departement, g.nom_departement, g.region, c.type_bien_key, d.annee
 ),
 
 avec_yoy AS (
@@ -1,4 +1,4 @@
-{{ config(materialized='table', schema='STAR') }}
+{{ config(materialized='table', schema='STAR', meta={'median_mode': 'approx'}) }}
 
 /*
   Agrégation mensuelle × type de bien.
@@ -7,13 +7,15 @@
 
   Remplace l'import direct de fact_mutations pour tous les visuels
   temporels du dashboard Power BI (page Évolution + page Accueil).
+  Recombinée depuis le cube mensuel (1 ligne de dim_date par mois).
+  La jointure dim_date écarte le compartiment des mutations sans date.
 */
 
 SELECT
     -- Clés dimensions
-    f.type_bien_key,
-    TO_NUMBER(TO_CHAR(DATE_TRUNC('month', d.date_complete), 'YYYYMMDD'))  AS date_mois_key,
-    DATE_TRUNC('month', d.date_complete)                                   AS mois,
+    kt.type_bien_key,
+    {{ date_key('c.mois') }}                                               AS date_mois_key,
+    c.mois,
     d.annee,
     d.trimestre_num,
     d.trimestre_libelle,
@@ -22,21 +24,23 @@ SELECT
     d.semestre,
 
     -- Mesures agrégées
-    COUNT(*)                                                               AS nb_transactions,
-    COUNT(CASE WHEN f.est_vente_avec_prix = 1 THEN 1 END)                 AS nb_ventes,
-    SUM(f.valeur_fonciere)                                                 AS volume_financier,
-    AVG(f.valeur_fonciere)                                                 AS prix_moyen,
-    MEDIAN(f.valeur_fonciere)                                              AS prix_median,
-    AVG(f.prix_metre_carre)                                                AS prix_m2_moyen,
-    AVG(f.surface_reelle_bati)                                             AS surface_moyenne,
-    SUM(f.est_bien_bati)                                                   AS nb_biens_batis
+    SUM(c.nb_transactions)                                                 AS nb_transactions,
+    SUM(c.nb_ventes)                                                       AS nb_ventes,
+    SUM(c.volume_financier)                                                AS volume_financier,
+    SUM(c.volume_financier) / NULLIF(SUM(c.nb_ventes), 0)                  AS prix_moyen,
+    {{ prix_median('c.prix_etat') }}                                       AS prix_median,
+    SUM(c.somme_prix_metre_carre) / NULLIF(SUM(c.nb_prix_metre_carre), 0)  AS prix_m2_moyen,
+    SUM(c.somme_surface_bati) / NULLIF(SUM(c.nb_surfaces), 0)              AS surface_moyenne,
+    SUM(c.nb_biens_batis)                                                  AS nb_biens_batis
 
-FROM {{ ref('fact_mutations') }} f
+FROM {{ ref('cube_mutations_mensuel') }} c
+{{ star_key_join('type_bien', 'kt', 'c') }}
 JOIN {{ ref('dim_date') }} d
-    ON f.date_key = d.date_key
+    ON d.date_complete = c.mois
+{{ exact_median_join([['c.type_local', 'type_local'], ['c.mois', "DATE_TRUNC('month', date_mutation)"]]) }}
 GROUP BY
-    f.type_bien_key,
-    DATE_TRUNC('month', d.date_complete),
+    kt.type_bien_key,
+    c.mois,
     d.annee,
     d.trimestre_num,
     d.trimestre_libelle,
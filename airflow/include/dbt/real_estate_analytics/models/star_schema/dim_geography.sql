@@ -1,15 +1,9 @@
 {{ config(materialized='table', schema='STAR') }}
 
-WITH communes_distinctes AS (
-    SELECT DISTINCT
-        COALESCE(commune, 'Inconnu')          AS commune,
-        COALESCE(code_postal, 'XXXXX')        AS code_postal,
-        COALESCE(code_departement, 'XX')      AS code_departement
-    FROM {{ ref('silver_mutation_f') }}
-),
-
-enriched AS (
+-- Grain et clé : key_map_geography (geo_key INTEGER persistante)
+WITH enriched AS (
     SELECT
+        c.geo_key,
         c.commune,
         c.code_postal,
         c.code_departement,
@@ -25,13 +19,13 @@ enriched AS (
                 THEN 'Grandes métropoles'
             ELSE COALESCE(d.region, 'Autre')
         END                                                                AS zone_analytique
-    FROM communes_distinctes c
+    FROM {{ ref('key_map_geography') }} c
     LEFT JOIN {{ ref('ref_departements') }} d
         ON c.code_departement = d.code_departement
 )
 
 SELECT
-    {{ dbt_utils.generate_surrogate_key(['commune', 'code_postal', 'code_departement']) }} AS geo_key,
+    geo_key,
     commune,
     code_postal,
     code_departement,
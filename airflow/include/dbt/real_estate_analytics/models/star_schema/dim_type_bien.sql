@@ -1,13 +1,10 @@
 {{ config(materialized='table', schema='STAR') }}
 
-WITH types_distincts AS (
-    SELECT DISTINCT type_local
-    FROM {{ ref('silver_mutation_f') }}
-)
-
+-- Grain et clé : key_map_type_bien (type_bien_key INTEGER persistante) ;
+-- type_local NULL y est normalisé en 'non renseigné'
 SELECT
-    {{ dbt_utils.generate_surrogate_key(['type_local']) }}   AS type_bien_key,
-    COALESCE(type_local, 'non renseigné')                    AS type_local,
+    type_bien_key,
+    type_local,
 
     -- Catégorie métier
     CASE
@@ -17,7 +14,7 @@ SELECT
             THEN 'Commercial'
         WHEN type_local = 'dépendance'
             THEN 'Dépendance'
-        WHEN type_local IS NULL
+        WHEN type_local = 'non renseigné'
             THEN 'Non renseigné (terrain)'
         ELSE 'Autre'
     END                                                      AS categorie,
@@ -28,8 +25,8 @@ SELECT
         WHEN type_local = 'appartement'                                    THEN 'Appartement'
         WHEN type_local = 'local industriel. commercial ou assimilé'       THEN 'Local commercial'
         WHEN type_local = 'dépendance'                                     THEN 'Dépendance'
-        WHEN type_local IS NULL                                            THEN 'Terrain / Non renseigné'
-        ELSE INITCAP(type_local)
+        WHEN type_local = 'non renseigné'                                  THEN 'Terrain / Non renseigné'
+        ELSE {{ initcap('type_local') }}
     END                                                      AS libelle,
 
     -- Ordre d'affichage pour les graphiques
@@ -41,4 +38,4 @@ SELECT
         ELSE 5
     END                                                      AS ordre_affichage
 
-FROM types_distincts
+FROM {{ ref('key_map_type_bien') }}
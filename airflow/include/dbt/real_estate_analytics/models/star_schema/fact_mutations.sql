@@ -4,7 +4,7 @@
   Table de faits centrale du modèle en étoile.
   Granularité : 1 ligne = 1 transaction immobilière (mutation_id unique).
 
-  Clés étrangères vers :
+  Clés étrangères INTEGER (maps persistantes key_map_*, macros/star_keys.sql) vers :
     - dim_date          (date_key)
     - dim_geography     (geo_key)
     - dim_type_bien     (type_bien_key)
@@ -16,17 +16,12 @@ SELECT
     f.mutation_id,
 
     -- Clés étrangères (FK vers les dimensions)
-    TO_NUMBER(TO_CHAR(f.date_mutation, 'YYYYMMDD'))
+    {{ date_key('f.date_mutation') }}
         AS date_key,
 
-    {{ dbt_utils.generate_surrogate_key(['f.commune', 'f.code_postal', 'f.code_departement']) }}
-        AS geo_key,
-
-    {{ dbt_utils.generate_surrogate_key(['f.type_local']) }}
-        AS type_bien_key,
-
-    {{ dbt_utils.generate_surrogate_key(['f.nature_mutation']) }}
-        AS nature_key,
+    kg.geo_key,
+    kt.type_bien_key,
+    kn.nature_key,
 
     -- Mesures (faits quantitatifs)
     f.valeur_fonciere,
@@ -40,4 +35,7 @@ SELECT
     CASE WHEN f.surface_reelle_bati > 0    THEN 1 ELSE 0 END  AS est_bien_bati
 
 FROM {{ ref('silver_mutation_f') }} f
+{{ star_key_join('geography', 'kg', 'f') }}
+{{ star_key_join('type_bien', 'kt', 'f') }}
+{{ star_key_join('nature_mutation', 'kn', 'f') }}
 WHERE f.date_mutation IS NOT NULL
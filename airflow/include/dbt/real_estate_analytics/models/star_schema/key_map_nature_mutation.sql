@@ -0,0 +1,11 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='append',
+    full_refresh=false,
+    schema='STAR'
+  )
+}}
+
+-- Correspondance persistante clé naturelle → nature_key (INTEGER), voir macros/star_keys.sql
+{{ integer_key_map('nature_mutation', 'nature_key', ref('silver_mutation_f')) }}
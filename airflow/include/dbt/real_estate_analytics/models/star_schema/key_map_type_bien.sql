@@ -0,0 +1,11 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='append',
+    full_refresh=false,
+    schema='STAR'
+  )
+}}
+
+-- Correspondance persistante clé naturelle → type_bien_key (INTEGER), voir macros/star_keys.sql
+{{ integer_key_map('type_bien', 'type_bien_key', ref('cube_mutations_mensuel')) }}
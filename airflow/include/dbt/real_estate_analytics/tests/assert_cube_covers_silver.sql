@@ -0,0 +1,33 @@
+/*
+  Complétude du cube mensuel : chaque ligne Silver y est comptée une fois,
+  mutations sans date_mutation (compartiment cle_mois = 0) et sans
+  valeur_fonciere comprises. Retourne une ligne en cas d'écart.
+*/
+
+WITH silver AS (
+    SELECT
+        COUNT(*)                                                AS nb_transactions,
+        COUNT(valeur_fonciere)                                  AS nb_ventes,
+        COUNT(*) - COUNT(date_mutation)                         AS nb_sans_date
+    FROM {{ ref('silver_mutation_f') }}
+),
+
+cube AS (
+    SELECT
+        SUM(nb_transactions)                                    AS nb_transactions,
+        SUM(nb_ventes)                                          AS nb_ventes,
+        COALESCE(SUM(CASE WHEN cle_mois = 0 THEN nb_transactions END), 0) AS nb_sans_date
+    FROM {{ ref('cube_mutations_mensuel') }}
+)
+
+SELECT
+    silver.nb_transactions  AS silver_nb_transactions,
+    cube.nb_transactions    AS cube_nb_transactions,
+    silver.nb_ventes        AS silver_nb_ventes,
+    cube.nb_ventes          AS cube_nb_ventes,
+    silver.nb_sans_date     AS silver_nb_sans_date,
+    cube.nb_sans_date       AS cube_nb_sans_date
+FROM silver, cube
+WHERE silver.nb_transactions <> cube.nb_transactions
+   OR silver.nb_ventes       <> cube.nb_ventes
+   OR silver.nb_sans_date    <> cube.nb_sans_date
@@ -0,0 +1,98 @@
+{{ config(tags=['quantile_sketch']) }}
+
+/*
+  Erreur des médianes approchées (macros/quantile_state.sql) : médianes
+  fusionnées depuis les sketches du cube comparées à la médiane exacte
+  recalculée sur Silver, à trois niveaux de fusion : commune × type (mois
+  fusionnés), département × type (communes fusionnées) et France entière.
+  Mesure le sketch lui-même, quel que soit le median_mode des modèles.
+
+  - DuckDB : borne garantie du sketch logarithmique, ±α en erreur relative
+    (var('quantile_sketch_alpha')) de la médiane exacte « basse »
+    (QUANTILE_DISC).
+  - Snowflake : le t-digest (APPROX_PERCENTILE_*) a une erreur en rang,
+    sans borne en valeur garantie ; l'écart à MEDIAN est mesuré à chaque
+    build contre la tolérance var('median_approx_tolerance'), celle admise
+    pour les modèles en median_mode approx.
+
+  Les lignes retournées (groupe, approx, exact, erreur_relative) sont les
+  dépassements : `dbt test --store-failures -s assert_median_sketch_error_bound`.
+*/
+
+{% if target.type == 'duckdb' %}
+    {% set tolerance = var('quantile_sketch_alpha') %}
+    {% set exact_median = 'QUANTILE_DISC(valeur_fonciere, 0.5)' %}
+{% else %}
+    {% set tolerance = var('median_approx_tolerance') %}
+    {% set exact_median = 'MEDIAN(valeur_fonciere)' %}
+{% endif %}
+
+WITH silver AS (
+    -- Mutations sans date comprises : compartiment mois NULL du cube
+    SELECT *
+    FROM {{ ref('silver_mutation_f') }}
+),
+
+cube AS (
+    SELECT *
+    FROM {{ ref('cube_mutations_mensuel') }}
+),
+
+comparaisons AS (
+    SELECT
+        'commune × type'                                            AS niveau,
+        m.commune || ' / ' || COALESCE(m.type_local, '∅')           AS groupe,
+        m.approx,
+        e.exact
+    FROM (
+        SELECT commune, code_postal, type_local, {{ median_from_states('prix_etat') }} AS approx
+        FROM cube
+        GROUP BY commune, code_postal, type_local
+    ) m
+    JOIN (
+        SELECT commune, code_postal, type_local, {{ exact_median }} AS exact
+        FROM silver
+        GROUP BY commune, code_postal, type_local
+    ) e
+      ON  m.commune     IS NOT DISTINCT FROM e.commune
+      AND m.code_postal IS NOT DISTINCT FROM e.code_postal
+      AND m.type_local  IS NOT DISTINCT FROM e.type_local
+
+    UNION ALL
+
+    SELECT
+        'département × type',
+        m.code_departement || ' / ' || COALESCE(m.type_local, '∅'),
+        m.approx,
+        e.exact
+    FROM (
+        SELECT code_departement, type_local, {{ median_from_states('prix_etat') }} AS approx
+        FROM cube
+        GROUP BY code_departement, type_local
+    ) m
+    JOIN (
+        SELECT code_departement, type_local, {{ exact_median }} AS exact
+        FROM silver
+        GROUP BY code_departement, type_local
+    ) e
+      ON  m.code_departement IS NOT DISTINCT FROM e.code_departement
+      AND m.type_local       IS NOT DISTINCT FROM e.type_local
+
+    UNION ALL
+
+    SELECT
+        'France',
+        'France',
+        (SELECT {{ median_from_states('prix_etat') }} FROM cube),
+        (SELECT {{ exact_median }} FROM silver)
+)
+
+SELECT
+    niveau,
+    groupe,
+    approx,
+    exact,
+    ABS(approx - exact) / NULLIF(exact, 0)                          AS erreur_relative
+FROM comparaisons
+WHERE (approx IS NULL) <> (exact IS NULL)
+   OR ABS(approx - exact) > {{ tolerance }} * ABS(exact) + 1e-6
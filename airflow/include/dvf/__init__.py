@@ -0,0 +1,6 @@
+"""
+Modules Python partagés par les DAGs DVF.
+
+Importés paresseusement depuis les tâches (jamais au niveau module des DAGs)
+pour ne pas alourdir le parsing du scheduler.
+"""
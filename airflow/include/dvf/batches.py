@@ -0,0 +1,94 @@
+"""
+Lots de chargement Bronze (`DEV_BRONZE.load_batches`).
+
+Chaque exécution de COPY INTO est enregistrée comme un lot : ouverture
+(RUNNING, `started_at`) avant le COPY, clôture (LOADED / EMPTY / FAILED,
+`finished_at`, fichiers et compteurs) après. Les lignes Bronze portent
+`_loaded_at` (METADATA$START_SCAN_TIME, via INCLUDE_METADATA) : une ligne
+appartient au lot dont la fenêtre [started_at, finished_at] la contient.
+
+Les consommateurs (Silver, …) ne traitent que les lots LOADED qu'ils n'ont
+pas encore absorbés (macro dbt `unconsumed_load_batches`) : le run mensuel
+ne dépend plus d'un rescan de Bronze.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import datetime, timezone
+
+LOAD_BATCHES_TABLE = "DVF_DB.DEV_BRONZE.load_batches"
+
+# Statuts d'un lot
+STATUS_RUNNING = "RUNNING"
+STATUS_LOADED  = "LOADED"    # au moins un fichier chargé → à consommer
+STATUS_EMPTY   = "EMPTY"     # COPY sans nouveau fichier (FORCE = FALSE)
+STATUS_FAILED  = "FAILED"    # COPY en erreur (transaction annulée, aucune ligne)
+
+OPEN_BATCH_SQL = f"""
+INSERT INTO {LOAD_BATCHES_TABLE} (batch_id, dag_run_id, source_stage, status, started_at)
+SELECT %(batch_id)s, %(dag_run_id)s, %(source_stage)s, '{STATUS_RUNNING}', CURRENT_TIMESTAMP()
+"""
+
+CLOSE_BATCH_SQL = f"""
+UPDATE {LOAD_BATCHES_TABLE}
+SET status        = %(status)s,
+    finished_at   = CURRENT_TIMESTAMP(),
+    files         = PARSE_JSON(%(files)s),
+    files_loaded  = %(files_loaded)s,
+    rows_parsed   = %(rows_parsed)s,
+    rows_loaded   = %(rows_loaded)s,
+    errors_seen   = %(errors_seen)s,
+    error_message = %(error_message)s
+WHERE batch_id = %(batch_id)s
+"""
+
+
+def new_batch_id(now: datetime | None = None) -> str:
+    """
+    Identifiant de lot unique et triable : `YYYYMMDDTHHMMSS-<8 hex>`.
+    Unique par tentative : un retry ou un clear ouvre un nouveau lot.
+    """
+    now = now or datetime.now(timezone.utc)
+    return f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def summarize_copy_results(rows: list[dict]) -> dict:
+    """
+    Résume le résultat d'un COPY INTO (1 ligne par fichier, colonnes
+    `file`, `status`, `rows_parsed`, `rows_loaded`, `errors_seen`).
+    Un COPY sans fichier renvoie une seule ligne `status` sans `file`.
+    """
+    files, rows_parsed, rows_loaded, errors_seen = [], 0, 0, 0
+    for row in rows or []:
+        row = {k.lower(): v for k, v in row.items()}
+        if not row.get("file"):
+            continue
+        if (row.get("rows_loaded") or 0) > 0:
+            files.append(row["file"])
+        rows_parsed += row.get("rows_parsed") or 0
+        rows_loaded += row.get("rows_loaded") or 0
+        errors_seen += row.get("errors_seen") or 0
+    return {
+        "status":       STATUS_LOADED if rows_loaded else STATUS_EMPTY,
+        "files":        sorted(files),
+        "files_loaded": len(files),
+        "rows_parsed":  rows_parsed,
+        "rows_loaded":  rows_loaded,
+        "errors_seen":  errors_seen,
+    }
+
+
+def close_batch_parameters(batch_id: str, summary: dict, error_message: str | None = None) -> dict:
+    """Paramètres de CLOSE_BATCH_SQL pour un résumé de COPY (ou un échec)."""
+    return {
+        "batch_id":      batch_id,
+        "status":        STATUS_FAILED if error_message else summary["status"],
+        "files":         json.dumps(summary["files"]),
+        "files_loaded":  summary["files_loaded"],
+        "rows_parsed":   summary["rows_parsed"],
+        "rows_loaded":   summary["rows_loaded"],
+        "errors_seen":   summary["errors_seen"],
+        "error_message": error_message[:1000] if error_message else None,
+    }
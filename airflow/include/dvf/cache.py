@@ -0,0 +1,147 @@
+"""
+Cache disque des ZIP DVF, adressé par contenu amont.
+
+Clé = sha256(URL + empreinte amont de l'API dataset : checksum, à défaut
+last_modified + filesize — cf. manifest.resource_fingerprint). Une
+republication change l'empreinte, donc la clé : une entrée n'est jamais
+périmée, elle devient simplement inutilisée puis évincée.
+
+Un hit ne fait aucun appel réseau (ni API, ni HEAD) : le fichier a été
+vérifié (taille / checksum) avant publication dans le cache.
+
+Écritures atomiques : le téléchargement se fait dans `<root>/.staging/`
+(même système de fichiers, reprise par plages conservée) puis l'entrée est
+publiée par os.replace — un lecteur ne voit jamais de fichier partiel.
+
+Éviction LRU sous `max_bytes` : l'horodatage mtime est rafraîchi à chaque
+hit (atime n'est pas fiable avec noatime / relatime). Partagé par plusieurs
+processus (instances mappées, scripts locaux) sans verrou : un fichier
+évincé pendant sa lecture reste lisible par le descripteur déjà ouvert.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import IO
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3   # ≈ 10 années DVF compressées avec marge
+STAGING_DIR       = ".staging"
+ENTRY_SUFFIX      = ".zip"
+
+
+def cache_key(url: str, version: str) -> str:
+    """Clé d'une entrée : URL + empreinte amont (checksum / last_modified)."""
+    return hashlib.sha256(f"{url}\n{version}".encode("utf-8")).hexdigest()
+
+
+class DownloadCache:
+    """
+    Répertoire `root` de ZIP vérifiés, borné à `max_bytes` (LRU).
+    `stats` cumule hits, misses, bytes_saved (octets servis depuis le cache)
+    et evicted (entrées supprimées) pour l'instance.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root      = Path(root)
+        self.max_bytes = max_bytes
+        self.stats     = {"hits": 0, "misses": 0, "bytes_saved": 0, "evicted": 0}
+        (self.root / STAGING_DIR).mkdir(parents=True, exist_ok=True)
+
+    def path(self, url: str, version: str) -> Path:
+        return self.root / f"{cache_key(url, version)}{ENTRY_SUFFIX}"
+
+    def staging_path(self, url: str, version: str) -> Path:
+        """Destination du téléchargement avant publication (reprise conservée)."""
+        return self.root / STAGING_DIR / f"{cache_key(url, version)}{ENTRY_SUFFIX}"
+
+    def open(self, url: str, version: str, *, expected_size: int | None = None) -> IO[bytes] | None:
+        """
+        Entrée ouverte en lecture binaire (hit) ou None (miss). Une entrée
+        dont la taille diffère de `expected_size` est supprimée (miss).
+        """
+        path = self.path(url, version)
+        try:
+            archive = open(path, "rb")
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        size = os.fstat(archive.fileno()).st_size
+        if expected_size is not None and size != expected_size:
+            archive.close()
+            logger.warning("Entrée de cache incohérente (%d ≠ %d octets) → supprimée : %s", size, expected_size, path.name)
+            path.unlink(missing_ok=True)
+            self.stats["misses"] += 1
+            return None
+        os.utime(path)   # LRU : rafraîchit l'horodatage d'accès
+        self.stats["hits"] += 1
+        self.stats["bytes_saved"] += size
+        logger.info("Cache hit : %s (%d octets)", url.rsplit("/", 1)[-1], size)
+        return archive
+
+    def publish(self, url: str, version: str, source: str | Path) -> Path:
+        """
+        Publie atomiquement `source` (fichier vérifié, même système de
+        fichiers) comme entrée de (url, version), puis évince.
+        """
+        path = self.path(url, version)
+        os.replace(source, path)
+        os.utime(path)
+        self.evict(keep=path)
+        return path
+
+    def fetch(
+        self,
+        url: str,
+        version: str,
+        *,
+        expected_size: int | None = None,
+        **download_kwargs,
+    ) -> tuple[IO[bytes], dict | None]:
+        """
+        Entrée ouverte : depuis le cache (hit, aucun appel réseau) ou après
+        téléchargement par plages vérifié (include.dvf.download) puis
+        publication. Retourne (fichier, stats de ranged_download ou None).
+        """
+        archive = self.open(url, version, expected_size=expected_size)
+        if archive is not None:
+            return archive, None
+        from include.dvf.download import ranged_download
+
+        download = ranged_download(
+            url, self.staging_path(url, version), expected_size=expected_size, **download_kwargs
+        )
+        download["path"] = str(self.publish(url, version, download["path"]))
+        return open(download["path"], "rb"), download
+
+    def evict(self, *, keep: Path | None = None) -> list[Path]:
+        """
+        Supprime les entrées les moins récemment utilisées jusqu'à repasser
+        sous `max_bytes`. `keep` (entrée en cours d'usage) n'est jamais
+        évincée, même si elle dépasse seule la limite.
+        """
+        entries = []
+        for path in self.root.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                entries.append((path.stat(), path))
+            except FileNotFoundError:   # évincée par un autre processus
+                continue
+        total = sum(stat.st_size for stat, _ in entries)
+        removed = []
+        for stat, path in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            removed.append(path)
+        if removed:
+            self.stats["evicted"] += len(removed)
+            logger.info("Cache : %d entrée(s) évincée(s), %d octets conservés", len(removed), total)
+        return removed
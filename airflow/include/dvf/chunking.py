@@ -0,0 +1,168 @@
+"""
+Découpage des fichiers DVF en chunks compressés de taille COPY.
+
+Un fichier annuel (plusieurs Go décompressés) est réécrit en objets S3
+numérotés `<fichier>.txt.0000.gz`, `.0001.gz`… d'environ `target_size`
+octets compressés. Chaque chunk répète la ligne d'entête (PARSE_HEADER =
+TRUE l'exige) et se termine sur une fin de ligne : Snowflake répartit alors
+le chargement d'une année sur les threads du warehouse et ne transfère
+que des octets compressés.
+
+Le chunk courant est compressé dans un spool borné (mémoire puis disque) puis
+envoyé en multipart upload : mémoire ≈ spool + 1 part S3.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import re
+import tempfile
+from typing import IO, Iterator
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+CHUNK_TARGET_SIZE = 128 * 1024 * 1024   # Octets COMPRESSÉS visés par chunk (100–250 Mo conseillé)
+CHUNK_CODEC       = "gzip"              # gzip (stdlib) | zstd (package zstandard)
+READ_BLOCK_SIZE   = 1024 * 1024
+SPOOL_MAX_SIZE    = 16 * 1024 * 1024
+
+EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+# ValeursFoncieres-2024.txt | ValeursFoncieres-2024.txt.0003.gz | ….0003.zst
+DVF_TEXT_KEY_RE = re.compile(r"[.]txt([.]\d{4}[.](gz|zst))?$", re.IGNORECASE)
+
+
+def is_dvf_text_key(key: str) -> bool:
+    """Vrai pour un fichier DVF brut, entier ou chunk compressé."""
+    return bool(DVF_TEXT_KEY_RE.search(key))
+
+
+def chunk_key(base_key: str, index: int, codec: str = CHUNK_CODEC) -> str:
+    return f"{base_key}.{index:04d}.{EXTENSIONS[codec]}"
+
+
+def _compressor(file_obj: IO[bytes], codec: str):
+    if codec == "gzip":
+        # mtime=0 : même contenu → mêmes octets (ETag stable entre deux runs)
+        return gzip.GzipFile(fileobj=file_obj, mode="wb", compresslevel=6, mtime=0)
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).stream_writer(file_obj, closefd=False)
+    raise ValueError(f"Codec inconnu : {codec!r} (attendu : {sorted(EXTENSIONS)})")
+
+
+def open_decompressed(stream: IO[bytes], key: str) -> IO[bytes]:
+    """Flux lisible décompressé selon l'extension de `key` (.gz / .zst / brut)."""
+    lowered = key.lower()
+    if lowered.endswith(".gz"):
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if lowered.endswith(".zst"):
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    return stream
+
+
+def iter_chunks(
+    source: IO[bytes],
+    *,
+    target_size: int = CHUNK_TARGET_SIZE,
+    codec: str = CHUNK_CODEC,
+    block_size: int = READ_BLOCK_SIZE,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+) -> Iterator[tuple[int, IO[bytes]]]:
+    """
+    Découpe `source` (flux binaire avec entête) en chunks compressés.
+    Produit (index, fichier compressé positionné au début) ; le fichier est
+    fermé dès que le consommateur passe au chunk suivant.
+    """
+    header = source.readline()
+    index = 0
+    spool = compressor = None
+    leftover = b""
+
+    def _open():
+        nonlocal spool, compressor
+        spool = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+        compressor = _compressor(spool, codec)
+        compressor.write(header)
+
+    def _close():
+        compressor.close()
+        spool.seek(0)
+        return spool
+
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        buf = leftover + block
+        cut = buf.rfind(b"\n") + 1
+        if cut == 0:
+            leftover = buf
+            continue
+        if compressor is None:
+            _open()
+        compressor.write(buf[:cut])
+        leftover = buf[cut:]
+        # Coupure uniquement sur fin de ligne, dès que la cible compressée est atteinte
+        if spool.tell() >= target_size:
+            with _close() as done:
+                yield index, done
+            index += 1
+            spool = compressor = None
+
+    if leftover:
+        if compressor is None:
+            _open()
+        compressor.write(leftover)
+    if compressor is not None or index == 0:
+        if compressor is None:
+            _open()  # fichier réduit à son entête : 1 chunk quand même
+        with _close() as done:
+            yield index, done
+
+
+def upload_chunked(
+    source: IO[bytes],
+    client,
+    bucket: str,
+    base_key: str,
+    *,
+    target_size: int = CHUNK_TARGET_SIZE,
+    codec: str = CHUNK_CODEC,
+    part_size: int | None = None,
+) -> list[dict]:
+    """
+    Écrit `source` sur S3 en chunks `base_key.NNNN.<ext>`.
+    Retourne la liste des uploads ({"key", "bytes", "parts", "etag"}).
+    """
+    from include.dvf.ingestion import PART_SIZE, multipart_upload
+
+    results = []
+    for index, chunk in iter_chunks(source, target_size=target_size, codec=codec):
+        key = chunk_key(base_key, index, codec)
+        results.append(multipart_upload(client, chunk, bucket, key, part_size=part_size or PART_SIZE))
+        logger.info("Chunk uploadé : %s (%d octets)", key, results[-1]["bytes"])
+    return results
+
+
+def delete_stale_objects(client, bucket: str, base_key: str, keep: set[str]) -> list[str]:
+    """
+    Supprime les objets `base_key*` absents de `keep` : chunks en trop d'un
+    upload interrompu au même préfixe, ou fichier entier remplacé par des chunks.
+    """
+    paginator = client.get_paginator("list_objects_v2")
+    stale = [
+        o["Key"]
+        for page in paginator.paginate(Bucket=bucket, Prefix=base_key)
+        for o in page.get("Contents", [])
+        if o["Key"] not in keep and is_dvf_text_key(o["Key"])
+    ]
+    for key in stale:
+        client.delete_object(Bucket=bucket, Key=key)
+        logger.info("Objet obsolète supprimé : %s", key)
+    return stale
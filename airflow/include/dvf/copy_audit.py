@@ -0,0 +1,126 @@
+"""
+Audit des COPY INTO Bronze : résultats par fichier, quarantaine des rejets.
+
+Avec ON_ERROR = CONTINUE, une ligne non parsable n'est pas chargée et
+COPY ne la signale que dans son jeu de résultats (1 ligne par fichier :
+rows_parsed, rows_loaded, errors_seen, first_error…). Ce jeu est conservé
+dans DEV_BRONZE.copy_file_audit, enrichi de la taille du fichier
+(INFORMATION_SCHEMA.COPY_HISTORY) et de la durée du COPY : historique de
+débit (vue DEV_BRONZE.copy_throughput) pour dimensionner le warehouse.
+
+Les lignes rejetées sont extraites par VALIDATE(JOB_ID => <query id du
+COPY>) dans DEV_BRONZE.copy_rejects. VALIDATE ne couvre pas les COPY avec
+transformation (SELECT … FROM @stage) : pour la table typée chargée depuis
+Parquet, seules les premières erreurs par fichier sont auditées (les
+valeurs non convertibles sont déjà conservées dans _raw_rejects). Le
+Bronze typé TXT passe par une table d'atterrissage chargée sans
+transformation : VALIDATE s'y applique.
+
+La tâche n'échoue que si le taux de rejet du lot dépasse un seuil.
+"""
+
+from __future__ import annotations
+
+import json
+
+AUDIT_TABLE      = "DVF_DB.DEV_BRONZE.copy_file_audit"
+QUARANTINE_TABLE = "DVF_DB.DEV_BRONZE.copy_rejects"
+MAX_ERROR_RATE   = 0.01   # 1 % de lignes rejetées par lot
+
+# Tables Bronze chargées sans transformation → VALIDATE() applicable
+VALIDATE_TABLES = frozenset({"mutations_foncieres", "mutations_foncieres_typed_landing"})
+
+# Colonnes du résultat de COPY INTO conservées (noms Snowflake en minuscules)
+RESULT_COLUMNS = (
+    "file", "status", "rows_parsed", "rows_loaded", "errors_seen",
+    "first_error", "first_error_line", "first_error_character", "first_error_column_name",
+)
+
+INSERT_AUDIT_SQL = f"""
+INSERT INTO {AUDIT_TABLE} (
+    batch_id, target_table, file, status, rows_parsed, rows_loaded, errors_seen,
+    first_error, first_error_line, first_error_character, first_error_column_name,
+    file_bytes, copy_seconds, audited_at
+)
+SELECT
+    %(batch_id)s,
+    %(target_table)s,
+    r.value:file::VARCHAR,
+    r.value:status::VARCHAR,
+    r.value:rows_parsed::NUMBER,
+    r.value:rows_loaded::NUMBER,
+    r.value:errors_seen::NUMBER,
+    r.value:first_error::VARCHAR,
+    r.value:first_error_line::NUMBER,
+    r.value:first_error_character::NUMBER,
+    r.value:first_error_column_name::VARCHAR,
+    h.file_size,
+    %(copy_seconds)s,
+    CURRENT_TIMESTAMP()
+FROM TABLE(FLATTEN(INPUT => PARSE_JSON(%(results)s))) r
+LEFT JOIN TABLE(DVF_DB.INFORMATION_SCHEMA.COPY_HISTORY(
+    TABLE_NAME => %(target_table)s,
+    START_TIME => DATEADD(hour, -6, CURRENT_TIMESTAMP())
+)) h
+    ON ENDSWITH(r.value:file::VARCHAR, h.file_name)
+QUALIFY ROW_NUMBER() OVER (PARTITION BY r.index ORDER BY h.last_load_time DESC NULLS LAST) = 1
+"""
+
+
+def file_results(rows: list[dict]) -> list[dict]:
+    """
+    Lignes par fichier d'un résultat de COPY INTO, colonnes normalisées
+    (RESULT_COLUMNS). Un COPY sans fichier renvoie une ligne sans `file`.
+    """
+    results = []
+    for row in rows or []:
+        row = {k.lower(): v for k, v in row.items()}
+        if row.get("file"):
+            results.append({column: row.get(column) for column in RESULT_COLUMNS})
+    return results
+
+
+def audit_parameters(batch_id: str, target_table: str, rows: list[dict], copy_seconds: float) -> dict:
+    """Paramètres de INSERT_AUDIT_SQL pour le résultat d'un COPY."""
+    return {
+        "batch_id":     batch_id,
+        "target_table": f"DVF_DB.DEV_BRONZE.{target_table}",
+        "results":      json.dumps(file_results(rows), default=str),
+        "copy_seconds": round(copy_seconds, 3),
+    }
+
+
+def quarantine_sql(table: str) -> str:
+    """INSERT … SELECT des lignes rejetées par le COPY %(job_id)s, via VALIDATE()."""
+    if table not in VALIDATE_TABLES:
+        raise ValueError(f"VALIDATE() non applicable (COPY avec transformation) : {table}")
+    return f"""
+    INSERT INTO {QUARANTINE_TABLE} (
+        batch_id, target_table, file, line, character, column_name, row_number,
+        error, rejected_record, quarantined_at
+    )
+    SELECT
+        %(batch_id)s, 'DVF_DB.DEV_BRONZE.{table}', file, line, character, column_name, row_number,
+        error, rejected_record, CURRENT_TIMESTAMP()
+    FROM TABLE(VALIDATE(DVF_DB.DEV_BRONZE.{table}, JOB_ID => %(job_id)s))
+    """
+
+
+def error_rate(summary: dict) -> float:
+    """Part des lignes lues rejetées par le COPY (résumé de summarize_copy_results)."""
+    return summary["errors_seen"] / summary["rows_parsed"] if summary["rows_parsed"] else 0.0
+
+
+class CopyErrorRateExceeded(ValueError):
+    """Taux de rejet d'un lot COPY supérieur au seuil configuré."""
+
+
+def check_error_rate(summary: dict, max_rate: float = MAX_ERROR_RATE) -> float:
+    """Retourne le taux de rejet du lot ; lève CopyErrorRateExceeded au-delà de `max_rate`."""
+    rate = error_rate(summary)
+    if rate > max_rate:
+        raise CopyErrorRateExceeded(
+            f"{summary['errors_seen']} lignes rejetées sur {summary['rows_parsed']} "
+            f"({rate:.2%} > seuil {max_rate:.2%}) — voir {AUDIT_TABLE} / {QUARANTINE_TABLE}"
+        )
+    return rate
@@ -0,0 +1,70 @@
+"""
+Graphe des modèles dbt lu depuis `manifest.json`.
+
+Le TaskGroup `transformation` crée une tâche par modèle et reproduit les
+dépendances `ref()` réelles : chaque Gold démarre dès que Silver est prêt,
+les dimensions du star schema ne dépendent que de Silver, etc.
+
+Le manifest est produit au build de l'image (`dbt parse`, voir Dockerfile) :
+la lecture au parsing du DAG reste un simple json.load, sans appel à dbt.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+DBT_PACKAGE = "real_estate_analytics"
+
+
+def load_manifest(path: str | Path) -> dict | None:
+    """manifest.json, ou None s'il n'a pas encore été généré."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def model_graph(manifest: dict, package: str = DBT_PACKAGE) -> dict[str, dict]:
+    """
+    Modèles exécutables du projet : {nom: {"unique_id", "layer",
+    "materialized", "upstream": [noms]}}.
+
+    - layer = premier dossier sous models/ (staging, silver, gold, star_schema)
+    - upstream = modèles parents ; sources et seeds sont exclus (les seeds
+      sont chargés par dbt_seed, en amont de tout le graphe)
+    - un modèle éphémère n'a pas de tâche : ses propres parents sont
+      reportés sur ses enfants
+    """
+    nodes = {
+        uid: node
+        for uid, node in manifest.get("nodes", {}).items()
+        if node.get("resource_type") == "model" and node.get("package_name") == package
+    }
+
+    def parents(uid: str, seen: frozenset = frozenset()) -> set[str]:
+        result = set()
+        for parent in nodes[uid].get("depends_on", {}).get("nodes", []):
+            if parent not in nodes or parent in seen:
+                continue
+            if nodes[parent]["config"].get("materialized") == "ephemeral":
+                result |= parents(parent, seen | {parent})
+            else:
+                result.add(parent)
+        return result
+
+    graph = {}
+    for uid, node in nodes.items():
+        materialized = node["config"].get("materialized")
+        if materialized == "ephemeral":
+            continue
+        fqn = node.get("fqn", [])
+        graph[node["name"]] = {
+            "unique_id":    uid,
+            "layer":        fqn[1] if len(fqn) > 2 else "models",
+            "materialized": materialized,
+            "upstream":     sorted(nodes[p]["name"] for p in parents(uid)),
+        }
+    return graph
+
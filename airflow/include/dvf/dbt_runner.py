@@ -0,0 +1,155 @@
+"""
+Exécution de dbt en processus (dbtRunner) pour les tâches du DAG.
+
+Lancé avec l'interpréteur du venv dbt (dbt n'est pas importable depuis
+l'environnement Airflow) ; arguments identiques à la CLI dbt :
+
+    python -m include.dvf.dbt_runner run --project-dir … --select silver_mutation_f
+
+Par rapport à `dbt <commande>` :
+  - état de partial parse (partial_parse.msgpack) conservé dans
+    DVF_DBT_STATE_DIR/<empreinte du projet>/, hors du projet : restauré
+    dans le target-path de la tâche avant l'invocation, publié (écriture
+    atomique) après un succès s'il a changé. Une tâche ne re-parse que les
+    fichiers modifiés — aucun si le projet n'a pas changé ; dbt vérifie
+    lui-même la validité de l'état (profil, vars, versions) et re-parse
+    tout s'il le rejette.
+  - `deps` ignoré si package-lock.yml / packages.yml n'ont pas changé depuis
+    la dernière installation réussie (et dbt_packages/ présent).
+
+La connexion Snowflake reste ouverte par chaque tâche (processus distincts).
+"""
+
+from __future__ import annotations
+
+import argparse
+import filecmp
+import hashlib
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+STATE_DIR          = os.getenv("DVF_DBT_STATE_DIR", "/tmp/dbt_state")
+PARTIAL_PARSE_FILE = "partial_parse.msgpack"
+PACKAGES_DIR       = "dbt_packages"
+
+# Fichiers du projet dont dépend le parsing (empreinte de l'état)
+PROJECT_FILES = ("dbt_project.yml", "packages.yml", "package-lock.yml")
+PROJECT_DIRS  = ("models", "macros", "seeds", "snapshots", "tests", "analyses")
+LOCK_FILES    = ("packages.yml", "package-lock.yml")
+
+
+def _digest(root: Path, paths: list[Path]) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(str(path.relative_to(root)).encode("utf-8") + b"\0")
+        digest.update(path.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+def project_hash(project_dir: str | Path) -> str:
+    """Empreinte des sources du projet dbt (clé de l'état de parsing)."""
+    root = Path(project_dir)
+    paths = [root / name for name in PROJECT_FILES if (root / name).is_file()]
+    for name in PROJECT_DIRS:
+        paths += [p for p in (root / name).rglob("*") if p.is_file()]
+    return _digest(root, paths)[:16]
+
+
+def packages_hash(project_dir: str | Path) -> str | None:
+    """Empreinte des dépendances déclarées ; None sans package-lock.yml."""
+    root = Path(project_dir)
+    if not (root / "package-lock.yml").is_file():
+        return None
+    return _digest(root, [root / name for name in LOCK_FILES if (root / name).is_file()])[:16]
+
+
+def _deps_marker(project_dir: Path, state_dir: Path) -> Path | None:
+    lock = packages_hash(project_dir)
+    return state_dir / "deps" / lock if lock else None
+
+
+def deps_up_to_date(project_dir: str | Path, state_dir: str | Path = STATE_DIR) -> bool:
+    """True si `dbt deps` a déjà réussi pour ce lock et que les packages sont en place."""
+    marker = _deps_marker(Path(project_dir), Path(state_dir))
+    packages = Path(project_dir) / PACKAGES_DIR
+    return bool(marker and marker.exists() and packages.is_dir() and any(packages.iterdir()))
+
+
+def restore_partial_parse(state: Path, target_path: Path) -> bool:
+    """Copie l'état de parsing mis en cache dans le target-path de la tâche."""
+    cached = state / PARTIAL_PARSE_FILE
+    if not cached.exists():
+        return False
+    try:
+        target_path.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cached, target_path / PARTIAL_PARSE_FILE)
+    except OSError as exc:   # target-path non inscriptible : parsing complet
+        logger.warning("État de parsing non restauré (%s)", exc)
+        return False
+    return True
+
+
+def save_partial_parse(target_path: Path, state: Path) -> bool:
+    """Publie atomiquement l'état de parsing produit par la tâche s'il diffère du cache."""
+    produced, cached = target_path / PARTIAL_PARSE_FILE, state / PARTIAL_PARSE_FILE
+    if not produced.exists() or (cached.exists() and filecmp.cmp(produced, cached, shallow=False)):
+        return False
+    state.mkdir(parents=True, exist_ok=True)
+    tmp = state / f"{PARTIAL_PARSE_FILE}.{os.getpid()}.tmp"
+    shutil.copyfile(produced, tmp)
+    os.replace(tmp, cached)
+    return True
+
+
+def _parse_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("command")
+    parser.add_argument("--project-dir", default=".")
+    parser.add_argument("--target-path")
+    return parser.parse_known_args(args)[0]
+
+
+def run(args: list[str], *, state_dir: str | Path = STATE_DIR, runner=None) -> int:
+    """
+    Exécute `dbt <args>` en processus ; code retour de la CLI dbt
+    (0 succès, 1 échec de nœuds, 2 erreur d'exécution).
+    """
+    opts = _parse_args(args)
+    project, state_dir = Path(opts.project_dir), Path(state_dir)
+
+    if opts.command == "deps" and deps_up_to_date(project, state_dir):
+        logger.info("dbt deps ignoré : package-lock.yml inchangé (%s)", packages_hash(project))
+        return 0
+
+    state = state_dir / project_hash(project)
+    target_path = Path(opts.target_path) if opts.target_path else project / "target"
+    restored = opts.command != "deps" and restore_partial_parse(state, target_path)
+    logger.info("dbt %s | état de parsing %s (%s)", opts.command, "restauré" if restored else "absent", state.name)
+
+    if runner is None:
+        from dbt.cli.main import dbtRunner
+
+        runner = dbtRunner()
+    result = runner.invoke(args)
+
+    if result.success:
+        if opts.command == "deps":
+            marker = _deps_marker(project, state_dir)
+            if marker:
+                marker.parent.mkdir(parents=True, exist_ok=True)
+                marker.touch()
+        elif save_partial_parse(target_path, state):
+            logger.info("État de parsing publié : %s", state)
+        return 0
+    return 2 if result.exception else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    sys.exit(run(sys.argv[1:]))
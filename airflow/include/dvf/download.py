@@ -0,0 +1,290 @@
+"""
+Téléchargement reprenable par plages HTTP (Range) des ZIP DVF.
+
+Le fichier est découpé en chunks de `chunk_size` octets, téléchargés
+(éventuellement en parallèle) directement à leur offset dans
+`<dest>.part`. Chaque chunk terminé est consigné avec son CRC32 dans
+`<dest>.state.json` (écriture atomique) : une coupure réseau ne fait
+retélécharger que le chunk en cours (retry local avec backoff), et une
+nouvelle tentative de tâche reprend là où la précédente s'est arrêtée,
+après re-vérification des chunks déjà sur disque.
+
+`If-Range` (ETag / Last-Modified) garantit que les chunks proviennent de
+la même version du fichier : une republication en cours de route est
+détectée (réponse 200 au lieu de 206) et le téléchargement repart de zéro.
+À la fin, taille et checksum sont comparés aux métadonnées de l'API
+dataset (filesize, checksum sha1) avant de publier `<dest>`.
+
+Serveur sans support Range : repli sur un GET unique, non reprenable.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from include.dvf.ingestion import DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+RANGE_CHUNK_SIZE = 16 * 1024 * 1024   # Taille d'une plage HTTP (unité de reprise)
+CHUNK_RETRIES    = 3                  # Nouvelles tentatives par chunk avant échec
+RETRY_BACKOFF    = 2.0                # Secondes, doublées à chaque tentative
+STATE_VERSION    = 1
+
+
+class DownloadIntegrityError(ValueError):
+    """Fichier téléchargé non conforme (taille, checksum, source modifiée)."""
+
+
+class _SourceChanged(Exception):
+    """Réponse 200 à une requête If-Range : le fichier a changé côté serveur."""
+
+
+def _part_path(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".part")
+
+
+def _state_path(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".state.json")
+
+
+def _chunks(size: int, chunk_size: int) -> list[tuple[int, int]]:
+    """Plages [début, fin] inclusives couvrant `size` octets."""
+    return [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+
+def file_checksum(path: Path, algorithm: str = "sha1") -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        while block := f.read(DOWNLOAD_CHUNK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _crc_on_disk(fd: int, start: int, end: int) -> int:
+    crc, offset = 0, start
+    while offset <= end:
+        block = os.pread(fd, min(DOWNLOAD_CHUNK_SIZE, end + 1 - offset), offset)
+        if not block:
+            break
+        crc = zlib.crc32(block, crc)
+        offset += len(block)
+    return crc
+
+
+def _probe(session, url: str, timeout: int) -> dict:
+    """HEAD : taille, validateur (ETag / Last-Modified), support des plages."""
+    response = session.head(url, allow_redirects=True, timeout=timeout)
+    response.raise_for_status()
+    length = response.headers.get("Content-Length")
+    return {
+        "url":       response.url,
+        "size":      int(length) if length is not None else None,
+        "validator": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+        "ranges":    response.headers.get("Accept-Ranges", "").lower() == "bytes",
+    }
+
+
+def _load_state(dest: Path, expected: dict) -> dict:
+    """État de reprise s'il correspond au même fichier distant, sinon état vierge."""
+    fresh = {**expected, "chunks": {}}
+    try:
+        state = json.loads(_state_path(dest).read_text())
+    except (FileNotFoundError, ValueError):
+        return fresh
+    if any(state.get(k) != v for k, v in expected.items()) or not _part_path(dest).exists():
+        logger.info("Reprise impossible (source ou découpage modifié) : %s", dest.name)
+        return fresh
+    return state
+
+
+def _save_state(dest: Path, state: dict) -> None:
+    tmp = _state_path(dest).with_suffix(".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, _state_path(dest))
+
+
+def _discard(dest: Path) -> None:
+    for path in (_part_path(dest), _state_path(dest)):
+        path.unlink(missing_ok=True)
+
+
+def _fetch_chunk(session, url: str, fd: int, start: int, end: int, validator: str | None, timeout: int) -> int:
+    """Télécharge la plage [start, end] à son offset ; retourne son CRC32."""
+    headers = {"Range": f"bytes={start}-{end}"}
+    if validator:
+        headers["If-Range"] = validator
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 200:
+            raise _SourceChanged(url)
+        response.raise_for_status()
+        content_range = response.headers.get("Content-Range", "")
+        if not content_range.startswith(f"bytes {start}-{end}/"):
+            raise OSError(f"Content-Range inattendu pour {start}-{end} : {content_range!r}")
+        crc, offset = 0, start
+        for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            if offset + len(block) > end + 1:
+                raise OSError(f"Plage {start}-{end} : réponse trop longue")
+            os.pwrite(fd, block, offset)
+            crc = zlib.crc32(block, crc)
+            offset += len(block)
+    if offset != end + 1:
+        raise OSError(f"Plage {start}-{end} tronquée à {offset - start} octets")
+    return crc
+
+
+def _download_single(session, url: str, part: Path, timeout: int) -> int:
+    """Repli sans Range : GET unique en streaming vers `part`."""
+    size = 0
+    with session.get(url, stream=True, timeout=timeout) as response, open(part, "wb") as f:
+        response.raise_for_status()
+        for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            f.write(block)
+            size += len(block)
+    return size
+
+
+def ranged_download(
+    url: str,
+    dest: str | Path,
+    *,
+    expected_size: int | None = None,
+    checksum: str | None = None,
+    checksum_type: str = "sha1",
+    chunk_size: int = RANGE_CHUNK_SIZE,
+    concurrency: int = 1,
+    retries: int = CHUNK_RETRIES,
+    backoff: float = RETRY_BACKOFF,
+    timeout: int = DOWNLOAD_TIMEOUT,
+) -> dict:
+    """
+    Télécharge `url` vers `dest` par plages de `chunk_size` octets
+    (`concurrency` requêtes simultanées), reprend un téléchargement
+    interrompu et vérifie taille / checksum avant de publier `dest`.
+
+    Retourne {"path", "bytes", "bytes_fetched", "bytes_resumed", "chunks",
+    "retries", "ranged", "checksum"}. Lève DownloadIntegrityError si la
+    taille ou le checksum diffère des métadonnées amont (fichiers partiels
+    supprimés), ou l'erreur réseau d'un chunk après `retries` tentatives
+    (progression conservée pour la tentative suivante).
+    """
+    import requests
+
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = _part_path(dest)
+    local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    probe = _probe(session(), url, timeout)
+    size = probe["size"]
+    if expected_size is not None and size is not None and size != expected_size:
+        raise DownloadIntegrityError(f"{dest.name} : taille serveur {size} ≠ taille API {expected_size}")
+
+    stats = {"path": str(dest), "bytes_fetched": 0, "bytes_resumed": 0, "chunks": 0, "retries": 0,
+             "ranged": bool(probe["ranges"] and size)}
+
+    # Fichier complet d'une tentative précédente (échec en aval, ex. upload S3)
+    if dest.exists():
+        if dest.stat().st_size == size and (not checksum or file_checksum(dest, checksum_type) == checksum.lower()):
+            logger.info("Déjà téléchargé et vérifié : %s", dest.name)
+            return {**stats, "bytes": size, "bytes_resumed": size, "checksum": checksum and checksum.lower()}
+        dest.unlink()
+
+    if not stats["ranged"]:
+        logger.info("Serveur sans Range → téléchargement unique : %s", dest.name)
+        stats["bytes_fetched"] = _download_single(session(), probe["url"], part, timeout)
+    else:
+        state = _load_state(dest, {
+            "version":    STATE_VERSION,
+            "url":        url,
+            "size":       size,
+            "validator":  probe["validator"],
+            "chunk_size": chunk_size,
+        })
+        ranges = _chunks(size, chunk_size)
+        stats["chunks"] = len(ranges)
+        lock = threading.Lock()
+
+        with open(part, "r+b" if state["chunks"] else "wb") as f:
+            f.truncate(size)
+            fd = f.fileno()
+
+            # Chunks déjà consignés : re-vérifiés sur disque (CRC32) avant reprise
+            for index, crc in list(state["chunks"].items()):
+                start, end = ranges[int(index)]
+                if _crc_on_disk(fd, start, end) == crc:
+                    stats["bytes_resumed"] += end + 1 - start
+                else:
+                    del state["chunks"][index]
+            if stats["bytes_resumed"]:
+                logger.info("Reprise de %s : %d/%d octets déjà présents", dest.name, stats["bytes_resumed"], size)
+            _save_state(dest, state)
+
+            def fetch(index: int) -> None:
+                start, end = ranges[index]
+                for attempt in range(retries + 1):
+                    try:
+                        crc = _fetch_chunk(session(), probe["url"], fd, start, end, probe["validator"], timeout)
+                        break
+                    except (requests.RequestException, OSError) as exc:
+                        if attempt == retries:
+                            raise
+                        with lock:
+                            stats["retries"] += 1
+                        logger.warning("Plage %d-%d de %s en échec (%s) → nouvel essai", start, end, dest.name, exc)
+                        time.sleep(backoff * 2 ** attempt)
+                with lock:
+                    state["chunks"][str(index)] = crc
+                    stats["bytes_fetched"] += end + 1 - start
+                    _save_state(dest, state)
+
+            pending = [i for i in range(len(ranges)) if str(i) not in state["chunks"]]
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                    futures = [pool.submit(fetch, i) for i in pending]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()
+                        raise
+            except _SourceChanged:
+                _discard(dest)
+                raise DownloadIntegrityError(f"{dest.name} : fichier modifié côté serveur pendant le téléchargement")
+
+    actual_size = part.stat().st_size
+    if expected_size is not None and actual_size != expected_size:
+        _discard(dest)
+        raise DownloadIntegrityError(f"{dest.name} : {actual_size} octets reçus, {expected_size} attendus")
+    if checksum:
+        actual = file_checksum(part, checksum_type)
+        if actual != checksum.lower():
+            _discard(dest)
+            raise DownloadIntegrityError(f"{dest.name} : {checksum_type} {actual} ≠ {checksum} (API)")
+        stats["checksum"] = actual
+    else:
+        stats["checksum"] = None
+
+    os.replace(part, dest)
+    _state_path(dest).unlink(missing_ok=True)
+    stats["bytes"] = actual_size
+    logger.info(
+        "Téléchargé : %s (%d octets, %d repris, %d chunks, %d retries)",
+        dest.name, actual_size, stats["bytes_resumed"], stats["chunks"], stats["retries"],
+    )
+    return stats
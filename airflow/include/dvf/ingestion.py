@@ -0,0 +1,304 @@
+"""
+Ingestion DVF en streaming : data.gouv.fr (ZIP) → S3 (multipart upload).
+
+Le corps HTTP est écrit par blocs dans un spool borné (mémoire puis disque),
+le membre .txt est décompressé à la volée et envoyé sur S3 par parts de
+taille fixe. La mémoire consommée dépend de `part_size`, pas de la taille
+du fichier (un ZIP annuel DVF dépasse plusieurs centaines de Mo).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from typing import IO, Callable
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024           # 1 MiB par lecture HTTP
+SPOOL_MAX_SIZE      = 8 * 1024 * 1024       # Au-delà : bascule du spool sur disque
+PART_SIZE           = 16 * 1024 * 1024      # Taille d'une part S3 (min. 5 MiB imposé par S3)
+MIN_PART_SIZE       = 5 * 1024 * 1024
+DOWNLOAD_TIMEOUT    = 300
+API_TIMEOUT         = 30
+
+_YEAR_RE = re.compile(r"valeursfoncieres-(\d{4})", re.IGNORECASE)
+
+
+def list_dvf_resources(api_url: str, *, timeout: int = API_TIMEOUT) -> list[dict]:
+    """
+    Liste les ressources ZIP `valeursfoncieres-YYYY` du dataset data.gouv.fr.
+    Un seul appel API ; chaque ressource est décrite par un dict sérialisable
+    (XCom) : {"url", "zip_name", "expected_txt", "year", "checksum",
+    "checksum_type", "last_modified", "filesize"}. checksum, last_modified
+    et filesize alimentent le manifest d'ingestion (détection des
+    republications) et la vérification du téléchargement.
+    """
+    import requests
+
+    response = requests.get(api_url, timeout=timeout)
+    response.raise_for_status()
+    return parse_dvf_resources(response.json())
+
+
+def parse_dvf_resources(dataset: dict) -> list[dict]:
+    """
+    Ressources ZIP `valeursfoncieres-YYYY` d'une réponse de l'API dataset
+    (partagé par list_dvf_resources et le trigger asynchrone).
+    """
+    resources = []
+    for r in dataset["resources"]:
+        url = r["url"]
+        if not (url.endswith(".zip") and "valeursfoncieres" in url):
+            continue
+        zip_name = url.split("/")[-1]
+        year = _YEAR_RE.search(zip_name)
+        resources.append({
+            "url":           url,
+            "zip_name":      zip_name,
+            # Les ZIP DVF ont une double extension : valeursfoncieres-YYYY.txt.zip
+            # → retirer seulement '.zip' donne valeursfoncieres-YYYY.txt
+            "expected_txt":  zip_name[:-4],
+            "year":          year.group(1) if year else zip_name,
+            "checksum":      (r.get("checksum") or {}).get("value"),
+            "checksum_type": (r.get("checksum") or {}).get("type"),
+            "last_modified": r.get("last_modified"),
+            "filesize":      r.get("filesize"),
+        })
+    return resources
+
+
+def download_to_spool(
+    url: str,
+    *,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+    timeout: int = DOWNLOAD_TIMEOUT,
+) -> tuple[IO[bytes], int]:
+    """
+    Télécharge `url` en streaming dans un SpooledTemporaryFile.
+    Retourne (fichier positionné au début, nombre d'octets téléchargés).
+    Le fichier est seekable (requis par zipfile) et sa part en mémoire est
+    bornée par `spool_max_size`.
+    """
+    import requests
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_max_size, suffix=".zip")
+    size = 0
+    try:
+        with requests.get(url, stream=True, timeout=timeout) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    spool.write(chunk)
+                    size += len(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool, size
+
+
+def multipart_upload(
+    client,
+    file_obj: IO[bytes],
+    bucket: str,
+    key: str,
+    *,
+    part_size: int = PART_SIZE,
+) -> dict:
+    """
+    Envoie `file_obj` vers s3://bucket/key en multipart upload séquentiel.
+    Un seul buffer de `part_size` octets est en mémoire à la fois.
+    L'upload est annulé (abort) en cas d'erreur : aucune part orpheline
+    ni objet partiel n'est laissé sur S3.
+
+    `client` est un client boto3 S3 (ex. `S3Hook.get_conn()`).
+    Retourne {"key", "bytes", "parts", "etag"}.
+    """
+    if part_size < MIN_PART_SIZE:
+        raise ValueError(f"part_size doit être >= {MIN_PART_SIZE} octets (contrainte S3)")
+
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+    parts: list[dict] = []
+    total = 0
+    try:
+        while True:
+            data = file_obj.read(part_size)
+            # Une part vide n'est envoyée que pour un fichier vide (S3 exige >= 1 part)
+            if not data and parts:
+                break
+            part_number = len(parts) + 1
+            response = client.upload_part(
+                Bucket     = bucket,
+                Key        = key,
+                UploadId   = upload_id,
+                PartNumber = part_number,
+                Body       = data,
+            )
+            parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+            total += len(data)
+            if not data:
+                break
+
+        result = client.complete_multipart_upload(
+            Bucket          = bucket,
+            Key             = key,
+            UploadId        = upload_id,
+            MultipartUpload = {"Parts": parts},
+        )
+    except BaseException:
+        logger.warning("Upload multipart annulé : s3://%s/%s", bucket, key)
+        client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    return {
+        "key":   key,
+        "bytes": total,
+        "parts": len(parts),
+        "etag":  result.get("ETag", "").strip('"'),
+    }
+
+
+def upload_zip_members(
+    zip_file: IO[bytes],
+    client,
+    bucket: str,
+    prefix: str,
+    *,
+    skip: Callable[[str], bool] = lambda key: False,
+    part_size: int = PART_SIZE,
+    chunk_target_size: int | None = None,
+    chunk_codec: str = "gzip",
+) -> tuple[list[dict], list[str]]:
+    """
+    Décompresse en streaming chaque membre .txt de `zip_file` vers S3.
+    `skip(s3_key)` permet d'ignorer les clés déjà présentes.
+    `chunk_target_size` : si renseigné, le membre est réécrit en chunks
+    compressés `<fichier>.txt.NNNN.gz` (voir include.dvf.chunking) au lieu
+    d'un objet unique non compressé.
+    Les objets obsolètes du même fichier sous `prefix` (chunks d'un upload
+    interrompu, fichier entier remplacé par des chunks) sont supprimés après
+    l'upload. Une republication est écrite sous un préfixe de version distinct
+    (include.dvf.manifest.version_prefix) : la version courante n'est jamais
+    touchée ici, son retrait suit la bascule du manifest.
+    Retourne (uploads effectués — 1 entrée par objet S3, noms de fichiers ignorés).
+    """
+    from include.dvf.chunking import delete_stale_objects, upload_chunked
+
+    uploaded, skipped = [], []
+    with zipfile.ZipFile(zip_file) as z:
+        for file_name in z.namelist():
+            if not file_name.endswith(".txt"):
+                continue
+
+            s3_key = f"{prefix}{file_name}"
+            if skip(s3_key):
+                logger.info("SKIP (déjà présent sur S3) : %s", file_name)
+                skipped.append(file_name)
+                continue
+
+            logger.info("Upload S3 (multipart) → %s", s3_key)
+            with z.open(file_name) as f:
+                if chunk_target_size:
+                    results = upload_chunked(
+                        f, client, bucket, s3_key,
+                        target_size = chunk_target_size,
+                        codec       = chunk_codec,
+                        part_size   = part_size,
+                    )
+                else:
+                    results = [multipart_upload(client, f, bucket, s3_key, part_size=part_size)]
+            delete_stale_objects(client, bucket, s3_key, keep={r["key"] for r in results})
+
+            uploaded.extend({"file_name": file_name, **r} for r in results)
+            logger.info(
+                "Upload terminé : %s (%d objet(s), %d octets)",
+                file_name, len(results), sum(r["bytes"] for r in results),
+            )
+    return uploaded, skipped
+
+
+def stream_zip_to_s3(
+    url: str,
+    client,
+    bucket: str,
+    prefix: str,
+    *,
+    skip: Callable[[str], bool] = lambda key: False,
+    part_size: int = PART_SIZE,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+    chunk_target_size: int | None = None,
+    chunk_codec: str = "gzip",
+    download_dir: str | None = None,
+    expected_size: int | None = None,
+    checksum: str | None = None,
+    checksum_type: str = "sha1",
+    download_concurrency: int = 1,
+    cache=None,
+    cache_version: str | None = None,
+) -> dict:
+    """
+    Chaîne complète pour un ZIP DVF : download → décompression → S3.
+    Sans `download_dir` : download spoolé en un GET. Avec `download_dir` :
+    download par plages HTTP reprenable et vérifié (taille / checksum de
+    l'API, include.dvf.download) ; le ZIP n'est supprimé qu'après l'upload,
+    une nouvelle tentative reprend donc le téléchargement ou le réutilise.
+    Avec `cache` (include.dvf.cache.DownloadCache) et `cache_version`
+    (empreinte amont) : un hit n'effectue aucun appel réseau ; un miss est
+    téléchargé par plages dans le cache puis conservé après l'upload.
+    Retourne {"zip_name", "bytes_downloaded", "uploaded", "skipped",
+    "download", "cache_hit"} ; "download" vaut None en mode spool et sur
+    un hit de cache.
+    """
+    zip_name = url.split("/")[-1]
+    download = None
+    use_cache = cache is not None and cache_version is not None
+    if use_cache:
+        archive, download = cache.fetch(
+            url, cache_version,
+            expected_size = expected_size,
+            checksum      = checksum,
+            checksum_type = checksum_type,
+            concurrency   = download_concurrency,
+        )
+        size = download["bytes_fetched"] if download else 0
+    elif download_dir:
+        from include.dvf.download import ranged_download
+
+        logger.info("Téléchargement ZIP (plages HTTP) : %s", zip_name)
+        download = ranged_download(
+            url, f"{download_dir}/{zip_name}",
+            expected_size = expected_size,
+            checksum      = checksum,
+            checksum_type = checksum_type,
+            concurrency   = download_concurrency,
+        )
+        archive, size = open(download["path"], "rb"), download["bytes_fetched"]
+    else:
+        logger.info("Téléchargement ZIP (streaming) : %s", zip_name)
+        archive, size = download_to_spool(url, spool_max_size=spool_max_size)
+    with archive:
+        logger.info("ZIP téléchargé : %s (%d octets)", zip_name, size)
+        uploaded, skipped = upload_zip_members(
+            archive, client, bucket, prefix,
+            skip              = skip,
+            part_size         = part_size,
+            chunk_target_size = chunk_target_size,
+            chunk_codec       = chunk_codec,
+        )
+    if download and not use_cache:
+        os.remove(download["path"])
+    return {
+        "zip_name":         zip_name,
+        "bytes_downloaded": size,
+        "uploaded":         uploaded,
+        "skipped":          skipped,
+        "download":         download,
+        "cache_hit":        use_cache and download is None,
+    }
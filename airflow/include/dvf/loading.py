@@ -0,0 +1,241 @@
+"""
+Session Snowflake unique du groupe `loading` et DDL conditionnel.
+
+SnowflakeHook.run() ouvre une connexion par appel : DDL, stages, ouverture
+de lot, COPY et clôture coûtaient autant de sessions (authentification,
+contexte USE …). LoadingSession exécute tout sur une seule connexion DB-API.
+
+Le DDL (01_create_snowflake_objects.sql) et chaque CREATE OR REPLACE STAGE
+ne sont rejoués que si leur empreinte (sha256 du SQL) diffère de celle
+enregistrée dans DEV_BRONZE.ddl_fingerprints lors de la dernière
+application. Sur un run où seules les données changent : une seule lecture
+d'empreintes au lieu d'une vingtaine d'instructions DDL.
+
+Stages : avec une storage integration (DVF_STORAGE_INTEGRATION), le DDL ne
+contient aucun secret. À défaut (credentials de aws_conn), la clé secrète
+est masquée avant le calcul de l'empreinte et n'apparaît ni dans les logs
+ni dans les erreurs remontées ; l'AWS_KEY_ID reste dans l'empreinte, une
+rotation de clé (nouvel identifiant) rejoue donc le stage.
+
+Table d'empreintes illisible (premier run : elle est créée par le script
+DDL lui-même) → tout est réappliqué, comme avant. Un objet supprimé hors
+pipeline n'est pas détecté : DVF_FORCE_DDL=true force la réapplication.
+
+Republication (include/dvf/manifest.py) : les lignes Bronze d'une version
+remplacée sont supprimées par `_source_file` (retire_rows_sql) avant le
+chargement de la nouvelle version. Objets historiques adoptés (hors
+répertoire de version) : leurs lignes chargées avant le lignage ont
+`_source_file` NULL et sont retrouvées par l'année de "Date mutation"
+(legacy_source_years).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from io import StringIO
+
+logger = logging.getLogger(__name__)
+
+DDL_FINGERPRINTS_TABLE = "DVF_DB.DEV_BRONZE.ddl_fingerprints"
+
+# Contexte minimal de la session (rôle et warehouse existent avant le DDL)
+SESSION_CONTEXT_SQL = "USE ROLE DVF_BI_ROLE; USE WAREHOUSE DVF_WH;"
+
+READ_FINGERPRINTS_SQL = f"SELECT object_name, fingerprint FROM {DDL_FINGERPRINTS_TABLE}"
+
+SAVE_FINGERPRINT_SQL = f"""
+MERGE INTO {DDL_FINGERPRINTS_TABLE} t
+USING (SELECT %(object_name)s AS object_name, %(fingerprint)s AS fingerprint) s
+ON t.object_name = s.object_name
+WHEN MATCHED THEN UPDATE SET fingerprint = s.fingerprint, applied_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (object_name, fingerprint, applied_at)
+    VALUES (s.object_name, s.fingerprint, CURRENT_TIMESTAMP())
+"""
+
+
+def fingerprint(*parts: str) -> str:
+    """Empreinte sha256 d'un ou plusieurs textes SQL (ordre significatif)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def retired_source_files(keys: list[str], stage_prefix: str, *, parquet: bool = False) -> list[str]:
+    """
+    Valeurs `_source_file` des lignes Bronze issues des objets bruts `keys`.
+    Texte : METADATA$FILENAME, chemin relatif au stage (`stage_prefix`).
+    Parquet : nom des fichiers `<source>.parquet` produits pour chaque objet
+    brut (un par partition, comparé sans le chemin de partition).
+    """
+    if parquet:
+        from include.dvf.parquet import source_basename
+
+        return sorted({f"{source_basename(key)}.parquet" for key in keys})
+    return sorted(key.removeprefix(stage_prefix) for key in keys)
+
+
+def legacy_source_years(keys: list[str]) -> list[str]:
+    """
+    Années des objets historiques de `keys` (hors répertoire de version,
+    adoptés par le manifest). Leurs lignes Bronze chargées avant le lignage
+    ont `_source_file` NULL : seule l'année de "Date mutation" les rattache
+    à l'objet (un fichier DVF = une année de mutations).
+    """
+    from include.dvf.manifest import is_versioned_key
+
+    years = set()
+    for key in keys:
+        year = re.search(r"\d{4}", key.rsplit("/", 1)[-1])
+        if year and not is_versioned_key(key):
+            years.add(year.group(0))
+    return sorted(years)
+
+
+def retire_rows_sql(table: str, *, parquet: bool = False, typed: bool = False) -> str:
+    """
+    DELETE des lignes Bronze de `table` dont la source figure dans
+    %(source_files)s (JSON), et des lignes sans lignage (`_source_file`
+    NULL) dont l'année de "Date mutation" figure dans %(legacy_years)s.
+    `typed` : "Date mutation" en DATE (table typée) plutôt qu'en JJ/MM/AAAA.
+    """
+    column = "REGEXP_SUBSTR(_source_file, '[^/]+$')" if parquet else "_source_file"
+    year = 'YEAR("Date mutation")::VARCHAR' if typed else 'RIGHT(TRIM("Date mutation"), 4)'
+    return f"""
+    DELETE FROM DVF_DB.DEV_BRONZE.{table}
+    WHERE {column} IN (
+        SELECT value::VARCHAR FROM TABLE(FLATTEN(INPUT => PARSE_JSON(%(source_files)s)))
+    )
+       OR (_source_file IS NULL AND {year} IN (
+        SELECT value::VARCHAR FROM TABLE(FLATTEN(INPUT => PARSE_JSON(%(legacy_years)s)))
+    ))
+    """
+
+
+def mask_secrets(text: str, secrets: tuple[str, ...]) -> str:
+    """`text` avec chaque secret non vide remplacé par ***."""
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, "***")
+    return text
+
+
+def stage_sql(
+    stage: str,
+    url: str,
+    file_format: str,
+    access_key: str | None = None,
+    secret_key: str | None = None,
+    *,
+    storage_integration: str | None = None,
+) -> str:
+    """
+    CREATE OR REPLACE STAGE d'un stage S3 DVF : storage integration si
+    fournie (aucun secret dans le DDL), credentials de aws_conn sinon.
+    """
+    if storage_integration:
+        auth, comment = f"STORAGE_INTEGRATION = {storage_integration}", "storage integration"
+    else:
+        auth = f"""CREDENTIALS = (
+            AWS_KEY_ID     = '{access_key}'
+            AWS_SECRET_KEY = '{secret_key}'
+        )"""
+        comment = "credentials gérés par Airflow aws_conn"
+    return f"""
+    CREATE OR REPLACE STAGE DVF_DB.DEV_BRONZE.{stage}
+        URL = '{url}'
+        {auth}
+        FILE_FORMAT = DVF_DB.DEV_BRONZE.{file_format}
+        COMMENT = 'Stage DVF — {comment}';
+    """
+
+
+class LoadingSession:
+    """
+    Exécute les instructions du groupe `loading` sur une seule connexion
+    (`conn` : connexion DB-API, ex. SnowflakeHook.get_conn()).
+    `statements` compte les allers-retours ; `applied` / `skipped` listent
+    les objets dont le DDL a été rejoué ou évité ; `last_query_id` est le
+    query id Snowflake de la dernière instruction (ex. JOB_ID de VALIDATE).
+    """
+
+    def __init__(self, conn, *, force: bool = False) -> None:
+        self.conn       = conn
+        self.force      = force
+        self.statements = 0
+        self.last_query_id: str | None = None
+        self.applied: list[str] = []
+        self.skipped: list[str] = []
+        self._fingerprints: dict[str, str] | None = None
+
+    def execute(self, sql: str, parameters: dict | None = None) -> list[dict]:
+        """Une instruction ; lignes résultat en dicts (colonnes en minuscules)."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, parameters)
+            self.statements += 1
+            self.last_query_id = getattr(cursor, "sfqid", None)
+            if not cursor.description:
+                return []
+            columns = [column[0].lower() for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def execute_script(self, sql: str) -> list[dict]:
+        """Script multi-instructions (découpage du connecteur Snowflake) ; lignes de la dernière."""
+        from snowflake.connector.util_text import split_statements
+
+        rows: list[dict] = []
+        for statement, _ in split_statements(StringIO(sql), remove_comments=True):
+            if statement.strip():
+                rows = self.execute(statement)
+        return rows
+
+    def fingerprints(self) -> dict[str, str]:
+        """Empreintes enregistrées (lues une fois par session)."""
+        if self._fingerprints is None:
+            try:
+                rows = self.execute(READ_FINGERPRINTS_SQL)
+            except Exception as exc:   # table absente (premier run) : DDL complet
+                logger.info("Empreintes DDL illisibles (%s) → DDL réappliqué", exc)
+                rows = []
+            self._fingerprints = {r["object_name"]: r["fingerprint"] for r in rows}
+        return self._fingerprints
+
+    def ensure(
+        self,
+        object_name: str,
+        sql: str,
+        *,
+        depends_on: tuple[str, ...] = (),
+        secrets: tuple[str, ...] = (),
+    ) -> bool:
+        """
+        Exécute `sql` si son empreinte (incluant celles de `depends_on`)
+        diffère de l'empreinte enregistrée pour `object_name`, puis
+        l'enregistre. Retourne True si le DDL a été rejoué.
+        `secrets` : valeurs masquées avant le calcul de l'empreinte et dans
+        l'erreur remontée si le DDL échoue (le SQL n'est jamais journalisé).
+        """
+        current = self.fingerprints()
+        expected = fingerprint(mask_secrets(sql, secrets), *(current.get(name, "") for name in depends_on))
+        if not self.force and current.get(object_name) == expected:
+            logger.info("DDL inchangé → ignoré : %s", object_name)
+            self.skipped.append(object_name)
+            return False
+        try:
+            self.execute_script(sql)
+        except Exception as exc:
+            if not secrets:
+                raise
+            # from None : ni le message d'origine ni le contexte ne portent le secret
+            raise RuntimeError(f"DDL en échec : {object_name} : {mask_secrets(str(exc), secrets)}") from None
+        self.execute(SAVE_FINGERPRINT_SQL, {"object_name": object_name, "fingerprint": expected})
+        current[object_name] = expected
+        self.applied.append(object_name)
+        logger.info("DDL appliqué : %s", object_name)
+        return True
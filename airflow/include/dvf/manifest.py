@@ -0,0 +1,175 @@
+"""
+Manifest d'ingestion DVF : détection des fichiers republiés par data.gouv.fr.
+
+Un objet JSON unique sur S3 (hors du préfixe chargé par COPY INTO) garde,
+pour chaque ressource, l'empreinte amont (checksum / last_modified de l'API
+dataset) et l'ETag / la taille de ce qui a été uploadé. Une année n'est
+re-téléchargée que si son empreinte amont a changé.
+
+Remplacement d'une version : le manifest est le pointeur. Chaque version
+est écrite sous son propre préfixe (`version_prefix`, dérivé de
+l'empreinte amont), jamais par-dessus la précédente ; la bascule est
+l'écriture du manifest, une fois tous les objets uploadés. Juste avant,
+les lignes Bronze de la version remplacée (`replaced_objects`) sont
+supprimées via `_source_file` (objet historique adopté : aussi les lignes
+sans lignage de son année, chargées avant `_source_file`) ; juste après, ses objets S3 le sont, avec
+les versions orphelines d'uploads interrompus (`orphan_keys`). Un échec
+en cours d'upload laisse donc l'ancienne version intacte et seule
+référencée.
+
+Silver (incrémental, MERGE sur mutation_id) ne conserve pas le fichier
+source : une ligne corrigée ou retirée par la republication y reste
+jusqu'au prochain `dbt run --full-refresh -s silver_mutation_f+`.
+
+Écrivain unique : seule la tâche `update_ingestion_manifest` écrit l'objet,
+après consolidation des résultats des instances mappées (pas de course).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_KEY     = "manifests/dvf_ingestion_manifest.json"
+MANIFEST_VERSION = 1
+
+# Actions décidées par plan_resources()
+ACTION_UNCHANGED = "unchanged"   # empreinte identique → aucun appel S3 / HTTP
+ACTION_CHANGED   = "changed"     # republication → download sous un nouveau préfixe de version
+ACTION_NEW       = "new"         # absente du manifest → skip si déjà sur S3 (adoption)
+
+# Répertoire de version sous le préfixe brut : <prefix><ressource>/v-<12 hex>/
+_VERSION_DIR_RE = re.compile(r"/v-[0-9a-f]{12}/")
+
+
+def resource_fingerprint(resource: dict) -> str:
+    """
+    Empreinte amont d'une ressource data.gouv.fr.
+    Le checksum (sha1) est prioritaire ; à défaut last_modified + filesize.
+    """
+    if resource.get("checksum"):
+        return f"checksum:{resource['checksum']}"
+    return f"modified:{resource.get('last_modified')}|size:{resource.get('filesize')}"
+
+
+def version_prefix(prefix: str, resource: dict) -> str:
+    """
+    Préfixe S3 d'une version amont d'une ressource :
+    real-raw/valeursfoncieres-2024/v-<sha1(empreinte)[:12]>/.
+    Déterministe : un retry réécrit la même version au même endroit.
+    """
+    stem = resource["zip_name"].lower().removesuffix(".zip").removesuffix(".txt")
+    digest = hashlib.sha1(resource_fingerprint(resource).encode("utf-8")).hexdigest()[:12]
+    return f"{prefix}{stem}/v-{digest}/"
+
+
+def is_versioned_key(key: str) -> bool:
+    """Vrai pour un objet écrit sous un préfixe de version (version_prefix)."""
+    return bool(_VERSION_DIR_RE.search(key))
+
+
+def empty_manifest() -> dict:
+    return {"version": MANIFEST_VERSION, "updated_at": None, "resources": {}}
+
+
+def load_manifest(client, bucket: str, key: str = MANIFEST_KEY) -> dict:
+    """Lit le manifest depuis S3 ; manifest vide s'il n'existe pas encore."""
+    try:
+        body = client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except client.exceptions.NoSuchKey:
+        logger.info("Manifest absent (s3://%s/%s) → premier run", bucket, key)
+        return empty_manifest()
+    return json.loads(body)
+
+
+def save_manifest(client, bucket: str, manifest: dict, key: str = MANIFEST_KEY) -> None:
+    """Écrit le manifest (PUT S3 = remplacement atomique de l'objet)."""
+    manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+    client.put_object(
+        Bucket      = bucket,
+        Key         = key,
+        Body        = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+        ContentType = "application/json",
+    )
+
+
+def plan_resources(resources: list[dict], manifest: dict) -> list[dict]:
+    """
+    Annote chaque ressource avec son empreinte et l'action à mener
+    (ACTION_UNCHANGED / ACTION_CHANGED / ACTION_NEW) par rapport au manifest.
+    """
+    known = manifest.get("resources", {})
+    planned = []
+    for resource in resources:
+        fingerprint = resource_fingerprint(resource)
+        entry = known.get(resource["zip_name"])
+        if entry is None:
+            action = ACTION_NEW
+        elif entry.get("fingerprint") == fingerprint:
+            action = ACTION_UNCHANGED
+        else:
+            action = ACTION_CHANGED
+        planned.append({**resource, "fingerprint": fingerprint, "action": action})
+    return planned
+
+
+def manifest_entry(resource: dict, objects: list[dict]) -> dict:
+    """
+    Entrée de manifest pour une ressource ingérée (ou adoptée).
+    `objects` : [{"key", "etag", "bytes"}] des objets S3 correspondants.
+    """
+    return {
+        "url":           resource["url"],
+        "fingerprint":   resource["fingerprint"],
+        "checksum":      resource.get("checksum"),
+        "last_modified": resource.get("last_modified"),
+        "filesize":      resource.get("filesize"),
+        "objects":       objects,
+        "ingested_at":   datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def merge_entries(manifest: dict, entries: dict[str, dict]) -> dict:
+    """Fusionne les entrées {zip_name: entry} dans le manifest (en place)."""
+    manifest.setdefault("resources", {}).update(entries)
+    return manifest
+
+
+def referenced_keys(manifest: dict) -> set[str]:
+    """Clés S3 des versions courantes (pointées par le manifest)."""
+    return {
+        obj["key"]
+        for entry in manifest.get("resources", {}).values()
+        for obj in entry.get("objects", [])
+    }
+
+
+def replaced_objects(manifest: dict, entries: dict[str, dict]) -> list[dict]:
+    """
+    Objets des versions que `entries` vont remplacer (à appeler avant
+    merge_entries) : [{"zip_name", "key", "etag", "bytes"}]. Une clé reprise
+    par la nouvelle version (adoption, même version) n'est pas retirée.
+    """
+    replaced = []
+    for zip_name, entry in entries.items():
+        previous = manifest.get("resources", {}).get(zip_name)
+        if not previous:
+            continue
+        kept = {obj["key"] for obj in entry.get("objects", [])}
+        replaced += [{"zip_name": zip_name, **obj} for obj in previous.get("objects", []) if obj["key"] not in kept]
+    return replaced
+
+
+def orphan_keys(manifest: dict, keys: list[str]) -> list[str]:
+    """
+    Objets de version non référencés par le manifest : uploads interrompus
+    ou versions remplacées. Les objets historiques (hors répertoire de
+    version) ne sont jamais considérés orphelins.
+    """
+    current = referenced_keys(manifest)
+    return sorted(k for k in keys if is_versioned_key(k) and k not in current)
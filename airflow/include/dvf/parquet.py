@@ -0,0 +1,326 @@
+"""
+Conversion DVF : TXT pipe-séparé → Parquet zstd partitionné (annee / département).
+
+Lecture en streaming (pyarrow.csv.open_csv, blocs de `block_size`), écriture
+d'un fichier Parquet par partition Hive `annee=YYYY/code_departement=XX/`.
+Les lignes sont tamponnées par partition et écrites par row groups ; le total
+tamponné est plafonné par `max_buffered_rows` (la plus grosse partition est
+vidée en premier), la mémoire reste donc bornée quelle que soit la taille du
+fichier source.
+
+Les valeurs restent des chaînes brutes (virgule décimale, dates JJ/MM/AAAA) :
+Bronze reste tout en VARCHAR, le contrat avec Silver est inchangé. Le gain
+vient du format colonne compressé (stockage S3, volume scanné par COPY).
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import re
+from pathlib import Path
+from typing import IO
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+BLOCK_SIZE        = 8 * 1024 * 1024   # Taille d'un bloc CSV lu par pyarrow
+ROW_GROUP_SIZE    = 100_000           # Lignes par row group Parquet
+MAX_BUFFERED_ROWS = 500_000           # Plafond global de lignes en attente d'écriture
+COMPRESSION       = "zstd"
+
+DATE_COLUMN       = "Date mutation"
+DEPT_COLUMN       = "Code departement"
+NULL_VALUES       = ["", "NULL", "null"]  # = NULL_IF du file format Snowflake
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+class _RawStream(io.RawIOBase):
+    """Adapte un flux `read(n)` (ex. StreamingBody boto3) en RawIOBase bufferisable."""
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._stream.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+class _PartitionWriters:
+    """Un ParquetWriter par partition, alimenté par des tampons bornés."""
+
+    def __init__(
+        self,
+        out_dir: Path,
+        schema,
+        basename: str,
+        row_group_size: int,
+        max_buffered_rows: int,
+    ) -> None:
+        self.out_dir = out_dir
+        self.schema = schema
+        self.basename = basename
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows
+        self.buffers: dict[tuple[str, str], list] = {}
+        self.buffered: dict[tuple[str, str], int] = {}
+        self.writers: dict[tuple[str, str], object] = {}
+        self.paths: dict[tuple[str, str], Path] = {}
+        self.rows: dict[tuple[str, str], int] = {}
+
+    def add(self, key: tuple[str, str], table) -> None:
+        self.buffers.setdefault(key, []).append(table)
+        self.buffered[key] = self.buffered.get(key, 0) + table.num_rows
+        if self.buffered[key] >= self.row_group_size:
+            self._flush(key)
+        while sum(self.buffered.values()) > self.max_buffered_rows:
+            self._flush(max(self.buffered, key=self.buffered.get))
+
+    def _flush(self, key: tuple[str, str]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = self.buffers.pop(key, [])
+        self.buffered.pop(key, None)
+        if not tables:
+            return
+        if key not in self.writers:
+            annee, dept = key
+            path = self.out_dir / f"annee={annee}" / f"code_departement={dept}" / f"{self.basename}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.writers[key] = pq.ParquetWriter(path, self.schema, compression=COMPRESSION)
+            self.paths[key] = path
+        table = pa.concat_tables(tables)
+        self.writers[key].write_table(table, row_group_size=self.row_group_size)
+        self.rows[key] = self.rows.get(key, 0) + table.num_rows
+
+    def close(self) -> list[dict]:
+        for key in list(self.buffers):
+            self._flush(key)
+        files = []
+        for key, writer in self.writers.items():
+            writer.close()
+            files.append({
+                "path": self.paths[key].relative_to(self.out_dir).as_posix(),
+                "rows": self.rows[key],
+            })
+        return sorted(files, key=lambda f: f["path"])
+
+
+def _trim_to_null(column):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    trimmed = pc.utf8_trim_whitespace(column)
+    return pc.if_else(pc.equal(trimmed, ""), pa.scalar(None, pa.string()), trimmed)
+
+
+def _partition_keys(batch, default_year: str):
+    """Clé `annee|departement` par ligne (année lue dans la date JJ/MM/AAAA)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    names = batch.schema.names
+    if DATE_COLUMN in names:
+        annee = pc.utf8_slice_codeunits(batch.column(DATE_COLUMN), 6, 10)
+        annee = pc.if_else(pc.equal(pc.utf8_length(annee), 4), annee, default_year)
+        annee = pc.fill_null(annee, default_year)
+    else:
+        annee = pa.array([default_year] * batch.num_rows, pa.string())
+    if DEPT_COLUMN in names:
+        dept = pc.fill_null(batch.column(DEPT_COLUMN), DEFAULT_PARTITION)
+    else:
+        dept = pa.array([DEFAULT_PARTITION] * batch.num_rows, pa.string())
+    return pc.binary_join_element_wise(annee, dept, "|")
+
+
+def convert_txt_to_parquet(
+    source: IO[bytes],
+    out_dir: str | Path,
+    *,
+    basename: str,
+    default_year: str,
+    block_size: int = BLOCK_SIZE,
+    row_group_size: int = ROW_GROUP_SIZE,
+    max_buffered_rows: int = MAX_BUFFERED_ROWS,
+) -> dict:
+    """
+    Convertit un fichier DVF pipe-séparé (flux binaire) en Parquet partitionné
+    sous `out_dir`. `default_year` sert de partition quand la date est absente.
+    Retourne {"rows", "rejected", "files": [{"path", "rows"}]}.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+
+    out_dir = Path(out_dir)
+    reader = source
+    if not hasattr(source, "peek"):
+        reader = io.BufferedReader(_RawStream(source), buffer_size=block_size)
+    header = reader.readline().decode("utf-8").rstrip("\r\n").split("|")
+    schema = pa.schema([(name, pa.string()) for name in header])
+
+    rejected = {"n": 0}
+
+    def _on_invalid_row(row) -> str:
+        # Équivalent ERROR_ON_COLUMN_COUNT_MISMATCH : la ligne est écartée et comptée
+        rejected["n"] += 1
+        return "skip"
+
+    batches = pa_csv.open_csv(
+        reader,
+        read_options    = pa_csv.ReadOptions(column_names=header, block_size=block_size),
+        parse_options   = pa_csv.ParseOptions(
+            delimiter           = "|",
+            quote_char          = '"',
+            invalid_row_handler = _on_invalid_row,
+        ),
+        convert_options = pa_csv.ConvertOptions(
+            column_types        = {name: pa.string() for name in header},
+            null_values         = NULL_VALUES,
+            strings_can_be_null = True,
+        ),
+    )
+
+    writers = _PartitionWriters(out_dir, schema, basename, row_group_size, max_buffered_rows)
+    total = 0
+    for batch in batches:
+        if batch.num_rows == 0:
+            continue
+        # Équivalent TRIM_SPACE = TRUE + EMPTY_FIELD_AS_NULL du COPY CSV
+        batch = pa.RecordBatch.from_arrays(
+            [_trim_to_null(col) for col in batch.columns], schema=schema,
+        )
+        keys = _partition_keys(batch, default_year)
+        order = pc.sort_indices(keys)
+        table = pa.Table.from_batches([batch]).take(order)
+        sorted_keys = keys.take(order)
+
+        # Après tri, chaque partition est une tranche contiguë du batch
+        offset = 0
+        for item in pc.value_counts(sorted_keys):
+            key, count = item["values"].as_py(), item["counts"].as_py()
+            annee, dept = key.split("|", 1)
+            writers.add((annee, dept), table.slice(offset, count))
+            offset += count
+        total += batch.num_rows
+
+    files = writers.close()
+    if rejected["n"]:
+        logger.warning("%s : %d lignes rejetées (nombre de colonnes invalide)", basename, rejected["n"])
+    logger.info("%s : %d lignes → %d fichiers Parquet", basename, total, len(files))
+    return {"rows": total, "rejected": rejected["n"], "files": files}
+
+
+# ─── S3 : TXT brut → Parquet partitionné ──────────────────────────────────────
+
+def source_basename(source_key: str) -> str:
+    """
+    Nom de base d'une source brute, sans extensions :
+    ValeursFoncieres-2024.txt → ValeursFoncieres-2024,
+    ValeursFoncieres-2024.txt.0003.gz → ValeursFoncieres-2024.0003.
+    Source sous un préfixe de version (include/dvf/manifest.py) : la version
+    est conservée (….0003.v-0123456789ab) → les Parquet de deux versions
+    ne partagent jamais un nom, le retrait de l'ancienne est sans ambiguïté.
+    """
+    name = source_key.rsplit("/", 1)[-1]
+    name = re.sub(r"[.](gz|zst)$", "", name, flags=re.IGNORECASE)
+    name = re.sub(r"[.]txt", "", name, count=1, flags=re.IGNORECASE)
+    version = re.search(r"/(v-[0-9a-f]{12})/", source_key)
+    return f"{name}.{version.group(1)}" if version else name
+
+
+def _marker_key(target_prefix: str, basename: str) -> str:
+    return f"{target_prefix}_converted/{basename}.json"
+
+
+def delete_converted(client, bucket: str, target_prefix: str, basename: str) -> list[str]:
+    """Supprime les fichiers Parquet et le marqueur d'une source retirée."""
+    paginator = client.get_paginator("list_objects_v2")
+    keys = [
+        o["Key"]
+        for page in paginator.paginate(Bucket=bucket, Prefix=target_prefix)
+        for o in page.get("Contents", [])
+        if o["Key"].endswith(f"/{basename}.parquet")
+    ]
+    for key in keys + [_marker_key(target_prefix, basename)]:
+        client.delete_object(Bucket=bucket, Key=key)
+    return keys
+
+
+def is_converted(client, bucket: str, target_prefix: str, basename: str, source_etag: str) -> bool:
+    """Vrai si le marqueur de conversion existe pour cet ETag source."""
+    import json
+
+    try:
+        body = client.get_object(Bucket=bucket, Key=_marker_key(target_prefix, basename))["Body"].read()
+    except client.exceptions.NoSuchKey:
+        return False
+    return json.loads(body).get("source_etag") == source_etag
+
+
+def convert_s3_object(
+    client,
+    bucket: str,
+    source_key: str,
+    target_prefix: str,
+    *,
+    default_year: str,
+    work_dir: str | Path,
+) -> dict:
+    """
+    Convertit s3://bucket/source_key en Parquet sous s3://bucket/target_prefix.
+    Les fichiers d'une source portent son nom de base : une reconversion
+    (republication) écrase ses propres fichiers puis supprime ceux devenus
+    obsolètes. Un marqueur `_converted/<source>.json` mémorise l'ETag source.
+    """
+    import json
+
+    from include.dvf.chunking import open_decompressed
+    from include.dvf.ingestion import multipart_upload
+
+    basename = source_basename(source_key)
+    obj = client.get_object(Bucket=bucket, Key=source_key)
+    source_etag = obj["ETag"].strip('"')
+
+    # Les chunks .gz / .zst (entête répété) se convertissent comme un fichier entier
+    with obj["Body"] as body, open_decompressed(body, source_key) as stream:
+        result = convert_txt_to_parquet(
+            stream, work_dir, basename=basename, default_year=default_year,
+        )
+
+    new_keys = set()
+    for f in result["files"]:
+        key = f"{target_prefix}{f['path']}"
+        with open(Path(work_dir) / f["path"], "rb") as fh:
+            multipart_upload(client, fh, bucket, key)
+        new_keys.add(key)
+
+    paginator = client.get_paginator("list_objects_v2")
+    stale = [
+        o["Key"]
+        for page in paginator.paginate(Bucket=bucket, Prefix=target_prefix)
+        for o in page.get("Contents", [])
+        if o["Key"].endswith(f"/{basename}.parquet") and o["Key"] not in new_keys
+    ]
+    for key in stale:
+        client.delete_object(Bucket=bucket, Key=key)
+
+    summary = {
+        "source_key":   source_key,
+        "source_etag":  source_etag,
+        "rows":         result["rows"],
+        "rejected":     result["rejected"],
+        "files":        len(result["files"]),
+        "stale_deleted":len(stale),
+    }
+    client.put_object(
+        Bucket = bucket,
+        Key    = _marker_key(target_prefix, basename),
+        Body   = json.dumps(summary).encode("utf-8"),
+    )
+    return summary
@@ -0,0 +1,106 @@
+"""
+Extraits de service : star schema → Parquet versionné → API locale.
+
+Après `quality`, les agrégats et dimensions du star schema sont déchargés
+(COPY INTO @stage … TYPE = PARQUET) sous une version immuable, puis
+publiés en écrivant le pointeur `CURRENT.json` en dernier :
+
+    s3://BUCKET/real-serving/
+        CURRENT.json                      ← version publiée (écrit en dernier)
+        20250105T020000/
+            agg_commune_type_bien/data_0_0_0.snappy.parquet
+            dim_geography/…
+
+L'API de lecture (`include/serving/api.py`) suit ce pointeur : un
+changement de version recharge les extraits et vide son cache. Les
+lectures ne réveillent plus DVF_WH.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime, timezone
+
+STAR_SCHEMA   = "DVF_DB.DEV_STAR"
+SERVING_STAGE = "DVF_DB.DEV_BRONZE.dvf_s3_serving_stage"
+CURRENT_KEY   = "CURRENT.json"
+
+# Tables publiées : dimensions + agrégats (pas fact_mutations, 17M lignes)
+SERVING_TABLES = (
+    "dim_date",
+    "dim_geography",
+    "dim_type_bien",
+    "dim_nature_mutation",
+    "agg_annuel_type_bien",
+    "agg_mensuel_type_bien",
+    "agg_departement_type_bien",
+    "agg_commune_type_bien",
+)
+
+_VERSION_RE = re.compile(r"^\d{8}T\d{6}$")
+
+
+def serving_version(logical_date: datetime) -> str:
+    """
+    Version publiée : `YYYYMMDDTHHMMSS` de la date logique du run.
+    Stable d'un retry à l'autre (le déchargement réécrit la même version).
+    """
+    return f"{logical_date.astimezone(timezone.utc):%Y%m%dT%H%M%S}"
+
+
+def is_version(name: str) -> bool:
+    return bool(_VERSION_RE.match(name))
+
+
+def unload_sql(table: str, version: str, stage: str = SERVING_STAGE, schema: str = STAR_SCHEMA) -> str:
+    """COPY INTO de déchargement d'une table vers `@stage/<version>/<table>/`."""
+    if table not in SERVING_TABLES:
+        raise ValueError(f"Table non publiable : {table}")
+    return f"""
+COPY INTO @{stage}/{version}/{table}/
+FROM {schema}.{table}
+FILE_FORMAT = (TYPE = PARQUET COMPRESSION = SNAPPY)
+HEADER      = TRUE
+OVERWRITE   = TRUE
+"""
+
+
+def summarize_unload(rows: list[dict]) -> dict:
+    """Résume le résultat d'un COPY de déchargement (`rows_unloaded`, `output_bytes`)."""
+    rows_unloaded, output_bytes = 0, 0
+    for row in rows or []:
+        row = {k.lower(): v for k, v in row.items()}
+        rows_unloaded += row.get("rows_unloaded") or 0
+        output_bytes  += row.get("output_bytes") or 0
+    return {"rows": rows_unloaded, "bytes": output_bytes}
+
+
+def publication(version: str, tables: dict[str, dict], dag_run_id: str | None = None,
+                published_at: datetime | None = None) -> dict:
+    """Contenu de CURRENT.json pour une version entièrement déchargée."""
+    published_at = published_at or datetime.now(timezone.utc)
+    return {
+        "version":      version,
+        "published_at": published_at.isoformat(timespec="seconds"),
+        "dag_run_id":   dag_run_id,
+        "tables":       {name: tables[name] for name in sorted(tables)},
+    }
+
+
+def parse_publication(raw: bytes | str) -> dict:
+    """Lit CURRENT.json ; lève ValueError si le pointeur est incohérent."""
+    current = json.loads(raw)
+    if not is_version(current.get("version", "")) or not current.get("tables"):
+        raise ValueError(f"{CURRENT_KEY} invalide : {current!r}")
+    return current
+
+
+def stale_versions(versions: list[str], current: str, keep: int) -> list[str]:
+    """
+    Versions à supprimer : toutes sauf les `keep` plus récentes, la version
+    courante étant toujours conservée (un lecteur peut encore la charger).
+    """
+    ordered = sorted((v for v in versions if is_version(v)), reverse=True)
+    kept = set(ordered[:max(keep, 1)]) | {current}
+    return sorted(v for v in ordered if v not in kept)
@@ -0,0 +1,181 @@
+"""
+Télémétrie de performance par tâche (dvf_production_pipeline).
+
+Posée en callbacks de tâche (default_args) : couvre tous les TaskGroups sans
+modifier le code des tâches.
+    - on_execute_callback : départ du chronomètre, remise à zéro des métriques
+    - on_success_callback / on_failure_callback : émission
+
+Métriques émises (préfixe `dvf.`, tags dag_id / task_id / map_index / status) :
+    dvf.task.<task_id>.duration          temps mur (timing)
+    dvf.task.<task_id>.peak_rss_bytes    pic RSS du process de la tâche
+    dvf.task.<task_id>.<métrique>        compteurs déclarés par la tâche via
+                                         `record()` (octets, lignes COPY, …)
+    dvf.dbt.<type>.<nom>.execution_time  temps par modèle / seed, lu dans
+                                         run_results.json (tâches dbt)
+
+Export :
+    - Airflow Stats : StatsD, DogStatsD ou OpenTelemetry selon la section
+      [metrics] (AIRFLOW__METRICS__STATSD_ON / OTEL_ON, …) ; no-op sinon.
+    - Fichier JSON Lines si DVF_TELEMETRY_FILE est défini (test local,
+      lecture directe par DuckDB : read_json('metrics.jsonl')).
+
+La télémétrie n'échoue jamais une tâche : toute erreur d'export est loggée.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX      = "dvf"
+TELEMETRY_FILE     = os.getenv("DVF_TELEMETRY_FILE", "")
+DBT_RESOURCE_TYPES = ("model", "seed", "snapshot")
+
+# État du process de la tâche (les callbacks tournent dans le même process)
+_started_at: float | None = None
+_recorded: dict[str, float] = {}
+
+
+def record(**metrics: float) -> None:
+    """Déclare des compteurs de la tâche courante (émis au succès / à l'échec)."""
+    _recorded.update({k: v for k, v in metrics.items() if v is not None})
+
+
+def peak_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """Pic RSS du process (ou de ses enfants terminés) ; ru_maxrss en Kio sous Linux."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def dbt_node_timings(run_results: dict, since: datetime | None = None) -> list[dict]:
+    """
+    Temps d'exécution par nœud dbt (modèles, seeds, snapshots) d'un
+    run_results.json. Un fichier généré avant `since` (run précédent,
+    commande sans résultat comme `dbt deps`) est ignoré.
+    """
+    generated_at = run_results.get("metadata", {}).get("generated_at")
+    if since and generated_at:
+        generated = datetime.fromisoformat(generated_at.replace("Z", "+00:00"))
+        if generated.tzinfo is None:
+            generated = generated.replace(tzinfo=timezone.utc)
+        if generated < since:
+            return []
+
+    timings = []
+    for result in run_results.get("results", []):
+        # unique_id = <type>.<projet>.<nom> (ex. model.real_estate_analytics.silver_mutation_f)
+        parts = result.get("unique_id", "").split(".")
+        resource_type, name = parts[0], parts[-1]
+        if resource_type not in DBT_RESOURCE_TYPES:
+            continue
+        timings.append({
+            "resource_type":  resource_type,
+            "name":           name,
+            "status":         result.get("status"),
+            "execution_time": float(result.get("execution_time") or 0.0),
+        })
+    return timings
+
+
+def collect_task_metrics(context, status: str, dbt_run_results: str | Path | None = None) -> list[dict]:
+    """
+    Métriques de la tâche courante : [{"name", "type", "value", "tags"}].
+    type = "timing" (secondes) ou "gauge".
+    """
+    ti = context["ti"]
+    task_id = ti.task_id
+    tags = {
+        "dag_id":    ti.dag_id,
+        "task_id":   task_id,
+        "map_index": str(getattr(ti, "map_index", -1)),
+        "status":    status,
+    }
+
+    start_date = getattr(ti, "start_date", None)
+    if _started_at is not None:
+        duration = time.perf_counter() - _started_at
+    elif start_date:
+        duration = (datetime.now(timezone.utc) - start_date).total_seconds()
+    else:
+        duration = None
+
+    prefix = f"{METRIC_PREFIX}.task.{task_id}"
+    metrics = []
+    if duration is not None:
+        metrics.append({"name": f"{prefix}.duration", "type": "timing", "value": duration, "tags": tags})
+    metrics.append({"name": f"{prefix}.peak_rss_bytes", "type": "gauge", "value": peak_rss_bytes(), "tags": tags})
+    children_rss = peak_rss_bytes(resource.RUSAGE_CHILDREN)
+    if children_rss:
+        # Sous-process (dbt lancé par BashOperator)
+        metrics.append({"name": f"{prefix}.children_peak_rss_bytes", "type": "gauge",
+                        "value": children_rss, "tags": tags})
+    for key, value in sorted(_recorded.items()):
+        metrics.append({"name": f"{prefix}.{key}", "type": "gauge", "value": value, "tags": tags})
+
+    if dbt_run_results and Path(dbt_run_results).exists():
+        run_results = json.loads(Path(dbt_run_results).read_text())
+        for node in dbt_node_timings(run_results, since=start_date):
+            metrics.append({
+                "name":  f"{METRIC_PREFIX}.dbt.{node['resource_type']}.{node['name']}.execution_time",
+                "type":  "timing",
+                "value": node["execution_time"],
+                "tags":  {**tags, "dbt_status": str(node["status"])},
+            })
+    return metrics
+
+
+def export_to_airflow_stats(metrics: list[dict]) -> None:
+    """StatsD / DogStatsD / OpenTelemetry selon la configuration [metrics] d'Airflow."""
+    from airflow.stats import Stats
+
+    for m in metrics:
+        if m["type"] == "timing":
+            Stats.timing(m["name"], timedelta(seconds=m["value"]), tags=m["tags"])
+        else:
+            Stats.gauge(m["name"], m["value"], tags=m["tags"])
+
+
+def export_to_file(metrics: list[dict], path: str | Path) -> None:
+    """Ajoute les métriques en JSON Lines (1 ligne par métrique, horodatée)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now(timezone.utc).isoformat()
+    with open(path, "a", encoding="utf-8") as f:
+        for m in metrics:
+            f.write(json.dumps({"ts": ts, **m}) + "\n")
+
+
+def emit_task_metrics(context, status: str, dbt_run_results: str | Path | None = None) -> None:
+    """Collecte et exporte les métriques de la tâche ; ne lève jamais."""
+    try:
+        metrics = collect_task_metrics(context, status, dbt_run_results=dbt_run_results)
+        export_to_airflow_stats(metrics)
+        if TELEMETRY_FILE:
+            export_to_file(metrics, TELEMETRY_FILE)
+    except Exception:
+        logger.warning("Télémétrie non émise pour %s", context["ti"].task_id, exc_info=True)
+
+
+# ─── Callbacks ────────────────────────────────────────────────────────────────
+
+def on_execute_callback(context) -> None:
+    global _started_at
+    _started_at = time.perf_counter()
+    _recorded.clear()
+
+
+def on_success_callback(context) -> None:
+    emit_task_metrics(context, "success")
+
+
+def on_failure_callback(context) -> None:
+    emit_task_metrics(context, "failed")
@@ -0,0 +1,134 @@
+"""
+Trigger différable : republication du dataset DVF sur data.gouv.fr.
+
+Exécuté par le triggerer (boucle asyncio, aiohttp) : entre deux
+interrogations de l'API dataset, aucun slot worker n'est occupé.
+Attaché à un Asset par un AssetWatcher, chaque TriggerEvent devient un
+événement d'asset qui déclenche le DAG de production.
+
+Référence : le manifest d'ingestion S3 (include/dvf/manifest.py), écrit
+par le DAG après chaque ingestion. Une ressource dont l'empreinte amont
+(checksum / last_modified) diffère du manifest est « en attente ». Cet état
+est persistant : un redémarrage du triggerer ne rejoue pas une
+publication déjà ingérée et ne manque pas une publication survenue
+pendant l'arrêt. En mémoire, une même liste de ressources en attente
+n'est émise qu'une fois (le run déclenché met à jour le manifest).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator
+
+from airflow.triggers.base import BaseEventTrigger, TriggerEvent
+
+from include.dvf.ingestion import API_TIMEOUT, parse_dvf_resources
+from include.dvf.manifest import ACTION_UNCHANGED, MANIFEST_KEY, empty_manifest, load_manifest, plan_resources
+
+POLL_INTERVAL = 3600   # 1 interrogation de l'API par heure
+
+
+def pending_updates(resources: list[dict], manifest: dict) -> list[dict]:
+    """Ressources nouvelles ou republiées par rapport au manifest d'ingestion."""
+    return [r for r in plan_resources(resources, manifest) if r["action"] != ACTION_UNCHANGED]
+
+
+def updates_fingerprint(pending: list[dict]) -> str:
+    """Empreinte stable d'un ensemble de ressources en attente (ordre indifférent)."""
+    digest = hashlib.sha1()
+    for zip_name, fingerprint in sorted((r["zip_name"], r["fingerprint"]) for r in pending):
+        digest.update(f"{zip_name}={fingerprint}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def update_payload(pending: list[dict]) -> dict:
+    """Payload JSON de l'événement (extra de l'événement d'asset)."""
+    return {
+        "fingerprint": updates_fingerprint(pending),
+        "resources": [
+            {"zip_name": r["zip_name"], "last_modified": r.get("last_modified"), "action": r["action"]}
+            for r in sorted(pending, key=lambda r: r["zip_name"])
+        ],
+    }
+
+
+async def fetch_dvf_resources(session, api_url: str) -> list[dict]:
+    """Ressources DVF de l'API dataset (session aiohttp, timeout porté par la session)."""
+    async with session.get(api_url) as response:
+        response.raise_for_status()
+        return parse_dvf_resources(await response.json())
+
+
+class DvfDatasetUpdateTrigger(BaseEventTrigger):
+    """
+    Interroge l'API dataset toutes les `poll_interval` secondes et émet un
+    événement quand des ressources sont nouvelles ou republiées par rapport
+    au manifest s3://`bucket`/`manifest_key` (sans bucket : manifest vide,
+    toute ressource est en attente — usage local / tests).
+
+    Une erreur d'interrogation (HTTP, S3, JSON) est journalisée puis retentée
+    à l'intervalle suivant : le trigger ne s'arrête pas.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        *,
+        bucket: str | None = None,
+        manifest_key: str = MANIFEST_KEY,
+        aws_conn_id: str | None = None,
+        poll_interval: float = POLL_INTERVAL,
+        timeout: float = API_TIMEOUT,
+    ) -> None:
+        super().__init__()
+        self.api_url       = api_url
+        self.bucket        = bucket
+        self.manifest_key  = manifest_key
+        self.aws_conn_id   = aws_conn_id
+        self.poll_interval = poll_interval
+        self.timeout       = timeout
+
+    def serialize(self) -> tuple[str, dict[str, Any]]:
+        return (
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            {
+                "api_url":       self.api_url,
+                "bucket":        self.bucket,
+                "manifest_key":  self.manifest_key,
+                "aws_conn_id":   self.aws_conn_id,
+                "poll_interval": self.poll_interval,
+                "timeout":       self.timeout,
+            },
+        )
+
+    def _read_manifest(self) -> dict:
+        """Lecture synchrone du manifest (S3Hook), exécutée hors de la boucle."""
+        from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+
+        return load_manifest(S3Hook(aws_conn_id=self.aws_conn_id).get_conn(), self.bucket, self.manifest_key)
+
+    async def _manifest(self) -> dict:
+        if self.bucket is None:
+            return empty_manifest()
+        from asgiref.sync import sync_to_async
+
+        return await sync_to_async(self._read_manifest)()
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        import aiohttp
+
+        emitted = None
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            while True:
+                try:
+                    pending = pending_updates(await fetch_dvf_resources(session, self.api_url), await self._manifest())
+                except Exception as exc:   # réseau, S3, réponse invalide : nouvel essai au prochain intervalle
+                    self.log.warning("Interrogation de %s en échec : %s", self.api_url, exc)
+                else:
+                    payload = update_payload(pending)
+                    if pending and payload["fingerprint"] != emitted:
+                        emitted = payload["fingerprint"]
+                        self.log.info("Publication DVF détectée : %s", [r["zip_name"] for r in payload["resources"]])
+                        yield TriggerEvent(payload)
+                await asyncio.sleep(self.poll_interval)
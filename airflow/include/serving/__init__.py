@@ -0,0 +1 @@
+"""API de lecture locale des extraits Parquet du star schema (hors Airflow)."""
@@ -0,0 +1,551 @@
+"""
+API de lecture DVF : extraits Parquet du star schema servis par DuckDB.
+
+Service HTTP en lecture seule, sans Snowflake : les extraits publiés par la
+tâche `serving` du DAG (include/dvf/serving.py) sont chargés en mémoire dans
+DuckDB ; les résultats sont mis en cache (LRU + TTL). Le pointeur
+CURRENT.json est relu toutes les `--refresh` secondes : une nouvelle version
+recharge les tables puis vide le cache.
+
+Usage :
+    python -m include.serving.api serve --source s3://BUCKET/real-serving/ --port 8080
+    python -m include.serving.api serve --source /data/real-serving
+    python -m include.serving.api export --database target/dvf_local.duckdb --out /data/real-serving
+
+Endpoints (GET, JSON) :
+    /prix-m2/commune?commune=lyon[&code_postal=69003][&type=appartement][&annee=2024]
+    /volume-mensuel[?type=maison][&debut=2023-01][&fin=2024-12]
+    /departements/classement[?annee=2024][&type=appartement][&critere=prix_m2_moyen][&limite=20]
+    /sante
+
+Dépendances : duckdb (absent de l'image Airflow), boto3 pour une source S3.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from include.dvf.serving import (
+    CURRENT_KEY,
+    SERVING_TABLES,
+    parse_publication,
+    publication,
+    serving_version,
+)
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+CACHE_MAX_ENTRIES = 4096
+CACHE_TTL_SECONDS = 300
+REFRESH_SECONDS   = 30
+MAX_LIMIT         = 200
+LOCAL_CACHE_DIR   = Path("/tmp/dvf_serving")
+
+# Index DuckDB (ART) des colonnes de recherche ponctuelle
+INDEXES = {
+    "agg_commune_type_bien": ("commune",),
+}
+
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})$")
+_MISS = object()
+
+
+class ParamError(ValueError):
+    """Paramètre de requête invalide (→ HTTP 400)."""
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Cache de résultats
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ResultCache:
+    """
+    Cache LRU borné en entrées, chaque entrée expirant après `ttl_seconds`.
+    Vidé entièrement à chaque nouvelle version publiée (`clear`).
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS,
+                 clock=time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries":   len(self._entries),
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Sources de publication (dossier local ou S3)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class LocalPublications:
+    """Publications dans un dossier local (même layout que le préfixe S3)."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def current(self) -> dict | None:
+        path = self.root / CURRENT_KEY
+        return parse_publication(path.read_bytes()) if path.exists() else None
+
+    def materialize(self, current: dict) -> Path:
+        return self.root / current["version"]
+
+    def prune(self, keep_version: str) -> None:
+        """Les versions locales appartiennent au producteur : rien à supprimer."""
+
+
+class S3Publications:
+    """Publications sur S3, copiées une fois par version dans `cache_dir`."""
+
+    def __init__(self, url: str, cache_dir: Path = LOCAL_CACHE_DIR, client=None) -> None:
+        parts = urlsplit(url)
+        self.bucket = parts.netloc
+        self.prefix = parts.path.lstrip("/")
+        if self.prefix and not self.prefix.endswith("/"):
+            self.prefix += "/"
+        self.cache_dir = Path(cache_dir)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client("s3")
+        return self._client
+
+    def current(self) -> dict | None:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{CURRENT_KEY}")["Body"]
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return parse_publication(body.read())
+
+    def materialize(self, current: dict) -> Path:
+        version_prefix = f"{self.prefix}{current['version']}/"
+        target = self.cache_dir / current["version"]
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=version_prefix):
+            for obj in page.get("Contents", []):
+                local = target / obj["Key"][len(version_prefix):]
+                if local.exists() and local.stat().st_size == obj["Size"]:
+                    continue
+                local.parent.mkdir(parents=True, exist_ok=True)
+                partial = local.with_name(local.name + ".part")
+                self.client.download_file(self.bucket, obj["Key"], str(partial))
+                partial.replace(local)
+        return target
+
+    def prune(self, keep_version: str) -> None:
+        """Tables chargées en mémoire : les copies des autres versions sont inutiles."""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.iterdir():
+            if path.is_dir() and path.name != keep_version:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def open_source(source: str, cache_dir: Path = LOCAL_CACHE_DIR):
+    if source.startswith("s3://"):
+        return S3Publications(source, cache_dir)
+    return LocalPublications(Path(source))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Extraits chargés dans DuckDB
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ExtractStore:
+    """
+    Tables de la version publiée, chargées dans une base DuckDB en mémoire.
+    Une nouvelle version est chargée à côté puis substituée d'un bloc : les
+    requêtes en cours finissent sur l'ancienne.
+    """
+
+    def __init__(self) -> None:
+        self._con = None
+        self._lock = threading.Lock()
+        self.version: str | None = None
+        self.loaded_at: str | None = None
+        self.rows: dict[str, int] = {}
+
+    def load(self, directory: Path, current: dict) -> None:
+        import duckdb
+
+        con = duckdb.connect(":memory:")
+        rows = {}
+        for table in current["tables"]:
+            if table not in SERVING_TABLES:
+                continue
+            files = str(Path(directory) / table / "*.parquet").replace("'", "''")
+            con.execute(f"CREATE TABLE {table} AS SELECT * FROM read_parquet('{files}')")
+            rows[table] = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for column in INDEXES.get(table, ()):
+                con.execute(f"CREATE INDEX idx_{table}_{column} ON {table} ({column})")
+        with self._lock:
+            self._con = con
+            self.version = current["version"]
+            self.loaded_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            self.rows = rows
+        logger.info("Extraits %s chargés : %s", current["version"], rows)
+
+    def query(self, sql: str, params: list) -> list[dict]:
+        with self._lock:
+            con = self._con
+        if con is None:
+            raise LookupError("aucune version publiée chargée")
+        cursor = con.cursor()
+        try:
+            cursor.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            return [dict(zip(columns, map(_json_value, row))) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Requêtes (paramètres → SQL paramétré)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _type_filter(params: dict, sql: list[str], args: list) -> None:
+    if params.get("type"):
+        sql.append("AND (t.type_local = lower(?) OR lower(t.libelle) = lower(?))")
+        args += [params["type"], params["type"]]
+
+
+def _int_param(params: dict, name: str, default=None, low=None, high=None):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ParamError(f"{name} doit être un entier : {raw!r}") from None
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ParamError(f"{name} hors bornes [{low}, {high}] : {value}")
+    return value
+
+
+def _month_param(params: dict, name: str) -> date | None:
+    raw = params.get(name)
+    if not raw:
+        return None
+    match = _MONTH_RE.match(raw)
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ParamError(f"{name} attendu au format AAAA-MM : {raw!r}")
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def prix_m2_commune(params: dict) -> tuple[str, list]:
+    """Prix au m², prix moyen / médian et volume d'une commune, par type et année."""
+    if not params.get("commune"):
+        raise ParamError("paramètre commune requis")
+    sql = ["""
+        SELECT a.commune, a.code_postal, a.code_departement, t.libelle AS type_bien, a.annee,
+               a.nb_transactions, a.prix_m2_moyen, a.prix_moyen, a.prix_median
+        FROM agg_commune_type_bien a
+        JOIN dim_type_bien t USING (type_bien_key)
+        WHERE a.commune = lower(?)"""]
+    args = [params["commune"]]
+    if params.get("code_postal"):
+        sql.append("AND a.code_postal = ?")
+        args.append(params["code_postal"])
+    _type_filter(params, sql, args)
+    annee = _int_param(params, "annee")
+    if annee is not None:
+        sql.append("AND a.annee = ?")
+        args.append(annee)
+    sql.append("ORDER BY a.annee, t.ordre_affichage, a.code_postal")
+    return "\n".join(sql), args
+
+
+def volume_mensuel(params: dict) -> tuple[str, list]:
+    """Série mensuelle : transactions, volume financier, prix moyen."""
+    sql = ["""
+        SELECT a.mois,
+               SUM(a.nb_transactions)                                AS nb_transactions,
+               SUM(a.volume_financier)                               AS volume_financier,
+               SUM(a.volume_financier) / NULLIF(SUM(a.nb_ventes), 0) AS prix_moyen
+        FROM agg_mensuel_type_bien a
+        JOIN dim_type_bien t USING (type_bien_key)
+        WHERE TRUE"""]
+    args: list = []
+    _type_filter(params, sql, args)
+    for name, operator in (("debut", ">="), ("fin", "<=")):
+        month = _month_param(params, name)
+        if month is not None:
+            sql.append(f"AND a.mois {operator} ?")
+            args.append(month)
+    sql.append("GROUP BY a.mois ORDER BY a.mois")
+    return "\n".join(sql), args
+
+
+# Critères de classement : par type de bien, ou tous types confondus (additifs)
+RANKING_BY_TYPE = ("prix_m2_moyen", "prix_moyen", "prix_median", "nb_transactions",
+                   "volume_financier", "variation_prix_yoy_pct")
+RANKING_ALL_TYPES = ("nb_transactions", "volume_financier", "prix_moyen")
+
+
+def classement_departements(params: dict) -> tuple[str, list]:
+    """Classement des départements d'une année (la plus récente par défaut)."""
+    by_type = bool(params.get("type"))
+    allowed = RANKING_BY_TYPE if by_type else RANKING_ALL_TYPES
+    critere = params.get("critere") or ("prix_m2_moyen" if by_type else "nb_transactions")
+    if critere not in allowed:
+        raise ParamError(f"critere parmi {', '.join(allowed)}" + ("" if by_type else " (sans type)"))
+    limite = _int_param(params, "limite", default=20, low=1, high=MAX_LIMIT)
+    annee = _int_param(params, "annee")
+
+    if by_type:
+        metrics = "a." + ", a.".join(RANKING_BY_TYPE)
+        group_by = ""
+    else:
+        metrics = """SUM(a.nb_transactions)                                AS nb_transactions,
+               SUM(a.volume_financier)                               AS volume_financier,
+               SUM(a.volume_financier) / NULLIF(SUM(a.nb_ventes), 0) AS prix_moyen"""
+        group_by = "GROUP BY a.code_departement, a.nom_departement, a.region, a.annee"
+    sql = [f"""
+        WITH base AS (
+            SELECT a.code_departement, a.nom_departement, a.region, a.annee,
+               {metrics}
+            FROM agg_departement_type_bien a
+            JOIN dim_type_bien t USING (type_bien_key)
+            WHERE a.annee = COALESCE(?, (SELECT MAX(annee) FROM agg_departement_type_bien))"""]
+    args: list = [annee]
+    _type_filter(params, sql, args)
+    sql.append(f"""{group_by}
+        )
+        SELECT RANK() OVER (ORDER BY {critere} DESC NULLS LAST) AS rang, *
+        FROM base
+        ORDER BY rang, code_departement
+        LIMIT ?""")
+    args.append(limite)
+    return "\n".join(sql), args
+
+
+ROUTES = {
+    "/prix-m2/commune":         prix_m2_commune,
+    "/volume-mensuel":          volume_mensuel,
+    "/departements/classement": classement_departements,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Application
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ServingApp:
+    """Routage, cache et suivi des publications (indépendant du serveur HTTP)."""
+
+    def __init__(self, source, cache: ResultCache | None = None, store: ExtractStore | None = None) -> None:
+        self.source = source
+        self.cache = cache or ResultCache()
+        self.store = store or ExtractStore()
+
+    def refresh(self) -> bool:
+        """Charge la version publiée si elle a changé ; True si rechargée."""
+        current = self.source.current()
+        if current is None or current["version"] == self.store.version:
+            return False
+        self.store.load(self.source.materialize(current), current)
+        self.cache.clear()
+        self.source.prune(current["version"])
+        return True
+
+    def handle(self, path: str, params: dict) -> tuple[int, dict | list, dict]:
+        """(statut HTTP, corps JSON, en-têtes) d'une requête GET."""
+        if path == "/sante":
+            return 200, {
+                "version":   self.store.version,
+                "loaded_at": self.store.loaded_at,
+                "rows":      self.store.rows,
+                "cache":     self.cache.stats(),
+            }, {}
+        route = ROUTES.get(path)
+        if route is None:
+            return 404, {"error": f"endpoint inconnu : {path}", "endpoints": sorted(ROUTES)}, {}
+        if self.store.version is None:
+            return 503, {"error": "aucune version publiée chargée"}, {}
+
+        version = self.store.version
+        key = (version, path, tuple(sorted(params.items())))
+        headers = {"X-Serving-Version": version}
+        cached = self.cache.get(key)
+        if cached is not _MISS:
+            return 200, cached, {**headers, "X-Cache": "HIT"}
+        try:
+            sql, args = route(params)
+        except ParamError as exc:
+            return 400, {"error": str(exc)}, headers
+        started = time.perf_counter()
+        rows = self.store.query(sql, args)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.cache.put(key, rows)
+        return 200, rows, {**headers, "X-Cache": "MISS", "Server-Timing": f"duckdb;dur={elapsed_ms:.2f}"}
+
+    def run_refresher(self, interval: float, stop: threading.Event) -> None:
+        while not stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception:   # la version chargée continue d'être servie
+                logger.exception("Échec du rechargement des extraits")
+
+
+def make_handler(app: ServingApp):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "dvf-serving/1.0"
+
+        def do_GET(self) -> None:  # noqa: N802 (API BaseHTTPRequestHandler)
+            url = urlsplit(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                status, body, headers = app.handle(url.path.rstrip("/") or "/", params)
+            except Exception:
+                logger.exception("Erreur sur %s", self.path)
+                status, body, headers = 500, {"error": "erreur interne"}, {}
+            payload = json.dumps(body, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, fmt: str, *args) -> None:
+            logger.debug("%s - %s", self.address_string(), fmt % args)
+
+    return Handler
+
+
+def serve(app: ServingApp, host: str, port: int, refresh_seconds: float) -> None:
+    app.refresh()
+    stop = threading.Event()
+    threading.Thread(target=app.run_refresher, args=(refresh_seconds, stop), daemon=True).start()
+    server = ThreadingHTTPServer((host, port), make_handler(app))
+    logger.info("API DVF sur http://%s:%d (version %s)", host, port, app.store.version)
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Export local (target dbt DuckDB → même layout que la publication S3)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def export_duckdb(database: Path, out_root: Path, schema: str = "DEV_STAR", version: str | None = None) -> dict:
+    """
+    Publie les tables du star schema d'une base dbt DuckDB (target `duckdb`)
+    dans `out_root`, au layout de la tâche `serving` : version puis CURRENT.json.
+    """
+    import duckdb
+
+    version = version or serving_version(datetime.now(timezone.utc))
+    con = duckdb.connect(str(database), read_only=True)
+    tables = {}
+    for table in SERVING_TABLES:
+        out_dir = Path(out_root) / version / table
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out_file = out_dir / "data_0_0_0.snappy.parquet"
+        con.execute(f"COPY (SELECT * FROM {schema}.{table}) TO '{out_file}' (FORMAT PARQUET, COMPRESSION SNAPPY)")
+        rows = con.execute(f"SELECT COUNT(*) FROM {schema}.{table}").fetchone()[0]
+        tables[table] = {"rows": rows, "bytes": out_file.stat().st_size}
+    con.close()
+
+    current = publication(version, tables)
+    pointer = Path(out_root) / CURRENT_KEY
+    partial = pointer.with_suffix(".json.part")
+    partial.write_text(json.dumps(current, indent=2))
+    os.replace(partial, pointer)
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = commands.add_parser("serve", help="Servir la version publiée")
+    serve_cmd.add_argument("--source", required=True, help="s3://bucket/prefix/ ou dossier local")
+    serve_cmd.add_argument("--host", default="0.0.0.0")
+    serve_cmd.add_argument("--port", type=int, default=8080)
+    serve_cmd.add_argument("--cache-size", type=int, default=CACHE_MAX_ENTRIES)
+    serve_cmd.add_argument("--cache-ttl", type=float, default=CACHE_TTL_SECONDS, help="secondes")
+    serve_cmd.add_argument("--refresh", type=float, default=REFRESH_SECONDS, help="secondes entre 2 lectures de CURRENT.json")
+    serve_cmd.add_argument("--cache-dir", type=Path, default=LOCAL_CACHE_DIR, help="copie locale d'une source S3")
+
+    export_cmd = commands.add_parser("export", help="Publier depuis une base dbt DuckDB")
+    export_cmd.add_argument("--database", type=Path, required=True)
+    export_cmd.add_argument("--out", type=Path, required=True)
+    export_cmd.add_argument("--schema", default="DEV_STAR")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "export":
+        current = export_duckdb(args.database, args.out, schema=args.schema)
+        print(json.dumps(current, indent=2))
+        return
+    app = ServingApp(open_source(args.source, args.cache_dir), ResultCache(args.cache_size, args.cache_ttl))
+    serve(app, args.host, args.port, args.refresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 -- Script : 01_create_snowflake_objects.sql
 -- Description : Création idempotente des objets Snowflake nécessaires
 --               au pipeline DVF (schemas, file format, table bronze).
--- Exécution  : Une seule fois au démarrage du pipeline (idempotent).
+-- Exécution  : Par le groupe loading quand le script change (empreinte
+--              dans DEV_BRONZE.ddl_fingerprints) ; idempotent.
 -- Prérequis  : Rôle DVF_BI_ROLE avec CREATE SCHEMA / TABLE sur DVF_DB.
 -- ============================================================
 
@@ -18,8 +19,10 @@ CREATE SCHEMA IF NOT EXISTS DEV_STAR   COMMENT = 'Star Schema : optimisé Power
 
 -- ─── File Format ─────────────────────────────────────────────────────────────
 -- Fichiers DVF : pipe-separated, UTF-8, 1 ligne d'entête
+-- (fichiers entiers non compressés ou chunks .gz / .zst → COMPRESSION AUTO)
 CREATE FILE FORMAT IF NOT EXISTS DEV_BRONZE.dvf_csv_format
     TYPE                         = 'CSV'
+    COMPRESSION                  = 'AUTO'
     FIELD_DELIMITER              = '|'
     RECORD_DELIMITER             = '\n'
     SKIP_HEADER                  = 1
@@ -31,6 +34,13 @@ CREATE FILE FORMAT IF NOT EXISTS DEV_BRONZE.dvf_csv_format
     ERROR_ON_COLUMN_COUNT_MISMATCH = FALSE
     COMMENT = 'Format fichiers DVF (data.gouv.fr) — pipe-separated UTF-8';
 
+-- Fichiers DVF convertis en Parquet (optionnel, DVF_PARQUET_ENABLED) :
+-- zstd, partitionnés annee=YYYY/code_departement=XX/, colonnes VARCHAR brutes
+CREATE FILE FORMAT IF NOT EXISTS DEV_BRONZE.dvf_parquet_format
+    TYPE        = 'PARQUET'
+    COMPRESSION = 'AUTO'
+    COMMENT     = 'Format DVF Parquet (conversion Airflow conversion_group)';
+
 -- ─── Table Bronze : mutations_foncieres ──────────────────────────────────────
 -- Couche RAW : noms de colonnes = headers exacts des fichiers DVF.
 -- Tout en VARCHAR → aucune transformation en Bronze.
@@ -41,9 +51,10 @@ CREATE FILE FORMAT IF NOT EXISTS DEV_BRONZE.dvf_csv_format
 CREATE TABLE IF NOT EXISTS DEV_BRONZE.mutations_foncieres (
 
     -- ── Colonnes DVF (42 colonnes, noms = headers CSV exacts) ─────────────────
-    -- Compatible avec la table existante. Pas de colonnes metadata (_source_file
-    -- etc.) pour ne pas casser les tables déjà créées. Le chargement utilise
-    -- MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE.
+    -- Le chargement utilise MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE.
+    -- Les colonnes de lignage (_source_file, …) sont ajoutées plus bas par
+    -- ALTER TABLE … ADD COLUMN IF NOT EXISTS : même chemin pour une table
+    -- neuve et pour les tables déjà créées.
     "No disposition"                VARCHAR  COMMENT 'Numéro de disposition dans l''acte',
     "Identifiant de document"       VARCHAR  COMMENT 'Identifiant unique de l''acte notarié',
     "Reference document"            VARCHAR  COMMENT 'Référence du document',
@@ -89,3 +100,223 @@ CREATE TABLE IF NOT EXISTS DEV_BRONZE.mutations_foncieres (
 )
 COMMENT = 'Table Bronze DVF — données brutes depuis S3. Chargement incrémental mensuel.'
 DATA_RETENTION_TIME_IN_DAYS = 7;
+
+-- ─── Lignage Bronze (migration idempotente) ──────────────────────────────────
+-- Renseignées par COPY INTO (INCLUDE_METADATA, voir 02_copy_into_bronze*.sql).
+-- Lignes chargées avant la migration : NULL (lot « historique »).
+ALTER TABLE DEV_BRONZE.mutations_foncieres ADD COLUMN IF NOT EXISTS
+    _source_file        VARCHAR       COMMENT 'Fichier source relatif au stage (METADATA$FILENAME)';
+ALTER TABLE DEV_BRONZE.mutations_foncieres ADD COLUMN IF NOT EXISTS
+    _source_row_number  NUMBER        COMMENT 'Numéro de ligne dans le fichier source (METADATA$FILE_ROW_NUMBER)';
+ALTER TABLE DEV_BRONZE.mutations_foncieres ADD COLUMN IF NOT EXISTS
+    _loaded_at          TIMESTAMP_LTZ COMMENT 'Horodatage du scan COPY (METADATA$START_SCAN_TIME) → lot de chargement';
+
+-- ─── Table Bronze typée : mutations_foncieres_typed (optionnelle) ─────────────
+-- DVF_TYPED_BRONZE=true : dates (JJ/MM/AAAA) et décimaux (virgule) convertis
+-- une seule fois au chargement (03_insert_bronze_typed.sql depuis la table
+-- d'atterrissage, 02_copy_into_bronze_parquet_typed.sql) ; Silver lit
+-- des DATE / NUMBER natifs (var dbt bronze_typed). Mêmes noms de colonnes
+-- que mutations_foncieres, compteurs et identifiants restent en VARCHAR.
+-- Valeur non convertible : colonne typée NULL, valeur brute conservée dans
+-- _raw_rejects ({"Valeur fonciere": "12x,5"}), NULL si tout est converti.
+CREATE TABLE IF NOT EXISTS DEV_BRONZE.mutations_foncieres_typed (
+    "No disposition"                VARCHAR,
+    "Identifiant de document"       VARCHAR,
+    "Reference document"            VARCHAR,
+    "1 Articles CGI"                VARCHAR,
+    "2 Articles CGI"                VARCHAR,
+    "3 Articles CGI"                VARCHAR,
+    "4 Articles CGI"                VARCHAR,
+    "5 Articles CGI"                VARCHAR,
+    "Motif de la non-price"         VARCHAR,
+    "Date mutation"                 DATE          COMMENT 'Date de la mutation (JJ/MM/AAAA → DATE)',
+    "Nature mutation"               VARCHAR,
+    "Valeur fonciere"               NUMBER(15, 2) COMMENT 'Prix de cession en euros (virgule décimale → NUMBER)',
+    "No voie"                       VARCHAR,
+    "B/T/Q"                         VARCHAR,
+    "Type de voie"                  VARCHAR,
+    "Code voie"                     VARCHAR,
+    "Voie"                          VARCHAR,
+    "Code postal"                   VARCHAR,
+    "Commune"                       VARCHAR,
+    "Code departement"              VARCHAR,
+    "Code commune"                  VARCHAR,
+    "Section"                       VARCHAR,
+    "No plan"                       VARCHAR,
+    "No Volume"                     VARCHAR,
+    "1er lot"                       VARCHAR,
+    "Surface Carrez du 1er lot"     NUMBER(12, 2),
+    "2eme lot"                      VARCHAR,
+    "Surface Carrez du 2eme lot"    NUMBER(12, 2),
+    "3eme lot"                      VARCHAR,
+    "Surface Carrez du 3eme lot"    NUMBER(12, 2),
+    "4eme lot"                      VARCHAR,
+    "Surface Carrez du 4eme lot"    NUMBER(12, 2),
+    "5eme lot"                      VARCHAR,
+    "Surface Carrez du 5eme lot"    NUMBER(12, 2),
+    "Nombre de lots"                VARCHAR,
+    "Code type local"               VARCHAR,
+    "Type local"                    VARCHAR,
+    "Identifiant local"             VARCHAR,
+    "Surface reelle bati"           NUMBER(12, 2) COMMENT 'Surface bâtie réelle (m²)',
+    "Nombre pieces principales"     VARCHAR,
+    "Nature culture"                VARCHAR,
+    "Nature culture speciale"       VARCHAR,
+    "Surface terrain"               NUMBER(12, 2) COMMENT 'Surface du terrain (m²)',
+
+    _raw_rejects        OBJECT        COMMENT 'Valeurs brutes non converties, par colonne (NULL = aucune)',
+    _source_file        VARCHAR       COMMENT 'Fichier source relatif au stage (METADATA$FILENAME)',
+    _source_row_number  NUMBER        COMMENT 'Numéro de ligne dans le fichier source (METADATA$FILE_ROW_NUMBER)',
+    _loaded_at          TIMESTAMP_LTZ COMMENT 'Horodatage du scan COPY (METADATA$START_SCAN_TIME) → lot de chargement'
+)
+COMMENT = 'Table Bronze DVF typée — dates et montants convertis au COPY INTO'
+DATA_RETENTION_TIME_IN_DAYS = 7;
+
+-- ─── Table d'atterrissage : mutations_foncieres_typed_landing ───────────────
+-- DVF_TYPED_BRONZE=true (TXT) : 02_copy_into_bronze_typed.sql y charge les
+-- fichiers par nom de colonne (MATCH_BY_COLUMN_NAME, entête lu), puis
+-- 03_insert_bronze_typed.sql convertit vers mutations_foncieres_typed et
+-- vide la table. DELETE et non TRUNCATE : TRUNCATE efface le registre de
+-- chargement du COPY, les fichiers seraient rechargés au run suivant.
+CREATE TRANSIENT TABLE IF NOT EXISTS DEV_BRONZE.mutations_foncieres_typed_landing (
+    "No disposition"                VARCHAR,
+    "Identifiant de document"       VARCHAR,
+    "Reference document"            VARCHAR,
+    "1 Articles CGI"                VARCHAR,
+    "2 Articles CGI"                VARCHAR,
+    "3 Articles CGI"                VARCHAR,
+    "4 Articles CGI"                VARCHAR,
+    "5 Articles CGI"                VARCHAR,
+    "Motif de la non-price"         VARCHAR,
+    "Date mutation"                 VARCHAR,
+    "Nature mutation"               VARCHAR,
+    "Valeur fonciere"               VARCHAR,
+    "No voie"                       VARCHAR,
+    "B/T/Q"                         VARCHAR,
+    "Type de voie"                  VARCHAR,
+    "Code voie"                     VARCHAR,
+    "Voie"                          VARCHAR,
+    "Code postal"                   VARCHAR,
+    "Commune"                       VARCHAR,
+    "Code departement"              VARCHAR,
+    "Code commune"                  VARCHAR,
+    "Section"                       VARCHAR,
+    "No plan"                       VARCHAR,
+    "No Volume"                     VARCHAR,
+    "1er lot"                       VARCHAR,
+    "Surface Carrez du 1er lot"     VARCHAR,
+    "2eme lot"                      VARCHAR,
+    "Surface Carrez du 2eme lot"    VARCHAR,
+    "3eme lot"                      VARCHAR,
+    "Surface Carrez du 3eme lot"    VARCHAR,
+    "4eme lot"                      VARCHAR,
+    "Surface Carrez du 4eme lot"    VARCHAR,
+    "5eme lot"                      VARCHAR,
+    "Surface Carrez du 5eme lot"    VARCHAR,
+    "Nombre de lots"                VARCHAR,
+    "Code type local"               VARCHAR,
+    "Type local"                    VARCHAR,
+    "Identifiant local"             VARCHAR,
+    "Surface reelle bati"           VARCHAR,
+    "Nombre pieces principales"     VARCHAR,
+    "Nature culture"                VARCHAR,
+    "Nature culture speciale"       VARCHAR,
+    "Surface terrain"               VARCHAR,
+
+    _source_file        VARCHAR       COMMENT 'Fichier source relatif au stage (METADATA$FILENAME)',
+    _source_row_number  NUMBER        COMMENT 'Numéro de ligne dans le fichier source (METADATA$FILE_ROW_NUMBER)',
+    _loaded_at          TIMESTAMP_LTZ COMMENT 'Horodatage du scan COPY (METADATA$START_SCAN_TIME)'
+)
+COMMENT = 'Atterrissage VARCHAR du Bronze typé — vidé après conversion'
+DATA_RETENTION_TIME_IN_DAYS = 0;
+
+-- ─── Table d'audit : load_batches ────────────────────────────────────────────
+-- 1 ligne par exécution de COPY INTO (tâche Airflow loading.copy_into_bronze).
+-- Les lignes Bronze d'un lot : _loaded_at BETWEEN started_at AND finished_at.
+-- Les consommateurs ne traitent que les lots LOADED non encore absorbés
+-- (macro dbt unconsumed_load_batches).
+CREATE TABLE IF NOT EXISTS DEV_BRONZE.load_batches (
+    batch_id       VARCHAR        NOT NULL COMMENT 'Identifiant du lot (YYYYMMDDTHHMMSS-xxxxxxxx)',
+    dag_run_id     VARCHAR                 COMMENT 'run_id Airflow ayant exécuté le COPY',
+    source_stage   VARCHAR                 COMMENT 'Stage source (dvf_s3_stage | dvf_s3_parquet_stage)',
+    status         VARCHAR        NOT NULL COMMENT 'RUNNING | LOADED | EMPTY | FAILED',
+    started_at     TIMESTAMP_LTZ  NOT NULL COMMENT 'Ouverture du lot (avant COPY)',
+    finished_at    TIMESTAMP_LTZ           COMMENT 'Clôture du lot (après COPY)',
+    files          ARRAY                   COMMENT 'Fichiers chargés par le COPY',
+    files_loaded   NUMBER                  COMMENT 'Nombre de fichiers chargés',
+    rows_parsed    NUMBER                  COMMENT 'Lignes lues',
+    rows_loaded    NUMBER                  COMMENT 'Lignes insérées en Bronze',
+    errors_seen    NUMBER                  COMMENT 'Lignes rejetées (ON_ERROR = CONTINUE)',
+    error_message  VARCHAR                 COMMENT 'Erreur du COPY si FAILED',
+    CONSTRAINT pk_load_batches PRIMARY KEY (batch_id)
+)
+COMMENT = 'Audit des chargements Bronze — 1 ligne par COPY INTO';
+
+-- ─── Empreintes DDL : ddl_fingerprints ──────────────────────────────────────
+-- 1 ligne par objet géré par le groupe loading (ce script, chaque stage) :
+-- sha256 du SQL appliqué. Le DDL n'est rejoué que si l'empreinte change
+-- (include/dvf/loading.py) ; DVF_FORCE_DDL=true force la réapplication.
+CREATE TABLE IF NOT EXISTS DEV_BRONZE.ddl_fingerprints (
+    object_name  VARCHAR        NOT NULL COMMENT 'Objet géré (script:<fichier> | stage:<nom>)',
+    fingerprint  VARCHAR        NOT NULL COMMENT 'sha256 du SQL appliqué',
+    applied_at   TIMESTAMP_LTZ  NOT NULL COMMENT 'Dernière application',
+    CONSTRAINT pk_ddl_fingerprints PRIMARY KEY (object_name)
+)
+COMMENT = 'Empreintes du DDL appliqué par le pipeline — DDL ignoré si inchangé';
+
+-- ─── Audit COPY par fichier : copy_file_audit ───────────────────────────────
+-- 1 ligne par fichier traité par COPY INTO (résultat du COPY, taille issue de
+-- INFORMATION_SCHEMA.COPY_HISTORY, durée du COPY mesurée par la tâche).
+CREATE TABLE IF NOT EXISTS DEV_BRONZE.copy_file_audit (
+    batch_id                 VARCHAR        NOT NULL COMMENT 'Lot (load_batches.batch_id)',
+    target_table             VARCHAR        NOT NULL COMMENT 'Table Bronze chargée',
+    file                     VARCHAR        NOT NULL COMMENT 'Fichier du stage',
+    status                   VARCHAR                 COMMENT 'LOADED | PARTIALLY_LOADED | LOAD_FAILED',
+    rows_parsed              NUMBER                  COMMENT 'Lignes lues',
+    rows_loaded              NUMBER                  COMMENT 'Lignes insérées',
+    errors_seen              NUMBER                  COMMENT 'Lignes rejetées (ON_ERROR = CONTINUE)',
+    first_error              VARCHAR                 COMMENT 'Premier message d''erreur',
+    first_error_line         NUMBER                  COMMENT 'Ligne de la première erreur',
+    first_error_character    NUMBER                  COMMENT 'Caractère de la première erreur',
+    first_error_column_name  VARCHAR                 COMMENT 'Colonne de la première erreur',
+    file_bytes               NUMBER                  COMMENT 'Taille du fichier (COPY_HISTORY)',
+    copy_seconds             NUMBER(10, 3)           COMMENT 'Durée du COPY du lot (tous fichiers, en parallèle)',
+    audited_at               TIMESTAMP_LTZ  NOT NULL COMMENT 'Horodatage de l''audit'
+)
+COMMENT = 'Audit COPY INTO Bronze — 1 ligne par fichier et par lot';
+
+-- ─── Quarantaine des lignes rejetées : copy_rejects ─────────────────────────
+-- Lignes rejetées par COPY (ON_ERROR = CONTINUE), extraites par VALIDATE().
+-- Non alimentée pour la table typée (COPY avec transformation).
+CREATE TABLE IF NOT EXISTS DEV_BRONZE.copy_rejects (
+    batch_id         VARCHAR        NOT NULL COMMENT 'Lot (load_batches.batch_id)',
+    target_table     VARCHAR        NOT NULL COMMENT 'Table Bronze chargée',
+    file             VARCHAR                 COMMENT 'Fichier du stage',
+    line             NUMBER                  COMMENT 'Ligne dans le fichier',
+    character        NUMBER                  COMMENT 'Position de l''erreur dans la ligne',
+    column_name      VARCHAR                 COMMENT 'Colonne en erreur',
+    row_number       NUMBER                  COMMENT 'Numéro d''enregistrement',
+    error            VARCHAR                 COMMENT 'Message d''erreur',
+    rejected_record  VARCHAR                 COMMENT 'Enregistrement brut rejeté',
+    quarantined_at   TIMESTAMP_LTZ  NOT NULL COMMENT 'Horodatage de la mise en quarantaine'
+)
+COMMENT = 'Quarantaine des lignes rejetées par COPY INTO Bronze';
+
+-- ─── Débit de chargement : copy_throughput ──────────────────────────────────
+-- 1 ligne par lot : volume, durée du COPY et Mo/s, pour dimensionner DVF_WH.
+-- Les fichiers d'un lot sont chargés en parallèle : le débit est celui du lot.
+CREATE OR REPLACE VIEW DEV_BRONZE.copy_throughput
+COMMENT = 'Débit des COPY INTO Bronze par lot (Mo/s)'
+AS
+SELECT
+    batch_id,
+    target_table,
+    MIN(audited_at)                                         AS audited_at,
+    COUNT(*)                                                AS files,
+    SUM(rows_loaded)                                        AS rows_loaded,
+    SUM(errors_seen)                                        AS errors_seen,
+    SUM(file_bytes)                                         AS bytes,
+    MAX(copy_seconds)                                       AS copy_seconds,
+    SUM(file_bytes) / 1e6 / NULLIF(MAX(copy_seconds), 0)    AS mb_per_second
+FROM DEV_BRONZE.copy_file_audit
+GROUP BY batch_id, target_table;
@@ -6,9 +6,21 @@
 --   → compatible MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
 --   → évite tout conflit avec SKIP_HEADER du format nommé
 --
+-- Layout S3 : fichier entier ValeursFoncieres-YYYY.txt (historique) ou
+--   chunks compressés ValeursFoncieres-YYYY.txt.NNNN.gz|.zst (~128 Mo,
+--   entête répété dans chaque chunk) → chargés en parallèle par le warehouse
+--   PATTERN couvre les deux formes ; COMPRESSION = AUTO détecte gzip / zstd
+--
+-- Lignage : INCLUDE_METADATA (transformation de colonnes compatible
+--   MATCH_BY_COLUMN_NAME) → _source_file, _source_row_number, _loaded_at.
+--   Le lot (DEV_BRONZE.load_batches) est ouvert / clos par la tâche Airflow
+--   autour de ce script.
+--
 -- Idempotence : FORCE = FALSE (Snowflake skip les fichiers déjà chargés
 --   via son registre interne COPY_HISTORY)
--- Erreurs     : ON_ERROR = CONTINUE (rows invalides ignorées)
+-- Erreurs     : ON_ERROR = CONTINUE ; rows invalides auditées par fichier
+--   (copy_file_audit), extraites par VALIDATE() (copy_rejects) ; la tâche
+--   échoue au-delà de DVF_COPY_MAX_ERROR_RATE
 -- ============================================================
 
 USE DATABASE DVF_DB;
@@ -17,8 +29,10 @@ USE ROLE DVF_BI_ROLE;
 
 COPY INTO DVF_DB.DEV_BRONZE.mutations_foncieres
 FROM @DVF_DB.DEV_BRONZE.dvf_s3_stage
+PATTERN     = '.*[.]txt([.][0-9]{4}[.](gz|zst))?'
 FILE_FORMAT = (
     TYPE                           = 'CSV'
+    COMPRESSION                    = 'AUTO'
     FIELD_DELIMITER                = '|'
     PARSE_HEADER                   = TRUE
     FIELD_OPTIONALLY_ENCLOSED_BY   = '"'
@@ -29,6 +43,11 @@ FILE_FORMAT = (
     ERROR_ON_COLUMN_COUNT_MISMATCH = FALSE
 )
 MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+INCLUDE_METADATA     = (
+    _source_file       = METADATA$FILENAME,
+    _source_row_number = METADATA$FILE_ROW_NUMBER,
+    _loaded_at         = METADATA$START_SCAN_TIME
+)
 ON_ERROR             = CONTINUE
 PURGE                = FALSE
 FORCE                = FALSE;
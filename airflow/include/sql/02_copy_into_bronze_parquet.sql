@@ -0,0 +1,41 @@
+-- ============================================================
+-- Script : 02_copy_into_bronze_parquet.sql
+-- Description : Chargement incrémental S3 (Parquet) → Snowflake DEV_BRONZE
+--               Variante de 02_copy_into_bronze.sql utilisée quand
+--               DVF_PARQUET_ENABLED=true (TaskGroup `conversion`).
+--
+-- Source    : @dvf_s3_parquet_stage → s3://.../real-parquet/
+--             annee=YYYY/code_departement=XX/<source>.parquet (zstd)
+-- Stratégie : colonnes Parquet = headers DVF exacts (valeurs VARCHAR brutes)
+--   → MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE, table Bronze inchangée
+--   → pas de parsing CSV des 42 colonnes à chaque chargement
+-- PATTERN   : exclut les marqueurs de conversion (_converted/*.json)
+--
+-- Lignage : INCLUDE_METADATA (transformation de colonnes compatible
+--   MATCH_BY_COLUMN_NAME) → _source_file, _source_row_number, _loaded_at.
+--   Le lot (DEV_BRONZE.load_batches) est ouvert / clos par la tâche Airflow
+--   autour de ce script.
+--
+-- Idempotence : FORCE = FALSE (registre COPY_HISTORY, clé = fichier + ETag)
+-- Bascule TXT → Parquet : les lignes déjà chargées depuis les .txt seraient
+--   rechargées depuis les .parquet ; vider DEV_BRONZE.mutations_foncieres
+--   (TRUNCATE) lors de l'activation, ou compter sur la déduplication Silver.
+-- ============================================================
+
+USE DATABASE DVF_DB;
+USE WAREHOUSE DVF_WH;
+USE ROLE DVF_BI_ROLE;
+
+COPY INTO DVF_DB.DEV_BRONZE.mutations_foncieres
+FROM @DVF_DB.DEV_BRONZE.dvf_s3_parquet_stage
+PATTERN              = '.*annee=.*[.]parquet'
+FILE_FORMAT          = (FORMAT_NAME = 'DVF_DB.DEV_BRONZE.dvf_parquet_format')
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+INCLUDE_METADATA     = (
+    _source_file       = METADATA$FILENAME,
+    _source_row_number = METADATA$FILE_ROW_NUMBER,
+    _loaded_at         = METADATA$START_SCAN_TIME
+)
+ON_ERROR             = CONTINUE
+PURGE                = FALSE
+FORCE                = FALSE;
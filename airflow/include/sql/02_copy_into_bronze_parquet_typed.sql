@@ -0,0 +1,133 @@
+-- ============================================================
+-- Script : 02_copy_into_bronze_parquet_typed.sql
+-- Description : Chargement incrémental S3 (Parquet) → DEV_BRONZE.mutations_foncieres_typed
+--               Variante typée de 02_copy_into_bronze_parquet.sql
+--               (DVF_PARQUET_ENABLED=true et DVF_TYPED_BRONZE=true).
+--
+-- Stratégie : mêmes conversions que 02_copy_into_bronze_typed.sql ; les
+--   colonnes Parquet (headers DVF, valeurs VARCHAR brutes) sont lues par
+--   nom : $1:"Valeur fonciere"::VARCHAR.
+-- PATTERN   : exclut les marqueurs de conversion (_converted/*.json)
+--
+-- Idempotence : FORCE = FALSE (registre COPY_HISTORY propre à la table)
+-- ============================================================
+
+USE DATABASE DVF_DB;
+USE WAREHOUSE DVF_WH;
+USE ROLE DVF_BI_ROLE;
+
+COPY INTO DVF_DB.DEV_BRONZE.mutations_foncieres_typed (
+    "No disposition",
+    "Identifiant de document",
+    "Reference document",
+    "1 Articles CGI",
+    "2 Articles CGI",
+    "3 Articles CGI",
+    "4 Articles CGI",
+    "5 Articles CGI",
+    "Motif de la non-price",
+    "Date mutation",
+    "Nature mutation",
+    "Valeur fonciere",
+    "No voie",
+    "B/T/Q",
+    "Type de voie",
+    "Code voie",
+    "Voie",
+    "Code postal",
+    "Commune",
+    "Code departement",
+    "Code commune",
+    "Section",
+    "No plan",
+    "No Volume",
+    "1er lot",
+    "Surface Carrez du 1er lot",
+    "2eme lot",
+    "Surface Carrez du 2eme lot",
+    "3eme lot",
+    "Surface Carrez du 3eme lot",
+    "4eme lot",
+    "Surface Carrez du 4eme lot",
+    "5eme lot",
+    "Surface Carrez du 5eme lot",
+    "Nombre de lots",
+    "Code type local",
+    "Type local",
+    "Identifiant local",
+    "Surface reelle bati",
+    "Nombre pieces principales",
+    "Nature culture",
+    "Nature culture speciale",
+    "Surface terrain",
+    _raw_rejects,
+    _source_file,
+    _source_row_number,
+    _loaded_at
+)
+FROM (
+    SELECT
+        $1:"No disposition"::VARCHAR,                                                       -- No disposition
+        $1:"Identifiant de document"::VARCHAR,                                              -- Identifiant de document
+        $1:"Reference document"::VARCHAR,                                                   -- Reference document
+        $1:"1 Articles CGI"::VARCHAR,                                                       -- 1 Articles CGI
+        $1:"2 Articles CGI"::VARCHAR,                                                       -- 2 Articles CGI
+        $1:"3 Articles CGI"::VARCHAR,                                                       -- 3 Articles CGI
+        $1:"4 Articles CGI"::VARCHAR,                                                       -- 4 Articles CGI
+        $1:"5 Articles CGI"::VARCHAR,                                                       -- 5 Articles CGI
+        $1:"Motif de la non-price"::VARCHAR,                                                -- Motif de la non-price
+        TRY_TO_DATE($1:"Date mutation"::VARCHAR, 'DD/MM/YYYY'),                             -- Date mutation
+        $1:"Nature mutation"::VARCHAR,                                                      -- Nature mutation
+        TRY_TO_NUMBER(REPLACE($1:"Valeur fonciere"::VARCHAR, ',', '.'), 15, 2),             -- Valeur fonciere
+        $1:"No voie"::VARCHAR,                                                              -- No voie
+        $1:"B/T/Q"::VARCHAR,                                                                -- B/T/Q
+        $1:"Type de voie"::VARCHAR,                                                         -- Type de voie
+        $1:"Code voie"::VARCHAR,                                                            -- Code voie
+        $1:"Voie"::VARCHAR,                                                                 -- Voie
+        $1:"Code postal"::VARCHAR,                                                          -- Code postal
+        $1:"Commune"::VARCHAR,                                                              -- Commune
+        $1:"Code departement"::VARCHAR,                                                     -- Code departement
+        $1:"Code commune"::VARCHAR,                                                         -- Code commune
+        $1:"Section"::VARCHAR,                                                              -- Section
+        $1:"No plan"::VARCHAR,                                                              -- No plan
+        $1:"No Volume"::VARCHAR,                                                            -- No Volume
+        $1:"1er lot"::VARCHAR,                                                              -- 1er lot
+        TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 1er lot"::VARCHAR, ',', '.'), 12, 2),   -- Surface Carrez du 1er lot
+        $1:"2eme lot"::VARCHAR,                                                             -- 2eme lot
+        TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 2eme lot"::VARCHAR, ',', '.'), 12, 2),  -- Surface Carrez du 2eme lot
+        $1:"3eme lot"::VARCHAR,                                                             -- 3eme lot
+        TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 3eme lot"::VARCHAR, ',', '.'), 12, 2),  -- Surface Carrez du 3eme lot
+        $1:"4eme lot"::VARCHAR,                                                             -- 4eme lot
+        TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 4eme lot"::VARCHAR, ',', '.'), 12, 2),  -- Surface Carrez du 4eme lot
+        $1:"5eme lot"::VARCHAR,                                                             -- 5eme lot
+        TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 5eme lot"::VARCHAR, ',', '.'), 12, 2),  -- Surface Carrez du 5eme lot
+        $1:"Nombre de lots"::VARCHAR,                                                       -- Nombre de lots
+        $1:"Code type local"::VARCHAR,                                                      -- Code type local
+        $1:"Type local"::VARCHAR,                                                           -- Type local
+        $1:"Identifiant local"::VARCHAR,                                                    -- Identifiant local
+        TRY_TO_NUMBER(REPLACE($1:"Surface reelle bati"::VARCHAR, ',', '.'), 12, 2),         -- Surface reelle bati
+        $1:"Nombre pieces principales"::VARCHAR,                                            -- Nombre pieces principales
+        $1:"Nature culture"::VARCHAR,                                                       -- Nature culture
+        $1:"Nature culture speciale"::VARCHAR,                                              -- Nature culture speciale
+        TRY_TO_NUMBER(REPLACE($1:"Surface terrain"::VARCHAR, ',', '.'), 12, 2),             -- Surface terrain
+        NULLIF(OBJECT_CONSTRUCT(
+            'Date mutation',              IFF(TRY_TO_DATE($1:"Date mutation"::VARCHAR, 'DD/MM/YYYY') IS NULL, $1:"Date mutation"::VARCHAR, NULL),
+            'Valeur fonciere',            IFF(TRY_TO_NUMBER(REPLACE($1:"Valeur fonciere"::VARCHAR, ',', '.'), 15, 2) IS NULL, $1:"Valeur fonciere"::VARCHAR, NULL),
+            'Surface Carrez du 1er lot',  IFF(TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 1er lot"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface Carrez du 1er lot"::VARCHAR, NULL),
+            'Surface Carrez du 2eme lot', IFF(TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 2eme lot"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface Carrez du 2eme lot"::VARCHAR, NULL),
+            'Surface Carrez du 3eme lot', IFF(TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 3eme lot"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface Carrez du 3eme lot"::VARCHAR, NULL),
+            'Surface Carrez du 4eme lot', IFF(TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 4eme lot"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface Carrez du 4eme lot"::VARCHAR, NULL),
+            'Surface Carrez du 5eme lot', IFF(TRY_TO_NUMBER(REPLACE($1:"Surface Carrez du 5eme lot"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface Carrez du 5eme lot"::VARCHAR, NULL),
+            'Surface reelle bati',        IFF(TRY_TO_NUMBER(REPLACE($1:"Surface reelle bati"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface reelle bati"::VARCHAR, NULL),
+            'Surface terrain',            IFF(TRY_TO_NUMBER(REPLACE($1:"Surface terrain"::VARCHAR, ',', '.'), 12, 2) IS NULL, $1:"Surface terrain"::VARCHAR, NULL)
+        ), OBJECT_CONSTRUCT()),
+        METADATA$FILENAME,
+        METADATA$FILE_ROW_NUMBER,
+        METADATA$START_SCAN_TIME
+    FROM @DVF_DB.DEV_BRONZE.dvf_s3_parquet_stage
+)
+PATTERN     = '.*annee=.*[.]parquet'
+FILE_FORMAT = (FORMAT_NAME = 'DVF_DB.DEV_BRONZE.dvf_parquet_format')
+ON_ERROR    = CONTINUE
+PURGE       = FALSE
+FORCE       = FALSE;
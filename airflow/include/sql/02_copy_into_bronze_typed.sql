@@ -0,0 +1,50 @@
+-- ============================================================
+-- Script : 02_copy_into_bronze_typed.sql
+-- Description : Chargement incrémental S3 → DEV_BRONZE.mutations_foncieres_typed_landing
+--               Première étape du Bronze typé (DVF_TYPED_BRONZE=true, TXT) ;
+--               la conversion vers mutations_foncieres_typed est faite par
+--               03_insert_bronze_typed.sql, dans le même lot.
+--
+-- Stratégie : chargement par nom de colonne, comme 02_copy_into_bronze.sql
+--   (PARSE_HEADER = TRUE, MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE) : un
+--   fichier aux colonnes réordonnées reste correctement chargé. Une
+--   transformation au COPY imposerait des références positionnelles
+--   ($1 … $43) sans contrôle de l'entête → conversion faite après coup.
+--
+-- Lignage : INCLUDE_METADATA → _source_file, _source_row_number, _loaded_at.
+--
+-- Idempotence : FORCE = FALSE (registre COPY_HISTORY propre à la table
+--   d'atterrissage, conservé par le DELETE de 03_insert_bronze_typed.sql)
+-- Erreurs     : ON_ERROR = CONTINUE ; rows invalides auditées par fichier
+--   (copy_file_audit), extraites par VALIDATE() (copy_rejects) ; une
+--   valeur non convertible ne rejette pas la ligne → _raw_rejects
+-- ============================================================
+
+USE DATABASE DVF_DB;
+USE WAREHOUSE DVF_WH;
+USE ROLE DVF_BI_ROLE;
+
+COPY INTO DVF_DB.DEV_BRONZE.mutations_foncieres_typed_landing
+FROM @DVF_DB.DEV_BRONZE.dvf_s3_stage
+PATTERN     = '.*[.]txt([.][0-9]{4}[.](gz|zst))?'
+FILE_FORMAT = (
+    TYPE                           = 'CSV'
+    COMPRESSION                    = 'AUTO'
+    FIELD_DELIMITER                = '|'
+    PARSE_HEADER                   = TRUE
+    FIELD_OPTIONALLY_ENCLOSED_BY   = '"'
+    ENCODING                       = 'UTF8'
+    TRIM_SPACE                     = TRUE
+    EMPTY_FIELD_AS_NULL            = TRUE
+    NULL_IF                        = ('', 'NULL', 'null')
+    ERROR_ON_COLUMN_COUNT_MISMATCH = FALSE
+)
+MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+INCLUDE_METADATA     = (
+    _source_file       = METADATA$FILENAME,
+    _source_row_number = METADATA$FILE_ROW_NUMBER,
+    _loaded_at         = METADATA$START_SCAN_TIME
+)
+ON_ERROR             = CONTINUE
+PURGE                = FALSE
+FORCE                = FALSE;
@@ -0,0 +1,140 @@
+-- ============================================================
+-- Script : 03_insert_bronze_typed.sql
+-- Description : Conversion DEV_BRONZE.mutations_foncieres_typed_landing
+--               → DEV_BRONZE.mutations_foncieres_typed (DVF_TYPED_BRONZE=true, TXT)
+--
+-- Exécuté par la tâche Airflow juste après 02_copy_into_bronze_typed.sql,
+--   dans le même lot (load_batches) : dates JJ/MM/AAAA → DATE, décimaux à
+--   virgule → NUMBER, une seule fois (Silver lit des types natifs). Une
+--   valeur non convertible donne NULL et sa valeur brute est conservée
+--   dans _raw_rejects (OBJECT, NULL si tout est converti).
+--
+-- Colonnes : lues par nom dans la table d'atterrissage (chargée par
+--   MATCH_BY_COLUMN_NAME) → indépendant de l'ordre des colonnes du fichier.
+--
+-- Lignage : _source_file / _source_row_number repris du COPY ; _loaded_at =
+--   instant de la conversion, dans la fenêtre du lot courant (des lignes
+--   restées en atterrissage après un échec sont absorbées par le lot suivant).
+--
+-- Transaction : INSERT puis DELETE (pas TRUNCATE, qui effacerait le
+--   registre de chargement du COPY) validés ensemble → ni perte ni doublon.
+-- ============================================================
+
+USE DATABASE DVF_DB;
+USE WAREHOUSE DVF_WH;
+USE ROLE DVF_BI_ROLE;
+
+BEGIN TRANSACTION;
+
+INSERT INTO DVF_DB.DEV_BRONZE.mutations_foncieres_typed (
+    "No disposition",
+    "Identifiant de document",
+    "Reference document",
+    "1 Articles CGI",
+    "2 Articles CGI",
+    "3 Articles CGI",
+    "4 Articles CGI",
+    "5 Articles CGI",
+    "Motif de la non-price",
+    "Date mutation",
+    "Nature mutation",
+    "Valeur fonciere",
+    "No voie",
+    "B/T/Q",
+    "Type de voie",
+    "Code voie",
+    "Voie",
+    "Code postal",
+    "Commune",
+    "Code departement",
+    "Code commune",
+    "Section",
+    "No plan",
+    "No Volume",
+    "1er lot",
+    "Surface Carrez du 1er lot",
+    "2eme lot",
+    "Surface Carrez du 2eme lot",
+    "3eme lot",
+    "Surface Carrez du 3eme lot",
+    "4eme lot",
+    "Surface Carrez du 4eme lot",
+    "5eme lot",
+    "Surface Carrez du 5eme lot",
+    "Nombre de lots",
+    "Code type local",
+    "Type local",
+    "Identifiant local",
+    "Surface reelle bati",
+    "Nombre pieces principales",
+    "Nature culture",
+    "Nature culture speciale",
+    "Surface terrain",
+    _raw_rejects,
+    _source_file,
+    _source_row_number,
+    _loaded_at
+)
+SELECT
+    l."No disposition",                                                       -- No disposition
+    l."Identifiant de document",                                              -- Identifiant de document
+    l."Reference document",                                                   -- Reference document
+    l."1 Articles CGI",                                                       -- 1 Articles CGI
+    l."2 Articles CGI",                                                       -- 2 Articles CGI
+    l."3 Articles CGI",                                                       -- 3 Articles CGI
+    l."4 Articles CGI",                                                       -- 4 Articles CGI
+    l."5 Articles CGI",                                                       -- 5 Articles CGI
+    l."Motif de la non-price",                                                -- Motif de la non-price
+    TRY_TO_DATE(l."Date mutation", 'DD/MM/YYYY'),                             -- Date mutation
+    l."Nature mutation",                                                      -- Nature mutation
+    TRY_TO_NUMBER(REPLACE(l."Valeur fonciere", ',', '.'), 15, 2),             -- Valeur fonciere
+    l."No voie",                                                              -- No voie
+    l."B/T/Q",                                                                -- B/T/Q
+    l."Type de voie",                                                         -- Type de voie
+    l."Code voie",                                                            -- Code voie
+    l."Voie",                                                                 -- Voie
+    l."Code postal",                                                          -- Code postal
+    l."Commune",                                                              -- Commune
+    l."Code departement",                                                     -- Code departement
+    l."Code commune",                                                         -- Code commune
+    l."Section",                                                              -- Section
+    l."No plan",                                                              -- No plan
+    l."No Volume",                                                            -- No Volume
+    l."1er lot",                                                              -- 1er lot
+    TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 1er lot", ',', '.'), 12, 2),   -- Surface Carrez du 1er lot
+    l."2eme lot",                                                             -- 2eme lot
+    TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 2eme lot", ',', '.'), 12, 2),  -- Surface Carrez du 2eme lot
+    l."3eme lot",                                                             -- 3eme lot
+    TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 3eme lot", ',', '.'), 12, 2),  -- Surface Carrez du 3eme lot
+    l."4eme lot",                                                             -- 4eme lot
+    TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 4eme lot", ',', '.'), 12, 2),  -- Surface Carrez du 4eme lot
+    l."5eme lot",                                                             -- 5eme lot
+    TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 5eme lot", ',', '.'), 12, 2),  -- Surface Carrez du 5eme lot
+    l."Nombre de lots",                                                       -- Nombre de lots
+    l."Code type local",                                                      -- Code type local
+    l."Type local",                                                           -- Type local
+    l."Identifiant local",                                                    -- Identifiant local
+    TRY_TO_NUMBER(REPLACE(l."Surface reelle bati", ',', '.'), 12, 2),         -- Surface reelle bati
+    l."Nombre pieces principales",                                            -- Nombre pieces principales
+    l."Nature culture",                                                       -- Nature culture
+    l."Nature culture speciale",                                              -- Nature culture speciale
+    TRY_TO_NUMBER(REPLACE(l."Surface terrain", ',', '.'), 12, 2),             -- Surface terrain
+    NULLIF(OBJECT_CONSTRUCT(
+        'Date mutation',              IFF(TRY_TO_DATE(l."Date mutation", 'DD/MM/YYYY') IS NULL, l."Date mutation", NULL),
+        'Valeur fonciere',            IFF(TRY_TO_NUMBER(REPLACE(l."Valeur fonciere", ',', '.'), 15, 2) IS NULL, l."Valeur fonciere", NULL),
+        'Surface Carrez du 1er lot',  IFF(TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 1er lot", ',', '.'), 12, 2) IS NULL, l."Surface Carrez du 1er lot", NULL),
+        'Surface Carrez du 2eme lot', IFF(TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 2eme lot", ',', '.'), 12, 2) IS NULL, l."Surface Carrez du 2eme lot", NULL),
+        'Surface Carrez du 3eme lot', IFF(TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 3eme lot", ',', '.'), 12, 2) IS NULL, l."Surface Carrez du 3eme lot", NULL),
+        'Surface Carrez du 4eme lot', IFF(TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 4eme lot", ',', '.'), 12, 2) IS NULL, l."Surface Carrez du 4eme lot", NULL),
+        'Surface Carrez du 5eme lot', IFF(TRY_TO_NUMBER(REPLACE(l."Surface Carrez du 5eme lot", ',', '.'), 12, 2) IS NULL, l."Surface Carrez du 5eme lot", NULL),
+        'Surface reelle bati',        IFF(TRY_TO_NUMBER(REPLACE(l."Surface reelle bati", ',', '.'), 12, 2) IS NULL, l."Surface reelle bati", NULL),
+        'Surface terrain',            IFF(TRY_TO_NUMBER(REPLACE(l."Surface terrain", ',', '.'), 12, 2) IS NULL, l."Surface terrain", NULL)
+    ), OBJECT_CONSTRUCT()),
+    l._source_file,
+    l._source_row_number,
+    CURRENT_TIMESTAMP()
+FROM DVF_DB.DEV_BRONZE.mutations_foncieres_typed_landing l;
+
+DELETE FROM DVF_DB.DEV_BRONZE.mutations_foncieres_typed_landing;
+
+COMMIT;
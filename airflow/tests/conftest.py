@@ -0,0 +1,8 @@
+"""Rend le package `include` importable depuis les tests (racine du projet Astro)."""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
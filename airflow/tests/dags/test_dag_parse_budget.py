@@ -0,0 +1,24 @@
+"""Budget de parsing des DAGs : temps, mémoire et imports par fichier (include/benchmarks/dag_parse.py)."""
+
+import pytest
+
+from include.benchmarks.dag_parse import PROJECT_ROOT, dag_files, measure, violations
+
+# Scripts DAG rangés avec le projet dbt : leur import doit rester sans effet de bord
+INCLUDE_DAG_FILES = sorted((PROJECT_ROOT / "include" / "dbt" / "real_estate_analytics" / "dags").glob("[!_]*.py"))
+
+
+@pytest.mark.parametrize("path", dag_files() + INCLUDE_DAG_FILES, ids=lambda path: path.name)
+def test_dag_file_parses_within_budget(path):
+    """Chargé seul par DagBag dans un processus neuf : budget respecté, aucun client lourd importé."""
+    result = measure(path)
+    assert not violations(result), f"{path.name} : {violations(result)}"
+    assert not (PROJECT_ROOT / "raw").exists(), f"{path.name} écrit sur disque au parsing"
+
+
+def test_violations_report_every_budget_breach():
+    result = {"seconds": 3.2, "rss_mb": 80.0, "heavy_modules": ["boto3"],
+              "import_errors": {"dag.py": "ModuleNotFoundError: No module named 'x'"}}
+    problems = violations(result, budget_seconds=2, budget_mb=64)
+    assert len(problems) == 4 and "boto3" in problems[-1]
+    assert violations({**result, "seconds": 0.1, "rss_mb": 1, "heavy_modules": [], "import_errors": {}}) == []
@@ -0,0 +1,28 @@
+"""Tâches dbt du DAG de production : chaque run_results.json est lu là où sa tâche l'écrit."""
+
+import re
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from airflow.models import DagBag
+
+DAG_FILE = Path(__file__).resolve().parents[2] / "dags" / "dvf_pipeline_prod.py"
+
+
+@pytest.fixture(scope="module")
+def dag():
+    return DagBag(dag_folder=str(DAG_FILE), include_examples=False).dags["dvf_production_pipeline"]
+
+
+def test_dbt_tasks_read_run_results_from_their_own_target_path(dag):
+    module = next(m for m in sys.modules.values() if getattr(m, "__file__", None) == str(DAG_FILE))
+
+    dbt_tasks = [t for t in dag.tasks if re.search(r" (run|seed|test) ", getattr(t, "bash_command", ""))]
+    assert {"transformation.dbt_seed", "quality.dbt_test"} <= {t.task_id for t in dbt_tasks}
+    for t in dbt_tasks:
+        target_path = re.search(r"--target-path (\S+)", t.bash_command).group(1)
+        results = module._dbt_run_results({"ti": SimpleNamespace(task_id=t.task_id)})
+        assert results == f"{target_path}/run_results.json", t.task_id
+    assert "target/run_results.json" not in DAG_FILE.read_text()
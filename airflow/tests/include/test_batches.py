@@ -0,0 +1,57 @@
+"""Tests des lots de chargement Bronze (résumé COPY INTO, paramètres d'audit)."""
+
+import json
+from datetime import datetime, timezone
+
+from include.dvf.batches import (
+    STATUS_EMPTY,
+    STATUS_FAILED,
+    STATUS_LOADED,
+    close_batch_parameters,
+    new_batch_id,
+    summarize_copy_results,
+)
+
+
+def test_new_batch_id_is_sortable_and_unique():
+    earlier = new_batch_id(datetime(2025, 1, 5, 2, 0, tzinfo=timezone.utc))
+    later = new_batch_id(datetime(2025, 2, 5, 2, 0, tzinfo=timezone.utc))
+
+    assert earlier.startswith("20250105T020000-")
+    assert earlier < later
+    assert new_batch_id() != new_batch_id()
+
+
+def test_summarize_copy_results_counts_loaded_files():
+    rows = [
+        {"FILE": "s3://b/real-raw/ValeursFoncieres-2024.txt.0001.gz", "STATUS": "LOADED",
+         "ROWS_PARSED": 10, "ROWS_LOADED": 9, "ERRORS_SEEN": 1},
+        {"FILE": "s3://b/real-raw/ValeursFoncieres-2024.txt.0000.gz", "STATUS": "LOADED",
+         "ROWS_PARSED": 5, "ROWS_LOADED": 5, "ERRORS_SEEN": 0},
+        {"FILE": "s3://b/real-raw/vide.txt", "STATUS": "LOAD_FAILED",
+         "ROWS_PARSED": 3, "ROWS_LOADED": 0, "ERRORS_SEEN": 3},
+    ]
+
+    summary = summarize_copy_results(rows)
+
+    assert summary["status"] == STATUS_LOADED
+    assert summary["files"] == [
+        "s3://b/real-raw/ValeursFoncieres-2024.txt.0000.gz",
+        "s3://b/real-raw/ValeursFoncieres-2024.txt.0001.gz",
+    ]
+    assert (summary["rows_parsed"], summary["rows_loaded"], summary["errors_seen"]) == (18, 14, 4)
+
+
+def test_summarize_copy_results_without_new_files_is_empty():
+    summary = summarize_copy_results([{"status": "Copy executed with 0 files processed."}])
+
+    assert summary["status"] == STATUS_EMPTY
+    assert summary["files_loaded"] == 0
+
+
+def test_close_batch_parameters_marks_failures():
+    params = close_batch_parameters("b1", summarize_copy_results([]), error_message="x" * 2000)
+
+    assert params["status"] == STATUS_FAILED
+    assert json.loads(params["files"]) == []
+    assert len(params["error_message"]) == 1000
@@ -0,0 +1,127 @@
+"""Tests du chargement Bronze typé : colonnes lues par nom, conversions alignées sur le DDL."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+from include.benchmarks.synthetic_dvf import COLUMNS
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "include" / "sql"
+
+# Scripts qui convertissent vers mutations_foncieres_typed (TXT : depuis l'atterrissage)
+CONVERSIONS = ["03_insert_bronze_typed.sql", "02_copy_into_bronze_parquet_typed.sql"]
+
+
+def _typed_ddl(table: str = "mutations_foncieres_typed") -> dict[str, str]:
+    sql = (SQL_DIR / "01_create_snowflake_objects.sql").read_text(encoding="utf-8")
+    ddl = sql[sql.index(f"TABLE IF NOT EXISTS DEV_BRONZE.{table} ("):]
+    ddl = ddl[:ddl.index("\nCOMMENT =")]
+    return dict(re.findall(r'^\s*"([^"]+)"\s+(\w+(?:\(\d+, \d+\))?)', ddl, flags=re.MULTILINE))
+
+
+def _conversion(script: str) -> tuple[list[str], list[tuple[str, str]], str]:
+    """(colonnes cibles, (expression, colonne commentée) du SELECT, bloc _raw_rejects)."""
+    sql = (SQL_DIR / script).read_text(encoding="utf-8")
+    start = sql.index("INSERT INTO") if "INSERT INTO" in sql else sql.index("COPY INTO")
+    targets = sql[start:sql.index("\n)\n", start)]
+    select = sql[sql.index("SELECT\n", start):sql.index("NULLIF(OBJECT_CONSTRUCT(")]
+    rejects = sql[sql.index("NULLIF(OBJECT_CONSTRUCT("):sql.index("), OBJECT_CONSTRUCT())")]
+    return (
+        re.findall(r'^\s*"([^"]+)",$', targets, flags=re.MULTILINE),
+        re.findall(r"^\s+(.+?),\s+-- (.+)$", select, flags=re.MULTILINE),
+        rejects,
+    )
+
+
+def test_typed_table_follows_dvf_layout():
+    ddl = _typed_ddl()
+    assert list(ddl) == COLUMNS
+    assert ddl["Date mutation"] == "DATE"
+    assert ddl["Valeur fonciere"] == "NUMBER(15, 2)"
+    assert set(_typed_ddl("mutations_foncieres_typed_landing").values()) == {"VARCHAR"}
+    assert list(_typed_ddl("mutations_foncieres_typed_landing")) == COLUMNS
+
+
+def test_text_files_are_loaded_by_column_name():
+    copy = (SQL_DIR / "02_copy_into_bronze_typed.sql").read_text(encoding="utf-8")
+    statement = copy[copy.index("COPY INTO"):]
+    assert statement.startswith("COPY INTO DVF_DB.DEV_BRONZE.mutations_foncieres_typed_landing\n")
+    assert "PARSE_HEADER                   = TRUE" in statement
+    assert "MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE" in statement
+    assert "$" not in statement.replace("METADATA$", "")
+
+    insert = (SQL_DIR / "03_insert_bronze_typed.sql").read_text(encoding="utf-8")
+    # DELETE (pas TRUNCATE) : le registre de chargement du COPY est conservé
+    assert "DELETE FROM DVF_DB.DEV_BRONZE.mutations_foncieres_typed_landing;" in insert
+    assert "TRUNCATE" not in insert.split("USE ROLE")[1]
+
+
+@pytest.mark.parametrize("script", CONVERSIONS)
+def test_conversion_maps_each_column_to_its_source(script):
+    targets, select, _ = _conversion(script)
+    assert targets == COLUMNS
+    assert [column for _, column in select] == COLUMNS
+
+    source = r'l\."([^"]+)"' if script == "03_insert_bronze_typed.sql" else r'\$1:"([^"]+)"'
+    for expression, column in select:
+        assert re.findall(source, expression) == [column], column
+
+
+@pytest.mark.parametrize("script", CONVERSIONS)
+def test_converted_columns_match_ddl_and_rejects(script):
+    ddl = _typed_ddl()
+    _, select, rejects = _conversion(script)
+
+    converted = {column: expression for expression, column in select if expression.startswith("TRY_")}
+    assert set(converted) == {column for column, type_ in ddl.items() if type_ != "VARCHAR"}
+    for column, expression in converted.items():
+        scale = re.search(r"NUMBER\((\d+, \d+)\)", ddl[column])
+        if scale:
+            assert expression.endswith(f", {scale.group(1)})"), column
+        else:
+            assert "'DD/MM/YYYY'" in expression, column
+        # Valeur brute conservée quand la conversion échoue
+        assert f"'{column}',".ljust(30) + f"IFF({expression} IS NULL, " in rejects, column
+
+
+# ─── Macros dbt bronze_date / bronze_number, rendues pour Snowflake ──────────
+
+MACRO_DIR = Path(__file__).resolve().parents[2] / "include" / "dbt" / "real_estate_analytics" / "macros"
+
+
+def _render(macro: str, *args: str, typed: bool) -> str:
+    """Rend une macro du projet dbt (dispatch default__ = Snowflake) dans un mode Bronze."""
+    from jinja2 import Environment
+
+    macros = {}
+
+    def dispatch(name):
+        return lambda *a: macros[f"default__{name}"](*a)
+
+    def return_(value):
+        # dbt : return() sort de la macro avec `value` ; ici rendu en texte, vide si faux
+        return value if value else ""
+
+    env = Environment()
+    env.globals.update({
+        "adapter": type("Adapter", (), {"dispatch": staticmethod(dispatch)}),
+        "var":     lambda name, default=None: "true" if typed else "false",
+        "env_var": lambda name, default=None: default,
+        "return":  return_,
+    })
+    source = "".join((MACRO_DIR / name).read_text(encoding="utf-8") for name in ("cross_db.sql", "bronze_typed.sql"))
+    module = env.from_string(source).module
+    macros.update({name: getattr(module, name) for name in dir(module) if not name.startswith("_")})
+    return " ".join(str(macros[macro](*args)).split())
+
+
+def test_bronze_macros_parse_dates_like_the_typed_load():
+    insert = (SQL_DIR / "03_insert_bronze_typed.sql").read_text(encoding="utf-8")
+    date_format = re.search(r"TRY_TO_DATE\(l\.\"Date mutation\", ('[^']+')\)", insert).group(1)
+
+    assert _render("bronze_date", "s.date_mutation", typed=False) == f"TRY_TO_DATE(s.date_mutation, {date_format})"
+    assert _render("bronze_date", "s.date_mutation", typed=True) == "s.date_mutation"
+    assert _render("bronze_number", "v", typed=False) == "TRY_TO_NUMBER(REPLACE(v, ',', '.'))"
+    assert _render("bronze_number", "v", typed=True) == "CAST(v AS DECIMAL(38, 0))"
+    assert _render("bronze_table", typed=True) == "mutations_foncieres_typed"
@@ -0,0 +1,106 @@
+"""Tests du cache disque des ZIP DVF : clé amont, LRU, publication atomique, hit sans réseau."""
+
+import functools
+import hashlib
+import http.server
+import os
+import threading
+
+import pytest
+
+from include.dvf.cache import DownloadCache, cache_key
+from include.dvf.download import DownloadIntegrityError
+
+URL = "https://static.data.gouv.fr/valeursfoncieres-2024.txt.zip"
+
+
+class CountingHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.requests += 1
+        super().do_GET()
+
+
+@pytest.fixture
+def http_dir(tmp_path_factory):
+    """Sert un dossier en HTTP (sans Range) ; server.requests compte les GET."""
+    directory = tmp_path_factory.mktemp("http")
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(CountingHandler, directory=str(directory))
+    )
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield directory, server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _entry(cache: DownloadCache, url: str, size: int, mtime: float):
+    staged = cache.staging_path(url, "v1")
+    staged.write_bytes(b"x" * size)
+    path = cache.publish(url, "v1", staged)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_key_depends_on_upstream_version():
+    assert cache_key(URL, "checksum:abc") == cache_key(URL, "checksum:abc")
+    assert cache_key(URL, "checksum:abc") != cache_key(URL, "checksum:def")
+    assert cache_key(URL, "checksum:abc") != cache_key(URL.replace("2024", "2023"), "checksum:abc")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DownloadCache(tmp_path, max_bytes=300)
+    old, recent = _entry(cache, "a", 100, 1_000), _entry(cache, "b", 100, 2_000)
+    used = _entry(cache, "c", 100, 500)
+    with cache.open("c", "v1"):             # un hit rafraîchit l'entrée
+        pass
+
+    new = _entry(cache, "d", 100, 3_000)
+    assert not old.exists() and recent.exists() and used.exists() and new.exists()
+    assert cache.stats["evicted"] == 1
+
+    # L'entrée publiée n'est jamais évincée, même seule au-dessus de la limite
+    cache.max_bytes = 50
+    big = _entry(cache, "e", 200, 4_000)
+    assert [p.name for p in tmp_path.glob("*.zip")] == [big.name]
+
+
+def test_hit_skips_network_and_counts_bytes_saved(http_dir, tmp_path):
+    directory, server, base_url = http_dir
+    content = os.urandom(50_000)
+    (directory / "dvf.zip").write_bytes(content)
+    url, version = f"{base_url}/dvf.zip", f"checksum:{hashlib.sha1(content).hexdigest()}"
+    cache = DownloadCache(tmp_path)
+
+    archive, download = cache.fetch(url, version, expected_size=len(content), checksum=version[9:])
+    with archive:
+        assert archive.read() == content
+    assert download["bytes_fetched"] == len(content) and server.requests == 1
+
+    server.shutdown()                       # aucun appel réseau sur un hit
+    archive, download = cache.fetch(url, version, expected_size=len(content))
+    with archive:
+        assert archive.read() == content
+    assert download is None
+    assert cache.stats == {"hits": 1, "misses": 1, "bytes_saved": len(content), "evicted": 0}
+    assert [p.name for p in tmp_path.glob("*.zip")] == [cache.path(url, version).name]
+
+
+def test_failed_download_is_never_published(http_dir, tmp_path):
+    directory, _, base_url = http_dir
+    (directory / "dvf.zip").write_bytes(b"contenu")
+    cache = DownloadCache(tmp_path)
+
+    with pytest.raises(DownloadIntegrityError):
+        cache.fetch(f"{base_url}/dvf.zip", "checksum:x", checksum=hashlib.sha1(b"autre").hexdigest())
+    assert not list(tmp_path.glob("*.zip"))
+    assert cache.open(f"{base_url}/dvf.zip", "checksum:x") is None
+
+
+def test_inconsistent_entry_is_dropped(tmp_path):
+    cache = DownloadCache(tmp_path)
+    path = _entry(cache, URL, 100, 1_000)
+    assert cache.open(URL, "v1", expected_size=99) is None
+    assert not path.exists() and cache.stats["misses"] == 1
@@ -0,0 +1,61 @@
+"""Tests du découpage DVF en chunks compressés (entête répété, coupure sur ligne)."""
+
+import gzip
+import io
+import random
+import zipfile
+
+import boto3
+from moto import mock_aws
+
+from include.dvf.chunking import is_dvf_text_key, iter_chunks
+from include.dvf.ingestion import upload_zip_members
+
+HEADER = b"No disposition|Date mutation|Valeur fonciere|Commune\n"
+
+
+def _dvf_body(rows: int) -> bytes:
+    rng = random.Random(42)
+    return b"".join(
+        f"{i:06d}|{rng.randint(1, 28):02d}/01/2024|{rng.randint(1000, 900000)},00|COMMUNE-{rng.random()}\n".encode()
+        for i in range(rows)
+    )
+
+
+def test_chunks_repeat_header_and_cut_on_lines():
+    body = _dvf_body(20_000)
+    chunks = []
+    for index, chunk in iter_chunks(io.BytesIO(HEADER + body), target_size=32 * 1024, block_size=4096):
+        chunks.append((index, gzip.decompress(chunk.read())))
+
+    assert len(chunks) > 3
+    assert [i for i, _ in chunks] == list(range(len(chunks)))
+    assert all(data.startswith(HEADER) and data.endswith(b"\n") for _, data in chunks)
+    assert b"".join(data[len(HEADER):] for _, data in chunks) == body
+
+
+def test_header_only_file_yields_one_chunk():
+    chunks = [gzip.decompress(c.read()) for _, c in iter_chunks(io.BytesIO(HEADER))]
+    assert chunks == [HEADER]
+
+
+def test_chunked_upload_replaces_previous_layout(tmp_path):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ValeursFoncieres-2024.txt", HEADER + _dvf_body(200_000))
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="dvf")
+        # Layout historique : fichier entier + un chunk orphelin d'une version plus longue
+        client.put_object(Bucket="dvf", Key="real-raw/ValeursFoncieres-2024.txt", Body=b"old")
+        client.put_object(Bucket="dvf", Key="real-raw/ValeursFoncieres-2024.txt.0099.gz", Body=b"old")
+
+        archive.seek(0)
+        uploaded, _ = upload_zip_members(
+            archive, client, "dvf", "real-raw/", chunk_target_size=1024 * 1024,
+        )
+
+        keys = sorted(o["Key"] for o in client.list_objects_v2(Bucket="dvf")["Contents"])
+        assert keys == sorted(u["key"] for u in uploaded)
+        assert len(keys) > 1 and all(is_dvf_text_key(k) and k.endswith(".gz") for k in keys)
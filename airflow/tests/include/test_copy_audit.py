@@ -0,0 +1,57 @@
+"""Tests de l'audit COPY : résultats par fichier, quarantaine VALIDATE(), seuil de rejet."""
+
+import json
+import re
+
+import pytest
+
+from include.dvf.batches import summarize_copy_results
+from include.dvf.copy_audit import (
+    INSERT_AUDIT_SQL,
+    CopyErrorRateExceeded,
+    audit_parameters,
+    check_error_rate,
+    file_results,
+    quarantine_sql,
+)
+
+# Résultat Snowflake d'un COPY INTO (colonnes en majuscules, 1 ligne par fichier)
+COPY_ROWS = [
+    {"FILE": "s3://b/real-raw/ValeursFoncieres-2024.txt.0001.gz", "STATUS": "PARTIALLY_LOADED",
+     "ROWS_PARSED": 1000, "ROWS_LOADED": 990, "ERROR_LIMIT": 1000, "ERRORS_SEEN": 10,
+     "FIRST_ERROR": "Numeric value 'abc' is not recognized", "FIRST_ERROR_LINE": 42,
+     "FIRST_ERROR_CHARACTER": 17, "FIRST_ERROR_COLUMN_NAME": '"MUTATIONS_FONCIERES"["Valeur fonciere":11]'},
+    {"FILE": "s3://b/real-raw/ValeursFoncieres-2024.txt.0002.gz", "STATUS": "LOADED",
+     "ROWS_PARSED": 1000, "ROWS_LOADED": 1000, "ERROR_LIMIT": 1000, "ERRORS_SEEN": 0,
+     "FIRST_ERROR": None, "FIRST_ERROR_LINE": None, "FIRST_ERROR_CHARACTER": None, "FIRST_ERROR_COLUMN_NAME": None},
+]
+
+
+def test_file_results_keep_per_file_columns():
+    results = file_results(COPY_ROWS + [{"status": "Copy executed with 0 files processed."}])
+    assert [r["file"] for r in results] == [r["FILE"] for r in COPY_ROWS]
+    assert results[0]["first_error_line"] == 42 and "error_limit" not in results[0]
+
+
+def test_audit_parameters_bind_every_placeholder():
+    params = audit_parameters("20250101T000000-abcd1234", "mutations_foncieres", COPY_ROWS, 12.34567)
+    assert set(re.findall(r"%\((\w+)\)s", INSERT_AUDIT_SQL)) == set(params)
+    assert params["target_table"] == "DVF_DB.DEV_BRONZE.mutations_foncieres"
+    assert params["copy_seconds"] == 12.346
+    assert [r["errors_seen"] for r in json.loads(params["results"])] == [10, 0]
+
+
+def test_quarantine_only_for_copies_without_transformation():
+    sql = quarantine_sql("mutations_foncieres")
+    assert "VALIDATE(DVF_DB.DEV_BRONZE.mutations_foncieres, JOB_ID => %(job_id)s)" in sql
+    assert "VALIDATE(DVF_DB.DEV_BRONZE.mutations_foncieres_typed_landing," in quarantine_sql("mutations_foncieres_typed_landing")
+    with pytest.raises(ValueError):
+        quarantine_sql("mutations_foncieres_typed")
+
+
+def test_error_rate_threshold():
+    summary = summarize_copy_results(COPY_ROWS)
+    assert check_error_rate(summary, max_rate=0.01) == pytest.approx(0.005)
+    with pytest.raises(CopyErrorRateExceeded, match="10 lignes rejetées sur 2000"):
+        check_error_rate(summary, max_rate=0.001)
+    assert check_error_rate(summarize_copy_results([]), max_rate=0) == 0.0
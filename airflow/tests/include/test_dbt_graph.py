@@ -0,0 +1,68 @@
+"""Tests du graphe de modèles dbt lu depuis manifest.json."""
+
+import json
+
+from include.dvf.dbt_graph import load_manifest, model_graph
+
+
+def _node(name, layer, depends_on=(), materialized="table", resource_type="model",
+          package="real_estate_analytics"):
+    return {
+        f"{resource_type}.{package}.{name}": {
+            "name":          name,
+            "resource_type": resource_type,
+            "package_name":  package,
+            "fqn":           [package, layer, name],
+            "config":        {"materialized": materialized},
+            "depends_on":    {"macros": [], "nodes": list(depends_on)},
+        }
+    }
+
+
+MANIFEST = {"nodes": {
+    **_node("ref_departements", "ref_departements", resource_type="seed"),
+    **_node("src_dvf", "staging", ["source.real_estate_analytics.dvf.mutations_foncieres"], "view"),
+    **_node("silver_mutation_f", "silver", ["model.real_estate_analytics.src_dvf"], "incremental"),
+    **_node("volume_mensuel", "gold", ["model.real_estate_analytics.silver_mutation_f"], "incremental"),
+    **_node("dim_geography", "star_schema", [
+        "model.real_estate_analytics.silver_mutation_f",
+        "seed.real_estate_analytics.ref_departements",
+    ]),
+    **_node("base_faits", "star_schema", ["model.real_estate_analytics.silver_mutation_f"], "ephemeral"),
+    **_node("fact_mutations", "star_schema", [
+        "model.real_estate_analytics.base_faits",
+        "model.real_estate_analytics.dim_geography",
+    ]),
+    **_node("not_null_x", "silver", ["model.real_estate_analytics.silver_mutation_f"], "test",
+            resource_type="test"),
+    **_node("date_spine", "utils", [], package="dbt_utils"),
+}}
+
+
+def test_model_graph_keeps_project_models_with_ref_dependencies():
+    graph = model_graph(MANIFEST)
+
+    assert sorted(graph) == ["dim_geography", "fact_mutations", "silver_mutation_f", "src_dvf", "volume_mensuel"]
+    assert graph["src_dvf"]["upstream"] == []
+    assert graph["volume_mensuel"] == {
+        "unique_id":    "model.real_estate_analytics.volume_mensuel",
+        "layer":        "gold",
+        "materialized": "incremental",
+        "upstream":     ["silver_mutation_f"],
+    }
+    # Seed exclu : chargé par dbt_seed en amont de tout le graphe
+    assert graph["dim_geography"]["upstream"] == ["silver_mutation_f"]
+
+
+def test_ephemeral_models_forward_their_parents():
+    graph = model_graph(MANIFEST)
+
+    assert "base_faits" not in graph
+    assert graph["fact_mutations"]["upstream"] == ["dim_geography", "silver_mutation_f"]
+
+
+def test_load_manifest_missing_file_returns_none(tmp_path):
+    assert load_manifest(tmp_path / "manifest.json") is None
+
+    (tmp_path / "manifest.json").write_text(json.dumps(MANIFEST))
+    assert load_manifest(tmp_path / "manifest.json") == MANIFEST
@@ -0,0 +1,86 @@
+"""Tests du runner dbt en processus : état de partial parse partagé, deps ignoré si lock inchangé."""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from include.dvf.dbt_runner import PARTIAL_PARSE_FILE, deps_up_to_date, project_hash, run
+
+
+class FakeDbtRunner:
+    """dbtRunner minimal : journalise les invocations, écrit l'état de parsing dans le target-path."""
+
+    def __init__(self, state: bytes = b"parsed-v1", success: bool = True, exception: Exception | None = None):
+        self.state, self.success, self.exception = state, success, exception
+        self.calls: list[list[str]] = []
+        self.restored: list[bytes | None] = []
+
+    def invoke(self, args: list[str]) -> SimpleNamespace:
+        self.calls.append(args)
+        if args[0] == "deps":
+            project = Path(args[args.index("--project-dir") + 1])
+            (project / "dbt_packages" / "dbt_utils").mkdir(parents=True, exist_ok=True)
+        else:
+            target = Path(args[args.index("--target-path") + 1])
+            cached = target / PARTIAL_PARSE_FILE
+            self.restored.append(cached.read_bytes() if cached.exists() else None)
+            target.mkdir(parents=True, exist_ok=True)
+            cached.write_bytes(self.state)
+        return SimpleNamespace(success=self.success, exception=self.exception, result=None)
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    root = tmp_path / "project"
+    (root / "models" / "silver").mkdir(parents=True)
+    (root / "dbt_project.yml").write_text("name: real_estate_analytics\n")
+    (root / "packages.yml").write_text("packages:\n  - package: dbt-labs/dbt_utils\n")
+    (root / "package-lock.yml").write_text("sha1_hash: aaa\n")
+    (root / "models" / "silver" / "silver_mutation_f.sql").write_text("select 1\n")
+    return root
+
+
+def _args(project: Path, command: str, task: str = "t1") -> list[str]:
+    args = [command, "--project-dir", str(project), "--profiles-dir", str(project)]
+    if command != "deps":
+        args += ["--target-path", str(project.parent / "target" / task), "--select", "silver_mutation_f"]
+    return args
+
+
+def test_partial_parse_state_is_shared_between_tasks(project, tmp_path):
+    state_dir, runner = tmp_path / "state", FakeDbtRunner()
+    assert run(_args(project, "run", "t1"), state_dir=state_dir, runner=runner) == 0
+    assert run(_args(project, "run", "t2"), state_dir=state_dir, runner=runner) == 0
+    assert runner.restored == [None, b"parsed-v1"]
+    assert (state_dir / project_hash(project) / PARTIAL_PARSE_FILE).read_bytes() == b"parsed-v1"
+
+
+def test_project_change_uses_a_new_state(project, tmp_path):
+    state_dir, runner = tmp_path / "state", FakeDbtRunner()
+    before = project_hash(project)
+    run(_args(project, "run", "t1"), state_dir=state_dir, runner=runner)
+    (project / "models" / "silver" / "silver_mutation_f.sql").write_text("select 2\n")
+    assert project_hash(project) != before
+    run(_args(project, "run", "t2"), state_dir=state_dir, runner=runner)
+    assert runner.restored == [None, None]
+
+
+def test_failed_run_does_not_publish_state(project, tmp_path):
+    state_dir = tmp_path / "state"
+    assert run(_args(project, "run"), state_dir=state_dir, runner=FakeDbtRunner(success=False)) == 1
+    assert run(_args(project, "run"), state_dir=state_dir,
+               runner=FakeDbtRunner(success=False, exception=RuntimeError("profile"))) == 2
+    assert not (state_dir / project_hash(project)).exists()
+
+
+def test_deps_skipped_until_lock_changes(project, tmp_path):
+    state_dir, runner = tmp_path / "state", FakeDbtRunner()
+    assert not deps_up_to_date(project, state_dir)
+    for _ in range(2):
+        assert run(_args(project, "deps"), state_dir=state_dir, runner=runner) == 0
+    assert len(runner.calls) == 1 and deps_up_to_date(project, state_dir)
+
+    (project / "package-lock.yml").write_text("sha1_hash: bbb\n")
+    run(_args(project, "deps"), state_dir=state_dir, runner=runner)
+    assert len(runner.calls) == 2
@@ -0,0 +1,172 @@
+"""Tests du téléchargement par plages HTTP contre un serveur local (Range, pannes injectées)."""
+
+import hashlib
+import http.server
+import json
+import os
+import re
+import threading
+
+import pytest
+
+from include.dvf.download import DownloadIntegrityError, ranged_download
+
+CHUNK = 64 * 1024
+
+
+class RangeServer(http.server.ThreadingHTTPServer):
+    """Sert `content` avec Range / If-Range ; `failures` : plages coupées à mi-corps."""
+
+    def __init__(self, content: bytes, *, ranges: bool = True) -> None:
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.content, self.etag, self.ranges = content, '"v1"', ranges
+        self.failures: dict[int, int] = {}     # début de plage → nombre de coupures restantes
+        self.requests: list[str | None] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/valeursfoncieres-2024.txt.zip"
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def _headers(self, status: int, length: int, extra: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", self.server.etag)
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def do_HEAD(self) -> None:
+        self._headers(200, len(self.server.content))
+
+    def do_GET(self) -> None:
+        content, header = self.server.content, self.headers.get("Range")
+        with self.server.lock:
+            self.server.requests.append(header)
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", header or "")
+        if not (self.server.ranges and match) or self.headers.get("If-Range") not in (None, self.server.etag):
+            self._headers(200, len(content))
+            self.wfile.write(content)
+            return
+        start, end = int(match.group(1)), min(int(match.group(2)), len(content) - 1)
+        body = content[start:end + 1]
+        self._headers(206, len(body), {"Content-Range": f"bytes {start}-{end}/{len(content)}"})
+        with self.server.lock:
+            fail = self.server.failures.get(start, 0) > 0
+            if fail:
+                self.server.failures[start] -= 1
+        if fail:
+            self.wfile.write(body[: len(body) // 2])     # connexion coupée à mi-plage
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def content():
+    return os.urandom(10 * CHUNK + 1234)
+
+
+@pytest.fixture
+def server(content):
+    server = RangeServer(content)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def test_concurrent_chunks_are_verified(server, content, tmp_path):
+    dest = tmp_path / "dvf.zip"
+    result = ranged_download(
+        server.url, dest, expected_size=len(content), checksum=_sha1(content),
+        chunk_size=CHUNK, concurrency=4,
+    )
+    assert dest.read_bytes() == content
+    assert (result["chunks"], result["bytes_fetched"], result["retries"]) == (11, len(content), 0)
+    assert len([r for r in server.requests if r]) == 11
+    assert not list(tmp_path.glob("*.part")) and not list(tmp_path.glob("*.state.json"))
+
+
+def test_interrupted_chunk_is_retried_alone(server, content, tmp_path):
+    server.failures = {3 * CHUNK: 2}
+    result = ranged_download(server.url, tmp_path / "dvf.zip", chunk_size=CHUNK, backoff=0)
+    assert (tmp_path / "dvf.zip").read_bytes() == content
+    assert result["retries"] == 2
+    assert server.requests.count(f"bytes={3 * CHUNK}-{4 * CHUNK - 1}") == 3
+    assert len(server.requests) == 11 + 2
+
+
+def test_new_attempt_resumes_from_persisted_state(server, content, tmp_path):
+    dest = tmp_path / "dvf.zip"
+    server.failures = {6 * CHUNK: 99}
+    with pytest.raises(OSError):
+        ranged_download(server.url, dest, chunk_size=CHUNK, retries=1, backoff=0)
+    done = {int(i) for i in json.loads((tmp_path / "dvf.zip.state.json").read_text())["chunks"]}
+    assert 6 not in done and set(range(6)) <= done
+
+    # Un chunk consigné mais corrompu sur disque est re-téléchargé
+    with open(tmp_path / "dvf.zip.part", "r+b") as f:
+        f.seek(CHUNK)
+        f.write(b"\0" * 10)
+
+    server.failures, server.requests = {}, []
+    result = ranged_download(server.url, dest, checksum=_sha1(content), chunk_size=CHUNK, backoff=0)
+    assert dest.read_bytes() == content
+    refetched = sorted(set(range(11)) - done | {1})
+    assert result["bytes_resumed"] == (len(done) - 1) * CHUNK
+    assert result["bytes_fetched"] == len(content) - result["bytes_resumed"]
+    assert sorted(r for r in server.requests if r) == sorted(
+        f"bytes={i * CHUNK}-{min((i + 1) * CHUNK, len(content)) - 1}" for i in refetched
+    )
+
+
+def test_source_change_between_attempts_restarts(server, content, tmp_path):
+    dest = tmp_path / "dvf.zip"
+    server.failures = {2 * CHUNK: 99}
+    with pytest.raises(OSError):
+        ranged_download(server.url, dest, chunk_size=CHUNK, retries=0, concurrency=1)
+
+    server.content, server.etag, server.failures = content[::-1], '"v2"', {}
+    result = ranged_download(server.url, dest, chunk_size=CHUNK)
+    assert dest.read_bytes() == content[::-1]
+    assert result["bytes_resumed"] == 0
+
+
+def test_checksum_mismatch_discards_download(server, content, tmp_path):
+    with pytest.raises(DownloadIntegrityError):
+        ranged_download(server.url, tmp_path / "dvf.zip", checksum=_sha1(b"autre"), chunk_size=CHUNK)
+    assert list(tmp_path.iterdir()) == []
+
+    with pytest.raises(DownloadIntegrityError):
+        ranged_download(server.url, tmp_path / "dvf.zip", expected_size=len(content) + 1)
+
+
+def test_completed_file_is_reused(server, content, tmp_path):
+    dest = tmp_path / "dvf.zip"
+    ranged_download(server.url, dest, checksum=_sha1(content), chunk_size=CHUNK)
+    server.requests = []
+    result = ranged_download(server.url, dest, checksum=_sha1(content), chunk_size=CHUNK)
+    assert (result["bytes_fetched"], result["bytes_resumed"]) == (0, len(content))
+    assert server.requests == []
+
+
+def test_server_without_ranges_falls_back_to_single_get(content, tmp_path):
+    server = RangeServer(content, ranges=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        result = ranged_download(server.url, tmp_path / "dvf.zip", checksum=_sha1(content), chunk_size=CHUNK)
+    finally:
+        server.shutdown()
+    assert not result["ranged"] and server.requests == [None]
+    assert (tmp_path / "dvf.zip").read_bytes() == content
@@ -0,0 +1,196 @@
+"""Tests de l'ingestion streaming (ZIP → S3 multipart) contre un S3 moto local."""
+
+import functools
+import hashlib
+import http.server
+import json
+import os
+import threading
+import zipfile
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from include.dvf.ingestion import (
+    MIN_PART_SIZE,
+    list_dvf_resources,
+    multipart_upload,
+    parse_dvf_resources,
+    stream_zip_to_s3,
+)
+
+BUCKET = "dvf-test"
+PREFIX = "real-raw/"
+
+# Réponse de l'API dataset data.gouv.fr (extrait, champs utilisés)
+DATASET = {
+    "resources": [
+        {"url": "https://static.data.gouv.fr/resources/dvf/20250406-valeursfoncieres-2024.txt.zip",
+         "checksum": {"type": "sha1", "value": "ab12"}, "last_modified": "2025-04-06T10:00:00",
+         "filesize": 90_000_000},
+        {"url": "https://static.data.gouv.fr/resources/dvf/valeursfoncieres-2020-s2.txt.zip",
+         "checksum": None, "last_modified": "2025-04-06T10:00:00", "filesize": 40_000_000},
+        {"url": "https://static.data.gouv.fr/resources/dvf/valeursfoncieres-export.txt.zip"},
+        {"url": "https://static.data.gouv.fr/resources/dvf/notice-descriptive-dvf.pdf"},
+        {"url": "https://static.data.gouv.fr/resources/dvf/mutations-2024.zip"},
+    ],
+}
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def http_dir(tmp_path):
+    """Sert `tmp_path` sur un serveur HTTP local, retourne (dossier, url de base)."""
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield tmp_path, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_parse_dvf_resources_keeps_valeursfoncieres_zips():
+    resources = parse_dvf_resources(DATASET)
+    assert [r["zip_name"] for r in resources] == [
+        "20250406-valeursfoncieres-2024.txt.zip",
+        "valeursfoncieres-2020-s2.txt.zip",
+        "valeursfoncieres-export.txt.zip",
+    ]
+    assert [r["expected_txt"] for r in resources] == [
+        "20250406-valeursfoncieres-2024.txt",
+        "valeursfoncieres-2020-s2.txt",
+        "valeursfoncieres-export.txt",
+    ]
+    # Année extraite du nom ; sans année, le nom du ZIP sert d'identifiant
+    assert [r["year"] for r in resources] == ["2024", "2020", "valeursfoncieres-export.txt.zip"]
+
+
+def test_parse_dvf_resources_tolerates_missing_metadata():
+    first, no_checksum, bare = parse_dvf_resources(DATASET)
+    assert (first["checksum"], first["checksum_type"], first["filesize"]) == ("ab12", "sha1", 90_000_000)
+    assert (no_checksum["checksum"], no_checksum["checksum_type"]) == (None, None)
+    assert no_checksum["last_modified"] == "2025-04-06T10:00:00"
+    assert (bare["checksum"], bare["last_modified"], bare["filesize"]) == (None, None, None)
+    json.dumps([first, no_checksum, bare])   # sérialisable en XCom
+
+
+def test_list_dvf_resources_reads_dataset_api(http_dir):
+    directory, base_url = http_dir
+    (directory / "dataset.json").write_text(json.dumps(DATASET))
+    assert list_dvf_resources(f"{base_url}/dataset.json") == parse_dvf_resources(DATASET)
+
+
+def test_multipart_upload_splits_in_fixed_parts(s3_client, tmp_path):
+    payload = os.urandom(2 * MIN_PART_SIZE + 123)
+    source = tmp_path / "data.txt"
+    source.write_bytes(payload)
+
+    with source.open("rb") as f:
+        result = multipart_upload(s3_client, f, BUCKET, "k.txt", part_size=MIN_PART_SIZE)
+
+    assert result["parts"] == 3
+    assert result["bytes"] == len(payload)
+    assert s3_client.get_object(Bucket=BUCKET, Key="k.txt")["Body"].read() == payload
+
+
+def test_multipart_upload_aborts_on_error(s3_client, tmp_path):
+    source = tmp_path / "data.txt"
+    source.write_bytes(os.urandom(2 * MIN_PART_SIZE))
+
+    calls = {"n": 0}
+    original = s3_client.upload_part
+
+    def failing_upload_part(**kwargs):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise ConnectionError("réseau coupé")
+        return original(**kwargs)
+
+    s3_client.upload_part = failing_upload_part
+    with source.open("rb") as f, pytest.raises(ConnectionError):
+        multipart_upload(s3_client, f, BUCKET, "k.txt", part_size=MIN_PART_SIZE)
+
+    assert not s3_client.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=BUCKET)
+
+
+def test_stream_zip_to_s3_uploads_txt_members(s3_client, http_dir):
+    directory, base_url = http_dir
+    content = b"No disposition|Valeur fonciere\n" + b"000001|100000,00\n" * 50_000
+    with zipfile.ZipFile(directory / "valeursfoncieres-2024.txt.zip", "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ValeursFoncieres-2024.txt", content)
+        z.writestr("ValeursFoncieres-2023.txt", b"x")
+        z.writestr("LISEZMOI.pdf", b"%PDF")
+
+    result = stream_zip_to_s3(
+        f"{base_url}/valeursfoncieres-2024.txt.zip",
+        s3_client,
+        BUCKET,
+        PREFIX,
+        skip=lambda key: key.endswith("2023.txt"),
+    )
+
+    assert result["bytes_downloaded"] == (directory / "valeursfoncieres-2024.txt.zip").stat().st_size
+    assert [u["file_name"] for u in result["uploaded"]] == ["ValeursFoncieres-2024.txt"]
+    assert result["skipped"] == ["ValeursFoncieres-2023.txt"]
+    body = s3_client.get_object(Bucket=BUCKET, Key=f"{PREFIX}ValeursFoncieres-2024.txt")["Body"].read()
+    assert body == content
+
+
+def test_stream_zip_to_s3_verified_download_is_removed_after_upload(s3_client, http_dir, tmp_path_factory):
+    directory, base_url = http_dir
+    archive = directory / "valeursfoncieres-2024.txt.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ValeursFoncieres-2024.txt", b"No disposition|Valeur fonciere\n000001|100000,00\n")
+    download_dir = tmp_path_factory.mktemp("downloads")
+
+    result = stream_zip_to_s3(
+        f"{base_url}/valeursfoncieres-2024.txt.zip",
+        s3_client,
+        BUCKET,
+        PREFIX,
+        download_dir  = str(download_dir),
+        expected_size = archive.stat().st_size,
+        checksum      = hashlib.sha1(archive.read_bytes()).hexdigest(),
+    )
+
+    assert result["download"]["checksum"] == hashlib.sha1(archive.read_bytes()).hexdigest()
+    assert [u["file_name"] for u in result["uploaded"]] == ["ValeursFoncieres-2024.txt"]
+    assert list(download_dir.iterdir()) == []
+
+
+def test_stream_zip_to_s3_cache_hit_skips_download(s3_client, http_dir, tmp_path_factory):
+    from include.dvf.cache import DownloadCache
+
+    directory, base_url = http_dir
+    archive = directory / "valeursfoncieres-2024.txt.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ValeursFoncieres-2024.txt", b"No disposition|Valeur fonciere\n000001|100000,00\n")
+    cache, size = DownloadCache(tmp_path_factory.mktemp("cache")), archive.stat().st_size
+
+    def ingest() -> dict:
+        return stream_zip_to_s3(
+            f"{base_url}/valeursfoncieres-2024.txt.zip",
+            s3_client,
+            BUCKET,
+            PREFIX,
+            expected_size = size,
+            cache         = cache,
+            cache_version = "modified:2025-04-01|size:1",
+        )
+
+    first = ingest()
+    archive.unlink()                        # source indisponible : le hit ne doit pas la lire
+    second = ingest()
+
+    assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+    assert (first["bytes_downloaded"], second["bytes_downloaded"]) == (cache.stats["bytes_saved"], 0)
+    assert [u["file_name"] for u in second["uploaded"]] == ["ValeursFoncieres-2024.txt"]
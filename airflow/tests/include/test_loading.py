@@ -0,0 +1,179 @@
+"""Tests de la session de chargement : DDL / stages rejoués seulement si leur SQL change."""
+
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from include.dvf.loading import (
+    READ_FINGERPRINTS_SQL,
+    SAVE_FINGERPRINT_SQL,
+    LoadingSession,
+    fingerprint,
+    legacy_source_years,
+    mask_secrets,
+    retire_rows_sql,
+    retired_source_files,
+    stage_sql,
+)
+
+DDL = (Path(__file__).resolve().parents[2] / "include" / "sql" / "01_create_snowflake_objects.sql").read_text()
+
+
+class FakeSnowflake:
+    """Connexion DB-API minimale : table d'empreintes en mémoire, instructions journalisées."""
+
+    def __init__(self) -> None:
+        self.fingerprints: dict[str, str] | None = None   # None : table pas encore créée
+        self.executed: list[str] = []
+
+    def cursor(self) -> "FakeCursor":
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, db: FakeSnowflake) -> None:
+        self.db, self.description, self.rows = db, None, []
+
+    def execute(self, sql: str, parameters: dict | None = None) -> None:
+        db = self.db
+        db.executed.append(sql)
+        if sql == READ_FINGERPRINTS_SQL:
+            if db.fingerprints is None:
+                raise RuntimeError("Object 'DDL_FINGERPRINTS' does not exist")
+            self.description = [("OBJECT_NAME",), ("FINGERPRINT",)]
+            self.rows = list(db.fingerprints.items())
+        elif sql == SAVE_FINGERPRINT_SQL:
+            db.fingerprints[parameters["object_name"]] = parameters["fingerprint"]
+        elif "CREATE TABLE IF NOT EXISTS DEV_BRONZE.ddl_fingerprints" in sql:
+            db.fingerprints = {} if db.fingerprints is None else db.fingerprints
+
+    def fetchall(self) -> list[tuple]:
+        return self.rows
+
+    def close(self) -> None:
+        pass
+
+
+def _load(
+    db: FakeSnowflake, *, ddl: str = DDL, key_id: str = "AKIA1", secret: str = "s1", force: bool = False,
+) -> LoadingSession:
+    session = LoadingSession(db, force=force)
+    session.ensure("script:01", ddl)
+    for stage in ("dvf_s3_stage", "dvf_s3_serving_stage"):
+        session.ensure(
+            f"stage:{stage}",
+            stage_sql(stage, f"s3://bucket/{stage}/", "dvf_csv_format", key_id, secret),
+            depends_on=("script:01",),
+            secrets=(secret,),
+        )
+    return session
+
+
+def test_first_run_applies_everything_and_records_fingerprints():
+    db = FakeSnowflake()
+    session = _load(db)
+    assert session.applied == ["script:01", "stage:dvf_s3_stage", "stage:dvf_s3_serving_stage"]
+    assert set(db.fingerprints) == set(session.applied)
+    assert sum("CREATE OR REPLACE STAGE" in sql for sql in db.executed) == 2
+
+
+def test_unchanged_definitions_cost_a_single_read():
+    db = FakeSnowflake()
+    _load(db)
+    db.executed = []
+    session = _load(db)
+    assert session.applied == [] and len(session.skipped) == 3
+    assert db.executed == [READ_FINGERPRINTS_SQL] and session.statements == 1
+
+
+@pytest.mark.parametrize("change, expected", [
+    ({"secret": "s2"},                                   []),
+    ({"key_id": "AKIA2", "secret": "s2"},                ["stage:dvf_s3_stage", "stage:dvf_s3_serving_stage"]),
+    ({"ddl": DDL + "\nCREATE SCHEMA IF NOT EXISTS X;"}, ["script:01", "stage:dvf_s3_stage", "stage:dvf_s3_serving_stage"]),
+    ({"force": True},                                    ["script:01", "stage:dvf_s3_stage", "stage:dvf_s3_serving_stage"]),
+])
+def test_changes_reapply_only_what_depends_on_them(change, expected):
+    db = FakeSnowflake()
+    _load(db)
+    assert _load(db, **change).applied == expected
+    assert _load(db, **{k: v for k, v in change.items() if k != "force"}).applied == []
+
+
+def test_fingerprint_is_order_sensitive():
+    assert fingerprint("a", "b") != fingerprint("b", "a") != fingerprint("ab")
+
+
+def test_retired_source_files_match_bronze_source_column():
+    keys = ["real-raw/ValeursFoncieres-2024.txt", "real-raw/valeursfoncieres-2024/v-0123456789ab/ValeursFoncieres-2024.txt.0001.gz"]
+    assert retired_source_files(keys, "real-raw/") == [
+        "ValeursFoncieres-2024.txt", "valeursfoncieres-2024/v-0123456789ab/ValeursFoncieres-2024.txt.0001.gz",
+    ]
+    assert retired_source_files(keys, "real-raw/", parquet=True) == [
+        "ValeursFoncieres-2024.0001.v-0123456789ab.parquet", "ValeursFoncieres-2024.parquet",
+    ]
+    assert "WHERE _source_file IN" in retire_rows_sql("mutations_foncieres")
+    assert "REGEXP_SUBSTR(_source_file, '[^/]+$') IN" in retire_rows_sql("mutations_foncieres_typed", parquet=True)
+
+
+def test_legacy_source_years_only_for_historical_objects():
+    keys = [
+        "real-raw/ValeursFoncieres-2021.txt",
+        "real-raw/ValeursFoncieres-2022.txt.0003.gz",
+        "real-raw/valeursfoncieres-2024/v-0123456789ab/ValeursFoncieres-2024.txt",
+    ]
+    assert legacy_source_years(keys) == ["2021", "2022"]
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_retire_rows_also_deletes_unlineaged_rows_of_adopted_year(typed):
+    """Objet historique remplacé : les lignes d'avant le lignage (_source_file NULL) de son année partent aussi."""
+    duckdb = pytest.importorskip("duckdb")
+    db = duckdb.connect()
+    date = (lambda d: f"DATE '{d}'") if typed else (lambda d: "'" + "/".join(reversed(d.split("-"))) + "'")
+    db.sql(f"""
+        CREATE TABLE mutations_foncieres AS SELECT * FROM (VALUES
+            ({date("2022-03-01")}, NULL,                        'legacy 2022'),
+            ({date("2023-05-02")}, NULL,                        'legacy 2023'),
+            ({date("2022-07-03")}, 'ValeursFoncieres-2022.txt', 'flat 2022'),
+            ({date("2022-07-03")}, 'valeursfoncieres-2022/v-0123456789ab/ValeursFoncieres-2022.txt', 'new 2022')
+        ) t("Date mutation", _source_file, label)
+    """)
+    keys = ["real-raw/ValeursFoncieres-2022.txt"]
+    params = {
+        "source_files": json.dumps(retired_source_files(keys, "real-raw/")),
+        "legacy_years": json.dumps(legacy_source_years(keys)),
+    }
+    sql = retire_rows_sql("mutations_foncieres", typed=typed).replace("DVF_DB.DEV_BRONZE.", "")
+    # FLATTEN(PARSE_JSON(...)) Snowflake → UNNEST DuckDB, paramètres JSON en littéraux
+    sql = re.sub(
+        r"TABLE\(FLATTEN\(INPUT => PARSE_JSON\(%\((\w+)\)s\)\)\)",
+        lambda m: f"(SELECT UNNEST(from_json('{params[m.group(1)]}', '[\"VARCHAR\"]')) AS value)",
+        sql,
+    )
+    db.sql(sql)
+    assert sorted(r[0] for r in db.sql("SELECT label FROM mutations_foncieres").fetchall()) == ["legacy 2023", "new 2022"]
+
+
+def test_stage_secret_never_reaches_fingerprints_or_errors():
+    db = FakeSnowflake()
+    _load(db)
+    sql = stage_sql("dvf_s3_stage", "s3://bucket/dvf_s3_stage/", "dvf_csv_format", "AKIA1", "s3cr3t")
+    assert fingerprint(mask_secrets(sql, ("s3cr3t",))) == fingerprint(sql.replace("s3cr3t", "***"))
+
+    class FailingCursor(FakeCursor):
+        def execute(self, sql, parameters=None):
+            if "CREATE OR REPLACE STAGE" in sql:
+                raise RuntimeError(f"SQL compilation error near {sql}")
+            super().execute(sql, parameters)
+
+    db.cursor = lambda: FailingCursor(db)
+    with pytest.raises(RuntimeError, match="stage:dvf_s3_stage") as excinfo:
+        LoadingSession(db, force=True).ensure("stage:dvf_s3_stage", sql, secrets=("s3cr3t",))
+    assert "s3cr3t" not in str(excinfo.value) and excinfo.value.__suppress_context__
+
+
+def test_storage_integration_stage_has_no_credentials():
+    sql = stage_sql("dvf_s3_stage", "s3://bucket/real-raw/", "dvf_csv_format", storage_integration="DVF_S3_INT")
+    assert "STORAGE_INTEGRATION = DVF_S3_INT" in sql and "CREDENTIALS" not in sql
@@ -0,0 +1,108 @@
+"""Tests du manifest d'ingestion (détection des republications DVF)."""
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from include.dvf.manifest import (
+    ACTION_CHANGED,
+    ACTION_NEW,
+    ACTION_UNCHANGED,
+    is_versioned_key,
+    load_manifest,
+    manifest_entry,
+    merge_entries,
+    orphan_keys,
+    plan_resources,
+    replaced_objects,
+    save_manifest,
+    version_prefix,
+)
+
+BUCKET = "dvf-test"
+
+
+def _resource(year: str, checksum: str | None = None, last_modified: str = "2025-04-01") -> dict:
+    zip_name = f"valeursfoncieres-{year}.txt.zip"
+    return {
+        "url":           f"https://static.data.gouv.fr/{zip_name}",
+        "zip_name":      zip_name,
+        "expected_txt":  zip_name[:-4],
+        "year":          year,
+        "checksum":      checksum,
+        "last_modified": last_modified,
+        "filesize":      1000,
+    }
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_plan_detects_new_unchanged_and_changed():
+    old = plan_resources([_resource("2023", "aaa"), _resource("2024", last_modified="2025-04-01")], {})
+    assert [r["action"] for r in old] == [ACTION_NEW, ACTION_NEW]
+
+    manifest = merge_entries({}, {r["zip_name"]: manifest_entry(r, []) for r in old})
+    planned = plan_resources(
+        [
+            _resource("2023", "aaa"),                            # identique
+            _resource("2024", last_modified="2025-10-01"),       # republié sans checksum
+            _resource("2025", "ccc"),                            # nouvelle année
+        ],
+        manifest,
+    )
+    assert [r["action"] for r in planned] == [ACTION_UNCHANGED, ACTION_CHANGED, ACTION_NEW]
+
+
+def test_checksum_takes_precedence_over_last_modified():
+    manifest = merge_entries({}, {
+        r["zip_name"]: manifest_entry(r, []) for r in plan_resources([_resource("2023", "aaa")], {})
+    })
+    touched = _resource("2023", "aaa", last_modified="2026-01-01")
+    assert plan_resources([touched], manifest)[0]["action"] == ACTION_UNCHANGED
+
+
+def test_manifest_roundtrip_on_s3(s3_client):
+    assert load_manifest(s3_client, BUCKET)["resources"] == {}
+
+    resource = plan_resources([_resource("2024", "bbb")], {})[0]
+    entry = manifest_entry(resource, [{"key": "real-raw/ValeursFoncieres-2024.txt", "etag": "e1", "bytes": 42}])
+    save_manifest(s3_client, BUCKET, merge_entries(load_manifest(s3_client, BUCKET), {resource["zip_name"]: entry}))
+
+    manifest = load_manifest(s3_client, BUCKET)
+    assert manifest["updated_at"]
+    assert manifest["resources"][resource["zip_name"]]["objects"][0]["etag"] == "e1"
+    assert plan_resources([_resource("2024", "bbb")], manifest)[0]["action"] == ACTION_UNCHANGED
+
+
+def test_republication_gets_its_own_version_prefix():
+    v1 = plan_resources([_resource("2024", "aaa")], {})[0]
+    v2 = plan_resources([_resource("2024", "bbb")], {})[0]
+    prefix = version_prefix("real-raw/", v1)
+    assert prefix == version_prefix("real-raw/", v1)
+    assert prefix.startswith("real-raw/valeursfoncieres-2024/v-") and prefix != version_prefix("real-raw/", v2)
+    assert is_versioned_key(f"{prefix}ValeursFoncieres-2024.txt.0001.gz")
+    assert not is_versioned_key("real-raw/ValeursFoncieres-2024.txt")
+
+
+def test_replaced_objects_and_orphans_follow_the_pointer():
+    old = plan_resources([_resource("2024", "aaa")], {})[0]
+    new = plan_resources([_resource("2024", "bbb")], {})[0]
+    legacy = {"key": "real-raw/ValeursFoncieres-2024.txt", "etag": "e1", "bytes": 42}
+    current = {"key": f"{version_prefix('real-raw/', new)}ValeursFoncieres-2024.txt", "etag": "e2", "bytes": 43}
+    manifest = merge_entries({}, {old["zip_name"]: manifest_entry(old, [legacy])})
+    entries = {new["zip_name"]: manifest_entry(new, [current])}
+
+    assert replaced_objects(manifest, entries) == [{"zip_name": old["zip_name"], **legacy}]
+    assert replaced_objects(manifest, {old["zip_name"]: manifest_entry(old, [legacy])}) == []
+
+    interrupted = f"{version_prefix('real-raw/', old)}ValeursFoncieres-2024.txt.0001.gz"
+    keys = [legacy["key"], current["key"], interrupted]
+    # Avant la bascule, la nouvelle version n'est pas référencée ; les objets historiques jamais orphelins
+    assert orphan_keys(manifest, keys) == sorted([current["key"], interrupted])
+    assert orphan_keys(merge_entries(manifest, entries), keys) == [interrupted]
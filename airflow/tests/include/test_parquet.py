@@ -0,0 +1,86 @@
+"""Tests de la conversion TXT DVF → Parquet partitionné."""
+
+import io
+
+import boto3
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from moto import mock_aws
+
+from include.dvf.parquet import convert_s3_object, convert_txt_to_parquet, delete_converted, is_converted, source_basename
+
+HEADER = "No disposition|Date mutation|Valeur fonciere|Code departement|Commune\n"
+
+
+def _dvf_txt(rows: int) -> bytes:
+    lines = [HEADER]
+    for i in range(rows):
+        dept = ["75", "01", "2A"][i % 3]
+        year = 2023 + i % 2
+        lines.append(f"{i:06d}|15/0{1 + i % 9}/{year}| {100000 + i},50 |{dept}|PARIS\n")
+    lines.append("000999|01/01/2024\n")  # ligne tronquée → rejetée
+    return "".join(lines).encode("utf-8")
+
+
+def test_convert_partitions_by_year_and_departement(tmp_path):
+    result = convert_txt_to_parquet(
+        io.BytesIO(_dvf_txt(3_000)), tmp_path,
+        basename="ValeursFoncieres-2024", default_year="2024",
+        block_size=4096, row_group_size=500, max_buffered_rows=1_000,
+    )
+
+    assert result["rows"] == 3_000
+    assert result["rejected"] == 1
+    assert len(result["files"]) == 6  # 2 années × 3 départements
+    assert "annee=2024/code_departement=2A/ValeursFoncieres-2024.parquet" in [f["path"] for f in result["files"]]
+
+    table = ds.dataset(tmp_path, format="parquet", partitioning="hive").to_table()
+    assert table.num_rows == 3_000
+    # Valeurs brutes conservées (zéros en tête, virgule décimale), espaces retirés
+    row = table.filter(ds.field("No disposition") == "000007").to_pylist()[0]
+    assert row["Valeur fonciere"] == "100007,50"
+    assert row["Code departement"] == "01"
+
+    meta = pq.ParquetFile(tmp_path / result["files"][0]["path"]).metadata
+    assert meta.row_group(0).column(0).compression == "ZSTD"
+    assert max(meta.row_group(i).num_rows for i in range(meta.num_row_groups)) <= 500
+
+
+def test_convert_s3_object_is_idempotent(tmp_path):
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="dvf")
+        client.put_object(Bucket="dvf", Key="real-raw/ValeursFoncieres-2024.txt", Body=_dvf_txt(300))
+        etag = client.head_object(Bucket="dvf", Key="real-raw/ValeursFoncieres-2024.txt")["ETag"].strip('"')
+
+        assert not is_converted(client, "dvf", "real-parquet/", "ValeursFoncieres-2024", etag)
+        summary = convert_s3_object(
+            client, "dvf", "real-raw/ValeursFoncieres-2024.txt", "real-parquet/",
+            default_year="2024", work_dir=tmp_path / "work",
+        )
+        assert summary["rows"] == 300
+        assert is_converted(client, "dvf", "real-parquet/", "ValeursFoncieres-2024", etag)
+
+        keys = [o["Key"] for o in client.list_objects_v2(Bucket="dvf", Prefix="real-parquet/annee=")["Contents"]]
+        assert len(keys) == summary["files"] == 6
+
+
+def test_versions_never_share_parquet_names_and_retire_cleanly(tmp_path):
+    versioned = "real-raw/valeursfoncieres-2024/v-0123456789ab/ValeursFoncieres-2024.txt.0003.gz"
+    assert source_basename("real-raw/ValeursFoncieres-2024.txt") == "ValeursFoncieres-2024"
+    assert source_basename(versioned) == "ValeursFoncieres-2024.0003.v-0123456789ab"
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="dvf")
+        client.put_object(Bucket="dvf", Key="real-raw/ValeursFoncieres-2024.txt", Body=_dvf_txt(30))
+        convert_s3_object(
+            client, "dvf", "real-raw/ValeursFoncieres-2024.txt", "real-parquet/",
+            default_year="2024", work_dir=tmp_path / "work",
+        )
+        client.put_object(Bucket="dvf", Key="real-parquet/annee=2024/code_departement=75/Autre.parquet", Body=b"x")
+
+        deleted = delete_converted(client, "dvf", "real-parquet/", "ValeursFoncieres-2024")
+        assert len(deleted) == 6
+        remaining = [o["Key"] for o in client.list_objects_v2(Bucket="dvf", Prefix="real-parquet/").get("Contents", [])]
+        assert remaining == ["real-parquet/annee=2024/code_departement=75/Autre.parquet"]
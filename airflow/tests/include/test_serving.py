@@ -0,0 +1,214 @@
+"""Tests des extraits de service (publication versionnée) et du cache de l'API."""
+
+import json
+from datetime import datetime, timezone
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from include.dvf.serving import (
+    CURRENT_KEY,
+    SERVING_TABLES,
+    parse_publication,
+    publication,
+    serving_version,
+    stale_versions,
+    summarize_unload,
+    unload_sql,
+)
+from include.serving.api import (
+    ParamError,
+    ResultCache,
+    S3Publications,
+    ServingApp,
+    _MISS,
+    classement_departements,
+    volume_mensuel,
+)
+
+BUCKET = "dvf-test"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# ─── Publication ──────────────────────────────────────────────────────────────
+
+def test_serving_version_is_utc_and_stable():
+    logical_date = datetime(2025, 1, 5, 2, 0, tzinfo=timezone.utc)
+    assert serving_version(logical_date) == "20250105T020000"
+
+
+def test_unload_sql_targets_versioned_prefix():
+    sql = unload_sql("agg_commune_type_bien", "20250105T020000")
+    assert "@DVF_DB.DEV_BRONZE.dvf_s3_serving_stage/20250105T020000/agg_commune_type_bien/" in sql
+    assert "FROM DVF_DB.DEV_STAR.agg_commune_type_bien" in sql
+    assert "TYPE = PARQUET" in sql
+
+
+def test_unload_sql_rejects_unknown_table():
+    with pytest.raises(ValueError):
+        unload_sql("fact_mutations", "20250105T020000")
+
+
+def test_summarize_unload_accepts_snowflake_column_case():
+    rows = [{"ROWS_UNLOADED": 10, "INPUT_BYTES": 0, "OUTPUT_BYTES": 300}, {"rows_unloaded": 5, "output_bytes": 100}]
+    assert summarize_unload(rows) == {"rows": 15, "bytes": 400}
+    assert summarize_unload(None) == {"rows": 0, "bytes": 0}
+
+
+def test_publication_round_trip():
+    tables = {t: {"rows": 1, "bytes": 10} for t in SERVING_TABLES}
+    current = publication("20250105T020000", tables, dag_run_id="scheduled__2025-01-05")
+    assert parse_publication(json.dumps(current)) == current
+    assert list(current["tables"]) == sorted(SERVING_TABLES)
+
+
+@pytest.mark.parametrize("raw", ['{"version": "latest", "tables": {"a": {}}}', '{"version": "20250105T020000"}'])
+def test_parse_publication_rejects_invalid_pointer(raw):
+    with pytest.raises(ValueError):
+        parse_publication(raw)
+
+
+def test_stale_versions_keeps_recent_and_current():
+    versions = ["20250105T020000", "20250205T020000", "20250305T020000", "20250405T020000", "tmp"]
+    assert stale_versions(versions, "20250405T020000", keep=2) == ["20250105T020000", "20250205T020000"]
+    # Version courante plus ancienne (republication manuelle) : jamais supprimée
+    assert stale_versions(versions, "20250105T020000", keep=1) == ["20250205T020000", "20250305T020000"]
+
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # "b" devient le moins récent
+    cache.put("c", 3)
+    assert cache.get("b") is _MISS
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(max_entries=10, ttl_seconds=30, clock=clock)
+    cache.put("a", [])
+    clock.now = 29
+    assert cache.get("a") == []
+    clock.now = 30
+    assert cache.get("a") is _MISS
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "evictions": 0}
+
+
+# ─── Requêtes ─────────────────────────────────────────────────────────────────
+
+def test_month_parameters_are_validated():
+    _, args = volume_mensuel({"type": "maison", "debut": "2023-01"})
+    assert args[-1] == datetime(2023, 1, 1).date()
+    with pytest.raises(ParamError):
+        volume_mensuel({"fin": "2023-13"})
+
+
+def test_ranking_criterion_is_whitelisted():
+    sql, args = classement_departements({"type": "maison", "critere": "prix_median", "limite": "5"})
+    assert "ORDER BY prix_median DESC" in sql and args[-1] == 5
+    with pytest.raises(ParamError):
+        classement_departements({"critere": "prix_median"})     # non additif sans type
+    with pytest.raises(ParamError):
+        classement_departements({"type": "maison", "critere": "1; DROP TABLE x"})
+    with pytest.raises(ParamError):
+        classement_departements({"limite": "10000"})
+
+
+class FakeStore:
+    def __init__(self) -> None:
+        self.version, self.loaded_at, self.rows, self.loads, self.queries = None, None, {}, [], 0
+
+    def load(self, directory, current) -> None:
+        self.version = current["version"]
+        self.loads.append(directory)
+
+    def query(self, sql, params) -> list[dict]:
+        self.queries += 1
+        return [{"version": self.version}]
+
+
+class FakeSource:
+    def __init__(self) -> None:
+        self.current_version = None
+
+    def current(self):
+        return self.current_version and {"version": self.current_version, "tables": {"dim_date": {}}}
+
+    def materialize(self, current):
+        return f"/extracts/{current['version']}"
+
+    def prune(self, keep_version) -> None:
+        pass
+
+
+def test_new_publication_reloads_and_invalidates_cache():
+    source, store = FakeSource(), FakeStore()
+    app = ServingApp(source, store=store)
+    assert app.handle("/volume-mensuel", {})[0] == 503
+
+    source.current_version = "20250105T020000"
+    assert app.refresh() and not app.refresh()
+    assert app.handle("/volume-mensuel", {})[2]["X-Cache"] == "MISS"
+    assert app.handle("/volume-mensuel", {})[2]["X-Cache"] == "HIT"
+
+    source.current_version = "20250205T020000"
+    assert app.refresh()
+    status, body, headers = app.handle("/volume-mensuel", {})
+    assert (status, body, headers["X-Cache"]) == (200, [{"version": "20250205T020000"}], "MISS")
+    assert store.loads == ["/extracts/20250105T020000", "/extracts/20250205T020000"]
+    assert store.queries == 2
+
+
+def test_unknown_endpoint_and_bad_parameter():
+    app = ServingApp(FakeSource(), store=FakeStore())
+    app.store.version = "20250105T020000"
+    assert app.handle("/inconnu", {})[0] == 404
+    assert app.handle("/prix-m2/commune", {})[0] == 400
+
+
+# ─── Source S3 ────────────────────────────────────────────────────────────────
+
+def test_s3_publications_materializes_current_version(tmp_path):
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        source = S3Publications(f"s3://{BUCKET}/real-serving", cache_dir=tmp_path, client=client)
+        assert source.current() is None
+
+        current = publication("20250105T020000", {"dim_date": {"rows": 1, "bytes": 4}})
+        client.put_object(Bucket=BUCKET, Key="real-serving/20250105T020000/dim_date/data_0.parquet", Body=b"PAR1")
+        client.put_object(Bucket=BUCKET, Key=f"real-serving/{CURRENT_KEY}", Body=json.dumps(current))
+        (tmp_path / "20241205T020000").mkdir()
+
+        assert source.current()["version"] == "20250105T020000"
+        directory = source.materialize(source.current())
+        assert (directory / "dim_date" / "data_0.parquet").read_bytes() == b"PAR1"
+        source.prune("20250105T020000")
+        assert [p.name for p in tmp_path.iterdir()] == ["20250105T020000"]
+
+
+def test_extract_store_loads_parquet(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    from include.serving.api import ExtractStore
+
+    (tmp_path / "dim_type_bien").mkdir()
+    duckdb.sql("SELECT 1 AS type_bien_key, 'maison' AS type_local").write_parquet(
+        str(tmp_path / "dim_type_bien" / "data_0.parquet")
+    )
+    store = ExtractStore()
+    store.load(tmp_path, {"version": "20250105T020000", "tables": {"dim_type_bien": {}}})
+    assert store.rows == {"dim_type_bien": 1}
+    assert store.query("SELECT type_local FROM dim_type_bien WHERE type_bien_key = ?", [1]) == [{"type_local": "maison"}]
@@ -0,0 +1,83 @@
+"""Tests du générateur DVF synthétique (reproductibilité, layout Bronze, formats)."""
+
+import re
+import zipfile
+from pathlib import Path
+
+from include.benchmarks.synthetic_dvf import (
+    COLUMNS,
+    generate_dataset,
+    load_departements,
+    rows_for_scale,
+)
+
+CREATE_OBJECTS_SQL = Path(__file__).resolve().parents[2] / "include" / "sql" / "01_create_snowflake_objects.sql"
+
+
+def _bronze_columns() -> list[str]:
+    sql = CREATE_OBJECTS_SQL.read_text(encoding="utf-8")
+    ddl = sql[sql.index("CREATE TABLE IF NOT EXISTS DEV_BRONZE.mutations_foncieres"):]
+    ddl = ddl[:ddl.index("\nCOMMENT =")]
+    return re.findall(r'^\s*"([^"]+)"\s+VARCHAR', ddl, flags=re.MULTILINE)
+
+
+def _lines(path: str) -> list[list[str]]:
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n").split("|") for line in f]
+
+
+def test_same_seed_gives_identical_files(tmp_path):
+    a = generate_dataset(tmp_path / "a", scale_factor=0.001, seed=7, years=(2023, 2024))
+    b = generate_dataset(tmp_path / "b", scale_factor=0.001, seed=7, years=(2023, 2024))
+    c = generate_dataset(tmp_path / "c", scale_factor=0.001, seed=8, years=(2023, 2024))
+
+    for fa, fb, fc in zip(a["files"], b["files"], c["files"]):
+        assert Path(fa["path"]).read_bytes() == Path(fb["path"]).read_bytes()
+        assert Path(fa["path"]).read_bytes() != Path(fc["path"]).read_bytes()
+
+
+def test_layout_matches_bronze_table_plus_date_mutation(tmp_path):
+    bronze = _bronze_columns()
+
+    assert [c for c in COLUMNS if c != "Date mutation"] == bronze
+
+    summary = generate_dataset(tmp_path, scale_factor=0.001, years=(2024,))
+    lines = _lines(summary["files"][0]["path"])
+    assert lines[0] == COLUMNS
+    assert all(len(line) == len(COLUMNS) for line in lines)
+
+
+def test_row_counts_follow_scale_factor(tmp_path):
+    summary = generate_dataset(tmp_path, scale_factor=0.002, years=(2021, 2022, 2023))
+
+    assert summary["rows"] == rows_for_scale(0.002) == 3_400
+    assert [f["rows"] for f in summary["files"]] == [1_134, 1_133, 1_133]
+    for f in summary["files"]:
+        assert len(_lines(f["path"])) == f["rows"] + 1
+
+
+def test_values_use_dvf_conventions(tmp_path):
+    summary = generate_dataset(tmp_path, scale_factor=0.001, years=(2022,))
+    header, *rows = _lines(summary["files"][0]["path"])
+    col = {name: i for i, name in enumerate(header)}
+    departements = set(load_departements())
+
+    for row in rows:
+        day, month, year = row[col["Date mutation"]].split("/")
+        assert (len(day), len(month), year) == (2, 2, "2022")
+        assert row[col["Valeur fonciere"]] == "" or re.fullmatch(r"\d+,\d{2}", row[col["Valeur fonciere"]])
+        assert row[col["Code departement"]] in departements
+
+    # Plusieurs lignes par acte et doublons exacts, comme dans les fichiers DVF
+    assert any(r[col["Type local"]] == "Dépendance" for r in rows)
+    assert len({tuple(r) for r in rows}) < len(rows)
+
+
+def test_zip_output_contains_yearly_txt(tmp_path):
+    summary = generate_dataset(tmp_path, scale_factor=0.0005, years=(2024,), zip_output=True)
+
+    path = Path(summary["files"][0]["path"])
+    assert path.name == "valeursfoncieres-2024.txt.zip"
+    with zipfile.ZipFile(path) as z:
+        assert z.namelist() == ["ValeursFoncieres-2024.txt"]
+        assert len(z.read("ValeursFoncieres-2024.txt").decode("utf-8").splitlines()) == 851
@@ -0,0 +1,101 @@
+"""Tests de la télémétrie par tâche (collecte, run_results dbt, exports)."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from include.dvf import telemetry
+
+
+@pytest.fixture
+def context():
+    ti = SimpleNamespace(
+        dag_id     = "dvf_production_pipeline",
+        task_id    = "loading.copy_into_bronze",
+        map_index  = -1,
+        start_date = datetime.now(timezone.utc) - timedelta(seconds=5),
+    )
+    telemetry.on_execute_callback({"ti": ti})
+    return {"ti": ti}
+
+
+def _run_results(generated_at: str) -> dict:
+    return {
+        "metadata": {"generated_at": generated_at},
+        "results": [
+            {"unique_id": "model.real_estate_analytics.silver_mutation_f",
+             "status": "success", "execution_time": 42.5},
+            {"unique_id": "seed.real_estate_analytics.ref_departements",
+             "status": "success", "execution_time": 1.25},
+            {"unique_id": "test.real_estate_analytics.not_null_x.abc123",
+             "status": "pass", "execution_time": 0.5},
+        ],
+    }
+
+
+def test_dbt_node_timings_keeps_models_and_seeds():
+    timings = telemetry.dbt_node_timings(_run_results("2025-02-05T02:30:00Z"))
+
+    assert [(t["resource_type"], t["name"], t["execution_time"]) for t in timings] == [
+        ("model", "silver_mutation_f", 42.5),
+        ("seed", "ref_departements", 1.25),
+    ]
+
+
+def test_dbt_node_timings_ignores_stale_run_results():
+    since = datetime(2025, 2, 5, 3, 0, tzinfo=timezone.utc)
+
+    assert telemetry.dbt_node_timings(_run_results("2025-02-05T02:30:00Z"), since=since) == []
+    assert len(telemetry.dbt_node_timings(_run_results("2025-02-05T03:10:00.123456Z"), since=since)) == 2
+
+
+def test_collect_task_metrics_includes_recorded_counters(context):
+    telemetry.record(rows_loaded=1_000, bytes_uploaded=None)
+
+    metrics = {m["name"]: m for m in telemetry.collect_task_metrics(context, "success")}
+
+    prefix = "dvf.task.loading.copy_into_bronze"
+    assert metrics[f"{prefix}.duration"]["type"] == "timing"
+    assert metrics[f"{prefix}.peak_rss_bytes"]["value"] > 0
+    assert metrics[f"{prefix}.rows_loaded"]["value"] == 1_000
+    assert f"{prefix}.bytes_uploaded" not in metrics
+    assert metrics[f"{prefix}.rows_loaded"]["tags"]["status"] == "success"
+
+
+def test_collect_task_metrics_reads_fresh_dbt_run_results(context, tmp_path):
+    path = tmp_path / "run_results.json"
+    path.write_text(json.dumps(_run_results(datetime.now(timezone.utc).isoformat())))
+
+    names = [m["name"] for m in telemetry.collect_task_metrics(context, "success", dbt_run_results=path)]
+
+    assert "dvf.dbt.model.silver_mutation_f.execution_time" in names
+    assert "dvf.dbt.seed.ref_departements.execution_time" in names
+
+
+def test_emit_exports_to_stats_and_file(context, tmp_path, monkeypatch):
+    import airflow.stats
+
+    sent = []
+    monkeypatch.setattr(airflow.stats, "Stats", SimpleNamespace(
+        timing=lambda name, dt, tags: sent.append((name, dt)),
+        gauge=lambda name, value, tags: sent.append((name, value)),
+    ))
+    monkeypatch.setattr(telemetry, "TELEMETRY_FILE", str(tmp_path / "m" / "metrics.jsonl"))
+    telemetry.record(rows_loaded=7)
+
+    telemetry.emit_task_metrics(context, "success")
+
+    lines = [json.loads(l) for l in (tmp_path / "m" / "metrics.jsonl").read_text().splitlines()]
+    assert {l["name"] for l in lines} == {name for name, _ in sent}
+    assert ("dvf.task.loading.copy_into_bronze.rows_loaded", 7) in sent
+
+
+def test_emit_never_raises(context, monkeypatch):
+    def boom(*args, **kwargs):
+        raise RuntimeError("statsd down")
+
+    monkeypatch.setattr(telemetry, "export_to_airflow_stats", boom)
+
+    telemetry.emit_task_metrics(context, "failed")
@@ -0,0 +1,141 @@
+"""Tests du trigger de publication DVF contre un stub HTTP local de l'API dataset."""
+
+import asyncio
+import json
+
+import boto3
+import pytest
+from aiohttp import web
+from moto import mock_aws
+
+from include.dvf.manifest import MANIFEST_KEY, empty_manifest, merge_entries
+from include.dvf.triggers import DvfDatasetUpdateTrigger, pending_updates, updates_fingerprint
+
+BUCKET = "dvf-test"
+
+
+def _resource(year: int, last_modified: str) -> dict:
+    return {
+        "url":           f"https://static.data.gouv.fr/valeursfoncieres-{year}.txt.zip",
+        "last_modified": last_modified,
+        "filesize":      1000 + year,
+        "checksum":      None,
+    }
+
+
+class DatasetStub:
+    """API dataset data.gouv.fr minimale : réponses programmables, appels comptés."""
+
+    def __init__(self) -> None:
+        self.resources = [_resource(2023, "2025-04-01T10:00:00"), _resource(2024, "2025-04-01T10:00:00")]
+        self.failures = 0
+        self.calls = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            return web.Response(status=503)
+        return web.json_response({"resources": [*self.resources, {"url": "https://static.data.gouv.fr/notice.pdf"}]})
+
+
+async def _serve(stub: DatasetStub) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_get("/api/1/datasets/dvf/", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/1/datasets/dvf/"
+
+
+class Events:
+    """Exécute trigger.run() en tâche de fond, comme le triggerer ; événements en file."""
+
+    def __init__(self, trigger: DvfDatasetUpdateTrigger) -> None:
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._consume(trigger))
+
+    async def _consume(self, trigger) -> None:
+        async for event in trigger.run():
+            await self.queue.put(event)
+
+    async def next(self, timeout: float = 2.0):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def aclose(self) -> None:
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+def _manifest_for(resources: list[dict]) -> dict:
+    planned = pending_updates(
+        [{**r, "zip_name": r["url"].rsplit("/", 1)[-1]} for r in resources], empty_manifest()
+    )
+    return merge_entries(empty_manifest(), {r["zip_name"]: {"fingerprint": r["fingerprint"]} for r in planned})
+
+
+def test_serialize_round_trip():
+    trigger = DvfDatasetUpdateTrigger("https://example.test/api/", bucket=BUCKET, aws_conn_id="aws_conn", poll_interval=60)
+    classpath, kwargs = trigger.serialize()
+    assert classpath == "include.dvf.triggers.DvfDatasetUpdateTrigger"
+    assert DvfDatasetUpdateTrigger(**kwargs).serialize() == (classpath, kwargs)
+
+
+def test_fingerprint_ignores_order():
+    a = {"zip_name": "a.zip", "fingerprint": "modified:1|size:2"}
+    b = {"zip_name": "b.zip", "fingerprint": "modified:3|size:4"}
+    assert updates_fingerprint([a, b]) == updates_fingerprint([b, a]) != updates_fingerprint([a])
+
+
+def test_emits_once_per_publication_and_survives_errors():
+    async def scenario():
+        stub = DatasetStub()
+        runner, url = await _serve(stub)
+        events = Events(DvfDatasetUpdateTrigger(url, poll_interval=0.01))
+        try:
+            stub.failures = 2                               # API indisponible : retenté
+            first = await events.next()
+            assert [r["zip_name"] for r in first.payload["resources"]] == [
+                "valeursfoncieres-2023.txt.zip", "valeursfoncieres-2024.txt.zip",
+            ]
+            calls = stub.calls
+            with pytest.raises(asyncio.TimeoutError):       # inchangé : aucun nouvel événement
+                await events.next(timeout=0.2)
+            assert stub.calls > calls + 3
+
+            stub.resources[1] = _resource(2024, "2025-10-01T10:00:00")
+            second = await events.next()
+            assert second.payload["fingerprint"] != first.payload["fingerprint"]
+        finally:
+            await events.aclose()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_only_resources_missing_from_manifest_are_pending():
+    async def scenario():
+        stub = DatasetStub()
+        runner, url = await _serve(stub)
+        trigger = DvfDatasetUpdateTrigger(url, bucket=BUCKET, poll_interval=0.01)
+        events = Events(trigger)
+        try:
+            with mock_aws():
+                client = boto3.client("s3", region_name="us-east-1")
+                client.create_bucket(Bucket=BUCKET)
+                client.put_object(Bucket=BUCKET, Key=MANIFEST_KEY, Body=json.dumps(_manifest_for(stub.resources)))
+                with pytest.raises(asyncio.TimeoutError):   # tout est déjà ingéré
+                    await events.next(timeout=0.2)
+
+                stub.resources.append(_resource(2025, "2025-10-01T10:00:00"))
+                event = await events.next()
+            assert event.payload["resources"] == [
+                {"zip_name": "valeursfoncieres-2025.txt.zip", "last_modified": "2025-10-01T10:00:00", "action": "new"},
+            ]
+        finally:
+            await events.aclose()
+            await runner.cleanup()
+
+    asyncio.run(scenario())